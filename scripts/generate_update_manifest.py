@@ -48,8 +48,13 @@ def build_manifest(
     notes: str,
     important: bool,
     allow_insecure_http: bool = False,
+    patches: list[tuple[str, Path, Path]] | None = None,
 ) -> dict[str, object]:
-    """根据安装包生成 manifest 内容。"""
+    """根据安装包生成 manifest 内容。
+
+    ``patches`` 为 (旧版本号, 旧版本安装包, 补丁文件) 列表；补丁由
+    ``python -m nini.update.delta`` 生成，与安装包发布在同一渠道目录下。
+    """
     installer = installer.resolve()
     if not installer.exists():
         raise FileNotFoundError(installer)
@@ -66,6 +71,38 @@ def build_manifest(
     elif parsed_base_url.scheme != "https":
         raise ValueError("更新安装包下载 URL 必须使用 HTTPS")
     url = urljoin(base_url.rstrip("/") + "/", f"{channel}/{installer.name}")
+    patch_entries: list[dict[str, object]] = []
+    for from_version, base_installer, patch_file in patches or []:
+        try:
+            Version(from_version)
+        except InvalidVersion as exc:
+            raise ValueError(f"补丁基线版本号不符合 PEP 440: {from_version}") from exc
+        base_installer = base_installer.resolve()
+        patch_file = patch_file.resolve()
+        if not base_installer.exists():
+            raise FileNotFoundError(base_installer)
+        if not patch_file.exists():
+            raise FileNotFoundError(patch_file)
+        patch_entries.append(
+            {
+                "from_version": from_version,
+                "from_size": base_installer.stat().st_size,
+                "from_sha256": _sha256(base_installer),
+                "format": "nini-delta-v1",
+                "url": urljoin(base_url.rstrip("/") + "/", f"{channel}/{patch_file.name}"),
+                "size": patch_file.stat().st_size,
+                "sha256": _sha256(patch_file),
+            }
+        )
+    asset: dict[str, object] = {
+        "platform": "windows-x64",
+        "kind": "nsis-installer",
+        "url": url,
+        "size": installer.stat().st_size,
+        "sha256": _sha256(installer),
+    }
+    if patch_entries:
+        asset["patches"] = patch_entries
     return {
         "schema_version": 1,
         "product": "nini",
@@ -76,15 +113,7 @@ def build_manifest(
         "important": important,
         "title": f"Nini {version}",
         "notes": _notes(notes),
-        "assets": [
-            {
-                "platform": "windows-x64",
-                "kind": "nsis-installer",
-                "url": url,
-                "size": installer.stat().st_size,
-                "sha256": _sha256(installer),
-            }
-        ],
+        "assets": [asset],
         "signature_policy": "正式发布必须对 nini.exe、nini-cli.exe、nini-updater.exe 和安装包进行 Authenticode 签名",
         "signature": None,
         "signature_url": None,
@@ -104,6 +133,14 @@ def _build_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="仅测试或无域名部署使用：允许 localhost / IP 地址的 HTTP 下载 URL",
     )
+    parser.add_argument(
+        "--patch",
+        nargs=3,
+        action="append",
+        default=[],
+        metavar=("FROM_VERSION", "BASE_INSTALLER", "PATCH_FILE"),
+        help="增量补丁：旧版本号、旧版本安装包、补丁文件（可重复）",
+    )
     parser.add_argument("--output", required=True, type=Path)
     return parser
 
@@ -118,6 +155,7 @@ def main(argv: list[str] | None = None) -> int:
         notes=args.notes,
         important=args.important,
         allow_insecure_http=args.allow_insecure_http,
+        patches=[(ver, Path(base), Path(patch)) for ver, base, patch in args.patch],
     )
     args.output.parent.mkdir(parents=True, exist_ok=True)
     args.output.write_text(
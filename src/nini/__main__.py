@@ -738,9 +738,7 @@ def _cmd_debug_load_session(args: argparse.Namespace) -> int:
     trace_payload: dict[str, Any] | None = None
     trace_ref = str(snapshot.trace_ref or "").strip()
     if trace_ref:
-        trace_path = Path(trace_ref)
-        if trace_path.exists():
-            trace_payload = json.loads(trace_path.read_text(encoding="utf-8"))
+        trace_payload = store.load_trace_payload(trace_ref)
     print(
         json.dumps(
             {
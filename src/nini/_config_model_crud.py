@@ -10,10 +10,11 @@ from __future__ import annotations
 
 import json
 import logging
+import sqlite3
 from typing import Any, Mapping, TypedDict
 
 from nini.config import settings
-from nini.models.database import get_db
+from nini.models.database import get_database
 from nini.utils.crypto import decrypt_api_key, encrypt_api_key, mask_api_key
 
 logger = logging.getLogger(__name__)
@@ -146,23 +147,6 @@ class ModelPurposeRoute(TypedDict):
     base_url: str | None
 
 
-async def _ensure_app_settings_table(db: Any) -> None:
-    """确保 app_settings 表存在。
-
-    某些测试场景不会触发应用 lifespan（不会先执行 init_db），
-    这里做就地兜底，避免路由直接读写配置时报 no such table。
-    """
-    await db.execute(
-        """
-        CREATE TABLE IF NOT EXISTS app_settings (
-            key TEXT PRIMARY KEY,
-            value TEXT NOT NULL,
-            updated_at TEXT NOT NULL DEFAULT (datetime('now'))
-        )
-        """
-    )
-
-
 async def save_model_config(
     provider: str,
     api_key: str | None = None,
@@ -220,15 +204,13 @@ async def save_model_config(
     encrypted_key = encrypt_api_key(normalized_api_key) if normalized_api_key is not None else None
     key_hint = mask_api_key(normalized_api_key) if normalized_api_key is not None else ""
 
-    db = await get_db()
-    try:
-        # 先查询是否已存在该 provider 的记录
-        cursor = await db.execute(
+    def _upsert(conn: sqlite3.Connection) -> tuple[str, int]:
+        # 先查询是否已存在该 provider 的记录（与写入同属一个事务）
+        existing = conn.execute(
             "SELECT id, encrypted_api_key, api_key_hint, priority, model, api_mode, base_url "
             "FROM model_configs WHERE provider = ?",
             (provider,),
-        )
-        existing = await cursor.fetchone()
+        ).fetchone()
 
         if existing:
             existing_cfg = {
@@ -245,7 +227,7 @@ async def save_model_config(
             final_encrypted_key = encrypted_key if has_new_key else existing[1]
             final_key_hint = key_hint if has_new_key else (existing[2] or "")
             final_priority = priority if priority is not None else int(existing[3] or 0)
-            await db.execute(
+            conn.execute(
                 """
                 UPDATE model_configs
                 SET model = ?, encrypted_api_key = ?, api_key_hint = ?,
@@ -270,7 +252,7 @@ async def save_model_config(
             final_priority = (
                 priority if priority is not None else default_priorities.get(provider, 0)
             )
-            await db.execute(
+            conn.execute(
                 """
                 INSERT INTO model_configs (
                     provider, model, encrypted_api_key, api_key_hint, api_mode, base_url, priority, is_active, updated_at
@@ -288,20 +270,20 @@ async def save_model_config(
                     int(is_active),
                 ),
             )
-        await db.commit()
-        logger.info("已保存模型配置: provider=%s, model=%s", provider, final_model)
+        return final_key_hint, final_priority
 
-        return {
-            "provider": provider,
-            "model": final_model or "",
-            "api_key_hint": final_key_hint,
-            "api_mode": normalized_api_mode,
-            "base_url": final_base_url,
-            "priority": final_priority,
-            "is_active": is_active,
-        }
-    finally:
-        await db.close()
+    final_key_hint, final_priority = await get_database().write(_upsert)
+    logger.info("已保存模型配置: provider=%s, model=%s", provider, final_model)
+
+    return {
+        "provider": provider,
+        "model": final_model or "",
+        "api_key_hint": final_key_hint,
+        "api_mode": normalized_api_mode,
+        "base_url": final_base_url,
+        "priority": final_priority,
+        "is_active": is_active,
+    }
 
 
 async def load_all_model_configs() -> dict[str, dict[str, Any]]:
@@ -310,33 +292,28 @@ async def load_all_model_configs() -> dict[str, dict[str, Any]]:
     Returns:
         以 provider 为键的配置字典，值包含解密后的 api_key、model、base_url 等
     """
-    db = await get_db()
-    try:
-        cursor = await db.execute(
-            "SELECT provider, model, encrypted_api_key, api_key_hint, api_mode, base_url, priority, is_active "
-            "FROM model_configs WHERE is_active = 1"
-        )
-        rows = await cursor.fetchall()
-
-        configs: dict[str, dict[str, Any]] = {}
-        for row in rows:
-            provider = row[0]
-            encrypted_key = row[2]
-            api_key = decrypt_api_key(encrypted_key) if encrypted_key else None
-
-            configs[provider] = {
-                "provider": provider,
-                "model": row[1],
-                "api_key": api_key,
-                "api_key_hint": row[3] or "",
-                "api_mode": normalize_api_mode(provider, row[4]),
-                "base_url": row[5],
-                "priority": int(row[6] or 0),
-                "is_active": bool(row[7]),
-            }
-        return configs
-    finally:
-        await db.close()
+    rows = await get_database().fetchall(
+        "SELECT provider, model, encrypted_api_key, api_key_hint, api_mode, base_url, priority, is_active "
+        "FROM model_configs WHERE is_active = 1"
+    )
+
+    configs: dict[str, dict[str, Any]] = {}
+    for row in rows:
+        provider = row[0]
+        encrypted_key = row[2]
+        api_key = decrypt_api_key(encrypted_key) if encrypted_key else None
+
+        configs[provider] = {
+            "provider": provider,
+            "model": row[1],
+            "api_key": api_key,
+            "api_key_hint": row[3] or "",
+            "api_mode": normalize_api_mode(provider, row[4]),
+            "base_url": row[5],
+            "priority": int(row[6] or 0),
+            "is_active": bool(row[7]),
+        }
+    return configs
 
 
 async def get_effective_config(provider: str) -> dict[str, Any]:
@@ -444,22 +421,17 @@ async def get_model_priorities() -> dict[str, int]:
     """读取所有提供商优先级（数值越小越优先）。"""
     priorities = {provider: idx for idx, provider in enumerate(PROVIDER_PRIORITY_ORDER)}
 
-    db = await get_db()
-    try:
-        cursor = await db.execute("SELECT provider, priority FROM model_configs")
-        rows = await cursor.fetchall()
-        for row in rows:
-            provider = row[0]
-            if provider not in VALID_PROVIDERS:
-                continue
-            try:
-                parsed = int(row[1])
-            except (TypeError, ValueError):
-                continue
-            priorities[provider] = max(0, parsed)
-        return priorities
-    finally:
-        await db.close()
+    rows = await get_database().fetchall("SELECT provider, priority FROM model_configs")
+    for row in rows:
+        provider = row[0]
+        if provider not in VALID_PROVIDERS:
+            continue
+        try:
+            parsed = int(row[1])
+        except (TypeError, ValueError):
+            continue
+        priorities[provider] = max(0, parsed)
+    return priorities
 
 
 async def set_model_priorities(priorities: dict[str, int]) -> dict[str, int]:
@@ -473,22 +445,19 @@ async def set_model_priorities(priorities: dict[str, int]) -> dict[str, int]:
         if priority < 0:
             raise ValueError("优先级不能小于 0")
 
-    db = await get_db()
-    try:
-        for provider, priority in priorities.items():
-            await db.execute(
-                """
-                INSERT INTO model_configs (provider, model, priority, is_active, updated_at)
-                VALUES (?, '', ?, 1, datetime('now'))
-                ON CONFLICT(provider) DO UPDATE SET
-                    priority = excluded.priority,
-                    updated_at = excluded.updated_at
-                """,
-                (provider, int(priority)),
-            )
-        await db.commit()
-    finally:
-        await db.close()
+    rows = [(provider, int(priority)) for provider, priority in priorities.items()]
+    await get_database().write(
+        lambda conn: conn.executemany(
+            """
+            INSERT INTO model_configs (provider, model, priority, is_active, updated_at)
+            VALUES (?, '', ?, 1, datetime('now'))
+            ON CONFLICT(provider) DO UPDATE SET
+                priority = excluded.priority,
+                updated_at = excluded.updated_at
+            """,
+            rows,
+        )
+    )
 
     return await get_model_priorities()
 
@@ -499,18 +468,14 @@ async def get_default_provider() -> str | None:
     Returns:
         默认提供商 ID，如果未设置则返回 None
     """
-    db = await get_db()
-    try:
-        await _ensure_app_settings_table(db)
-        cursor = await db.execute("SELECT value FROM app_settings WHERE key = 'default_provider'")
-        row = await cursor.fetchone()
-        if row and row[0]:
-            provider_id = row[0] if isinstance(row[0], str) else None
-            if provider_id in VALID_PROVIDERS:
-                return provider_id
-        return None
-    finally:
-        await db.close()
+    row = await get_database().fetchone(
+        "SELECT value FROM app_settings WHERE key = 'default_provider'"
+    )
+    if row and row[0]:
+        provider_id = row[0] if isinstance(row[0], str) else None
+        if provider_id in VALID_PROVIDERS:
+            return provider_id
+    return None
 
 
 async def set_default_provider(provider_id: str | None) -> bool:
@@ -522,22 +487,19 @@ async def set_default_provider(provider_id: str | None) -> bool:
     Returns:
         是否设置成功
     """
-    db = await get_db()
+    if provider_id is not None and provider_id not in VALID_PROVIDERS:
+        logger.warning("尝试设置无效的默认提供商: %s", provider_id)
+        return False
+
     try:
-        await _ensure_app_settings_table(db)
         if provider_id is None:
             # 清除默认设置
-            await db.execute("DELETE FROM app_settings WHERE key = 'default_provider'")
-            await db.commit()
+            await get_database().execute("DELETE FROM app_settings WHERE key = 'default_provider'")
             logger.info("已清除默认模型提供商设置")
             return True
 
-        if provider_id not in VALID_PROVIDERS:
-            logger.warning("尝试设置无效的默认提供商: %s", provider_id)
-            return False
-
         # 保存到 app_settings
-        await db.execute(
+        await get_database().execute(
             """
             INSERT INTO app_settings (key, value, updated_at)
             VALUES ('default_provider', ?, datetime('now'))
@@ -547,14 +509,11 @@ async def set_default_provider(provider_id: str | None) -> bool:
             """,
             (provider_id,),
         )
-        await db.commit()
         logger.info("默认模型提供商已设置为: %s", provider_id)
         return True
     except Exception as e:
         logger.error("设置默认提供商失败: %s", e)
         return False
-    finally:
-        await db.close()
 
 
 def _empty_route() -> ModelPurposeRoute:
@@ -615,24 +574,18 @@ def _normalize_purpose_routes(value: Any) -> dict[str, ModelPurposeRoute]:
 
 async def get_model_purpose_routes() -> dict[str, ModelPurposeRoute]:
     """读取用途级别的模型路由映射。"""
-    db = await get_db()
+    row = await get_database().fetchone(
+        "SELECT value FROM app_settings WHERE key = ?",
+        (_PURPOSE_ROUTING_KEY,),
+    )
+    if not row or not row[0]:
+        return {purpose: _empty_route() for purpose in MODEL_PURPOSES}
     try:
-        await _ensure_app_settings_table(db)
-        cursor = await db.execute(
-            "SELECT value FROM app_settings WHERE key = ?",
-            (_PURPOSE_ROUTING_KEY,),
-        )
-        row = await cursor.fetchone()
-        if not row or not row[0]:
-            return {purpose: _empty_route() for purpose in MODEL_PURPOSES}
-        try:
-            loaded = json.loads(row[0])
-        except json.JSONDecodeError:
-            logger.warning("用途模型路由配置解析失败，已回退为空映射")
-            loaded = {}
-        return _normalize_purpose_routes(loaded)
-    finally:
-        await db.close()
+        loaded = json.loads(row[0])
+    except json.JSONDecodeError:
+        logger.warning("用途模型路由配置解析失败，已回退为空映射")
+        loaded = {}
+    return _normalize_purpose_routes(loaded)
 
 
 async def set_model_purpose_routes(
@@ -685,30 +638,24 @@ async def set_model_purpose_routes(
             item["base_url"] = str(route["base_url"])
         to_store[purpose] = item
 
-    db = await get_db()
-    try:
-        await _ensure_app_settings_table(db)
-        if to_store:
-            await db.execute(
-                """
-                INSERT INTO app_settings (key, value, updated_at)
-                VALUES (?, ?, datetime('now'))
-                ON CONFLICT(key) DO UPDATE SET
-                value = excluded.value,
-                updated_at = excluded.updated_at
-                """,
-                (_PURPOSE_ROUTING_KEY, json.dumps(to_store, ensure_ascii=False)),
-            )
-        else:
-            await db.execute(
-                "DELETE FROM app_settings WHERE key = ?",
-                (_PURPOSE_ROUTING_KEY,),
-            )
-        await db.commit()
-        logger.info("用途模型路由已更新: %s", to_store)
-        return merged
-    finally:
-        await db.close()
+    if to_store:
+        await get_database().execute(
+            """
+            INSERT INTO app_settings (key, value, updated_at)
+            VALUES (?, ?, datetime('now'))
+            ON CONFLICT(key) DO UPDATE SET
+            value = excluded.value,
+            updated_at = excluded.updated_at
+            """,
+            (_PURPOSE_ROUTING_KEY, json.dumps(to_store, ensure_ascii=False)),
+        )
+    else:
+        await get_database().execute(
+            "DELETE FROM app_settings WHERE key = ?",
+            (_PURPOSE_ROUTING_KEY,),
+        )
+    logger.info("用途模型路由已更新: %s", to_store)
+    return merged
 
 
 async def get_purpose_provider_routes() -> dict[str, str | None]:
@@ -788,20 +735,14 @@ async def list_user_configured_provider_ids() -> list[str]:
 
 async def get_active_provider_id() -> str | None:
     """读取当前激活的供应商 ID。"""
-    db = await get_db()
-    try:
-        await _ensure_app_settings_table(db)
-        cursor = await db.execute(
-            "SELECT value FROM app_settings WHERE key = ?",
-            (_ACTIVE_PROVIDER_KEY,),
-        )
-        row = await cursor.fetchone()
-        value = row[0] if row else None
-        if isinstance(value, str) and value in VALID_PROVIDERS:
-            return value
-        return None
-    finally:
-        await db.close()
+    row = await get_database().fetchone(
+        "SELECT value FROM app_settings WHERE key = ?",
+        (_ACTIVE_PROVIDER_KEY,),
+    )
+    value = row[0] if row else None
+    if isinstance(value, str) and value in VALID_PROVIDERS:
+        return value
+    return None
 
 
 async def remove_model_config(provider: str) -> None:
@@ -813,13 +754,8 @@ async def remove_model_config(provider: str) -> None:
     if provider not in VALID_PROVIDERS:
         raise ValueError(f"不支持的模型提供商: {provider}")
 
-    db = await get_db()
-    try:
-        await db.execute("DELETE FROM model_configs WHERE provider = ?", (provider,))
-        await db.commit()
-        logger.info("已删除供应商配置: provider=%s", provider)
-    finally:
-        await db.close()
+    await get_database().execute("DELETE FROM model_configs WHERE provider = ?", (provider,))
+    logger.info("已删除供应商配置: provider=%s", provider)
 
 
 async def set_active_provider(provider_id: str | None) -> None:
@@ -831,21 +767,17 @@ async def set_active_provider(provider_id: str | None) -> None:
     if provider_id is not None and provider_id not in VALID_PROVIDERS:
         raise ValueError(f"不支持的模型提供商: {provider_id}")
 
-    db = await get_db()
-    try:
-        await _ensure_app_settings_table(db)
-        if provider_id is None:
-            await db.execute("DELETE FROM app_settings WHERE key = ?", (_ACTIVE_PROVIDER_KEY,))
-        else:
-            await db.execute(
-                """
-                INSERT INTO app_settings (key, value, updated_at)
-                VALUES (?, ?, datetime('now'))
-                ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = datetime('now')
-                """,
-                (_ACTIVE_PROVIDER_KEY, provider_id),
-            )
-        await db.commit()
-        logger.info("激活供应商已设置为: %s", provider_id)
-    finally:
-        await db.close()
+    if provider_id is None:
+        await get_database().execute(
+            "DELETE FROM app_settings WHERE key = ?", (_ACTIVE_PROVIDER_KEY,)
+        )
+    else:
+        await get_database().execute(
+            """
+            INSERT INTO app_settings (key, value, updated_at)
+            VALUES (?, ?, datetime('now'))
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = datetime('now')
+            """,
+            (_ACTIVE_PROVIDER_KEY, provider_id),
+        )
+    logger.info("激活供应商已设置为: %s", provider_id)
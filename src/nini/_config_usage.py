@@ -9,12 +9,11 @@ import json
 import logging
 import os
 import platform
+import sqlite3
 from pathlib import Path
 from typing import Any
 
-from nini.models.database import get_db
-
-from nini._config_model_crud import _ensure_app_settings_table
+from nini.models.database import get_database
 
 logger = logging.getLogger(__name__)
 
@@ -65,14 +64,11 @@ def _write_system_usage(fast: int, deep: int) -> None:
 
 async def _read_db_usage() -> dict[str, int]:
     """从数据库读取内置用量计数。"""
-    db = await get_db()
     try:
-        await _ensure_app_settings_table(db)
-        cursor = await db.execute(
+        rows = await get_database().fetchall(
             "SELECT key, value FROM app_settings WHERE key IN (?, ?)",
             (_BUILTIN_FAST_USAGE_KEY, _BUILTIN_DEEP_USAGE_KEY),
         )
-        rows = await cursor.fetchall()
         row_map = {r[0]: r[1] for r in rows}
         return {
             "fast": max(0, int(row_map.get(_BUILTIN_FAST_USAGE_KEY, 0) or 0)),
@@ -81,8 +77,6 @@ async def _read_db_usage() -> dict[str, int]:
     except Exception as e:
         logger.warning("读取数据库用量失败: %s", e)
         return {"fast": 0, "deep": 0}
-    finally:
-        await db.close()
 
 
 async def get_builtin_usage() -> dict[str, int]:
@@ -109,10 +103,9 @@ async def increment_builtin_usage(mode: str) -> None:
         return
 
     key = _BUILTIN_FAST_USAGE_KEY if mode == "fast" else _BUILTIN_DEEP_USAGE_KEY
-    db = await get_db()
-    try:
-        await _ensure_app_settings_table(db)
-        await db.execute(
+
+    def _increment(conn: sqlite3.Connection) -> list[sqlite3.Row]:
+        conn.execute(
             """
             INSERT INTO app_settings (key, value, updated_at)
             VALUES (?, '1', datetime('now'))
@@ -122,17 +115,16 @@ async def increment_builtin_usage(mode: str) -> None:
             """,
             (key,),
         )
-        cursor = await db.execute(
+        return conn.execute(
             "SELECT key, value FROM app_settings WHERE key IN (?, ?)",
             (_BUILTIN_FAST_USAGE_KEY, _BUILTIN_DEEP_USAGE_KEY),
-        )
-        rows = await cursor.fetchall()
-        await db.commit()
+        ).fetchall()
+
+    try:
+        rows = await get_database().write(_increment)
     except Exception as e:
         logger.warning("写入数据库用量失败: %s", e)
         rows = []
-    finally:
-        await db.close()
 
     row_map = {r[0]: r[1] for r in rows}
     db_usage: dict[str, Any] = {
@@ -8,16 +8,23 @@ from nini.agent.components.context_builder import (
     ContextBuilder,
     filter_valid_messages,
     get_last_user_message,
-    prepare_messages_for_llm,
     replace_arguments,
     sanitize_for_system_context,
     sanitize_reference_text,
 )
-from nini.agent.components.context_utils import naturalize_internal_status_text
+from nini.agent.components.context_utils import (
+    naturalize_internal_status_text,
+    prepare_messages_for_llm,
+)
 from nini.agent.components.context_compressor import (
+    BackgroundCompactor,
     compress_session_context,
+    compress_with_watermarks,
+    discard_background_compaction,
     force_auto_compress,
+    get_background_compactor,
     maybe_auto_compress,
+    shutdown_background_compactor,
     sliding_window_trim,
 )
 from nini.agent.components.reasoning_tracker import (
@@ -50,6 +57,11 @@ __all__ = [
     "maybe_auto_compress",
     "force_auto_compress",
     "compress_session_context",
+    "compress_with_watermarks",
+    "BackgroundCompactor",
+    "get_background_compactor",
+    "discard_background_compaction",
+    "shutdown_background_compactor",
     "sliding_window_trim",
     # Reasoning Tracker
     "ReasoningChainTracker",
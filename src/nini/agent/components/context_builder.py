@@ -24,9 +24,9 @@ from nini.agent.components.context_tools import (
     match_tools_by_context,
 )
 from nini.agent.components.context_utils import (
+    PreparedMessageCache,
     filter_valid_messages,
     get_last_user_message,
-    prepare_messages_for_llm,
     replace_arguments,
     sanitize_for_system_context,
     sanitize_reference_text,
@@ -36,6 +36,7 @@ from nini.agent.prompt_policy import (
     PDCA_DETAIL_BLOCK,
     compose_runtime_context_message,
     format_untrusted_context_block,
+    get_adaptive_tool_budget,
 )
 from nini.agent.prompts.scientific import get_system_prompt
 from nini.agent.session import Session
@@ -423,7 +424,14 @@ class ContextBuilder:
             )
 
         valid_messages = filter_valid_messages(session.messages)
-        prepared_messages = prepare_messages_for_llm(valid_messages, context_ratio=context_ratio)
+        cache = session.prepared_message_cache
+        if not isinstance(cache, PreparedMessageCache):
+            cache = PreparedMessageCache()
+            session.prepared_message_cache = cache
+        prepared_messages, prepared_tokens = cache.prepare(
+            valid_messages,
+            adaptive_max_chars=get_adaptive_tool_budget(context_ratio),
+        )
 
         if settings.auto_compress_enabled and prepared_messages:
             from nini.agent.components.context_compressor import (
@@ -432,12 +440,15 @@ class ContextBuilder:
             )
 
             threshold, _target = get_compress_threshold_for_window(context_window)
-            current_tokens = count_messages_tokens(messages + prepared_messages)
+            base_tokens = count_messages_tokens(messages)
+            # 单条 token 数各含 2 个收尾开销，整体只计一次
+            current_tokens = base_tokens + sum(prepared_tokens) - 2 * len(prepared_tokens)
             if current_tokens > threshold:
                 prepared_messages = sliding_window_trim(
                     prepared_messages,
                     threshold,
-                    base_tokens=count_messages_tokens(messages),
+                    base_tokens=base_tokens,
+                    msg_tokens=prepared_tokens,
                 )
 
         messages.extend(prepared_messages)
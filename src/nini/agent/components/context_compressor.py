@@ -2,22 +2,43 @@
 
 Handles automatic compression when context exceeds token thresholds
 and sliding window trimming as a fallback mechanism.
+
+压缩分两级水位：token 数越过软水位时由 BackgroundCompactor 在后台提前生成
+最旧消息段的摘要，下一个轮次边界原子替换；只有越过硬阈值且后台结果不可用时
+才在关键路径上同步压缩。
 """
 
 from __future__ import annotations
 
+import asyncio
 import logging
-from typing import Any
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Coroutine
 
 from nini.agent.events import AgentEvent, EventType
 from nini.agent.session import Session
 from nini.agent import event_builders as eb
 from nini.config import settings
-from nini.memory.compression import compress_session_history_with_llm
+from nini.memory.compression import (
+    apply_compression_summary,
+    compress_session_history_with_llm,
+    plan_compression_split,
+    summarize_for_compression,
+    try_merge_oldest_segments,
+)
 from nini.utils.token_counter import count_messages_tokens
 
 logger = logging.getLogger(__name__)
 
+# 已完成但一直未被接管的预压缩结果保留时长（秒），超时后在下次启动时清理
+_SPECULATIVE_JOB_TTL_SECONDS = 600.0
+
+
+def _keep_recent_messages() -> int:
+    """压缩时最少保留的近期消息数：同步压缩与后台预压缩共用。"""
+    return max(4, settings.memory_keep_recent_messages)
+
 
 async def compress_session_context(
     session: Session,
@@ -39,7 +60,7 @@ async def compress_session_context(
     """
     threshold = settings.auto_compress_threshold_tokens
     target = target_tokens if target_tokens is not None else threshold // 2
-    min_messages = max(4, settings.memory_keep_recent_messages)
+    min_messages = _keep_recent_messages()
     logger.info(
         "自动压缩触发(%s): 当前 %d tokens, 目标 %d tokens",
         trigger,
@@ -122,13 +143,16 @@ async def maybe_auto_compress(
         if current_tokens is not None
         else count_messages_tokens(session.messages)
     )
-    if measured_tokens <= threshold:
-        return None
-    return await compress_session_context(
+    return await compress_with_watermarks(
         session,
         current_tokens=measured_tokens,
-        trigger="threshold",
-        target_tokens=target,
+        threshold=threshold,
+        inline=lambda tokens: compress_session_context(
+            session,
+            current_tokens=tokens,
+            trigger="threshold",
+            target_tokens=target,
+        ),
     )
 
 
@@ -155,6 +179,227 @@ async def force_auto_compress(
     )
 
 
+@dataclass
+class _SpeculativeJob:
+    """一次后台预压缩：待归档的最旧消息快照与生成摘要的任务。"""
+
+    archived: list[dict[str, Any]]
+    task: asyncio.Task[tuple[str, str]]
+    started_tokens: int
+    started_at: float = field(default_factory=time.monotonic)
+
+
+class BackgroundCompactor:
+    """后台预压缩器。
+
+    软水位触发时对最旧消息段启动 LLM 摘要任务（只读快照，不修改会话）；
+    轮次边界调用 ``handover`` 时，若摘要已完成且会话历史前缀未变，则一次性
+    归档并替换为摘要。历史被回滚、已被其他路径压缩等情况下结果作废。
+    """
+
+    def __init__(
+        self,
+        *,
+        summarize: (
+            Callable[[list[dict[str, Any]]], Coroutine[Any, Any, tuple[str, str]]] | None
+        ) = None,
+    ) -> None:
+        self._summarize = summarize or summarize_for_compression
+        self._jobs: dict[str, _SpeculativeJob] = {}
+
+    def has_job(self, session_id: str) -> bool:
+        return session_id in self._jobs
+
+    def is_ready(self, session_id: str) -> bool:
+        job = self._jobs.get(session_id)
+        return job is not None and job.task.done()
+
+    def maybe_start(
+        self,
+        session: Session,
+        *,
+        current_tokens: int,
+        ratio: float = 0.5,
+        min_messages: int | None = None,
+    ) -> bool:
+        """为会话启动后台摘要；已有在途任务或消息不足时不启动。
+
+        ``min_messages`` 默认与同步压缩一致，取 ``settings.memory_keep_recent_messages``。
+        """
+        self._evict_stale()
+        if session.id in self._jobs:
+            return False
+        archive_count = plan_compression_split(
+            len(session.messages),
+            ratio=ratio,
+            min_messages=min_messages if min_messages is not None else _keep_recent_messages(),
+        )
+        if archive_count <= 0:
+            return False
+        archived = list(session.messages[:archive_count])
+        task = asyncio.create_task(
+            self._summarize(archived), name=f"speculative-compress-{session.id[:8]}"
+        )
+        task.add_done_callback(_log_task_failure)
+        self._jobs[session.id] = _SpeculativeJob(
+            archived=archived, task=task, started_tokens=current_tokens
+        )
+        logger.info(
+            "后台预压缩启动: session=%s, tokens=%d, archive=%d",
+            session.id,
+            current_tokens,
+            archive_count,
+        )
+        return True
+
+    async def handover(
+        self,
+        session: Session,
+        *,
+        current_tokens: int,
+        wait: bool = False,
+    ) -> AgentEvent | None:
+        """在轮次边界接管后台摘要结果。
+
+        Args:
+            session: 目标会话。
+            current_tokens: 接管前的 token 数（用于事件与压缩比）。
+            wait: 摘要尚未完成时是否等待（硬阈值路径使用）。
+
+        Returns:
+            接管成功时返回 CONTEXT_COMPRESSED 事件，否则返回 None。
+        """
+        job = self._jobs.get(session.id)
+        if job is None or (not wait and not job.task.done()):
+            return None
+        try:
+            summary, summary_mode = await asyncio.shield(job.task)
+        except Exception:
+            self._jobs.pop(session.id, None)
+            return None
+        self._jobs.pop(session.id, None)
+        # 以下检查与替换之间没有 await，保证接管的原子性
+        if not _has_prefix(session.messages, job.archived):
+            logger.info("后台预压缩结果已过期（会话历史已变化），丢弃: session=%s", session.id)
+            return None
+        result = apply_compression_summary(session, job.archived, summary, summary_mode)
+        await try_merge_oldest_segments(session, settings.compressed_context_max_segments)
+
+        post_tokens = count_messages_tokens(session.messages)
+        archived_count = int(result.get("archived_count", 0))
+        return eb.build_context_compressed_event(
+            original_tokens=current_tokens,
+            compressed_tokens=post_tokens,
+            compression_ratio=calculate_compression_ratio(current_tokens, post_tokens),
+            message=f"上下文已在后台压缩，归档了 {archived_count} 条消息",
+            archived_count=archived_count,
+            remaining_count=int(result.get("remaining_count", 0)),
+            previous_tokens=current_tokens,
+            trigger="background",
+        )
+
+    def discard(self, session_id: str) -> None:
+        """取消并丢弃会话的在途预压缩。"""
+        job = self._jobs.pop(session_id, None)
+        if job is not None and not job.task.done():
+            job.task.cancel()
+
+    def _evict_stale(self) -> None:
+        """清理超过保留时长仍未接管的已完成结果（会话闲置或已不在内存中）。"""
+        deadline = time.monotonic() - _SPECULATIVE_JOB_TTL_SECONDS
+        for session_id, job in list(self._jobs.items()):
+            if job.task.done() and job.started_at < deadline:
+                self._jobs.pop(session_id, None)
+
+    def shutdown(self) -> None:
+        for session_id in list(self._jobs):
+            self.discard(session_id)
+
+
+def _has_prefix(messages: list[dict[str, Any]], prefix: list[dict[str, Any]]) -> bool:
+    """按对象身份判断 messages 是否仍以 prefix 开头，且之后还有保留消息。"""
+    if len(messages) <= len(prefix):
+        return False
+    return all(current is expected for current, expected in zip(messages, prefix))
+
+
+def _log_task_failure(task: asyncio.Task[Any]) -> None:
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if exc is not None:
+        logger.warning("后台预压缩失败: %s", exc)
+
+
+_background_compactor: BackgroundCompactor | None = None
+
+
+def get_background_compactor() -> BackgroundCompactor:
+    """获取进程级后台预压缩器。"""
+    global _background_compactor
+    if _background_compactor is None:
+        _background_compactor = BackgroundCompactor()
+    return _background_compactor
+
+
+def discard_background_compaction(session_id: str) -> None:
+    """丢弃会话的后台预压缩（会话被移除或删除时调用）。"""
+    if _background_compactor is not None:
+        _background_compactor.discard(session_id)
+
+
+def shutdown_background_compactor() -> None:
+    """取消所有在途预压缩任务（应用关闭时调用）。"""
+    if _background_compactor is not None:
+        _background_compactor.shutdown()
+
+
+async def compress_with_watermarks(
+    session: Session,
+    *,
+    current_tokens: int,
+    threshold: int,
+    inline: Callable[[int], Awaitable[AgentEvent | None]],
+) -> AgentEvent | None:
+    """按软/硬两级水位调度压缩。
+
+    - 后台摘要已完成：在本轮次边界接管；
+    - 超过硬阈值：优先等待在途后台任务，仍超限或没有后台任务时调用 ``inline``；
+    - 超过软水位：启动后台摘要，本轮不阻塞。
+    """
+    compactor = get_background_compactor()
+    soft_limit = int(threshold * settings.auto_compress_soft_watermark_ratio)
+    tokens = int(current_tokens)
+
+    if compactor.is_ready(session.id):
+        before = count_messages_tokens(session.messages)
+        event = await compactor.handover(session, current_tokens=tokens)
+        if event is not None:
+            # 只有会话历史变短，系统提示等其余部分不变
+            tokens = max(0, tokens - (before - count_messages_tokens(session.messages)))
+            if tokens <= threshold:
+                return event
+
+    if tokens > threshold:
+        if compactor.has_job(session.id):
+            before = count_messages_tokens(session.messages)
+            event = await compactor.handover(session, current_tokens=tokens, wait=True)
+            if event is not None:
+                tokens = max(0, tokens - (before - count_messages_tokens(session.messages)))
+                if tokens <= threshold:
+                    return event
+        compactor.discard(session.id)
+        return await inline(tokens)
+
+    if (
+        settings.auto_compress_background_enabled
+        and tokens > soft_limit
+        and compactor.maybe_start(session, current_tokens=tokens)
+    ):
+        logger.debug("软水位 %d 已越过，后台预压缩进行中", soft_limit)
+    return None
+
+
 def calculate_compression_ratio(
     original_tokens: int,
     compressed_tokens: int,
@@ -199,6 +444,7 @@ def sliding_window_trim(
     token_budget: int,
     base_tokens: int = 0,
     min_recent: int = 4,
+    msg_tokens: list[int] | None = None,
 ) -> list[dict[str, Any]]:
     """Trim messages from oldest to fit within token budget.
 
@@ -210,6 +456,8 @@ def sliding_window_trim(
         token_budget: Maximum tokens allowed.
         base_tokens: Token count of base/context messages not in the list.
         min_recent: Minimum number of recent messages to preserve.
+        msg_tokens: 预计算的单条消息 token 数（与 messages 一一对应），
+            通常来自 PreparedMessageCache，省去重复计数。
 
     Returns:
         Trimmed message list fitting within token budget.
@@ -218,7 +466,8 @@ def sliding_window_trim(
         return messages
 
     # 预计算每条消息的 token 数，避免 O(n²) 重复计数
-    msg_tokens = [count_messages_tokens([m]) for m in messages]
+    if msg_tokens is None or len(msg_tokens) != len(messages):
+        msg_tokens = [count_messages_tokens([m]) for m in messages]
     current_total = base_tokens + sum(msg_tokens)
 
     if current_total <= token_budget:
@@ -5,6 +5,7 @@ from __future__ import annotations
 import json as _json
 import logging
 import re
+from dataclasses import dataclass
 from typing import Any
 
 from nini.agent.prompt_policy import (
@@ -17,6 +18,7 @@ from nini.agent.prompt_policy import (
 )
 from nini.agent.session import Session
 from nini.agent.components.tool_executor import summarize_tool_result_dict
+from nini.utils.token_counter import count_messages_tokens
 
 logger = logging.getLogger(__name__)
 
@@ -363,18 +365,100 @@ def _prepare_single_message_for_llm(
     return None
 
 
+@dataclass
+class _PreparedEntry:
+    """单条消息的预处理结果；持有源对象引用，保证 id() 不会被复用。"""
+
+    source: dict[str, Any]
+    content: Any
+    tool_calls: Any
+    prepared: dict[str, Any] | None
+    tokens: int
+
+
+class PreparedMessageCache:
+    """按 (消息对象身份, 工具结果预算档位) 缓存 LLM 预处理结果与 token 数。
+
+    会话历史只追加时，每次构建只需处理新增消息；消息的 content / tool_calls
+    被整体替换时自动重新计算。压缩、回滚改写历史后由 Session 调用 ``clear``。
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[tuple[int, int], _PreparedEntry] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def prepare(
+        self,
+        messages: list[dict[str, Any]],
+        *,
+        adaptive_max_chars: int,
+    ) -> tuple[list[dict[str, Any]], list[int]]:
+        """返回 (预处理后的消息, 每条消息的 token 数)。
+
+        token 数与 ``count_messages_tokens([msg])`` 一致（含单条消息的收尾开销）。
+        """
+        prepared: list[dict[str, Any]] = []
+        tokens: list[int] = []
+        seen: set[int] = set()
+        for msg in messages:
+            seen.add(id(msg))
+            key = (id(msg), adaptive_max_chars)
+            entry = self._entries.get(key)
+            if (
+                entry is None
+                or entry.source is not msg
+                or entry.content is not msg.get("content")
+                or entry.tool_calls is not msg.get("tool_calls")
+            ):
+                self.misses += 1
+                cleaned = _prepare_single_message_for_llm(
+                    msg, adaptive_max_chars=adaptive_max_chars
+                )
+                entry = _PreparedEntry(
+                    source=msg,
+                    content=msg.get("content"),
+                    tool_calls=msg.get("tool_calls"),
+                    prepared=cleaned,
+                    tokens=count_messages_tokens([cleaned]) if cleaned is not None else 0,
+                )
+                self._entries[key] = entry
+            else:
+                self.hits += 1
+            if entry.prepared is not None:
+                # 浅拷贝：下游可能修改消息字典，避免污染缓存
+                prepared.append(dict(entry.prepared))
+                tokens.append(entry.tokens)
+
+        # 丢弃已不在历史中的消息（被压缩归档或回滚）
+        if len(self._entries) > len(seen) * 2:
+            self._entries = {key: value for key, value in self._entries.items() if key[0] in seen}
+        return prepared, tokens
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
 def prepare_messages_for_llm(
     messages: list[dict[str, Any]],
     context_ratio: float = 0.0,
+    *,
+    cache: PreparedMessageCache | None = None,
 ) -> list[dict[str, Any]]:
     """去掉 UI 噪音和大载荷字段，得到适合 LLM 的消息列表。
 
     Args:
         messages: 原始消息列表
         context_ratio: 当前 context 使用率（0.0 ~ 1.0），用于动态调整工具结果截断预算
+        cache: 可选的预处理缓存，传入时复用未变化消息的结果
     """
     # 根据 context 使用率计算工具结果预算
     adaptive_max_chars = get_adaptive_tool_budget(context_ratio)
+    if cache is not None:
+        return cache.prepare(messages, adaptive_max_chars=adaptive_max_chars)[0]
 
     prepared: list[dict[str, Any]] = []
     for msg in messages:
@@ -11,7 +11,7 @@ from typing import Any, AsyncGenerator
 
 from nini.config import settings
 
-from .base import BaseLLMClient, LLMChunk, match_first_model
+from .base import BaseLLMClient, LLMChunk, match_first_model, shared_llm_transport
 
 logger = logging.getLogger(__name__)
 
@@ -33,11 +33,15 @@ class AnthropicClient(BaseLLMClient):
 
     def _ensure_client(self):
         if self._client is None:
-            from anthropic import AsyncAnthropic
+            from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
 
             self._client = AsyncAnthropic(
                 api_key=self._api_key,
                 timeout=max(1, int(settings.llm_timeout)),
+                http_client=DefaultAsyncHttpxClient(
+                    trust_env=settings.llm_trust_env_proxy,
+                    transport=shared_llm_transport(),
+                ),
             )
 
     def is_available(self) -> bool:
@@ -13,6 +13,18 @@ from typing import Any, AsyncGenerator, TypedDict
 logger = logging.getLogger(__name__)
 
 
+def shared_llm_transport() -> Any:
+    """模型供应商共享的出站传输层。
+
+    各供应商实例仍自建 SDK 客户端，但底层连接池跨实例、跨 ``reload_model_resolver`` 复用；
+    关闭供应商客户端不会关闭共享连接。
+    """
+    from nini.config import settings
+    from nini.utils.http_pool import get_http_pool
+
+    return get_http_pool().transport("llm", trust_env=settings.llm_trust_env_proxy)
+
+
 def match_first_model(
     available: list[str],
     keyword_groups: list[tuple[str, ...]],
@@ -11,7 +11,7 @@ from typing import Any, AsyncGenerator
 from nini.config import settings
 
 from .base import LLMChunk
-from .base import match_first_model
+from .base import match_first_model, shared_llm_transport
 from .openai_provider import OpenAICompatibleClient
 
 
@@ -152,7 +152,10 @@ class KimiCodingClient(OpenAICompatibleClient):
             if self._base_url:
                 kwargs["base_url"] = self._base_url
             if self._http_client is None:
-                self._http_client = DefaultAsyncHttpxClient(trust_env=settings.llm_trust_env_proxy)
+                self._http_client = DefaultAsyncHttpxClient(
+                    trust_env=settings.llm_trust_env_proxy,
+                    transport=shared_llm_transport(),
+                )
             kwargs["http_client"] = self._http_client
             kwargs["default_headers"] = {
                 "User-Agent": self._USER_AGENT,
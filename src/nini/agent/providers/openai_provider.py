@@ -18,7 +18,13 @@ import openai
 
 from nini.config import settings
 
-from .base import BaseLLMClient, LLMChunk, ReasoningStreamParser, match_first_model
+from .base import (
+    BaseLLMClient,
+    LLMChunk,
+    ReasoningStreamParser,
+    match_first_model,
+    shared_llm_transport,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -266,7 +272,10 @@ class OpenAICompatibleClient(BaseLLMClient):
             if self._http_client is None:
                 # 默认不读取系统代理环境变量，避免 ALL_PROXY/HTTPS_PROXY
                 # 意外注入导致的 socksio 依赖报错。
-                self._http_client = DefaultAsyncHttpxClient(trust_env=settings.llm_trust_env_proxy)
+                self._http_client = DefaultAsyncHttpxClient(
+                    trust_env=settings.llm_trust_env_proxy,
+                    transport=shared_llm_transport(),
+                )
             kwargs["http_client"] = self._http_client
             self._client = AsyncOpenAI(**kwargs)
 
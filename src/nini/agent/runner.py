@@ -11,6 +11,7 @@ import json
 import logging
 import re
 import uuid
+from collections import OrderedDict
 from contextlib import suppress
 from dataclasses import dataclass
 from datetime import datetime, timezone
@@ -22,13 +23,14 @@ from nini.agent.model_resolver import (
 )
 from nini.agent.prompt_policy import AGENTS_MD_MAX_CHARS
 from nini.agent.providers import ReasoningStreamParser
-from nini.agent.session import Session, session_manager
+from nini.agent.session import Session, resolve_session_resource_id, session_manager
 from nini.config import settings
 from nini.knowledge.loader import KnowledgeLoader
 from nini.intent import default_intent_analyzer
 from nini.intent.service import SLASH_SKILL_WITH_ARGS_RE
 from nini.memory.compression import (
     compress_session_history_with_llm,
+    flush_analysis_memories,
 )
 from nini.memory.research_profile import (
     DEFAULT_RESEARCH_PROFILE_ID,
@@ -68,6 +70,7 @@ from nini.agent.components import (
     detect_reasoning_type,
     detect_key_decisions,
     calculate_confidence_score,
+    compress_with_watermarks,
     execute_tool,
     naturalize_internal_status_text,
     parse_tool_arguments,
@@ -79,6 +82,9 @@ from nini.agent.components import (
 
 logger = logging.getLogger(__name__)
 
+# 每个 runner 缓存的回合形态数（阶段 × 首选工具组合），超出后按 LRU 淘汰
+_TOOL_DEFINITIONS_CACHE_MAX_ENTRIES = 32
+
 # 仅主 Agent 可调用的 Orchestrator 工具集（子 Agent 不暴露，防止递归派发）
 ORCHESTRATOR_TOOL_NAMES: frozenset[str] = frozenset({"dispatch_agents"})
 GENERIC_ASK_OPTION_LABEL_RE = re.compile(
@@ -423,6 +429,10 @@ class AgentRunner:
         self._loop_guard = LoopGuard()
         # 最近一轮工具暴露策略快照（用于恢复提示与观测）
         self._last_tool_exposure_policy: dict[str, Any] | None = None
+        self._tool_definitions_cache: OrderedDict[tuple[Any, ...], tuple[dict[str, Any], ...]] = (
+            OrderedDict()
+        )
+        self._tool_definitions_registry: Any = None
         # 累计需要从 Agent 超时预算中扣除的人工等待时长
         self._timeout_excluded_seconds: float = 0.0
         # MemoryManager 实例（惰性初始化）
@@ -437,7 +447,13 @@ class AgentRunner:
 
         返回 PLAN_STEP_UPDATE 事件供调用方 yield；若无需处理则返回 None。
         无论是否实际修改任务状态，都会清除 pending 标记，防止下轮脏状态。
+        同时立即落盘本轮累积的 AnalysisMemory 修改（write-behind）。
         """
+        try:
+            flush_analysis_memories(resolve_session_resource_id(session))
+        except Exception:
+            logger.debug("turn 结束时落盘 AnalysisMemory 失败", exc_info=True)
+
         pending_id = getattr(session, "pending_auto_complete_task_id", None)
         if pending_id is None:
             return None
@@ -3305,49 +3321,110 @@ class AgentRunner:
 
         主 Agent（非 SubSession）额外暴露 ORCHESTRATOR_TOOL_NAMES 中的工具；
         子 Agent（SubSession）不暴露这些工具，防止递归派发。
+
+        注册表提供 ``version`` 时，最终工具列表按 (注册表版本, 子会话标记, 可见工具集,
+        首选工具) 缓存：回合形态不变时直接复用同一批定义对象，序列化结果字节一致。
         """
         from nini.agent.sub_session import SubSession
 
         is_sub_session = isinstance(session, SubSession)
+        registry = self._tool_registry
 
-        tools: list[dict[str, Any]] = []
         visible_tool_names: set[str] | None = None
         self._last_tool_exposure_policy = None
+        if registry is not None and not is_sub_session:
+            # compute_tool_exposure_policy 依赖 list_tools 确定可见工具集；
+            # 若注册表不支持 list_tools（如测试用 mock），跳过可见性过滤以避免误清空工具列表。
+            _has_list_tools = hasattr(registry, "list_tools")
+            try:
+                policy = compute_tool_exposure_policy(
+                    session=session,
+                    tool_registry=registry,
+                    user_message=user_message,
+                )
+                self._last_tool_exposure_policy = policy
+                visible_tool_names = (
+                    set(policy.get("visible_tools", [])) if _has_list_tools else None
+                )
+            except Exception:
+                self._last_tool_exposure_policy = None
+                visible_tool_names = None
+
+        normalized_preferred = {
+            str(name).strip() for name in preferred_tools or set() if str(name).strip()
+        }
+
+        cache_key: tuple[Any, ...] | None = None
+        version = getattr(registry, "version", None)
+        if isinstance(version, int) and not isinstance(version, bool):
+            if self._tool_definitions_registry is not registry:
+                self._tool_definitions_cache.clear()
+                self._tool_definitions_registry = registry
+            cache_key = (
+                version,
+                is_sub_session,
+                None if visible_tool_names is None else frozenset(visible_tool_names),
+                frozenset(normalized_preferred),
+                self._ask_user_question_handler is not None,
+            )
+            cached = self._tool_definitions_cache.get(cache_key)
+            if cached is not None:
+                self._tool_definitions_cache.move_to_end(cache_key)
+                return list(cached)
+
+        tools = self._collect_tool_definitions(
+            is_sub_session=is_sub_session,
+            visible_tool_names=visible_tool_names,
+        )
+        annotated = [
+            self._annotate_tool_definition(item, preferred_tools=normalized_preferred)
+            for item in tools
+        ]
+        if normalized_preferred:
+            annotated.sort(
+                key=lambda item: (
+                    (
+                        0
+                        if isinstance(item.get("function"), dict)
+                        and item["function"].get("name") in normalized_preferred
+                        else 1
+                    ),
+                    str(item.get("function", {}).get("name", "")),
+                ),
+            )
+
+        if cache_key is not None:
+            self._tool_definitions_cache[cache_key] = tuple(annotated)
+            while len(self._tool_definitions_cache) > _TOOL_DEFINITIONS_CACHE_MAX_ENTRIES:
+                self._tool_definitions_cache.popitem(last=False)
+        return annotated
+
+    def _collect_tool_definitions(
+        self,
+        *,
+        is_sub_session: bool,
+        visible_tool_names: set[str] | None,
+    ) -> list[dict[str, Any]]:
+        """按可见工具集收集注册表定义，并补入 Orchestrator 与 ask_user_question 工具。"""
+        tools: list[dict[str, Any]] = []
         if self._tool_registry is not None:
-            if is_sub_session:
-                raw = self._tool_registry.get_tool_definitions()
-                if isinstance(raw, list):
-                    tools = [item for item in raw if isinstance(item, dict)]
-            else:
-                # compute_tool_exposure_policy 依赖 list_tools 确定可见工具集；
-                # 若注册表不支持 list_tools（如测试用 mock），跳过可见性过滤以避免误清空工具列表。
-                _has_list_tools = hasattr(self._tool_registry, "list_tools")
-                try:
-                    policy = compute_tool_exposure_policy(
-                        session=session,
-                        tool_registry=self._tool_registry,
-                        user_message=user_message,
+            raw = self._tool_registry.get_tool_definitions()
+            if isinstance(raw, list):
+                tools = [
+                    item
+                    for item in raw
+                    if isinstance(item, dict)
+                    and (
+                        is_sub_session
+                        or visible_tool_names is None
+                        or str(item.get("function", {}).get("name", "")).strip()
+                        in visible_tool_names
                     )
-                    self._last_tool_exposure_policy = policy
-                    visible_tool_names = (
-                        set(policy.get("visible_tools", [])) if _has_list_tools else None
-                    )
-                except Exception:
-                    self._last_tool_exposure_policy = None
-                    visible_tool_names = None
-                raw = self._tool_registry.get_tool_definitions()
-                if isinstance(raw, list):
-                    tools = [
-                        item
-                        for item in raw
-                        if isinstance(item, dict)
-                        and (
-                            visible_tool_names is None
-                            or str(item.get("function", {}).get("name", "")).strip()
-                            in visible_tool_names
-                        )
-                    ]
+                ]
 
+        tool_names = {
+            item["function"].get("name") for item in tools if isinstance(item.get("function"), dict)
+        }
         # Orchestrator 工具：从注册表中直接获取 tool_definition（不走 expose_to_llm 过滤）
         if (
             not is_sub_session
@@ -3355,47 +3432,17 @@ class AgentRunner:
             and hasattr(self._tool_registry, "get")
         ):
             for orch_name in ORCHESTRATOR_TOOL_NAMES:
-                # 检查是否已经在 tools 列表中
-                already_in = any(
-                    isinstance(t.get("function"), dict) and t["function"].get("name") == orch_name
-                    for t in tools
-                )
-                if not already_in:
-                    skill = self._tool_registry.get(orch_name)
-                    if skill is not None and hasattr(skill, "get_tool_definition"):
-                        tools.append(skill.get_tool_definition())
+                if orch_name in tool_names:
+                    continue
+                skill = self._tool_registry.get(orch_name)
+                if skill is not None and hasattr(skill, "get_tool_definition"):
+                    tools.append(skill.get_tool_definition())
+                    tool_names.add(orch_name)
 
         # 内建用户问答工具：允许模型暂停并向用户发起澄清问题。
-        has_ask_user_question = any(
-            isinstance(item, dict)
-            and isinstance(item.get("function"), dict)
-            and item["function"].get("name") == "ask_user_question"
-            for item in tools
-        )
-        if not has_ask_user_question and self._ask_user_question_handler is not None:
+        if "ask_user_question" not in tool_names and self._ask_user_question_handler is not None:
             tools.append(self._ask_user_question_tool_definition())
-
-        normalized_preferred = {
-            str(name).strip() for name in preferred_tools or set() if str(name).strip()
-        }
-        annotated = [
-            self._annotate_tool_definition(item, preferred_tools=normalized_preferred)
-            for item in tools
-        ]
-        if not normalized_preferred:
-            return annotated
-        return sorted(
-            annotated,
-            key=lambda item: (
-                (
-                    0
-                    if isinstance(item.get("function"), dict)
-                    and item["function"].get("name") in normalized_preferred
-                    else 1
-                ),
-                str(item.get("function", {}).get("name", "")),
-            ),
-        )
+        return tools
 
     @staticmethod
     def _annotate_tool_definition(
@@ -4651,7 +4698,7 @@ class AgentRunner:
         *,
         current_tokens: int | None = None,
     ) -> AgentEvent | None:
-        """检查上下文 token 数，超过阈值时自动压缩。"""
+        """检查上下文 token 数：越过软水位时后台预压缩，超过阈值时同步压缩。"""
         if not settings.auto_compress_enabled:
             return None
         threshold = settings.auto_compress_threshold_tokens
@@ -4660,12 +4707,15 @@ class AgentRunner:
             if current_tokens is not None
             else count_messages_tokens(session.messages)
         )
-        if measured_tokens <= threshold:
-            return None
-        return await self._compress_session_context(
+        return await compress_with_watermarks(
             session,
             current_tokens=measured_tokens,
-            trigger="threshold",
+            threshold=threshold,
+            inline=lambda tokens: self._compress_session_context(
+                session,
+                current_tokens=tokens,
+                trigger="threshold",
+            ),
         )
 
     async def _force_auto_compress(
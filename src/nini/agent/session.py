@@ -121,6 +121,8 @@ class Session:
     evidence_collector: Any = field(init=False, repr=False)
     # 工具执行期间的事件回调，允许工具流式发送进度更新
     event_callback: Any = field(default=None, repr=False)
+    # LLM 消息预处理缓存（PreparedMessageCache），由 ContextBuilder 惰性创建
+    prepared_message_cache: Any = field(default=None, repr=False)
 
     def __post_init__(self) -> None:
         from nini.agent.evidence_collector import EvidenceCollector
@@ -566,6 +568,9 @@ class Session:
 
     def _rewrite_conversation_memory(self) -> None:
         """根据当前 messages 重写持久化记忆。"""
+        # 历史被压缩/回滚改写，消息预处理缓存随之失效
+        if self.prepared_message_cache is not None:
+            self.prepared_message_cache.clear()
         self.conversation_memory.clear()
         for msg in self.messages:
             entry = {k: v for k, v in msg.items() if k != "_ts"}
@@ -840,6 +845,10 @@ class SessionManager:
             from nini.memory.compression import clear_session_analysis_memory_cache
 
             clear_session_analysis_memory_cache(session_id)
+        # 丢弃后台预压缩任务
+        from nini.agent.components.context_compressor import discard_background_compaction
+
+        discard_background_compaction(session_id)
         # 清理会话 lane
         from nini.agent.lane_queue import lane_queue
 
@@ -852,6 +861,12 @@ class SessionManager:
             session_dir = settings.sessions_dir / session_id
             if session_dir.exists():
                 shutil.rmtree(session_dir, ignore_errors=True)
+            from nini.utils.cost_ledger import get_cost_ledger
+
+            try:
+                get_cost_ledger().forget_session(session_id)
+            except Exception as exc:
+                logger.warning("从成本账本移除会话失败: %s (%s)", session_id, exc)
 
     def update_session_title(self, session_id: str, title: str) -> bool:
         """更新会话标题。"""
@@ -12,6 +12,7 @@
 
 from __future__ import annotations
 
+from collections import OrderedDict
 from dataclasses import dataclass, field
 from typing import Any
 
@@ -369,20 +370,31 @@ def _resolve_next_pending_stage(session: Any) -> str | None:
     return None
 
 
-def compute_tool_exposure_policy(
-    *,
+@dataclass(frozen=True)
+class ExposureShape:
+    """决定工具暴露面的全部会话输入（"回合形态"），可哈希，用作策略缓存键。"""
+
+    stage: str
+    stage_reason: str
+    active_task_id: int | None = None
+    active_task_title: str | None = None
+    active_task_hint: str | None = None
+    next_pending_stage: str | None = None
+    approved_tools: frozenset[str] = frozenset()
+
+
+# (ExposureShape, 工具名元组) → 策略；阶段与工具集组合有限，容量足够覆盖常见回合形态
+_POLICY_CACHE: OrderedDict[tuple[ExposureShape, tuple[str, ...]], dict[str, Any]] = OrderedDict()
+_POLICY_CACHE_MAX_ENTRIES = 128
+
+
+def resolve_exposure_shape(
     session: Any,
-    tool_registry: Any,
+    *,
     user_message: str | None = None,
     stage_override: str | None = None,
-) -> dict[str, Any]:
-    """计算当前轮允许暴露的工具面。"""
-    all_tools = []
-    if tool_registry is not None and hasattr(tool_registry, "list_tools"):
-        listed = tool_registry.list_tools()
-        if isinstance(listed, list):
-            all_tools = [str(item).strip() for item in listed if str(item).strip()]
-
+) -> ExposureShape:
+    """从会话状态解析回合形态（阶段、激活任务、look-ahead 阶段、高风险授权）。"""
     active_task_id: int | None = None
     active_task_title: str | None = None
     active_task_hint: str | None = None
@@ -411,6 +423,67 @@ def compute_tool_exposure_policy(
                 stage = str(recent_stage or "")
                 stage_reason = recent_reason
 
+    approved: set[str] = set()
+    if session is not None and hasattr(session, "has_tool_approval"):
+        approved = {name for name in _HIGH_RISK_TOOLS if session.has_tool_approval(name)}
+
+    return ExposureShape(
+        stage=stage,
+        stage_reason=stage_reason,
+        active_task_id=active_task_id,
+        active_task_title=active_task_title,
+        active_task_hint=active_task_hint,
+        next_pending_stage=_resolve_next_pending_stage(session),
+        approved_tools=frozenset(approved),
+    )
+
+
+def compute_tool_exposure_policy(
+    *,
+    session: Any,
+    tool_registry: Any,
+    user_message: str | None = None,
+    stage_override: str | None = None,
+) -> dict[str, Any]:
+    """计算当前轮允许暴露的工具面。
+
+    会话侧只解析回合形态；形态与工具集相同时直接复用已计算的策略。
+    """
+    all_tools: list[str] = []
+    if tool_registry is not None and hasattr(tool_registry, "list_tools"):
+        listed = tool_registry.list_tools()
+        if isinstance(listed, list):
+            all_tools = [str(item).strip() for item in listed if str(item).strip()]
+
+    shape = resolve_exposure_shape(
+        session, user_message=user_message, stage_override=stage_override
+    )
+    key = (shape, tuple(all_tools))
+    policy = _POLICY_CACHE.get(key)
+    if policy is None:
+        policy = _build_exposure_policy(shape, all_tools)
+        _POLICY_CACHE[key] = policy
+        while len(_POLICY_CACHE) > _POLICY_CACHE_MAX_ENTRIES:
+            _POLICY_CACHE.popitem(last=False)
+    else:
+        _POLICY_CACHE.move_to_end(key)
+    # 调用方可能修改返回值，交出一份拷贝
+    return {
+        name: (
+            (list(value) if isinstance(value, list) else dict(value))
+            if isinstance(value, (list, dict))
+            else value
+        )
+        for name, value in policy.items()
+    }
+
+
+def _build_exposure_policy(shape: ExposureShape, all_tools: list[str]) -> dict[str, Any]:
+    """根据回合形态与工具集计算暴露策略（纯函数）。"""
+    stage = shape.stage
+    active_task_id = shape.active_task_id
+    active_task_hint = shape.active_task_hint
+
     authorization_state: dict[str, bool] = {}
     forced_visible_tools: list[str] = []
     policy_warnings: list[str] = []
@@ -426,8 +499,8 @@ def compute_tool_exposure_policy(
         allowed |= _ANALYSIS_TOOLS
 
     # ── look-ahead：当前任务未标记 completed 时，预解锁下一阶段工具 ──
-    if stage in {"profile", "visualization"} and session is not None:
-        next_pending_stage = _resolve_next_pending_stage(session)
+    if stage in {"profile", "visualization"}:
+        next_pending_stage = shape.next_pending_stage
         if next_pending_stage and next_pending_stage != stage:
             lookahead_tools = _STAGE_TOOLS_MAP.get(next_pending_stage, set())
             lookahead_visible = [name for name in all_tools if name in lookahead_tools]
@@ -442,9 +515,7 @@ def compute_tool_exposure_policy(
     for tool_name in list(allowed):
         if tool_name not in _HIGH_RISK_TOOLS:
             continue
-        approved = False
-        if session is not None and hasattr(session, "has_tool_approval"):
-            approved = bool(session.has_tool_approval(tool_name))
+        approved = tool_name in shape.approved_tools
         authorization_state[tool_name] = approved
         if stage != "export" and not approved:
             allowed.discard(tool_name)
@@ -482,7 +553,7 @@ def compute_tool_exposure_policy(
     # ── 构建阶段过渡提示（供 runner 注入 LLM 上下文）──
     stage_transition_hint: str | None = None
     if removed_by_policy and active_task_id is not None:
-        next_stage = _resolve_next_pending_stage(session)
+        next_stage = shape.next_pending_stage
         if next_stage:
             representative_tools = [
                 name for name in removed_by_policy[:3] if name not in _ALWAYS_ALLOWED
@@ -498,9 +569,9 @@ def compute_tool_exposure_policy(
 
     return {
         "stage": stage,
-        "stage_reason": stage_reason,
+        "stage_reason": shape.stage_reason,
         "active_task_id": active_task_id,
-        "active_task_title": active_task_title,
+        "active_task_title": shape.active_task_title,
         "active_task_hint": active_task_hint,
         "visible_tools": visible_tools,
         "hidden_tools": hidden_tools,
@@ -1,7 +1,8 @@
 """编排工作流引擎 —— 基于 YAML DAG 定义的顺序/并行 Agent 执行。
 
 第一期只支持 depends_on（顺序依赖），不做条件分支。
-DAG 拓扑排序后按层次并行执行：同层步骤并行，不同层严格顺序。
+按数据流调度执行：每个步骤在自身依赖完成后立即启动（不等待同层其他步骤），
+受全局并发上限约束，就绪步骤按历史耗时估计的关键路径优先。
 
 YAML 定义示例::
 
@@ -22,11 +23,19 @@ YAML 定义示例::
 
 from __future__ import annotations
 
-import asyncio
 import logging
+import time
 from dataclasses import dataclass, field
 from typing import Any
 
+from nini.utils.dataflow import (
+    DataflowGraph,
+    DataflowScheduler,
+    DataflowTrace,
+    StepDurationHistory,
+    get_step_duration_history,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -92,6 +101,8 @@ class WorkflowResult:
     success: bool
     step_results: list[WorkflowStepResult] = field(default_factory=list)
     error: str = ""
+    # 调度时间线（每步就绪/开始/结束与实际关键路径）
+    trace: DataflowTrace | None = None
 
     @property
     def failed_steps(self) -> list[WorkflowStepResult]:
@@ -102,57 +113,43 @@ class WorkflowResult:
         return [r for r in self.step_results if r.success]
 
 
-def _topological_layers(steps: tuple[WorkflowStep, ...]) -> list[list[WorkflowStep]]:
-    """将 DAG 步骤按拓扑排序分层，每层内步骤可并行执行。
+def _build_graph(steps: tuple[WorkflowStep, ...]) -> DataflowGraph:
+    """构建步骤依赖图。
 
     Raises:
         ValueError: 存在循环依赖或引用未知步骤时
     """
-    step_map = {s.step_id: s for s in steps}
-    in_degree: dict[str, int] = {s.step_id: 0 for s in steps}
-
-    for step in steps:
-        for dep in step.depends_on:
-            if dep not in step_map:
-                raise ValueError(f"步骤 '{step.step_id}' 引用了未知依赖 '{dep}'")
-            in_degree[step.step_id] = in_degree.get(step.step_id, 0) + 1
-
-    layers: list[list[WorkflowStep]] = []
-    remaining = set(step_map.keys())
-
-    while remaining:
-        # 当前层：所有依赖已完成（in_degree == 0）的步骤
-        current_layer = [step_map[sid] for sid in remaining if in_degree[sid] == 0]
-        if not current_layer:
-            raise ValueError(f"工作流存在循环依赖，剩余步骤: {remaining}")
-
-        layers.append(current_layer)
-        completed = {s.step_id for s in current_layer}
-        remaining -= completed
-
-        # 减少后续步骤的 in_degree
-        for step in steps:
-            if step.step_id in remaining:
-                for dep in step.depends_on:
-                    if dep in completed:
-                        in_degree[step.step_id] -= 1
-
-    return layers
+    return DataflowGraph({step.step_id: step.depends_on for step in steps})
 
 
 class WorkflowExecutor:
     """工作流执行引擎。
 
-    将 WorkflowDef 的 DAG 步骤按拓扑层次执行：同层并行，跨层顺序。
+    将 WorkflowDef 的 DAG 步骤按数据流调度执行：依赖完成即启动，全局并发受限，
+    关键路径上的步骤优先。任一步骤失败后不再启动新步骤，在途步骤照常完成。
     """
 
-    def __init__(self, spawner: Any) -> None:
+    def __init__(
+        self,
+        spawner: Any,
+        *,
+        max_concurrency: int | None = None,
+        history: StepDurationHistory | None = None,
+    ) -> None:
         """初始化执行引擎。
 
         Args:
             spawner: SubAgentSpawner 实例，用于执行各步骤的 Agent
+            max_concurrency: 全局并发上限；默认取 settings.max_sub_agent_concurrency
+            history: 步骤耗时历史；默认使用进程级历史
         """
+        if max_concurrency is None:
+            from nini.config import settings
+
+            max_concurrency = int(getattr(settings, "max_sub_agent_concurrency", 4))
         self._spawner = spawner
+        self._max_concurrency = max_concurrency
+        self._history = history or get_step_duration_history()
 
     async def execute(
         self,
@@ -162,7 +159,7 @@ class WorkflowExecutor:
         context: str = "",
         parent_turn_id: str | None = None,
     ) -> WorkflowResult:
-        """按 DAG 拓扑顺序执行工作流。
+        """按 DAG 数据流执行工作流。
 
         Args:
             workflow: 工作流定义
@@ -171,10 +168,10 @@ class WorkflowExecutor:
             parent_turn_id: 父轮次 ID
 
         Returns:
-            WorkflowResult，包含所有步骤执行结果
+            WorkflowResult，包含已执行步骤结果（按拓扑层与声明顺序排列）与调度时间线
         """
         try:
-            layers = _topological_layers(workflow.steps)
+            graph = _build_graph(workflow.steps)
         except ValueError as exc:
             return WorkflowResult(
                 workflow_name=workflow.name,
@@ -182,89 +179,89 @@ class WorkflowExecutor:
                 error=str(exc),
             )
 
+        step_map = {s.step_id: s for s in workflow.steps}
         logger.info(
-            "WorkflowExecutor: 开始执行工作流 '%s'，共 %d 层 %d 步",
+            "WorkflowExecutor: 开始执行工作流 '%s'，共 %d 层 %d 步，并发上限 %s",
             workflow.name,
-            len(layers),
+            len(graph.layers),
             len(workflow.steps),
+            self._max_concurrency,
         )
 
-        all_results: list[WorkflowStepResult] = []
         completed_summaries: dict[str, str] = {}  # step_id → summary，供后续步骤引用
 
-        for layer_idx, layer in enumerate(layers):
-            logger.info(
-                "WorkflowExecutor: 执行第 %d/%d 层，%d 个步骤并行: %s",
-                layer_idx + 1,
-                len(layers),
-                len(layer),
-                [s.step_id for s in layer],
-            )
-
-            async def _run_step(step: WorkflowStep) -> WorkflowStepResult:
-                # 注入前置步骤摘要到任务描述
-                task = step.task_template
-                if step.depends_on:
-                    dep_summaries = "\n".join(
-                        f"[{dep}]: {completed_summaries.get(dep, '（无摘要）')}"
-                        for dep in step.depends_on
-                        if dep in completed_summaries
-                    )
-                    if dep_summaries:
-                        task = f"{task}\n\n前置步骤结果：\n{dep_summaries}"
-                if context:
-                    task = f"{task}\n\n背景信息：{context}"
-
-                import time
-
-                start = time.monotonic()
-                result = await self._spawner.spawn_with_retry(
-                    step.agent_id,
-                    task,
-                    session,
-                    parent_turn_id=parent_turn_id,
-                )
-                elapsed_ms = int((time.monotonic() - start) * 1000)
-                return WorkflowStepResult(
-                    step_id=step.step_id,
-                    agent_id=step.agent_id,
-                    success=result.success,
-                    summary=result.summary,
-                    error=result.error,
-                    stop_reason=result.stop_reason,
-                    execution_time_ms=elapsed_ms,
+        async def _run_step(step_id: str) -> WorkflowStepResult:
+            step = step_map[step_id]
+            # 注入前置步骤摘要到任务描述
+            task = step.task_template
+            if step.depends_on:
+                dep_summaries = "\n".join(
+                    f"[{dep}]: {completed_summaries.get(dep, '（无摘要）')}"
+                    for dep in step.depends_on
+                    if dep in completed_summaries
                 )
-
-            # 同层并行
-            layer_results = await asyncio.gather(
-                *(_run_step(step) for step in layer),
-                return_exceptions=False,
+                if dep_summaries:
+                    task = f"{task}\n\n前置步骤结果：\n{dep_summaries}"
+            if context:
+                task = f"{task}\n\n背景信息：{context}"
+
+            start = time.monotonic()
+            result = await self._spawner.spawn_with_retry(
+                step.agent_id,
+                task,
+                session,
+                parent_turn_id=parent_turn_id,
+            )
+            elapsed_ms = int((time.monotonic() - start) * 1000)
+            if result.success:
+                completed_summaries[step_id] = result.summary
+            return WorkflowStepResult(
+                step_id=step.step_id,
+                agent_id=step.agent_id,
+                success=result.success,
+                summary=result.summary,
+                error=result.error,
+                stop_reason=result.stop_reason,
+                execution_time_ms=elapsed_ms,
             )
 
-            for step, step_result in zip(layer, layer_results):
-                all_results.append(step_result)
-                if step_result.success:
-                    completed_summaries[step.step_id] = step_result.summary
-
-            # 如有步骤失败，终止后续层执行
-            failed = [r for r in layer_results if not r.success]
-            if failed:
-                failed_ids = [r.step_id for r in failed]
-                logger.warning(
-                    "WorkflowExecutor: 第 %d 层存在失败步骤 %s，终止后续执行",
-                    layer_idx + 1,
-                    failed_ids,
-                )
-                return WorkflowResult(
-                    workflow_name=workflow.name,
-                    success=False,
-                    step_results=all_results,
-                    error=f"步骤 {failed_ids} 执行失败",
-                )
+        scheduler: DataflowScheduler[WorkflowStepResult] = DataflowScheduler(
+            graph,
+            max_concurrency=self._max_concurrency,
+            history=self._history,
+            history_key=lambda sid: f"workflow:{step_map[sid].agent_id}",
+        )
+        # 任一步骤失败即停止启动新步骤
+        run = await scheduler.run(_run_step, should_halt=lambda _sid, result: not result.success)
+
+        depth = graph.depth()
+        ordered_ids = sorted(run.results, key=lambda sid: (depth[sid], graph.index[sid]))
+        all_results = [run.results[sid] for sid in ordered_ids]
+        failed_ids = [r.step_id for r in all_results if not r.success]
+        if failed_ids:
+            logger.warning(
+                "WorkflowExecutor: 步骤 %s 执行失败，未启动的步骤 %s 已终止",
+                failed_ids,
+                run.not_started,
+            )
+            return WorkflowResult(
+                workflow_name=workflow.name,
+                success=False,
+                step_results=all_results,
+                error=f"步骤 {failed_ids} 执行失败",
+                trace=run.trace,
+            )
 
-        logger.info("WorkflowExecutor: 工作流 '%s' 全部步骤执行成功", workflow.name)
+        logger.info(
+            "WorkflowExecutor: 工作流 '%s' 全部步骤执行成功，耗时 %d ms（关键路径 %s，%d ms）",
+            workflow.name,
+            run.trace.total_ms,
+            run.trace.critical_path,
+            run.trace.critical_path_ms,
+        )
         return WorkflowResult(
             workflow_name=workflow.name,
             success=True,
             step_results=all_results,
+            trace=run.trace,
         )
@@ -5,23 +5,25 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 from pathlib import Path
 from typing import Any
 
 import yaml
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 
 from nini.config import settings
 from nini.models.cost import (
     AggregateCostSummary,
     ModelPricing,
+    ModelTokenUsage,
     PricingConfig,
     SessionCostSummary,
     TokenUsage,
 )
-from nini.utils.token_counter import get_tracker
+from nini.utils.cost_ledger import flush_pending_syncs, get_cost_ledger
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/cost")
@@ -59,8 +61,8 @@ def _load_pricing_config() -> PricingConfig:
         return _pricing_config
 
 
-async def _load_session_title(meta_file: Path) -> str:
-    """异步加载会话标题。"""
+def _load_session_title(meta_file: Path) -> str:
+    """加载会话标题。"""
     if not meta_file.exists():
         return "新会话"
 
@@ -94,71 +96,33 @@ def _get_session_meta_path(session_id: str) -> Path:
 
 
 def _load_session_token_usage(session_id: str) -> TokenUsage | None:
-    """加载会话的 token 使用数据。"""
+    """从成本账本加载会话的 token 使用数据（先把 cost.jsonl 新增行入账）。"""
     try:
-        tracker = get_tracker(session_id)
-        pricing = _load_pricing_config()
-
-        # 导入成本估算函数用于重新计算缺失的成本
-        from nini.utils.token_counter import estimate_cost
-
-        # 计算成本（对于缺失成本的记录重新估算）
-        total_cost_usd = 0.0
-        for record in tracker.records:
-            if record.cost_usd is None:
-                # 重新计算缺失的成本（兼容旧数据）
-                cost, _ = estimate_cost(record.model, record.input_tokens, record.output_tokens)
-                record.cost_usd = cost
-            total_cost_usd += record.cost_usd or 0.0
-
-        total_cost_cny = total_cost_usd * pricing.usd_to_cny_rate
-
-        # 构建模型分解
-        model_breakdown: dict[str, Any] = {}
-        for record in tracker.records:
-            # 清理模型名称（移除可能的 fallback 标记用于分组）
-            clean_model_name = record.model.replace(" (fallback)", "")
-            if clean_model_name not in model_breakdown:
-                model_breakdown[clean_model_name] = {
-                    "model_id": clean_model_name,
-                    "input_tokens": 0,
-                    "output_tokens": 0,
-                    "total_tokens": 0,
-                    "cost_cny": 0.0,
-                    "cost_usd": 0.0,
-                    "call_count": 0,
-                }
-
-            model_data = model_breakdown[clean_model_name]
-            model_data["input_tokens"] += record.input_tokens
-            model_data["output_tokens"] += record.output_tokens
-            model_data["total_tokens"] += record.input_tokens + record.output_tokens
-            model_data["cost_usd"] += record.cost_usd or 0.0
-            model_data["call_count"] += 1
-
-        # 转换 USD 到 CNY
-        from nini.models.cost import ModelTokenUsage
+        ledger = get_cost_ledger()
+        ledger.sync_session(session_id, settings.sessions_dir / session_id / "cost.jsonl")
+        rate = _load_pricing_config().usd_to_cny_rate
 
         model_usage: dict[str, ModelTokenUsage] = {}
-        for model_id, data in model_breakdown.items():
-            data["cost_cny"] = float(data["cost_usd"]) * pricing.usd_to_cny_rate
-            # 显式构造 ModelTokenUsage 以确保类型正确
+        for model_id, data in ledger.session_models(session_id).items():
             model_usage[model_id] = ModelTokenUsage(
                 model_id=model_id,
-                input_tokens=int(data["input_tokens"]),
-                output_tokens=int(data["output_tokens"]),
-                total_tokens=int(data["total_tokens"]),
-                cost_cny=float(data["cost_cny"]),
-                cost_usd=float(data["cost_usd"]),
-                call_count=int(data["call_count"]),
+                input_tokens=data["input_tokens"],
+                output_tokens=data["output_tokens"],
+                total_tokens=data["total_tokens"],
+                cost_cny=data["cost_usd"] * rate,
+                cost_usd=data["cost_usd"],
+                call_count=data["call_count"],
             )
 
+        input_tokens = sum(item.input_tokens for item in model_usage.values())
+        output_tokens = sum(item.output_tokens for item in model_usage.values())
+        total_cost_usd = sum(item.cost_usd for item in model_usage.values())
         return TokenUsage(
             session_id=session_id,
-            input_tokens=tracker.total_input_tokens,
-            output_tokens=tracker.total_output_tokens,
-            total_tokens=tracker.total_tokens,
-            estimated_cost_cny=total_cost_cny,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            total_tokens=input_tokens + output_tokens,
+            estimated_cost_cny=total_cost_usd * rate,
             estimated_cost_usd=total_cost_usd,
             model_breakdown=model_usage,
         )
@@ -167,6 +131,50 @@ def _load_session_token_usage(session_id: str) -> TokenUsage | None:
         return None
 
 
+def _collect_sessions_cost(limit: int | None, offset: int) -> dict[str, Any]:
+    """基于账本汇总构建会话成本列表；读取量与返回的会话数成正比。"""
+    flush_pending_syncs()
+    ledger = get_cost_ledger()
+    ledger.ensure_backfilled(settings.sessions_dir)
+    rate = _load_pricing_config().usd_to_cny_rate
+    totals = ledger.totals()
+
+    sessions = []
+    for item in ledger.list_sessions(limit=limit, offset=offset):
+        session_id = item["session_id"]
+        sessions.append(
+            {
+                "session_id": session_id,
+                "title": _load_session_title(_get_session_meta_path(session_id)),
+                "total_tokens": item["total_tokens"],
+                "estimated_cost_cny": round(item["cost_usd"] * rate, 6),
+                "model_count": item["model_count"],
+                "last_used_at": item["last_ts"],
+            }
+        )
+
+    # 找出使用最多的模型
+    most_used_model: str | None = None
+    if totals["models"]:
+        most_used_model = max(totals["models"].items(), key=lambda x: x[1]["call_count"])[0]
+
+    session_count = totals["session_count"]
+    total_cost_cny = totals["cost_usd"] * rate
+    aggregate = {
+        "total_sessions": session_count,
+        "total_tokens": totals["total_tokens"],
+        "total_input_tokens": totals["input_tokens"],
+        "total_output_tokens": totals["output_tokens"],
+        "total_cost_cny": round(total_cost_cny, 6),
+        "total_cost_usd": round(totals["cost_usd"], 6),
+        "average_cost_per_session": (
+            round(total_cost_cny / session_count, 6) if session_count else 0.0
+        ),
+        "most_used_model": most_used_model,
+    }
+    return {"sessions": sessions, "aggregate": aggregate}
+
+
 @router.get("/session/{session_id}")
 async def get_session_cost(session_id: str) -> dict[str, Any]:
     """获取指定会话的 Token 使用统计和成本估算。
@@ -177,7 +185,7 @@ async def get_session_cost(session_id: str) -> dict[str, Any]:
     Returns:
         Token 使用统计和成本信息
     """
-    usage = _load_session_token_usage(session_id)
+    usage = await asyncio.to_thread(_load_session_token_usage, session_id)
     if usage is None:
         # 返回空数据而非 404，因为会话可能尚未产生 token 消耗
         return {
@@ -194,88 +202,45 @@ async def get_session_cost(session_id: str) -> dict[str, Any]:
 
 
 @router.get("/sessions")
-async def get_all_sessions_cost() -> dict[str, Any]:
-    """获取所有会话的成本统计列表。
+async def get_all_sessions_cost(
+    limit: int | None = Query(default=None, ge=1),
+    offset: int = Query(default=0, ge=0),
+) -> dict[str, Any]:
+    """获取会话成本列表（按最近调用倒序）和全局聚合摘要。
+
+    Args:
+        limit: 返回的会话数上限，默认全部
+        offset: 分页偏移
 
     Returns:
         会话成本列表和聚合摘要
     """
-    sessions_dir = Path(settings.data_dir) / "sessions"
-    if not sessions_dir.exists():
-        return {
-            "sessions": [],
-            "aggregate": {
-                "total_sessions": 0,
-                "total_tokens": 0,
-                "total_input_tokens": 0,
-                "total_output_tokens": 0,
-                "total_cost_cny": 0.0,
-                "total_cost_usd": 0.0,
-                "average_cost_per_session": 0.0,
-            },
-        }
-
-    sessions = []
-    total_input = 0
-    total_output = 0
-    total_cost_cny = 0.0
-    total_cost_usd = 0.0
-    model_usage: dict[str, int] = {}
-
-    for session_dir in sorted(
-        sessions_dir.iterdir(), key=lambda x: x.stat().st_mtime, reverse=True
-    ):
-        if not session_dir.is_dir():
-            continue
-
-        session_id = session_dir.name
-        meta_file = session_dir / "meta.json"
-
-        # 获取会话标题
-        title = await _load_session_title(meta_file)
-
-        # 获取 token 使用
-        usage = _load_session_token_usage(session_id)
-        if usage:
-            sessions.append(
-                {
-                    "session_id": session_id,
-                    "title": title,
-                    "total_tokens": usage.total_tokens,
-                    "estimated_cost_cny": round(usage.estimated_cost_cny, 6),
-                    "model_count": len(usage.model_breakdown),
-                }
-            )
-            total_input += usage.input_tokens
-            total_output += usage.output_tokens
-            total_cost_cny += usage.estimated_cost_cny
-            total_cost_usd += usage.estimated_cost_usd
-
-            # 统计模型使用
-            for model_id, model_data in usage.model_breakdown.items():
-                model_usage[model_id] = model_usage.get(model_id, 0) + model_data.call_count
-
-    # 找出使用最多的模型
-    most_used_model: str | None = None
-    if model_usage:
-        most_used_model = max(model_usage.items(), key=lambda x: x[1])[0]
-
-    # 构建聚合摘要
-    aggregate = {
-        "total_sessions": len(sessions),
-        "total_tokens": total_input + total_output,
-        "total_input_tokens": total_input,
-        "total_output_tokens": total_output,
-        "total_cost_cny": round(total_cost_cny, 6),
-        "total_cost_usd": round(total_cost_usd, 6),
-        "average_cost_per_session": round(total_cost_cny / len(sessions), 6) if sessions else 0.0,
-        "most_used_model": most_used_model,
-    }
+    return await asyncio.to_thread(_collect_sessions_cost, limit, offset)
+
+
+@router.get("/timeline")
+async def get_cost_timeline(
+    granularity: str = Query(default="day", pattern="^(hour|day|week)$"),
+    since: float | None = Query(default=None, description="起始 Unix 时间戳（秒）"),
+    until: float | None = Query(default=None, description="结束 Unix 时间戳（秒，不含）"),
+    session_id: str | None = None,
+) -> dict[str, Any]:
+    """按时间桶（UTC 对齐）聚合 token 与成本，每个桶附带模型分解。"""
+
+    def _collect() -> list[dict[str, Any]]:
+        flush_pending_syncs()
+        ledger = get_cost_ledger()
+        ledger.ensure_backfilled(settings.sessions_dir)
+        return ledger.timeline(
+            granularity=granularity, since=since, until=until, session_id=session_id
+        )
 
-    return {
-        "sessions": sessions,
-        "aggregate": aggregate,
-    }
+    buckets = await asyncio.to_thread(_collect)
+    rate = _load_pricing_config().usd_to_cny_rate
+    for bucket in buckets:
+        bucket["cost_cny"] = round(bucket["cost_usd"] * rate, 6)
+        bucket["cost_usd"] = round(bucket["cost_usd"], 6)
+    return {"granularity": granularity, "buckets": buckets}
 
 
 @router.get("/pricing")
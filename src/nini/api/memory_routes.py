@@ -188,13 +188,8 @@ async def delete_memory(memory_id: str) -> dict[str, Any]:
     """
     try:
         store = _get_store()
-        # MemoryStore 暂无独立 delete 方法，通过 sqlite3 直接删除
-        conn = store._conn  # type: ignore[attr-defined]
-        cursor = conn.execute("SELECT id FROM facts WHERE id = ?", (memory_id,))
-        if cursor.fetchone() is None:
+        if not store.delete_fact(memory_id):
             raise HTTPException(status_code=404, detail="记忆不存在")
-        with conn:
-            conn.execute("DELETE FROM facts WHERE id = ?", (memory_id,))
         return {"success": True, "message": "记忆已删除"}
 
     except HTTPException:
@@ -10,8 +10,6 @@ import os
 import mimetypes
 import re
 import shutil
-import subprocess
-import sys
 import uuid
 import zipfile
 from datetime import datetime, timezone
@@ -21,7 +19,7 @@ from urllib.parse import quote, unquote
 
 import pandas as pd
 from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, UploadFile
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
 from nini.agent.session import session_manager
 from nini.api.auth_utils import (
@@ -31,6 +29,7 @@ from nini.api.auth_utils import (
     require_auth,
     set_auth_session_cookie,
 )
+from nini.charts.render_service import RenderJob, get_chart_render_service
 from nini.config import settings
 from nini.intent import default_intent_analyzer
 from nini.models.schemas import (
@@ -70,20 +69,13 @@ from nini.tools.markdown_tool_admin import (
 from nini.utils.chart_payload import normalize_chart_payload
 from nini.utils.dataframe_io import read_dataframe
 from nini.workspace import WorkspaceManager
+from nini.workspace.preview import DEFAULT_PREVIEW_LINES
+from nini.workspace.zip_stream import ZipManifest, iter_zip_stream
 
 router = APIRouter(prefix="/api")
 logger = logging.getLogger(__name__)
 
 
-def _windows_subprocess_kwargs() -> dict[str, Any]:
-    """Windows 下隐藏短生命周期子进程窗口。"""
-    if sys.platform != "win32":
-        return {}
-    return {
-        "creationflags": getattr(subprocess, "CREATE_NO_WINDOW", 0),
-    }
-
-
 # Excel 序列日期关键词（用于启发式检测）
 _DATE_HINTS = {"日期", "时间", "时刻", "date", "time", "datetime", "timestamp"}
 _SKILL_UPLOAD_EXTENSIONS = {".md", ".markdown", ".txt"}
@@ -283,8 +275,48 @@ def _fix_excel_serial_dates(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def _build_download_response(path: Path, filename: str, *, inline: bool = False) -> Response:
-    """构造文件响应（支持 attachment/inline，避免 FileResponse 在线程池路径上的阻塞）。"""
+_BYTE_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _file_etag(path: Path) -> str:
+    """基于 mtime/size 的文件 ETag（无需读取文件内容）。"""
+    stat = path.stat()
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def _parse_byte_range(header: str, size: int) -> tuple[int, int] | None:
+    """解析单段 Range 头，返回闭区间 (start, end)；不可满足时返回 None。"""
+    match = _BYTE_RANGE_PATTERN.match(header.strip())
+    if match is None or size <= 0:
+        return None
+    start_raw, end_raw = match.groups()
+    if not start_raw and not end_raw:
+        return None
+    if not start_raw:
+        # bytes=-N：末尾 N 字节
+        length = int(end_raw)
+        if length <= 0:
+            return None
+        return max(size - length, 0), size - 1
+    start = int(start_raw)
+    end = int(end_raw) if end_raw else size - 1
+    if start >= size or end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def _build_download_response(
+    path: Path,
+    filename: str,
+    *,
+    inline: bool = False,
+    request: Request | None = None,
+) -> Response:
+    """构造文件响应（支持 attachment/inline，避免 FileResponse 在线程池路径上的阻塞）。
+
+    传入 ``request`` 时启用条件请求与分段读取：命中 ``If-None-Match`` 返回 304，
+    携带单段 ``Range`` 时只读取并返回对应字节区间（206）。
+    """
     media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
     disposition_type = "inline" if inline else "attachment"
     # RFC 5987 / RFC 6266: 非 ASCII 文件名用 filename* 编码，ASCII 用 filename 降级
@@ -299,10 +331,50 @@ def _build_download_response(path: Path, filename: str, *, inline: bool = False)
             f'filename="{ascii_fallback}"; '
             f"filename*=UTF-8''{utf8_encoded}"
         )
-    return Response(
-        content=path.read_bytes(),
-        media_type=media_type,
-        headers={"Content-Disposition": disposition},
+    if request is None:
+        return Response(
+            content=path.read_bytes(),
+            media_type=media_type,
+            headers={"Content-Disposition": disposition},
+        )
+
+    etag = _file_etag(path)
+    headers = {
+        "Content-Disposition": disposition,
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "no-cache",
+    }
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in {tag.strip() for tag in if_none_match.split(",")}:
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range.strip() == etag):
+        size = path.stat().st_size
+        byte_range = _parse_byte_range(range_header, size)
+        if byte_range is None:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status_code=416, headers=headers)
+        start, end = byte_range
+        with path.open("rb") as fh:
+            fh.seek(start)
+            chunk = fh.read(end - start + 1)
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        return Response(content=chunk, status_code=206, media_type=media_type, headers=headers)
+
+    return Response(content=path.read_bytes(), media_type=media_type, headers=headers)
+
+
+def _build_zip_stream_response(manifest: ZipManifest, filename: str) -> StreamingResponse:
+    """按清单流式输出 ZIP；响应头携带条目数与未压缩总字节数，供前端展示进度。"""
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    headers.update(manifest.http_headers())
+    return StreamingResponse(
+        iter_zip_stream(manifest),
+        media_type="application/zip",
+        headers=headers,
     )
 
 
@@ -681,12 +753,25 @@ def _resolve_file_path(session_id: str, file_path: str) -> Path | None:
 
 
 @router.get("/workspace/{session_id}/files/{file_path:path}/preview")
-async def preview_workspace_file(session_id: str, file_path: str):
-    """按路径获取工作空间文件预览。"""
+async def preview_workspace_file(
+    session_id: str,
+    file_path: str,
+    start_line: int = 0,
+    max_lines: int = DEFAULT_PREVIEW_LINES,
+):
+    """按路径获取工作空间文件预览。
+
+    文本类文件按行窗口返回，``start_line``（0 起始）与 ``max_lines`` 控制窗口位置。
+    """
     _ensure_workspace_session_exists(session_id)
     workspace = WorkspaceManager(session_id)
     try:
-        preview = workspace.get_file_preview_by_path(file_path)
+        preview = await asyncio.to_thread(
+            workspace.get_file_preview_by_path,
+            file_path,
+            start_line=start_line,
+            max_lines=max_lines,
+        )
         return APIResponse(success=True, data=preview)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail=f"文件不存在: {file_path}")
@@ -742,6 +827,7 @@ def _is_binary_file(filename: str) -> bool:
 
 @router.get("/workspace/{session_id}/files/{file_path:path}")
 async def get_workspace_file(
+    request: Request,
     session_id: str,
     file_path: str,
     inline: bool = False,
@@ -754,6 +840,7 @@ async def get_workspace_file(
     默认返回文件内容 JSON。当 download=1 时返回文件下载。
     图片文件（.png/.jpg/.jpeg/.gif/.webp/.svg/.bmp/.ico）默认直接返回文件流。
     二进制文件（.pdf/.doc/.docx/.xls/.xlsx 等）默认直接返回文件流。
+    图片与二进制文件响应携带 ETag，并支持 If-None-Match 与单段 Range 请求。
 
     参数:
         inline: 是否内联显示（而非下载）
@@ -772,12 +859,17 @@ async def get_workspace_file(
 
     # 图片文件默认内联返回，兼容 Markdown/预览；显式 download=1 时改为附件下载。
     if _is_image_file(filename):
-        return _build_download_response(target_path, filename, inline=inline if download else True)
+        return _build_download_response(
+            target_path,
+            filename,
+            inline=inline if download else True,
+            request=request,
+        )
 
     # 二进制文件（PDF、Office 文档等）默认直接返回文件流
     # 注意：尊重 inline 参数，用于 PDF 预览（inline=True）vs 下载（inline=False）
     if _is_binary_file(filename):
-        return _build_download_response(target_path, filename, inline=inline)
+        return _build_download_response(target_path, filename, inline=inline, request=request)
 
     # 如果不下载，返回文件内容 JSON（向后兼容）
     if not download and not bundle:
@@ -1004,18 +1096,14 @@ async def download_workspace_zip(
 
     workspace = WorkspaceManager(session_id)
     try:
-        zip_bytes = workspace.batch_download_paths(paths)
+        manifest = workspace.build_download_manifest_for_paths(paths)
     except FileNotFoundError as exc:
         raise HTTPException(status_code=404, detail=f"文件不存在: {exc}") from exc
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
-    if not zip_bytes:
+    if not manifest.entries:
         raise HTTPException(status_code=404, detail="没有可下载的文件")
-    return Response(
-        content=zip_bytes,
-        media_type="application/zip",
-        headers={"Content-Disposition": 'attachment; filename="workspace.zip"'},
-    )
+    return _build_zip_stream_response(manifest, "workspace.zip")
 
 
 # ---- Markdown Skills ----
@@ -1749,41 +1837,16 @@ async def _convert_plotly_json_to_png(
     height: int | None = None,
     scale: float | None = None,
 ) -> Response | None:
-    """将 Plotly JSON 转换为高清 PNG 并返回响应。失败时返回 None。"""
-    import json
-    import tempfile
-
-    import plotly.graph_objects as go
-
-    from nini.utils.chart_fonts import apply_plotly_cjk_font_fallback
-
-    width = width or settings.plotly_export_width
-    height = height or settings.plotly_export_height
-    scale = scale or settings.plotly_export_scale
-    timeout = settings.plotly_export_timeout
+    """将 Plotly JSON 转换为高清 PNG 并返回响应。失败时返回 None。
 
+    渲染交给常驻渲染服务，同一图表重复访问直接命中内容哈希缓存。
+    """
     try:
         chart_data = json.loads(json_path.read_text(encoding="utf-8"))
-        fig = go.Figure(chart_data)
-        apply_plotly_cjk_font_fallback(fig)
-
-        with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
-            tmp_path = Path(tmp.name)
-
-        await asyncio.wait_for(
-            asyncio.to_thread(
-                fig.write_image,
-                str(tmp_path),
-                width=width,
-                height=height,
-                scale=scale,
-                format="png",
-            ),
-            timeout=timeout,
+        png_bytes = await get_chart_render_service().render(
+            RenderJob(figure=chart_data, format="png", width=width, height=height, scale=scale),
+            timeout=settings.plotly_export_timeout,
         )
-
-        png_bytes = tmp_path.read_bytes()
-        tmp_path.unlink()
         png_filename = json_path.stem.replace(".plotly", "") + ".png"
 
         return Response(
@@ -1862,45 +1925,19 @@ def _extract_image_urls(md_content: str, session_id: str) -> list[dict[str, str]
 
 def _plotly_json_to_png_bytes(json_path: Path) -> bytes | None:
     """将 Plotly JSON 文件转换为 PNG 字节。失败返回 None。"""
-    import tempfile
-
     timeout_seconds = max(float(settings.plotly_export_timeout), 1.0)
-    script = """
-import json
-import sys
-from pathlib import Path
-import plotly.graph_objects as go
-from nini.utils.chart_fonts import apply_plotly_cjk_font_fallback
-
-src = Path(sys.argv[1])
-dst = Path(sys.argv[2])
-chart_data = json.loads(src.read_text(encoding="utf-8"))
-fig = go.Figure(chart_data)
-apply_plotly_cjk_font_fallback(fig)
-fig.write_image(str(dst), format="png", width=1400, height=900, scale=2)
-"""
-
-    with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
-        tmp_png = Path(tmp.name)
-
     try:
-        subprocess.run(
-            [sys.executable, "-c", script, str(json_path), str(tmp_png)],
-            check=True,
-            capture_output=True,
+        chart_data = json.loads(json_path.read_text(encoding="utf-8"))
+        return get_chart_render_service().render_sync(
+            RenderJob(figure=chart_data, format="png", width=1400, height=900, scale=2),
             timeout=timeout_seconds,
-            **_windows_subprocess_kwargs(),
         )
-        return tmp_png.read_bytes()
-    except subprocess.TimeoutExpired:
+    except TimeoutError:
         logger.warning("Plotly PNG 转换超时并已降级为原始文件: %s", json_path.name)
         return None
     except Exception as exc:
         logger.debug("Plotly PNG 转换失败 (%s): %s", json_path.name, exc)
         return None
-    finally:
-        if tmp_png.exists():
-            tmp_png.unlink()
 
 
 def _bundle_markdown_with_images(
@@ -1970,6 +2007,38 @@ async def download_chart_plotly_json(session_id: str, chart_id: str):
     )
 
 
+@router.get("/charts/{session_id}/artifacts/{chart_name}/window", response_model=APIResponse)
+async def get_chart_full_resolution_window(
+    session_id: str,
+    chart_name: str,
+    trace: int = 0,
+    x_min: str | None = None,
+    x_max: str | None = None,
+    max_points: int | None = None,
+):
+    """返回降采样图表某条轨迹在 x 区间内的完整分辨率数据（超预算时再抽稀）。"""
+    from nini.charts.downsample import load_trace_window
+    from nini.tools.visualization import full_resolution_name
+
+    _ensure_workspace_session_exists(session_id)
+    path = _resolve_file_path(session_id, full_resolution_name(Path(chart_name).name))
+    if path is None or not path.is_file():
+        raise HTTPException(status_code=404, detail="该图表没有完整分辨率数据")
+
+    budget = max_points or max(
+        settings.chart_line_point_budget, settings.chart_scatter_point_budget
+    )
+    try:
+        window = await asyncio.to_thread(
+            load_trace_window, path, trace, x_min=x_min, x_max=x_max, max_points=budget
+        )
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=str(exc.args[0] if exc.args else exc))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=f"区间参数无效: {exc}")
+    return APIResponse(success=True, data=window)
+
+
 @router.get("/sessions/{session_id}/export-all")
 async def export_all_artifacts(session_id: str):
     """批量导出会话的所有产物为 ZIP 文件。"""
@@ -1978,47 +2047,36 @@ async def export_all_artifacts(session_id: str):
         raise HTTPException(status_code=404, detail="会话不存在")
 
     workspace_dir = session_dir / "workspace"
-    zip_buffer = io.BytesIO()
-
-    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-        file_count = 0
+    manifest = ZipManifest()
 
-        for subdir in ("artifacts", "uploads", "notes"):
-            sub_path = workspace_dir / subdir
-            if sub_path.exists():
-                for file_path in sub_path.rglob("*"):
-                    if file_path.is_file() and "memory-payloads" not in str(file_path):
-                        arcname = f"{subdir}/{file_path.relative_to(sub_path)}"
-                        zip_file.write(file_path, arcname)
-                        file_count += 1
+    for subdir in ("artifacts", "uploads", "notes"):
+        sub_path = workspace_dir / subdir
+        if sub_path.exists():
+            for file_path in sorted(sub_path.rglob("*")):
+                if file_path.is_file() and "memory-payloads" not in str(file_path):
+                    arcname = f"{subdir}/{file_path.relative_to(sub_path).as_posix()}"
+                    manifest.add_file(file_path, arcname)
 
-        memory_file = session_dir / "memory.jsonl"
-        if memory_file.exists():
-            zip_file.write(memory_file, "memory.jsonl")
-            file_count += 1
+    memory_file = session_dir / "memory.jsonl"
+    if memory_file.exists():
+        manifest.add_file(memory_file, "memory.jsonl")
 
-        session = session_manager.get_session(session_id)
-        if session:
-            import json
-
-            metadata = {
-                "session_id": session_id,
-                "exported_at": datetime.now(timezone.utc).isoformat(),
-                "file_count": file_count,
-                "datasets": list(session.datasets.keys()),
-            }
-            zip_file.writestr("metadata.json", json.dumps(metadata, ensure_ascii=False, indent=2))
+    session = session_manager.get_session(session_id)
+    if session:
+        metadata = {
+            "session_id": session_id,
+            "exported_at": datetime.now(timezone.utc).isoformat(),
+            "file_count": len(manifest),
+            "datasets": list(session.datasets.keys()),
+        }
+        manifest.add_bytes(
+            "metadata.json",
+            json.dumps(metadata, ensure_ascii=False, indent=2).encode("utf-8"),
+        )
 
-    zip_buffer.seek(0)
-    zip_bytes = zip_buffer.read()
     timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
     filename = f"nini_session_{session_id[:8]}_{timestamp}.zip"
-
-    return Response(
-        content=zip_bytes,
-        media_type="application/zip",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
-    )
+    return _build_zip_stream_response(manifest, filename)
 
 
 # ---- 模型配置 ----
@@ -2121,6 +2179,22 @@ async def health():
     return {"status": "ok", "version": "0.1.0"}
 
 
+@router.get("/health/http-pool", dependencies=[Depends(require_auth)])
+async def http_pool_stats():
+    """出站 HTTP 连接池指标（请求数、新建/复用连接数、单 host 最大并发）。"""
+    from nini.utils.http_pool import get_http_pool
+
+    return APIResponse(success=True, data=get_http_pool().stats())
+
+
+@router.get("/health/database", dependencies=[Depends(require_auth)])
+async def database_stats():
+    """应用数据库指标（写队列深度、读写排队/执行延迟直方图）。"""
+    from nini.models.database import get_database
+
+    return APIResponse(success=True, data=get_database().stats())
+
+
 @router.get("/auth/status")
 async def auth_status(request: Request):
     """返回当前服务鉴权要求与当前会话状态。"""
@@ -9,9 +9,11 @@ from datetime import datetime, timezone
 from typing import Any
 
 from fastapi import APIRouter, HTTPException, Response
+from fastapi.responses import StreamingResponse
 
 from nini.config import settings
 from nini.workspace import WorkspaceManager
+from nini.workspace.zip_stream import iter_zip_stream
 from nini.agent.session import session_manager
 
 router = APIRouter()
@@ -136,13 +138,16 @@ async def download_project_artifacts_zip(session_id: str, artifact_ids: list[str
     if not artifact_ids:
         raise HTTPException(status_code=400, detail="artifact_ids 不能为空")
     workspace = WorkspaceManager(session_id)
-    payload = workspace.batch_download_project_artifacts(artifact_ids)
-    if not payload:
+    manifest = workspace.build_download_manifest_for_project_artifacts(artifact_ids)
+    if not manifest.entries:
         raise HTTPException(status_code=404, detail="未找到可打包的项目产物")
     ts = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
     filename = f"project_artifacts_{session_id[:8]}_{ts}.zip"
     headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
-    return Response(content=payload, media_type="application/zip", headers=headers)
+    headers.update(manifest.http_headers())
+    return StreamingResponse(
+        iter_zip_stream(manifest), media_type="application/zip", headers=headers
+    )
 
 
 @router.get("/workspace/{session_id}/folders")
@@ -8,12 +8,13 @@
 
 from __future__ import annotations
 
+import asyncio
 import inspect
 import logging
 from pathlib import Path
 import secrets
 from contextlib import asynccontextmanager
-from typing import Awaitable, Callable
+from typing import Any, Awaitable, Callable
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -55,6 +56,22 @@ def _read_web_index_html() -> str:
     return (_WEB_DIST / "index.html").read_text(encoding="utf-8")
 
 
+async def _verify_skill_catalog(registry: Any) -> None:
+    """校验冷启动加载的技能目录缓存，有变化时重扫并刷新快照。
+
+    文件扫描在工作线程中进行，注册表更新回到事件循环执行，避免与请求并发修改注册表。
+    """
+    try:
+        scanned = await asyncio.to_thread(registry.scan_markdown_changes)
+        if scanned is None:
+            return
+        registry.reload_markdown_tools(scanned=scanned)
+        registry.write_tools_snapshot()
+        logger.info("技能目录已变化，已增量重扫 Markdown 技能")
+    except Exception as exc:
+        logger.warning("校验技能目录缓存失败: %s", exc)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期：启动/关闭时执行。"""
@@ -91,12 +108,19 @@ async def lifespan(app: FastAPI):
     )
 
     # 初始化工具注册中心
-    if "plugin_registry" in inspect.signature(create_default_tool_registry).parameters:
-        registry = create_default_tool_registry(plugin_registry=plugin_registry)
-    else:
-        registry = create_default_tool_registry()
+    registry_params = inspect.signature(create_default_tool_registry).parameters
+    registry_kwargs: dict[str, Any] = {}
+    if "plugin_registry" in registry_params:
+        registry_kwargs["plugin_registry"] = plugin_registry
+    cold_start = settings.skills_catalog_cold_start and "trust_skill_catalog" in registry_params
+    if cold_start:
+        registry_kwargs["trust_skill_catalog"] = True
+    registry = create_default_tool_registry(**registry_kwargs)
     set_tool_registry(registry)
     logger.info("已注册 %d 个工具", len(registry.list_tools()))
+    if cold_start:
+        # 冷启动使用了缓存中的技能目录，后台校验一次，发现变化时刷新快照
+        app.state.skills_catalog_verify_task = asyncio.create_task(_verify_skill_catalog(registry))
 
     logger.info("Nini 启动完成 ✓")
 
@@ -104,8 +128,51 @@ async def lifespan(app: FastAPI):
 
     # 关闭
     logger.info("Nini 关闭中 ...")
+    verify_task = getattr(app.state, "skills_catalog_verify_task", None)
+    if verify_task is not None and not verify_task.done():
+        await verify_task
     await plugin_registry.shutdown_all()
 
+    from nini.charts.render_service import shutdown_chart_render_service
+
+    await asyncio.to_thread(shutdown_chart_render_service)
+
+    from nini.sandbox.webr_executor import shutdown_webr_session_pool
+
+    shutdown_webr_session_pool()
+
+    from nini.tools.export_report import shutdown_export_workers
+
+    shutdown_export_workers()
+
+    from nini.agent.components.context_compressor import shutdown_background_compactor
+
+    shutdown_background_compactor()
+
+    from nini.memory.analysis_memory import shutdown_analysis_memories
+
+    shutdown_analysis_memories()
+
+    from nini.todo import shutdown_todo_service
+
+    await asyncio.to_thread(shutdown_todo_service)
+
+    from nini.utils.cost_ledger import shutdown_cost_ledger_sync
+
+    await asyncio.to_thread(shutdown_cost_ledger_sync)
+
+    from nini.utils.http_pool import shutdown_http_pool
+
+    await shutdown_http_pool()
+
+    from nini.harness.store import shutdown_harness_trace_sink
+
+    await shutdown_harness_trace_sink()
+
+    from nini.models.database import shutdown_database
+
+    await shutdown_database()
+
 
 def create_app() -> FastAPI:
     """创建 FastAPI 应用实例。"""
@@ -454,24 +454,28 @@ class CorrelationAnalysisCapability:
         result: CorrelationAnalysisResult,
     ) -> None:
         """将相关性分析富信息记录到 AnalysisMemory。"""
-        from nini.tools.statistics.base import _record_stat_result
+        from nini.tools.statistics.base import _record_stat_result, _record_stat_results
 
-        # 为每对显著相关记录一条
-        for pair in result.significant_pairs:
-            _record_stat_result(
-                session,
-                dataset_name,
-                test_name=f"{result.method.title()} 相关性 ({pair.var1} ↔ {pair.var2})",
-                message=(
-                    f"r = {pair.coefficient:.3f}, p_adj = {pair.p_adjusted:.4f}, "
-                    f"强度: {pair.strength}"
-                ),
-                test_statistic=pair.coefficient,
-                p_value=pair.p_value,
-                effect_size=abs(pair.coefficient),
-                effect_type="r",
-                significant=pair.significant,
-            )
+        # 为每对显著相关记录一条（批量提交）
+        _record_stat_results(
+            session,
+            dataset_name,
+            [
+                {
+                    "test_name": f"{result.method.title()} 相关性 ({pair.var1} ↔ {pair.var2})",
+                    "message": (
+                        f"r = {pair.coefficient:.3f}, p_adj = {pair.p_adjusted:.4f}, "
+                        f"强度: {pair.strength}"
+                    ),
+                    "test_statistic": pair.coefficient,
+                    "p_value": pair.p_value,
+                    "effect_size": abs(pair.coefficient),
+                    "effect_type": "r",
+                    "significant": pair.significant,
+                }
+                for pair in result.significant_pairs
+            ],
+        )
 
         # 如果没有显著对，记录一条汇总
         if not result.significant_pairs:
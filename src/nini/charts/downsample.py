@@ -0,0 +1,329 @@
+"""大数据量图表的保形降采样与二进制数组编码。
+
+折线轨迹使用 LTTB（Largest-Triangle-Three-Buckets）保留峰谷形状；散点轨迹按二维
+网格做密度分箱，每个非空格子保留一个代表点。降采样只在点数超出预算时触发，
+完整分辨率数据另存为压缩 ``.npz`` 旁路文件，供前端缩放时按区间取回。
+数值数组统一编码为 Plotly typed array（``{"dtype", "bdata"}``），避免十进制文本膨胀。
+"""
+
+from __future__ import annotations
+
+import base64
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+# 与 x/y 一一对应、降采样时需同步抽取的逐点属性
+POINT_ATTRS: tuple[str, ...] = (
+    "x",
+    "y",
+    "text",
+    "hovertext",
+    "customdata",
+    "ids",
+    "marker.color",
+    "marker.size",
+    "marker.symbol",
+    "marker.opacity",
+    "error_x.array",
+    "error_x.arrayminus",
+    "error_y.array",
+    "error_y.arrayminus",
+)
+
+# Plotly.js typed array 支持的数据类型
+_BDATA_DTYPES = {"i1", "u1", "i2", "u2", "i4", "u4", "f4", "f8"}
+_INT32 = np.iinfo(np.int32)
+
+_METHOD_KEY = "__method__"
+
+
+@dataclass(frozen=True)
+class TraceReduction:
+    """单条轨迹的降采样记录。"""
+
+    index: int
+    method: str
+    original_points: int
+    points: int
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "trace": self.index,
+            "method": self.method,
+            "original_points": self.original_points,
+            "points": self.points,
+        }
+
+
+@dataclass
+class DownsampleResult:
+    """整张图的降采样结果：被抽稀的轨迹及其完整分辨率逐点数组。"""
+
+    reductions: list[TraceReduction]
+    full_resolution: dict[int, dict[str, np.ndarray]]
+
+    @property
+    def reduced(self) -> bool:
+        return bool(self.reductions)
+
+
+def decode_array(value: Any) -> np.ndarray | None:
+    """将 typed array / ndarray / list 还原为 ndarray；标量或无法识别时返回 None。"""
+    if isinstance(value, dict) and "bdata" in value and "dtype" in value:
+        arr = np.frombuffer(base64.b64decode(value["bdata"]), dtype=np.dtype(value["dtype"]))
+        shape = value.get("shape")
+        if shape:
+            arr = arr.reshape([int(part) for part in str(shape).split(",")])
+        return arr
+    if isinstance(value, np.ndarray):
+        return value
+    if isinstance(value, (list, tuple)):
+        try:
+            return np.asarray(value)
+        except ValueError:
+            return np.asarray(value, dtype=object)
+    return None
+
+
+def encode_array(arr: np.ndarray) -> Any:
+    """数值数组编码为 Plotly typed array，日期转 ISO 字符串，其余转为列表。"""
+    if arr.dtype.kind == "M":
+        return np.datetime_as_string(arr).tolist()
+    if arr.dtype.kind in "iu" and arr.dtype.itemsize == 8:
+        if arr.size == 0 or (arr.min() >= _INT32.min and arr.max() <= _INT32.max):
+            arr = arr.astype(np.int32 if arr.dtype.kind == "i" else np.uint32)
+        else:
+            arr = arr.astype(np.float64)
+    if arr.dtype.kind in "iuf":
+        if arr.dtype.str[1:] not in _BDATA_DTYPES:
+            arr = arr.astype(np.float64)
+        arr = np.ascontiguousarray(arr, dtype=arr.dtype.newbyteorder("<"))
+        payload: dict[str, Any] = {
+            "dtype": arr.dtype.str[1:],
+            "bdata": base64.b64encode(arr.tobytes()).decode("ascii"),
+        }
+        if arr.ndim > 1:
+            payload["shape"] = ",".join(str(dim) for dim in arr.shape)
+        return payload
+    return arr.tolist()
+
+
+def numeric_axis(values: np.ndarray) -> np.ndarray:
+    """把坐标数组映射为 float64：数值原样、日期取纳秒整数、分类取出现顺序编码。"""
+    if values.dtype.kind in "iufb":
+        return values.astype(np.float64)
+    if values.dtype.kind == "M":
+        return values.astype("datetime64[ns]").astype(np.int64).astype(np.float64)
+    try:
+        parsed = values.astype("datetime64[ns]")
+    except (ValueError, TypeError):
+        # 分类坐标：Plotly 按首次出现顺序排布类别，区间也以类别序号表示
+        _, first, inverse = np.unique(values.astype(str), return_index=True, return_inverse=True)
+        order = np.argsort(np.argsort(first))
+        return order[inverse].astype(np.float64)
+    return parsed.astype(np.int64).astype(np.float64)
+
+
+def coerce_bound(value: str | float | None) -> float | None:
+    """将缩放区间边界（数值或日期字符串）转换到 numeric_axis 的坐标系。"""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float(np.datetime64(str(value).replace(" ", "T"), "ns").astype(np.int64))
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """LTTB 降采样，返回保留点的下标（含首尾点）。"""
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = x.astype(np.float64)
+    y = y.astype(np.float64)
+    finite_y = np.where(np.isfinite(y), y, 0.0)
+    # 桶边界：首尾各自成桶，中间 threshold-2 个桶均分剩余点
+    edges = (np.floor(np.arange(threshold - 1) * (n - 2) / (threshold - 2)) + 1).astype(np.int64)
+    edges[-1] = n - 1
+    csum_x = np.concatenate(([0.0], np.cumsum(x)))
+    csum_y = np.concatenate(([0.0], np.cumsum(finite_y)))
+
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for bucket in range(threshold - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        # 下一个桶的均值作为三角形第三个顶点；最后一个桶以末点为参照
+        if bucket + 2 < len(edges):
+            next_start, next_stop = stop, edges[bucket + 2]
+        else:
+            next_start, next_stop = n - 1, n
+        count = next_stop - next_start
+        avg_x = (csum_x[next_stop] - csum_x[next_start]) / count
+        avg_y = (csum_y[next_stop] - csum_y[next_start]) / count
+        ax, ay = x[a], finite_y[a]
+        area = np.abs((ax - avg_x) * (y[start:stop] - ay) - (ax - x[start:stop]) * (avg_y - ay))
+        area = np.where(np.isnan(area), -1.0, area)
+        a = start + int(np.argmax(area))
+        keep[bucket + 1] = a
+    return keep
+
+
+def density_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """二维网格密度分箱：每个非空格子保留首个落入的点，点数不超过 max_points。
+
+    数据常集中在少数区域，初始 sqrt(max_points) 见方的网格往往只占满一小部分，
+    因此逐级加密网格，取非空格子数仍不超过预算的最细一级。
+    """
+    x = x.astype(np.float64)
+    y = y.astype(np.float64)
+    finite = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+    if len(finite) <= max_points:
+        return finite
+    unit: list[np.ndarray] = []
+    for values in (x[finite], y[finite]):
+        low, high = values.min(), values.max()
+        span = high - low
+        unit.append((values - low) / span if span > 0 else np.zeros(len(values)))
+
+    # 初始网格格子数不超过预算，首轮必然可用
+    best = np.empty(0, dtype=np.int64)
+    grid = max(1, int(np.sqrt(max_points)))
+    for _ in range(5):
+        cols = np.minimum((unit[0] * grid).astype(np.int64), grid - 1)
+        rows = np.minimum((unit[1] * grid).astype(np.int64), grid - 1)
+        _, first = np.unique(cols * grid + rows, return_index=True)
+        if len(first) > max_points:
+            break
+        best = first
+        if len(first) > max_points // 2:
+            break
+        grid *= 2
+    return np.sort(finite[best])
+
+
+def reduce_points(method: str, x: np.ndarray, y: np.ndarray, budget: int) -> np.ndarray:
+    # y 同样可能是日期或分类轴，统一映射为数值后再抽稀
+    if method == "lttb":
+        return lttb_indices(numeric_axis(x), numeric_axis(y), budget)
+    return density_indices(numeric_axis(x), numeric_axis(y), budget)
+
+
+def _get_path(trace: dict[str, Any], path: str) -> Any:
+    node: Any = trace
+    for part in path.split("."):
+        if not isinstance(node, dict):
+            return None
+        node = node.get(part)
+    return node
+
+
+def _set_path(trace: dict[str, Any], path: str, value: Any) -> None:
+    *parents, leaf = path.split(".")
+    node = trace
+    for part in parents:
+        node = node[part]
+    node[leaf] = value
+
+
+def _point_arrays(trace: dict[str, Any], n: int) -> dict[str, np.ndarray]:
+    arrays: dict[str, np.ndarray] = {}
+    for path in POINT_ATTRS:
+        arr = decode_array(_get_path(trace, path))
+        if arr is not None and arr.ndim >= 1 and len(arr) == n:
+            arrays[path] = arr
+    return arrays
+
+
+def _trace_method(trace: dict[str, Any]) -> str | None:
+    if trace.get("type", "scatter") not in {"scatter", "scattergl"}:
+        return None
+    mode = str(trace.get("mode") or "markers")
+    return "lttb" if "lines" in mode else "density"
+
+
+def downsample_figure(
+    figure: dict[str, Any], *, line_budget: int, scatter_budget: int
+) -> DownsampleResult:
+    """就地抽稀图中超出预算的折线/散点轨迹。"""
+    result = DownsampleResult(reductions=[], full_resolution={})
+    for index, trace in enumerate(figure.get("data") or []):
+        if not isinstance(trace, dict):
+            continue
+        method = _trace_method(trace)
+        y = decode_array(trace.get("y"))
+        if method is None or y is None or y.ndim != 1:
+            continue
+        budget = line_budget if method == "lttb" else scatter_budget
+        n = len(y)
+        if budget <= 0 or n <= budget:
+            continue
+        arrays = _point_arrays(trace, n)
+        x = arrays.get("x")
+        if x is None:
+            x = np.arange(n)
+            arrays["x"] = x
+        keep = reduce_points(method, x, y, budget)
+        for path, arr in arrays.items():
+            _set_path(trace, path, encode_array(arr[keep]))
+        result.reductions.append(TraceReduction(index, method, n, len(keep)))
+        result.full_resolution[index] = arrays
+    return result
+
+
+def save_full_resolution(path: Path, result: DownsampleResult) -> None:
+    """把被抽稀轨迹的完整分辨率数组写入压缩 npz（不含 pickle 对象）。"""
+    payload: dict[str, Any] = {}
+    methods = {item.index: item.method for item in result.reductions}
+    for index, arrays in result.full_resolution.items():
+        payload[f"t{index}{_METHOD_KEY}"] = np.asarray(methods[index])
+        for attr, arr in arrays.items():
+            if arr.dtype.kind == "O":
+                arr = arr.astype(str)
+            payload[f"t{index}__{attr}"] = arr
+    with path.open("wb") as fh:
+        np.savez_compressed(fh, **payload)
+
+
+def load_trace_window(
+    path: Path,
+    trace: int,
+    *,
+    x_min: str | float | None = None,
+    x_max: str | float | None = None,
+    max_points: int,
+) -> dict[str, Any]:
+    """按 x 区间读取完整分辨率数据；区间内仍超预算时用同一方法再抽稀。"""
+    prefix = f"t{trace}__"
+    method_key = f"t{trace}{_METHOD_KEY}"
+    with np.load(path, allow_pickle=False) as npz:
+        if method_key not in npz.files:
+            raise KeyError(f"轨迹 {trace} 没有完整分辨率数据")
+        method = str(npz[method_key])
+        arrays = {
+            key[len(prefix) :]: npz[key]
+            for key in npz.files
+            if key.startswith(prefix) and key != method_key
+        }
+
+    x, y = arrays["x"], arrays["y"]
+    axis = numeric_axis(x)
+    mask = np.ones(len(axis), dtype=bool)
+    low, high = coerce_bound(x_min), coerce_bound(x_max)
+    if low is not None:
+        mask &= axis >= low
+    if high is not None:
+        mask &= axis <= high
+    selected = np.flatnonzero(mask)
+    if max_points > 0 and len(selected) > max_points:
+        selected = selected[reduce_points(method, x[selected], y[selected], max_points)]
+    return {
+        "trace": trace,
+        "method": method,
+        "window_points": int(mask.sum()),
+        "points": int(len(selected)),
+        "data": {attr: encode_array(arr[selected]) for attr, arr in arrays.items()},
+    }
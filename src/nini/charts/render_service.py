@@ -0,0 +1,481 @@
+"""常驻的 Plotly 静态图渲染服务。
+
+此前每个调用点各自 ``fig.write_image``：每种格式新建线程池、每次 GET 重新渲染、
+报告导出再渲染一遍。这里统一为一个长生命周期服务：
+
+- 小容量渲染线程池执行任务，每个线程首次渲染时启动自己的 Kaleido 常驻浏览器并保持热启动；
+- 等待超时且任务仍在执行时视为卡死：弃用当前线程池与浏览器，后续任务由新线程池接手；
+- 渲染结果按 (图表 JSON, 格式, 尺寸, scale, 风格) 的内容哈希缓存到磁盘；
+- 相同任务在途时合并为同一个 Future（single-flight）；
+- 提供异步/同步、单个/批量接口，供工具、路由与报告导出共用。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from nini.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 支持的静态导出格式
+RENDER_FORMATS = frozenset({"png", "jpeg", "jpg", "svg", "pdf", "webp"})
+# 每写入多少个缓存文件检查一次容量
+_PRUNE_EVERY_WRITES = 32
+
+Rasterizer = Callable[[dict[str, Any], str, int, int, float], bytes]
+
+
+def _canonical_figure_json(figure: dict[str, Any]) -> str:
+    """稳定序列化图表：键排序；numpy 数组等交给 PlotlyJSONEncoder 完整展开。"""
+    from plotly.utils import PlotlyJSONEncoder
+
+    return json.dumps(
+        figure,
+        cls=PlotlyJSONEncoder,
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+
+
+@dataclass(frozen=True)
+class RenderJob:
+    """单个渲染任务。未指定的尺寸参数取 ``settings.plotly_export_*``。"""
+
+    figure: dict[str, Any]
+    format: str = "png"
+    width: int | None = None
+    height: int | None = None
+    scale: float | None = None
+    style_key: str = ""
+
+    def resolved(self) -> tuple[str, int, int, float]:
+        fmt = self.format.lower().strip()
+        if fmt == "jpg":
+            fmt = "jpeg"
+        return (
+            fmt,
+            int(self.width or settings.plotly_export_width),
+            int(self.height or settings.plotly_export_height),
+            float(self.scale or settings.plotly_export_scale),
+        )
+
+    def cache_key(self) -> str:
+        fmt, width, height, scale = self.resolved()
+        digest = hashlib.sha256()
+        digest.update(_canonical_figure_json(self.figure).encode("utf-8"))
+        digest.update(f"|{fmt}|{width}x{height}@{scale:g}|{self.style_key}".encode("utf-8"))
+        return digest.hexdigest()
+
+
+class _WarmKaleido:
+    """单个渲染线程独占的常驻 Kaleido 浏览器。
+
+    只在所属渲染线程内渲染：浏览器进程与其事件循环在首次渲染时创建，之后复用；
+    启动失败（如未安装 Chrome）时记住失败，由调用方回退到 ``plotly.io.to_image``。
+    线程池被弃用时由 ``retire`` 关闭：空闲则立即关闭，正在渲染则在本次渲染结束后关闭。
+    """
+
+    def __init__(self) -> None:
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._kaleido: Any = None
+        self._unavailable = False
+        self._retired = False
+        self._busy = threading.Lock()
+
+    def render(self, fig_dict: dict[str, Any], opts: dict[str, Any]) -> bytes | None:
+        try:
+            with self._busy:
+                if self._unavailable or self._retired:
+                    return None
+                if self._kaleido is None and not self._open():
+                    return None
+                assert self._loop is not None
+                return bytes(
+                    self._loop.run_until_complete(self._kaleido.calc_fig(fig_dict, opts=opts))
+                )
+        finally:
+            if self._retired:
+                self._close_if_idle()
+
+    def retire(self) -> None:
+        """标记弃用并尽快关闭浏览器；之后的渲染请求回退为单次渲染。"""
+        self._retired = True
+        self._close_if_idle()
+
+    def _close_if_idle(self) -> None:
+        if self._busy.acquire(blocking=False):
+            try:
+                self.close()
+            finally:
+                self._busy.release()
+
+    def _open(self) -> bool:
+        try:
+            import kaleido
+
+            kaleido_cls = getattr(kaleido, "Kaleido", None)
+            if kaleido_cls is None:
+                # kaleido<1.0：plotly 内部已维持常驻 scope，无需额外处理
+                self._unavailable = True
+                return False
+            self._loop = asyncio.new_event_loop()
+            instance = kaleido_cls()
+            self._loop.run_until_complete(instance.__aenter__())
+            self._kaleido = instance
+            logger.info("图表渲染服务已启动常驻 Kaleido 浏览器")
+            return True
+        except Exception:
+            logger.debug("启动常驻 Kaleido 失败，回退为单次渲染", exc_info=True)
+            self._unavailable = True
+            self.close()
+            return False
+
+    def close(self) -> None:
+        if self._loop is None:
+            return
+        try:
+            if self._kaleido is not None:
+                self._loop.run_until_complete(self._kaleido.__aexit__(None, None, None))
+        except Exception:
+            logger.debug("关闭常驻 Kaleido 失败", exc_info=True)
+        finally:
+            self._kaleido = None
+            self._loop.close()
+            self._loop = None
+
+
+class ChartRenderService:
+    """带内容哈希缓存的常驻渲染服务。"""
+
+    def __init__(
+        self,
+        *,
+        cache_dir: Path | None = None,
+        rasterizer: Rasterizer | None = None,
+        max_cache_bytes: int | None = None,
+        max_workers: int | None = None,
+    ) -> None:
+        self._cache_dir_override = cache_dir
+        self._rasterizer = rasterizer or self._rasterize_plotly
+        self._max_cache_bytes_override = max_cache_bytes
+        self._max_workers_override = max_workers
+        self._executor: concurrent.futures.ThreadPoolExecutor | None = None
+        # 线程池代数：每次弃用卡死的线程池后递增，旧代线程不再启动常驻浏览器
+        self._generation = 0
+        self._inflight: dict[str, concurrent.futures.Future[bytes]] = {}
+        self._inflight_generation: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._thread_state = threading.local()
+        self._warm_instances: list[_WarmKaleido] = []
+        self._writes_since_prune = 0
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "renders": 0,
+            "failures": 0,
+            "recycles": 0,
+        }
+
+    # ---- 缓存 ----
+
+    @property
+    def cache_dir(self) -> Path:
+        return self._cache_dir_override or settings.cache_dir / "chart_renders"
+
+    @property
+    def max_cache_bytes(self) -> int:
+        if self._max_cache_bytes_override is not None:
+            return self._max_cache_bytes_override
+        return max(int(settings.chart_render_cache_max_mb), 0) * 1024 * 1024
+
+    def _cache_path(self, key: str, fmt: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.{fmt}"
+
+    def get_cached(self, job: RenderJob) -> bytes | None:
+        """命中缓存时返回渲染结果，否则返回 None。"""
+        if self.max_cache_bytes <= 0:
+            return None
+        fmt = job.resolved()[0]
+        path = self._cache_path(job.cache_key(), fmt)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        try:
+            os.utime(path)  # 刷新 mtime，作为 LRU 淘汰依据
+        except OSError:
+            pass
+        return data
+
+    def _store(self, key: str, fmt: str, data: bytes) -> None:
+        if self.max_cache_bytes <= 0:
+            return
+        path = self._cache_path(key, fmt)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        except OSError:
+            logger.debug("写入图表渲染缓存失败: %s", path, exc_info=True)
+            return
+        self._writes_since_prune += 1
+        if self._writes_since_prune >= _PRUNE_EVERY_WRITES:
+            self._writes_since_prune = 0
+            self.prune_cache()
+
+    def prune_cache(self) -> None:
+        """按最近访问时间淘汰，使缓存总量不超过上限。"""
+        limit = self.max_cache_bytes
+        root = self.cache_dir
+        if not root.exists():
+            return
+        entries: list[tuple[float, int, Path]] = []
+        total = 0
+        for path in root.rglob("*"):
+            if not path.is_file() or path.suffix == ".tmp":
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        if total <= limit:
+            return
+        entries.sort()
+        for _mtime, size, path in entries:
+            if total <= limit:
+                break
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                continue
+
+    # ---- 渲染 ----
+
+    @property
+    def max_workers(self) -> int:
+        if self._max_workers_override is not None:
+            return max(self._max_workers_override, 1)
+        return max(int(settings.chart_render_workers), 1)
+
+    def _get_executor_locked(self) -> concurrent.futures.ThreadPoolExecutor:
+        if self._executor is None:
+            # 单个 Kaleido 实例不支持并发调用，每个渲染线程各持一个常驻浏览器
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="nini-chart-render"
+            )
+        return self._executor
+
+    def _thread_warm_kaleido(self) -> _WarmKaleido | None:
+        """当前渲染线程的常驻浏览器；已被弃用的旧代线程返回 None。"""
+        state = self._thread_state
+        warm: _WarmKaleido | None = getattr(state, "warm", None)
+        if warm is not None:
+            return warm
+        with self._lock:
+            if getattr(state, "generation", None) != self._generation:
+                return None
+            warm = _WarmKaleido()
+            self._warm_instances.append(warm)
+        state.warm = warm
+        return warm
+
+    def _recycle(self, generation: int) -> None:
+        """弃用卡死的线程池：新任务交给新线程池，旧线程池排队任务由其余线程继续完成。"""
+        with self._lock:
+            if generation != self._generation:
+                return  # 已由其他等待方回收
+            self._generation += 1
+            executor = self._executor
+            self._executor = None
+            retired = self._warm_instances
+            self._warm_instances = []
+            self.stats["recycles"] += 1
+        logger.warning("图表渲染超时，已弃用当前渲染线程池与常驻浏览器并重建")
+        if executor is not None:
+            executor.shutdown(wait=False)
+        for warm in retired:
+            warm.retire()
+
+    def _recycle_if_stuck(self, future: concurrent.futures.Future[bytes], generation: int) -> None:
+        # 仍在排队说明只是繁忙；已开始执行却超时才视为卡死
+        if future.running():
+            self._recycle(generation)
+
+    def _rasterize_plotly(
+        self, figure: dict[str, Any], fmt: str, width: int, height: int, scale: float
+    ) -> bytes:
+        import plotly.graph_objects as go
+        import plotly.io as pio
+
+        from nini.utils.chart_fonts import apply_plotly_cjk_font_fallback
+
+        fig = go.Figure(figure)
+        apply_plotly_cjk_font_fallback(fig)
+        opts = {"format": fmt, "width": width, "height": height, "scale": scale}
+        warm = self._thread_warm_kaleido()
+        data = warm.render(fig.to_dict(), opts) if warm is not None else None
+        if data is not None:
+            return data
+        return bytes(pio.to_image(fig, format=fmt, width=width, height=height, scale=scale))
+
+    def _render_job(self, job: RenderJob, key: str, generation: int) -> bytes:
+        state = self._thread_state
+        if getattr(state, "generation", None) != generation:
+            state.generation = generation
+            state.warm = None
+        try:
+            fmt, width, height, scale = job.resolved()
+            data = self._rasterizer(job.figure, fmt, width, height, scale)
+            self.stats["renders"] += 1
+            self._store(key, fmt, data)
+            return data
+        except Exception:
+            self.stats["failures"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                self._inflight_generation.pop(key, None)
+
+    def submit(self, job: RenderJob) -> concurrent.futures.Future[bytes]:
+        """提交渲染任务，返回 Future；缓存命中时直接返回已完成的 Future。"""
+        return self._submit(job)[0]
+
+    def _submit(self, job: RenderJob) -> tuple[concurrent.futures.Future[bytes], int]:
+        fmt = job.resolved()[0]
+        if fmt not in RENDER_FORMATS:
+            raise ValueError(f"不支持的渲染格式: {job.format}")
+        cached = self.get_cached(job)
+        if cached is not None:
+            self.stats["hits"] += 1
+            done: concurrent.futures.Future[bytes] = concurrent.futures.Future()
+            done.set_result(cached)
+            return done, -1
+
+        key = job.cache_key()
+        with self._lock:
+            pending = self._inflight.get(key)
+            if pending is not None:
+                self.stats["coalesced"] += 1
+                return pending, self._inflight_generation[key]
+            self.stats["misses"] += 1
+            generation = self._generation
+            future = self._get_executor_locked().submit(self._render_job, job, key, generation)
+            self._inflight[key] = future
+            self._inflight_generation[key] = generation
+            return future, generation
+
+    async def render(self, job: RenderJob, *, timeout: float | None = None) -> bytes:
+        """异步渲染单个图表，超时抛出 ``asyncio.TimeoutError``。"""
+        future, generation = self._submit(job)
+        # shield：超时只放弃等待，不取消在途任务，结果仍会写入缓存供后续命中
+        try:
+            return await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(future)), timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            self._recycle_if_stuck(future, generation)
+            raise
+
+    async def render_many(
+        self,
+        jobs: Sequence[RenderJob],
+        *,
+        timeout: float | None = None,
+    ) -> list[bytes | BaseException]:
+        """批量渲染；返回与 ``jobs`` 同序的结果，失败项为异常对象。"""
+        if not jobs:
+            return []
+        submitted = [self._submit(job) for job in jobs]
+        waiters = [asyncio.shield(asyncio.wrap_future(future)) for future, _ in submitted]
+        try:
+            return list(
+                await asyncio.wait_for(
+                    asyncio.gather(*waiters, return_exceptions=True), timeout=timeout
+                )
+            )
+        except asyncio.TimeoutError as exc:
+            for future, generation in submitted:
+                self._recycle_if_stuck(future, generation)
+            return [exc for _ in jobs]
+
+    def render_sync(self, job: RenderJob, *, timeout: float | None = None) -> bytes:
+        """同步渲染（供线程内或同步代码路径使用）。"""
+        future, generation = self._submit(job)
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            self._recycle_if_stuck(future, generation)
+            raise
+
+    def render_many_sync(
+        self,
+        jobs: Sequence[RenderJob],
+        *,
+        timeout: float | None = None,
+    ) -> list[bytes | BaseException]:
+        """同步批量渲染：一次性提交全部任务，再按顺序收集结果。"""
+        submitted = [self._submit(job) for job in jobs]
+        results: list[bytes | BaseException] = []
+        for future, generation in submitted:
+            try:
+                results.append(future.result(timeout=timeout))
+            except concurrent.futures.TimeoutError as exc:
+                self._recycle_if_stuck(future, generation)
+                results.append(exc)
+            except BaseException as exc:  # noqa: BLE001 - 逐项返回失败原因
+                results.append(exc)
+        return results
+
+    def shutdown(self) -> None:
+        """停止渲染线程并关闭常驻浏览器（会阻塞至当前任务结束，勿在事件循环线程调用）。"""
+        with self._lock:
+            executor = self._executor
+            self._executor = None
+            self._generation += 1
+            warm_instances = self._warm_instances
+            self._warm_instances = []
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        for warm in warm_instances:
+            warm.retire()
+
+
+_service: ChartRenderService | None = None
+_service_lock = threading.Lock()
+
+
+def get_chart_render_service() -> ChartRenderService:
+    """获取全局图表渲染服务。"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = ChartRenderService()
+        return _service
+
+
+def shutdown_chart_render_service() -> None:
+    """关闭全局图表渲染服务（应用退出时调用）。"""
+    global _service
+    with _service_lock:
+        service = _service
+        _service = None
+    if service is not None:
+        service.shutdown()
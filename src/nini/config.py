@@ -163,6 +163,11 @@ class Settings(BaseSettings):
     log_rotate_when: str = "midnight"
     log_rotate_interval: int = 1
     log_backup_count: int = 7
+    log_format: str = "text"  # 文件日志格式：text / json（JSON Lines）；控制台固定为彩色文本
+    log_queue_enabled: bool = True  # 日志经有界队列由专用线程批量写出
+    log_queue_size: int = 10_000  # 日志队列容量；满时丢弃 WARNING 以下的记录
+    log_queue_batch_size: int = 256  # 写线程单批最多写出的记录数
+    log_queue_debug_sample_rate: int = 10  # 队列过半时 DEBUG/TRACE 每 N 条保留 1 条
 
     # ---- 安全 ----
     api_key: str | None = None  # 设置后所有 API/WS 请求需携带此密钥
@@ -257,6 +262,11 @@ class Settings(BaseSettings):
     max_upload_size: int = 50 * 1024 * 1024  # 50 MB
     allowed_extensions: str = "csv,xlsx,xls,tsv,txt"
 
+    # ---- 数据画像 ----
+    # 超过该行数时四分位数改在均匀抽样上估计（矩与缺失/异常计数仍为全量），0 表示始终精确
+    data_profile_exact_max_rows: int = 1_000_000
+    data_profile_sample_rows: int = 200_000
+
     # ---- 多 Agent 并发 ----
     max_sub_agent_concurrency: int = 4  # spawn_batch 最大并行子 Agent 数
 
@@ -271,12 +281,18 @@ class Settings(BaseSettings):
     r_auto_install_packages: bool = False
     r_webr_enabled: bool = True  # 允许 webr（WebAssembly R）作为执行后端，无需本地 R
     r_webr_timeout: int = 60  # webr 执行超时（秒），WASM 比原生 R 慢，可适当放宽
+    r_webr_pool_size: int = 2  # 预热的 webr 会话上限（进程内常驻，复用已加载包与数据集）
+    r_webr_preload_packages: str = "jsonlite"  # 会话预热时加载的 R 包（逗号分隔）
 
     # ---- Plotly 图表导出配置 ----
     plotly_export_width: int = 1400
     plotly_export_height: int = 900
     plotly_export_scale: float = 2.0
     plotly_export_timeout: float = 30.0  # 秒
+    chart_render_workers: int = 2  # 渲染线程数（每线程一个常驻 Kaleido 浏览器）
+    chart_render_cache_max_mb: int = 256  # 渲染结果缓存上限（按内容哈希去重），0 表示不缓存
+    chart_line_point_budget: int = 5000  # 折线单条轨迹点数上限，超出按 LTTB 降采样，0 表示不降采样
+    chart_scatter_point_budget: int = 20000  # 散点单条轨迹点数上限，超出按密度分箱降采样
 
     # ---- 图表风格与一致性配置 ----
     chart_default_style: str = "default"
@@ -291,12 +307,29 @@ class Settings(BaseSettings):
     network_timeout: int = 10  # 网络可用性检测超时（秒），对应环境变量 NINI_NETWORK_TIMEOUT
     network_probe_url: str = "https://www.baidu.com"  # 可用性探测目标（可换为国内可达地址）
     network_proxy: str | None = None  # HTTP 代理地址（可选），如 http://proxy:8080
+    # 出站 HTTP 连接池（工具与模型供应商共享）
+    http_pool_max_connections: int = 100
+    http_pool_max_keepalive: int = 20
+    http_pool_keepalive_expiry: float = 30.0
+    http_pool_http2: bool = True  # 安装 h2 时对支持的站点启用 HTTP/2
+    # 文献检索：持久化缓存与各数据源令牌桶（速率单位：请求/秒）
+    literature_cache_enabled: bool = True
+    literature_cache_ttl_seconds: int = 24 * 3600
+    literature_paper_cache_ttl_seconds: int = 30 * 24 * 3600
+    literature_semantic_scholar_rate: float = 1.0  # 无 API Key 时的公共额度
+    literature_semantic_scholar_burst: int = 1
+    literature_crossref_rate: float = 10.0  # CrossRef polite pool 额度较宽
+    literature_crossref_burst: int = 5
 
     # ---- 功能特性开关 ----
     enable_cost_tracking: bool = True  # 启用成本追踪
     enable_reasoning: bool = True  # 启用推理事件展示
     enable_knowledge: bool = True  # 启用知识库 RAG
 
+    # ---- 成本统计 ----
+    cost_tracker_max_live: int = 256  # 内存中保留的会话 token 追踪器上限（按最近使用淘汰）
+    cost_tracker_idle_seconds: float = 1800.0  # 追踪器空闲超过该秒数即淘汰，需要时从磁盘重建
+
     # ---- 本地优先配置 ----
     # 已废弃：IntentAnalyzer 现已内置 Trie 优化，optimized_rules/rules 无区别，保留字段仅为兼容旧配置
     intent_strategy: str = "optimized_rules"  # 废弃字段，不再影响实际行为
@@ -321,11 +354,16 @@ class Settings(BaseSettings):
     skills_extra_dirs: str = ""
     # 自动发现兼容目录（.claude/skills/、.codex/skills/ 等）
     skills_auto_discover_compat_dirs: bool = True
+    # 冷启动时直接使用持久化的技能目录缓存，启动完成后在后台校验
+    skills_catalog_cold_start: bool = True
 
     # ---- 自动上下文压缩 ----
     auto_compress_enabled: bool = True
     auto_compress_threshold_tokens: int = 30000
     auto_compress_target_tokens: int = 15000
+    # 软水位（阈值的比例）：越过后在后台提前生成摘要，下个轮次边界接管
+    auto_compress_background_enabled: bool = True
+    auto_compress_soft_watermark_ratio: float = 0.7
 
     # ---- Deep Task 可观测性 ----
     deep_task_budget_token_limit: int = 12000
@@ -346,6 +384,11 @@ class Settings(BaseSettings):
     # ---- SQLite 会话存储 ----
     session_db_filename: str = "session.db"  # 每个会话目录下的 SQLite 文件名
 
+    # ---- 应用数据库 ----
+    db_read_pool_size: int = 4  # 只读 WAL 连接（线程）数
+    db_write_queue_size: int = 256  # 写队列容量，满时写请求等待空位
+    db_write_queue_timeout: float = 10.0  # 写队列满时的最长等待秒数，超时抛 DatabaseBusyError
+
     # ---- 应用内更新 ----
     update_base_url: str = ""  # 更新服务器基础 URL；留空时自动检查静默跳过
     update_channel: str = "stable"  # 更新渠道：stable / beta
@@ -354,6 +397,8 @@ class Settings(BaseSettings):
     update_check_interval_hours: int = 24
     update_disabled: bool = False  # 企业或离线部署可禁用更新入口
     update_download_timeout_seconds: int = 300
+    update_download_segments: int = 4  # 大文件并行分段下载的连接数；1 表示单连接
+    update_delta_enabled: bool = True  # 本地存在匹配的旧安装包时优先下载增量补丁
     update_signature_check_enabled: bool = True
     update_signature_allowed_thumbprints: str = ""  # 逗号分隔；正式发布推荐使用
     update_signature_allowed_publishers: str = ""  # 逗号分隔；测试环境可用
@@ -389,6 +434,11 @@ class Settings(BaseSettings):
     def sessions_dir(self) -> Path:
         return self.data_dir / "sessions"
 
+    @property
+    def cache_dir(self) -> Path:
+        """可随时清理的派生缓存目录（渲染结果、索引等）。"""
+        return self.data_dir / "cache"
+
     @property
     def db_path(self) -> Path:
         return self.data_dir / "db" / "nini.db"
@@ -450,6 +500,11 @@ class Settings(BaseSettings):
     def skills_snapshot_path(self) -> Path:
         return self.data_dir / "SKILLS_SNAPSHOT.md"
 
+    @property
+    def skills_catalog_path(self) -> Path:
+        """Markdown 技能扫描目录缓存（可随时删除，下次扫描重建）。"""
+        return self.cache_dir / "markdown_skills_catalog.json"
+
     @property
     def skills_state_path(self) -> Path:
         """技能管理状态文件（如启用/禁用覆盖）。"""
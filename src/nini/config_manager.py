@@ -21,7 +21,6 @@ from nini._config_model_crud import (  # noqa: F401
     VALID_PROVIDERS,
     VALID_ROUTE_PROVIDERS,
     ModelPurposeRoute,
-    _ensure_app_settings_table,
     get_active_provider_id,
     get_all_effective_configs,
     get_default_base_url_for_mode,
@@ -1,17 +1,68 @@
-"""Harness trace 本地存储与聚合分析。"""
+"""Harness trace 本地存储与聚合分析。
+
+存储布局（每个会话）::
+
+    harness/objects/<sha256[:2]>/<sha256>.json.gz   # trace 明细，按内容寻址、gzip 压缩
+    harness/traces/index.jsonl                      # run_id -> 对象路径的追加索引
+    harness/snapshots/<turn_id>.json                # 每轮运行快照
+
+``save_run`` 只在调用方协程里序列化一次 trace 并登记到后台写入器，随即返回；
+文件写入在工作线程完成，SQLite 摘要按批 upsert。写入完成前，同进程内的读取
+（``load_run``/``list_runs`` 等）会先看待写队列或等待其落盘，行为与同步写入一致。
+"""
 
 from __future__ import annotations
 
 import asyncio
+import gzip
+import hashlib
 import json
+import logging
+import os
+import threading
 from collections import Counter
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Mapping, cast
 
 from nini.config import settings
 from nini.harness.models import HarnessRunSummary, HarnessSessionSnapshot, HarnessTraceRecord
-from nini.models.database import get_db, init_db
+from nini.models.database import DatabaseService, get_database
+
+logger = logging.getLogger(__name__)
+
+_COMPRESS_LEVEL = 6
+# 单批写入的最大运行数；待写条目超过上限时 save_run 等待落盘（背压）
+_BATCH_SIZE = 64
+_MAX_PENDING = 512
+# 失败批次的重试间隔与单条运行的最大写入次数，超过后丢弃并计入 failed
+_RETRY_DELAY_SECONDS = 0.5
+_MAX_WRITE_ATTEMPTS = 3
+# flush 等待其他事件循环上的写入任务的最长时间，超时后在当前循环接管写入
+_FLUSH_STALL_SECONDS = 5.0
+
+_UPSERT_SUMMARY_SQL = """
+INSERT INTO harness_runs(
+    run_id, session_id, turn_id, task_id, recipe_id, status, failure_tags,
+    recovery_count, budget_warning_count,
+    duration_ms, input_tokens, output_tokens, estimated_cost_usd,
+    trace_path, created_at, updated_at
+) VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(run_id) DO UPDATE SET
+    task_id=excluded.task_id,
+    recipe_id=excluded.recipe_id,
+    status=excluded.status,
+    failure_tags=excluded.failure_tags,
+    recovery_count=excluded.recovery_count,
+    budget_warning_count=excluded.budget_warning_count,
+    duration_ms=excluded.duration_ms,
+    input_tokens=excluded.input_tokens,
+    output_tokens=excluded.output_tokens,
+    estimated_cost_usd=excluded.estimated_cost_usd,
+    trace_path=excluded.trace_path,
+    updated_at=excluded.updated_at
+"""
 
 
 def _json_default(obj: Any) -> Any:
@@ -21,62 +72,315 @@ def _json_default(obj: Any) -> Any:
     return str(obj)
 
 
+def _summary_params(summary: HarnessRunSummary) -> tuple[Any, ...]:
+    return (
+        summary.run_id,
+        summary.session_id,
+        summary.turn_id,
+        summary.task_id,
+        summary.recipe_id,
+        summary.status,
+        json.dumps(summary.failure_tags, ensure_ascii=False),
+        summary.recovery_count,
+        summary.budget_warning_count,
+        summary.duration_ms,
+        summary.input_tokens,
+        summary.output_tokens,
+        summary.estimated_cost_usd,
+        summary.trace_path,
+        summary.created_at,
+        summary.updated_at,
+    )
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def read_trace_file(path: Path) -> bytes:
+    """读取 trace 文件原始 JSON：兼容压缩对象与旧版未压缩 ``.json``。"""
+    data = path.read_bytes()
+    return gzip.decompress(data) if path.suffix == ".gz" else data
+
+
+@dataclass
+class _PendingRun:
+    """已序列化、等待后台落盘的一次运行。"""
+
+    summary: HarnessRunSummary
+    trace_json: bytes
+    object_path: Path
+    index_path: Path
+    index_line: str
+    snapshot_path: Path | None
+    snapshot_json: bytes | None
+    db_path: Path
+    attempts: int = 0
+    files_written: bool = False
+
+
+class HarnessTraceSink:
+    """harness trace 的后台写入器：事件循环里登记，工作线程写文件，摘要按批入库。
+
+    待写条目按 run_id 保存在内存中，落盘前的读取可直接命中；``flush`` 等待全部落盘。
+    """
+
+    def __init__(
+        self,
+        *,
+        batch_size: int = _BATCH_SIZE,
+        max_pending: int = _MAX_PENDING,
+        retry_delay: float = _RETRY_DELAY_SECONDS,
+        max_attempts: int = _MAX_WRITE_ATTEMPTS,
+    ) -> None:
+        self._batch_size = max(1, int(batch_size))
+        self._max_pending = max(1, int(max_pending))
+        self._retry_delay = max(0.0, float(retry_delay))
+        self._max_attempts = max(1, int(max_attempts))
+        self._pending: dict[str, _PendingRun] = {}
+        self._lock = threading.Lock()
+        self._task: asyncio.Task[None] | None = None
+        self._written = 0
+        self._batches = 0
+        self._failed = 0
+
+    # ---- 对外接口 ----
+
+    async def submit(self, item: _PendingRun) -> None:
+        with self._lock:
+            self._pending.pop(item.summary.run_id, None)
+            self._pending[item.summary.run_id] = item
+            backlog = len(self._pending)
+        self._ensure_task()
+        if backlog > self._max_pending:
+            await self.flush()
+
+    def pending_run(self, run_id: str, session_id: str | None = None) -> _PendingRun | None:
+        with self._lock:
+            item = self._pending.get(run_id)
+        if item is None or (session_id and item.summary.session_id != session_id):
+            return None
+        return item
+
+    def pending_trace(self, object_path: Path) -> bytes | None:
+        with self._lock:
+            items = list(self._pending.values())
+        for item in items:
+            if item.object_path == object_path:
+                return item.trace_json
+        return None
+
+    def pending_snapshot(self, session_id: str, turn_id: str | None = None) -> bytes | None:
+        """返回尚未落盘的最新快照（可限定轮次）。"""
+        with self._lock:
+            items = list(self._pending.values())
+        for item in reversed(items):
+            if item.snapshot_json is None or item.summary.session_id != session_id:
+                continue
+            if turn_id is None or item.summary.turn_id == turn_id:
+                return item.snapshot_json
+        return None
+
+    async def flush(self, stall_timeout: float = _FLUSH_STALL_SECONDS) -> None:
+        """等待当前全部待写条目落盘（失败条目重试到上限后丢弃）。"""
+        loop = asyncio.get_running_loop()
+        deadline: float | None = None
+        while True:
+            with self._lock:
+                if not self._pending:
+                    return
+            task = self._ensure_task()
+            if task.get_loop() is loop:
+                await asyncio.shield(task)
+                continue
+            # 写入任务运行在另一个事件循环上：该循环已停止或超时仍未写完时，
+            # 在当前循环接管写入（落盘与 upsert 均幂等），否则轮询等待
+            if deadline is None:
+                deadline = loop.time() + stall_timeout
+            if not task.get_loop().is_running() or loop.time() >= deadline:
+                self._task = loop.create_task(self._drain())
+                deadline = None
+                continue
+            await asyncio.sleep(0.02)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "pending": pending,
+            "written": self._written,
+            "batches": self._batches,
+            "failed": self._failed,
+        }
+
+    # ---- 后台写入 ----
+
+    def _ensure_task(self) -> asyncio.Task[None]:
+        task = self._task
+        if task is None or task.done() or task.get_loop().is_closed():
+            task = asyncio.get_running_loop().create_task(self._drain())
+            self._task = task
+        return task
+
+    async def _drain(self) -> None:
+        while True:
+            with self._lock:
+                batch = list(self._pending.values())[: self._batch_size]
+            if not batch:
+                return
+            self._batches += 1
+            # 事件循环关闭导致的取消会直接抛出，条目留在队列中由下一次 flush 重写
+            try:
+                await asyncio.to_thread(self._write_files, batch)
+                for item in batch:
+                    item.files_written = True
+                await self._write_summaries(batch)
+            except Exception as exc:  # 后台写入失败不影响对话主流程
+                dropped = self._drop_exhausted(batch)
+                logger.warning(
+                    "harness trace 写入失败（%d 条，首条 run_id=%s，放弃 %d 条）: %s",
+                    len(batch),
+                    batch[0].summary.run_id,
+                    dropped,
+                    exc,
+                )
+                # 其余条目留在队列中，稍后重试
+                await asyncio.sleep(self._retry_delay)
+                continue
+            self._written += len(batch)
+            with self._lock:
+                for item in batch:
+                    if self._pending.get(item.summary.run_id) is item:
+                        del self._pending[item.summary.run_id]
+
+    def _drop_exhausted(self, batch: list[_PendingRun]) -> int:
+        """累计失败次数，移除已达重试上限的条目，返回移除数量。"""
+        dropped = 0
+        with self._lock:
+            for item in batch:
+                item.attempts += 1
+                if item.attempts < self._max_attempts:
+                    continue
+                if self._pending.get(item.summary.run_id) is item:
+                    del self._pending[item.summary.run_id]
+                dropped += 1
+        self._failed += dropped
+        return dropped
+
+    @staticmethod
+    def _write_files(batch: list[_PendingRun]) -> None:
+        index_lines: dict[Path, list[str]] = {}
+        for item in batch:
+            if item.files_written:
+                # 上一次尝试已写完文件、仅摘要入库失败：避免重复追加索引
+                continue
+            if not item.object_path.exists():
+                # 内容寻址：相同内容只写一次
+                _write_atomic(
+                    item.object_path,
+                    gzip.compress(item.trace_json, compresslevel=_COMPRESS_LEVEL),
+                )
+            if item.snapshot_path is not None and item.snapshot_json is not None:
+                _write_atomic(item.snapshot_path, item.snapshot_json)
+            index_lines.setdefault(item.index_path, []).append(item.index_line)
+        for index_path, lines in index_lines.items():
+            index_path.parent.mkdir(parents=True, exist_ok=True)
+            with index_path.open("a", encoding="utf-8") as fh:
+                fh.write("".join(lines))
+
+    @staticmethod
+    async def _write_summaries(batch: list[_PendingRun]) -> None:
+        by_db: dict[Path, list[tuple[Any, ...]]] = {}
+        for item in batch:
+            by_db.setdefault(item.db_path, []).append(_summary_params(item.summary))
+
+        def upsert(rows: list[tuple[Any, ...]]) -> Any:
+            return lambda conn: conn.executemany(_UPSERT_SUMMARY_SQL, rows).rowcount
+
+        for db_path, rows in by_db.items():
+            current = get_database()
+            if current.path == db_path:
+                await current.write(upsert(rows))
+                continue
+            # 登记后数据目录已切换：写回登记时所属的数据库
+            service = DatabaseService(db_path, read_pool_size=1, write_queue_size=4)
+            try:
+                await service.write(upsert(rows))
+            finally:
+                await asyncio.to_thread(service.close)
+
+
+_sink: HarnessTraceSink | None = None
+_sink_lock = threading.Lock()
+
+
+def get_harness_trace_sink() -> HarnessTraceSink:
+    """返回进程内共享的 trace 写入器。"""
+    global _sink
+    with _sink_lock:
+        if _sink is None:
+            _sink = HarnessTraceSink()
+        return _sink
+
+
+async def shutdown_harness_trace_sink() -> None:
+    """等待待写 trace 全部落盘（应用退出时调用）。"""
+    with _sink_lock:
+        sink = _sink
+    if sink is not None:
+        await sink.flush()
+
+
 class HarnessTraceStore:
     """管理 harness trace 的本地存储。"""
 
-    _schema_ready_db_paths: set[str] = set()
-    _schema_lock = asyncio.Lock()
+    def __init__(self, sink: HarnessTraceSink | None = None) -> None:
+        self._sink = sink
+
+    @property
+    def sink(self) -> HarnessTraceSink:
+        return self._sink or get_harness_trace_sink()
 
     def _base_dir(self, session_id: str) -> Path:
         return settings.sessions_dir / session_id / "harness" / "traces"
 
-    def _trace_path(self, session_id: str, run_id: str) -> Path:
+    def _harness_dir(self, session_id: str) -> Path:
+        return settings.sessions_dir / session_id / "harness"
+
+    def _legacy_trace_path(self, session_id: str, run_id: str) -> Path:
         return self._base_dir(session_id) / f"{run_id}.json"
 
-    def _jsonl_path(self, session_id: str) -> Path:
-        return self._base_dir(session_id) / "runs.jsonl"
+    def _index_path(self, session_id: str) -> Path:
+        return self._base_dir(session_id) / "index.jsonl"
+
+    def _object_path(self, session_id: str, digest: str) -> Path:
+        return self._harness_dir(session_id) / "objects" / digest[:2] / f"{digest}.json.gz"
 
     def _snapshot_dir(self, session_id: str) -> Path:
-        return settings.sessions_dir / session_id / "harness" / "snapshots"
+        return self._harness_dir(session_id) / "snapshots"
 
     def _snapshot_path(self, session_id: str, turn_id: str) -> Path:
         return self._snapshot_dir(session_id) / f"{turn_id}.json"
 
     async def save_run(self, record: HarnessTraceRecord) -> HarnessRunSummary:
-        """保存运行明细与 SQLite 摘要。"""
-        base_dir = self._base_dir(record.session_id)
-        base_dir.mkdir(parents=True, exist_ok=True)
+        """登记运行明细与 SQLite 摘要，由后台写入器异步落盘。"""
+        trace_json = record.model_dump_json(fallback=_json_default).encode("utf-8")
+        digest = hashlib.sha256(trace_json).hexdigest()
+        object_path = self._object_path(record.session_id, digest)
 
-        trace_path = self._trace_path(record.session_id, record.run_id)
-        trace_path.write_text(
-            json.dumps(
-                record.model_dump(mode="json"),
-                ensure_ascii=False,
-                indent=2,
-                default=_json_default,
-            ),
-            encoding="utf-8",
-        )
-
-        runtime_snapshot_payload = None
+        snapshot_path = None
+        snapshot_json = None
         if isinstance(record.summary, dict):
             raw_snapshot = record.summary.get("runtime_snapshot")
             if isinstance(raw_snapshot, dict):
-                runtime_snapshot_payload = dict(raw_snapshot)
-        if runtime_snapshot_payload is not None:
-            runtime_snapshot_payload["trace_ref"] = str(trace_path)
-            snapshot = HarnessSessionSnapshot.model_validate(runtime_snapshot_payload)
-            self._save_snapshot(snapshot)
-
-        with self._jsonl_path(record.session_id).open("a", encoding="utf-8") as fh:
-            fh.write(
-                json.dumps(
-                    record.model_dump(mode="json"),
-                    ensure_ascii=False,
-                    default=_json_default,
-                )
-                + "\n"
-            )
+                snapshot_payload = {**raw_snapshot, "trace_ref": str(object_path)}
+                snapshot_path = self._snapshot_path(record.session_id, record.turn_id)
+                snapshot_json = json.dumps(
+                    snapshot_payload, ensure_ascii=False, default=_json_default
+                ).encode("utf-8")
 
         summary = HarnessRunSummary(
             run_id=record.run_id,
@@ -92,94 +396,40 @@ class HarnessTraceStore:
             input_tokens=int(record.summary.get("input_tokens", 0) or 0),
             output_tokens=int(record.summary.get("output_tokens", 0) or 0),
             estimated_cost_usd=float(record.summary.get("estimated_cost_usd", 0.0) or 0.0),
-            trace_path=str(trace_path),
+            trace_path=str(object_path),
             created_at=record.started_at,
             updated_at=record.finished_at or record.started_at,
         )
-        await self._save_summary(summary)
-        return summary
-
-    def _save_snapshot(self, snapshot: HarnessSessionSnapshot) -> None:
-        snapshot_dir = self._snapshot_dir(snapshot.session_id)
-        snapshot_dir.mkdir(parents=True, exist_ok=True)
-        self._snapshot_path(snapshot.session_id, snapshot.turn_id).write_text(
+        index_line = (
             json.dumps(
-                snapshot.model_dump(mode="json"),
+                {
+                    "run_id": record.run_id,
+                    "turn_id": record.turn_id,
+                    "status": record.status,
+                    "digest": digest,
+                    "created_at": record.started_at,
+                },
                 ensure_ascii=False,
-                indent=2,
-                default=_json_default,
-            ),
-            encoding="utf-8",
+            )
+            + "\n"
         )
-
-    async def _save_summary(self, summary: HarnessRunSummary) -> None:
-        await self._ensure_schema()
-        async with await get_db() as db:
-            await db.execute(
-                """
-                INSERT INTO harness_runs(
-                    run_id, session_id, turn_id, task_id, recipe_id, status, failure_tags,
-                    recovery_count, budget_warning_count,
-                    duration_ms, input_tokens, output_tokens, estimated_cost_usd,
-                    trace_path, created_at, updated_at
-                ) VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT(run_id) DO UPDATE SET
-                    task_id=excluded.task_id,
-                    recipe_id=excluded.recipe_id,
-                    status=excluded.status,
-                    failure_tags=excluded.failure_tags,
-                    recovery_count=excluded.recovery_count,
-                    budget_warning_count=excluded.budget_warning_count,
-                    duration_ms=excluded.duration_ms,
-                    input_tokens=excluded.input_tokens,
-                    output_tokens=excluded.output_tokens,
-                    estimated_cost_usd=excluded.estimated_cost_usd,
-                    trace_path=excluded.trace_path,
-                    updated_at=excluded.updated_at
-                """,
-                (
-                    summary.run_id,
-                    summary.session_id,
-                    summary.turn_id,
-                    summary.task_id,
-                    summary.recipe_id,
-                    summary.status,
-                    json.dumps(summary.failure_tags, ensure_ascii=False),
-                    summary.recovery_count,
-                    summary.budget_warning_count,
-                    summary.duration_ms,
-                    summary.input_tokens,
-                    summary.output_tokens,
-                    summary.estimated_cost_usd,
-                    summary.trace_path,
-                    summary.created_at,
-                    summary.updated_at,
-                ),
+        await self.sink.submit(
+            _PendingRun(
+                summary=summary,
+                trace_json=trace_json,
+                object_path=object_path,
+                index_path=self._index_path(record.session_id),
+                index_line=index_line,
+                snapshot_path=snapshot_path,
+                snapshot_json=snapshot_json,
+                db_path=settings.db_path,
             )
-            await db.commit()
-
-    @classmethod
-    async def _ensure_schema(cls) -> None:
-        db_path = str(settings.db_path.resolve())
-        if db_path in cls._schema_ready_db_paths:
-            return
-        async with cls._schema_lock:
-            if db_path in cls._schema_ready_db_paths:
-                return
-            await init_db()
-            async with await get_db() as db:
-                for ddl in (
-                    "ALTER TABLE harness_runs ADD COLUMN task_id TEXT",
-                    "ALTER TABLE harness_runs ADD COLUMN recipe_id TEXT",
-                    "ALTER TABLE harness_runs ADD COLUMN recovery_count INTEGER DEFAULT 0",
-                    "ALTER TABLE harness_runs ADD COLUMN budget_warning_count INTEGER DEFAULT 0",
-                ):
-                    try:
-                        await db.execute(ddl)
-                    except Exception:
-                        pass
-                await db.commit()
-            cls._schema_ready_db_paths.add(db_path)
+        )
+        return summary
+
+    async def flush(self) -> None:
+        """等待已登记的运行全部落盘。"""
+        await self.sink.flush()
 
     async def list_runs(
         self,
@@ -187,7 +437,7 @@ class HarnessTraceStore:
         limit: int = 20,
     ) -> list[HarnessRunSummary]:
         """读取摘要列表。"""
-        await self._ensure_schema()
+        await self.sink.flush()
         query = (
             "SELECT run_id, session_id, turn_id, task_id, recipe_id, status, failure_tags, "
             "recovery_count, budget_warning_count, duration_ms, input_tokens, output_tokens, "
@@ -201,9 +451,7 @@ class HarnessTraceStore:
         query += " ORDER BY created_at DESC LIMIT ?"
         params.append(limit)
 
-        async with await get_db() as db:
-            cursor = await db.execute(query, params)
-            rows = await cursor.fetchall()
+        rows = await get_database().fetchall(query, params)
 
         summaries: list[HarnessRunSummary] = []
         for row in rows:
@@ -234,15 +482,51 @@ class HarnessTraceStore:
 
     def load_run(self, run_id: str, session_id: str | None = None) -> HarnessTraceRecord:
         """读取单次运行明细。"""
-        if session_id:
-            candidate = self._trace_path(session_id, run_id)
-            if candidate.exists():
-                return HarnessTraceRecord.model_validate_json(candidate.read_text(encoding="utf-8"))
-
-        for path in settings.sessions_dir.glob(f"*/harness/traces/{run_id}.json"):
-            return HarnessTraceRecord.model_validate_json(path.read_text(encoding="utf-8"))
+        pending = self.sink.pending_run(run_id, session_id)
+        if pending is not None:
+            return HarnessTraceRecord.model_validate_json(pending.trace_json)
+
+        session_ids = (
+            [session_id]
+            if session_id
+            else [path.parents[1].name for path in settings.sessions_dir.glob("*/harness/traces")]
+        )
+        for sid in session_ids:
+            object_path = self._lookup_object(sid, run_id)
+            if object_path is not None and object_path.exists():
+                return HarnessTraceRecord.model_validate_json(read_trace_file(object_path))
+            legacy = self._legacy_trace_path(sid, run_id)
+            if legacy.exists():
+                return HarnessTraceRecord.model_validate_json(legacy.read_bytes())
         raise FileNotFoundError(run_id)
 
+    def load_trace_payload(self, trace_ref: str) -> dict[str, Any] | None:
+        """按快照中的 trace_ref 读取 trace 原始 JSON；文件不存在时返回 None。"""
+        path = Path(trace_ref)
+        pending = self.sink.pending_trace(path)
+        if pending is not None:
+            return cast(dict[str, Any], json.loads(pending))
+        if not path.exists():
+            return None
+        return cast(dict[str, Any], json.loads(read_trace_file(path)))
+
+    def _lookup_object(self, session_id: str, run_id: str) -> Path | None:
+        """在会话索引中查找 run_id 最近一次写入的对象路径。"""
+        index_path = self._index_path(session_id)
+        if not index_path.exists():
+            return None
+        marker = json.dumps(run_id, ensure_ascii=False)
+        with index_path.open(encoding="utf-8") as fh:
+            lines = [line for line in fh if marker in line]
+        for line in reversed(lines):
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if entry.get("run_id") == run_id and entry.get("digest"):
+                return self._object_path(session_id, str(entry["digest"]))
+        return None
+
     def replay_run(self, run_id: str, session_id: str | None = None) -> dict[str, Any]:
         """返回单次运行的可读回放摘要。"""
         record = self.load_run(run_id, session_id=session_id)
@@ -267,6 +551,9 @@ class HarnessTraceStore:
 
     def load_snapshot(self, session_id: str, turn_id: str) -> HarnessSessionSnapshot:
         """读取指定轮次的运行快照。"""
+        pending = self.sink.pending_snapshot(session_id, turn_id)
+        if pending is not None:
+            return HarnessSessionSnapshot.model_validate_json(pending)
         path = self._snapshot_path(session_id, turn_id)
         if not path.exists():
             raise FileNotFoundError(turn_id)
@@ -274,6 +561,9 @@ class HarnessTraceStore:
 
     def load_latest_snapshot(self, session_id: str) -> HarnessSessionSnapshot:
         """读取指定会话最近一轮的运行快照。"""
+        pending = self.sink.pending_snapshot(session_id)
+        if pending is not None:
+            return HarnessSessionSnapshot.model_validate_json(pending)
         snapshot_dir = self._snapshot_dir(session_id)
         if not snapshot_dir.exists():
             raise FileNotFoundError(session_id)
@@ -1,13 +1,25 @@
-"""统一日志配置与上下文传播。"""
+"""统一日志配置与上下文传播。
+
+根 logger 上只挂一个 ``AsyncLogHandler``：调用线程（通常是事件循环）只负责合并消息参数
+并放入有界队列，格式化（上下文标签、着色）、写文件与轮转都在专用写线程中批量完成。
+上下文字段由 LogRecord 工厂在调用线程创建记录时写入，``bind_log_context`` 不受影响。
+"""
 
 from __future__ import annotations
 
+import copy
+import itertools
+import json
 import logging
+import queue
 import sys
+import threading
+import time
 from contextvars import ContextVar, Token
+from datetime import datetime, timezone
 from logging.handlers import TimedRotatingFileHandler
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable
 
 TRACE_LEVEL = 5
 logging.addLevelName(TRACE_LEVEL, "TRACE")
@@ -228,6 +240,216 @@ def _build_colored_formatter() -> ColoredFormatter:
     return ColoredFormatter()
 
 
+class JsonLinesFormatter(logging.Formatter):
+    """紧凑 JSON Lines 格式：每条日志一行，只输出非空上下文字段。"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": getattr(record, "logger_name", record.name),
+            "msg": record.getMessage(),
+        }
+        for field in _CONTEXT_FIELDS:
+            value = getattr(record, field, "-")
+            if value and value != "-":
+                payload[field] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+        if record.stack_info:
+            payload["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+# ---- 异步日志队列 ----
+
+# 写线程处理批次期间置位：目标 handler 的逐条 flush 推迟到批次末尾统一执行
+_batch_state = threading.local()
+_DROP_REPORT_INTERVAL_SECONDS = 5.0
+_EXC_FORMATTER = logging.Formatter()
+_CLOSE_TIMEOUT_SECONDS = 5.0
+
+
+class _DeferredFlushMixin:
+    """批次写出期间跳过逐条 flush。"""
+
+    def flush(self) -> None:
+        if getattr(_batch_state, "active", False):
+            return
+        super().flush()  # type: ignore[misc]
+
+
+class _BatchedStreamHandler(_DeferredFlushMixin, logging.StreamHandler):
+    """控制台 handler（批量 flush）。"""
+
+
+class _BatchedRotatingFileHandler(_DeferredFlushMixin, TimedRotatingFileHandler):
+    """按时间轮转的文件 handler（批量 flush）。"""
+
+
+class AsyncLogHandler(logging.Handler):
+    """有界队列 + 专用写线程的日志 handler。
+
+    - 队列过半时，DEBUG/TRACE 记录每 ``debug_sample_rate`` 条保留 1 条；
+    - 队列已满时丢弃 WARNING 以下的记录；WARNING 及以上不丢弃，由调用线程直接写出；
+    - 丢弃/抽样计数定期以一条 WARNING 汇报，并可经 ``stats()`` 查询。
+    """
+
+    def __init__(
+        self,
+        targets: Iterable[logging.Handler],
+        *,
+        capacity: int = 10_000,
+        batch_size: int = 256,
+        debug_sample_rate: int = 10,
+    ) -> None:
+        super().__init__()
+        self.targets = list(targets)
+        self._queue: queue.Queue[logging.LogRecord | None] = queue.Queue(maxsize=max(1, capacity))
+        self._batch_size = max(1, int(batch_size))
+        self._sample_rate = max(1, int(debug_sample_rate))
+        self._sample_watermark = max(1, self._queue.maxsize // 2)
+        self._sample_counter = itertools.count()
+        self._counts = {"enqueued": 0, "dropped": 0, "sampled_out": 0, "sync_writes": 0}
+        self._reported = {"dropped": 0, "sampled_out": 0}
+        self._last_report = 0.0
+        self._closed = False
+        self._writer = threading.Thread(target=self._run, name="nini-log-writer", daemon=True)
+        self._writer.start()
+
+    # ---- 调用线程 ----
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            if (
+                record.levelno < logging.INFO
+                and self._queue.qsize() >= self._sample_watermark
+                and next(self._sample_counter) % self._sample_rate
+            ):
+                self._counts["sampled_out"] += 1
+                return
+            prepared = self._prepare(record)
+            if self._closed:
+                self._write([prepared])
+                return
+            try:
+                self._queue.put_nowait(prepared)
+                self._counts["enqueued"] += 1
+            except queue.Full:
+                if record.levelno < logging.WARNING:
+                    self._counts["dropped"] += 1
+                    return
+                self._counts["sync_writes"] += 1
+                self._write([prepared])
+        except Exception:
+            self.handleError(record)
+
+    def _prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """合并消息参数并固化异常文本，避免参数对象在入队后被修改。"""
+        prepared = copy.copy(record)
+        prepared.msg = record.getMessage()
+        prepared.args = None
+        if record.exc_info:
+            prepared.exc_text = record.exc_text or _EXC_FORMATTER.formatException(record.exc_info)
+            prepared.exc_info = None
+        return prepared
+
+    def flush(self) -> None:
+        """等待已入队的记录全部写出，再 flush 目标 handler。"""
+        if threading.current_thread() is not self._writer:
+            deadline = time.monotonic() + _CLOSE_TIMEOUT_SECONDS
+            with self._queue.all_tasks_done:
+                while self._queue.unfinished_tasks and self._writer.is_alive():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._queue.all_tasks_done.wait(remaining)
+        for target in self.targets:
+            target.flush()
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            if self._writer.is_alive():
+                try:
+                    self._queue.put(None, timeout=_CLOSE_TIMEOUT_SECONDS)
+                except queue.Full:
+                    pass
+                self._writer.join(_CLOSE_TIMEOUT_SECONDS)
+            for target in self.targets:
+                try:
+                    target.close()
+                except Exception:
+                    continue
+        super().close()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            **self._counts,
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+        }
+
+    # ---- 写线程 ----
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self._batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            records = [item for item in batch if item is not None]
+            try:
+                _batch_state.active = True
+                self._write(records)
+            finally:
+                _batch_state.active = False
+                for target in self.targets:
+                    try:
+                        target.flush()
+                    except Exception:
+                        continue
+                self._report_losses()
+                for _ in batch:
+                    self._queue.task_done()
+            if len(records) != len(batch):
+                return
+
+    def _write(self, records: list[logging.LogRecord]) -> None:
+        for record in records:
+            for target in self.targets:
+                if record.levelno >= target.level:
+                    target.handle(record)
+
+    def _report_losses(self) -> None:
+        dropped = self._counts["dropped"] - self._reported["dropped"]
+        sampled = self._counts["sampled_out"] - self._reported["sampled_out"]
+        now = time.monotonic()
+        if not (dropped or sampled) or now - self._last_report < _DROP_REPORT_INTERVAL_SECONDS:
+            return
+        self._reported = {
+            "dropped": self._counts["dropped"],
+            "sampled_out": self._counts["sampled_out"],
+        }
+        self._last_report = now
+        record = logging.getLogger(__name__).makeRecord(
+            __name__,
+            logging.WARNING,
+            __file__,
+            0,
+            "日志队列拥塞：已丢弃 %d 条、抽样跳过 %d 条低级别日志",
+            (dropped, sampled),
+            None,
+        )
+        self._write([record])
+
+
 def _mark_managed(handler: logging.Handler) -> logging.Handler:
     """给 handler 打上 Nini 管理标记。"""
     setattr(handler, _MANAGED_HANDLER_ATTR, True)
@@ -242,8 +464,14 @@ def setup_logging(
     rotate_when: str | None = None,
     rotate_interval: int | None = None,
     backup_count: int | None = None,
+    log_format: str | None = None,
+    use_queue: bool | None = None,
 ) -> Path | None:
-    """初始化统一日志配置，并返回日志文件路径。"""
+    """初始化统一日志配置，并返回日志文件路径。
+
+    ``log_format`` 只控制文件日志格式（``text`` / ``json``），控制台始终输出彩色
+    文本；``use_queue=False`` 时退回为在调用线程同步写出（排查问题时使用）。
+    """
     from nini.config import settings
 
     _install_record_factory()
@@ -254,16 +482,19 @@ def setup_logging(
     when = rotate_when or settings.log_rotate_when
     interval = rotate_interval or settings.log_rotate_interval
     retention = backup_count if backup_count is not None else settings.log_backup_count
-    formatter = _build_formatter()
+    file_format = str(log_format or settings.log_format).strip().lower()
+    queued = settings.log_queue_enabled if use_queue is None else use_queue
+    formatter = JsonLinesFormatter() if file_format == "json" else _build_formatter()
 
     root_logger = logging.getLogger()
     root_logger.setLevel(resolved_level)
     _remove_managed_handlers(root_logger)
 
-    console_handler = _mark_managed(logging.StreamHandler())
+    targets: list[logging.Handler] = []
+    console_handler = _BatchedStreamHandler()
     console_handler.setLevel(resolved_level)
     console_handler.setFormatter(_build_colored_formatter())
-    root_logger.addHandler(console_handler)
+    targets.append(console_handler)
 
     log_path: Path | None = target_dir / target_name
     try:
@@ -271,22 +502,41 @@ def setup_logging(
         resolved_log_path = log_path
         if resolved_log_path is None:
             raise ValueError("日志文件路径为空")
-        file_handler = _mark_managed(
-            TimedRotatingFileHandler(
-                resolved_log_path,
-                when=when,
-                interval=interval,
-                backupCount=retention,
-                encoding="utf-8",
-                utc=True,
-            )
+        file_handler = _BatchedRotatingFileHandler(
+            resolved_log_path,
+            when=when,
+            interval=interval,
+            backupCount=retention,
+            encoding="utf-8",
+            utc=True,
         )
         file_handler.setLevel(resolved_level)
         file_handler.setFormatter(formatter)
-        root_logger.addHandler(file_handler)
+        targets.append(file_handler)
     except Exception as exc:
-        logging.getLogger(__name__).warning("日志文件初始化失败，已回退为仅控制台输出: %s", exc)
+        file_error: Exception | None = exc
         log_path = None
+    else:
+        file_error = None
+
+    if queued:
+        root_logger.addHandler(
+            _mark_managed(
+                AsyncLogHandler(
+                    targets,
+                    capacity=settings.log_queue_size,
+                    batch_size=settings.log_queue_batch_size,
+                    debug_sample_rate=settings.log_queue_debug_sample_rate,
+                )
+            )
+        )
+    else:
+        for target in targets:
+            root_logger.addHandler(_mark_managed(target))
+    if file_error is not None:
+        logging.getLogger(__name__).warning(
+            "日志文件初始化失败，已回退为仅控制台输出: %s", file_error
+        )
 
     for logger_name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
         uvicorn_logger = logging.getLogger(logger_name)
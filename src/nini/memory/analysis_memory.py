@@ -1,12 +1,19 @@
 """结构化分析记忆系统。
 
 管理跨会话的结构化科研记忆，包含 AnalysisMemory 数据模型与持久化接口。
+
+持久化采用 write-behind：``add_*`` 只标记脏并安排一次延迟落盘，
+同一时间窗内的多次写入合并为一次；turn 结束、会话缓存清理、LRU 淘汰与
+应用退出时会立即 ``flush_analysis_memories``。
 """
 
 from __future__ import annotations
 
 import json
 import logging
+import threading
+from collections import OrderedDict
+from collections.abc import Iterable
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any
@@ -120,31 +127,42 @@ class AnalysisMemory:
     artifacts: list[Artifact] = field(default_factory=list)
     created_at: float = field(default_factory=lambda: __import__("time").time())
     updated_at: float = field(default_factory=lambda: __import__("time").time())
+    # 统计结果签名 -> 下标，按需构建；statistics 被整体替换或长度不符时重建
+    _signature_index: dict[tuple[Any, ...], int] | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _indexed_statistics_id: int = field(default=0, init=False, repr=False, compare=False)
+    _indexed_length: int = field(default=0, init=False, repr=False, compare=False)
+
+    # 写入方法持有注册表锁，保证后台 flush 线程序列化时看到的是一致快照
 
     def add_finding(self, finding: Finding) -> None:
         """添加发现记录。"""
-        self.findings.append(finding)
-        self.updated_at = __import__("time").time()
-        save_analysis_memory(self)
+        with _registry_lock:
+            self.findings.append(finding)
+            self._touch()
 
     def add_statistic(self, statistic: StatisticResult) -> None:
-        """添加统计结果。"""
-        signature = self._statistic_signature(statistic)
-        for index, existing in enumerate(self.statistics):
-            if self._statistic_signature(existing) == signature:
-                statistic.ltm_id = existing.ltm_id or statistic.ltm_id
-                self.statistics[index] = statistic
-                break
-        else:
-            self.statistics.append(statistic)
-        self.updated_at = __import__("time").time()
-        save_analysis_memory(self)
+        """添加统计结果（相同签名的结果幂等覆盖）。"""
+        with _registry_lock:
+            self._upsert_statistic(statistic)
+            self._touch()
+
+    def add_statistics(self, statistics: Iterable[StatisticResult]) -> None:
+        """批量添加统计结果，只标记一次脏。"""
+        with _registry_lock:
+            changed = False
+            for statistic in statistics:
+                self._upsert_statistic(statistic)
+                changed = True
+            if changed:
+                self._touch()
 
     def add_decision(self, decision: Decision) -> None:
         """添加决策记录。"""
-        self.decisions.append(decision)
-        self.updated_at = __import__("time").time()
-        save_analysis_memory(self)
+        with _registry_lock:
+            self.decisions.append(decision)
+            self._touch()
 
     def add_artifact(
         self,
@@ -160,9 +178,59 @@ class AnalysisMemory:
             description=description,
             metadata=metadata,
         )
-        self.artifacts.append(artifact)
+        with _registry_lock:
+            self.artifacts.append(artifact)
+            self._touch()
+
+    def _touch(self) -> None:
         self.updated_at = __import__("time").time()
-        save_analysis_memory(self)
+        mark_analysis_memory_dirty(self)
+
+    def _ensure_signature_index(self) -> dict[tuple[Any, ...], int]:
+        index = self._signature_index
+        if (
+            index is None
+            or self._indexed_statistics_id != id(self.statistics)
+            or self._indexed_length != len(self.statistics)
+        ):
+            index = {}
+            for position, existing in enumerate(self.statistics):
+                index.setdefault(self._statistic_signature(existing), position)
+            self._signature_index = index
+            self._indexed_statistics_id = id(self.statistics)
+            self._indexed_length = len(self.statistics)
+        return index
+
+    def invalidate_signature_index(self) -> None:
+        """statistics 被外部原地修改后调用，下次写入时重建签名索引。"""
+        self._signature_index = None
+
+    def _upsert_statistic(self, statistic: StatisticResult) -> None:
+        index = self._ensure_signature_index()
+        signature = self._statistic_signature(statistic)
+        position = index.get(signature)
+        if (
+            position is not None
+            and position < len(self.statistics)
+            and self._statistic_signature(self.statistics[position]) == signature
+        ):
+            existing = self.statistics[position]
+            statistic.ltm_id = existing.ltm_id or statistic.ltm_id
+            self.statistics[position] = statistic
+            return
+        if position is not None:
+            # 索引与列表不一致（外部原地修改过），重建后再查一次
+            self._signature_index = None
+            index = self._ensure_signature_index()
+            position = index.get(signature)
+            if position is not None:
+                existing = self.statistics[position]
+                statistic.ltm_id = existing.ltm_id or statistic.ltm_id
+                self.statistics[position] = statistic
+                return
+        index[signature] = len(self.statistics)
+        self.statistics.append(statistic)
+        self._indexed_length = len(self.statistics)
 
     def summary(self) -> str:
         """生成摘要文本。"""
@@ -480,18 +548,116 @@ class AnalysisMemory:
 
 # ---- 会话记忆注册表 ----
 
-_analysis_memories: dict[str, AnalysisMemory] = {}
+# 内存中最多保留的 AnalysisMemory 数量（LRU 淘汰，淘汰前先落盘）
+_MAX_CACHED_MEMORIES = 256
+# 脏记忆的延迟落盘时间（秒）：窗口内的多次写入合并为一次
+_FLUSH_DELAY_SECONDS = 2.0
 
+_analysis_memories: OrderedDict[str, AnalysisMemory] = OrderedDict()
+_dirty_keys: set[str] = set()
+_registry_lock = threading.RLock()
+_flush_timer: threading.Timer | None = None
 
-def save_analysis_memory(memory: AnalysisMemory) -> None:
-    """将 AnalysisMemory 持久化到磁盘。"""
+
+def _memory_key(session_id: str, dataset_name: str) -> str:
+    return f"{session_id}:{dataset_name}"
+
+
+def _write_analysis_memory(memory: AnalysisMemory) -> None:
     if not session_persistence_enabled(memory.session_id):
         return
     path = _analysis_memory_path(memory.session_id, memory.dataset_name)
-    path.write_text(
+    tmp_path = path.with_suffix(".json.tmp")
+    tmp_path.write_text(
         json.dumps(memory.to_dict(), ensure_ascii=False, indent=2),
         encoding="utf-8",
     )
+    tmp_path.replace(path)
+
+
+def save_analysis_memory(memory: AnalysisMemory) -> None:
+    """立即将 AnalysisMemory 持久化到磁盘。"""
+    with _registry_lock:
+        memory.invalidate_signature_index()
+        _write_analysis_memory(memory)
+        _dirty_keys.discard(_memory_key(memory.session_id, memory.dataset_name))
+
+
+def mark_analysis_memory_dirty(memory: AnalysisMemory) -> None:
+    """标记记忆待落盘，并安排一次延迟 flush。"""
+    global _flush_timer
+    if not session_persistence_enabled(memory.session_id):
+        return
+    with _registry_lock:
+        key = _memory_key(memory.session_id, memory.dataset_name)
+        cached = _analysis_memories.get(key)
+        if cached is not memory:
+            # 未经注册表获取的实例（如测试直接构造）：登记后再统一落盘
+            _cache_put_locked(key, memory)
+        _dirty_keys.add(key)
+        if _flush_timer is None:
+            _flush_timer = threading.Timer(_FLUSH_DELAY_SECONDS, _flush_from_timer)
+            _flush_timer.daemon = True
+            _flush_timer.start()
+
+
+def _flush_from_timer() -> None:
+    global _flush_timer
+    with _registry_lock:
+        _flush_timer = None
+    try:
+        flush_analysis_memories()
+    except Exception:
+        logger.warning("AnalysisMemory 延迟落盘失败", exc_info=True)
+
+
+def flush_analysis_memories(session_id: str | None = None) -> int:
+    """将脏记忆写入磁盘，返回写入数量。``session_id`` 为空时处理全部会话。
+
+    序列化与写盘都在注册表锁内完成（写入方法同样持锁），只有写盘成功后才清除脏标记；
+    失败的记忆保持为脏，等待下一次 flush 重试。
+    """
+    with _registry_lock:
+        prefix = f"{session_id}:" if session_id else ""
+        keys = [key for key in _dirty_keys if key.startswith(prefix)]
+        written = 0
+        for key in keys:
+            memory = _analysis_memories.get(key)
+            if memory is None:
+                _dirty_keys.discard(key)
+                continue
+            try:
+                _write_analysis_memory(memory)
+            except Exception:
+                logger.warning("AnalysisMemory 落盘失败: %s", key, exc_info=True)
+                continue
+            _dirty_keys.discard(key)
+            written += 1
+        return written
+
+
+def shutdown_analysis_memories() -> None:
+    """取消延迟定时器并落盘全部脏记忆（应用退出时调用）。"""
+    global _flush_timer
+    with _registry_lock:
+        timer = _flush_timer
+        _flush_timer = None
+    if timer is not None:
+        timer.cancel()
+    flush_analysis_memories()
+
+
+def _cache_put_locked(key: str, memory: AnalysisMemory) -> None:
+    _analysis_memories[key] = memory
+    _analysis_memories.move_to_end(key)
+    while len(_analysis_memories) > _MAX_CACHED_MEMORIES:
+        evicted_key, evicted = _analysis_memories.popitem(last=False)
+        if evicted_key in _dirty_keys:
+            try:
+                _write_analysis_memory(evicted)
+            except Exception:
+                logger.warning("AnalysisMemory 淘汰前落盘失败: %s", evicted_key, exc_info=True)
+            _dirty_keys.discard(evicted_key)
 
 
 def load_analysis_memory(session_id: str, dataset_name: str) -> AnalysisMemory | None:
@@ -518,20 +684,27 @@ def load_analysis_memory(session_id: str, dataset_name: str) -> AnalysisMemory |
 
 def get_analysis_memory(session_id: str, dataset_name: str) -> AnalysisMemory:
     """获取或创建分析记忆。"""
-    key = f"{session_id}:{dataset_name}"
-    if key not in _analysis_memories:
+    key = _memory_key(session_id, dataset_name)
+    with _registry_lock:
+        memory = _analysis_memories.get(key)
+        if memory is not None:
+            _analysis_memories.move_to_end(key)
+            return memory
         loaded = load_analysis_memory(session_id, dataset_name)
-        _analysis_memories[key] = loaded or AnalysisMemory(
+        memory = loaded or AnalysisMemory(
             session_id=session_id,
             dataset_name=dataset_name,
         )
-    return _analysis_memories[key]
+        _cache_put_locked(key, memory)
+        return memory
 
 
 def remove_analysis_memory(session_id: str, dataset_name: str) -> None:
     """移除分析记忆。"""
-    key = f"{session_id}:{dataset_name}"
-    _analysis_memories.pop(key, None)
+    key = _memory_key(session_id, dataset_name)
+    with _registry_lock:
+        _analysis_memories.pop(key, None)
+        _dirty_keys.discard(key)
     if session_persistence_enabled(session_id):
         path = _analysis_memory_path(session_id, dataset_name)
         if path.exists():
@@ -540,35 +713,40 @@ def remove_analysis_memory(session_id: str, dataset_name: str) -> None:
 
 def list_session_analysis_memories(session_id: str) -> list[AnalysisMemory]:
     """列出会话的所有分析记忆（非空的）。"""
-    if session_persistence_enabled(session_id):
-        memory_dir = _analysis_memory_dir(session_id, create=False)
-        if memory_dir.exists():
-            for path in sorted(memory_dir.glob("*.json")):
-                try:
-                    payload = json.loads(path.read_text(encoding="utf-8"))
-                except Exception:
-                    logger.warning("读取 AnalysisMemory 文件失败: %s", path)
-                    continue
-                if not isinstance(payload, dict):
-                    continue
-                dataset_name = str(payload.get("dataset_name", "")).strip()
-                if not dataset_name:
-                    continue
-                key = f"{session_id}:{dataset_name}"
-                if key not in _analysis_memories:
-                    _analysis_memories[key] = AnalysisMemory.from_dict(payload)
-
-    result: list[AnalysisMemory] = []
-    prefix = f"{session_id}:"
-    for key, mem in _analysis_memories.items():
-        if key.startswith(prefix) and (mem.findings or mem.statistics or mem.decisions):
-            result.append(mem)
-    return result
+    with _registry_lock:
+        if session_persistence_enabled(session_id):
+            memory_dir = _analysis_memory_dir(session_id, create=False)
+            if memory_dir.exists():
+                for path in sorted(memory_dir.glob("*.json")):
+                    try:
+                        payload = json.loads(path.read_text(encoding="utf-8"))
+                    except Exception:
+                        logger.warning("读取 AnalysisMemory 文件失败: %s", path)
+                        continue
+                    if not isinstance(payload, dict):
+                        continue
+                    dataset_name = str(payload.get("dataset_name", "")).strip()
+                    if not dataset_name:
+                        continue
+                    key = _memory_key(session_id, dataset_name)
+                    if key not in _analysis_memories:
+                        _cache_put_locked(key, AnalysisMemory.from_dict(payload))
+
+        result: list[AnalysisMemory] = []
+        prefix = f"{session_id}:"
+        for key, mem in _analysis_memories.items():
+            if key.startswith(prefix) and (mem.findings or mem.statistics or mem.decisions):
+                result.append(mem)
+        return result
 
 
 def clear_session_analysis_memories(session_id: str) -> None:
     """清除会话的所有分析记忆。"""
-    clear_session_analysis_memory_cache(session_id)
+    with _registry_lock:
+        prefix = f"{session_id}:"
+        for key in [k for k in _dirty_keys if k.startswith(prefix)]:
+            _dirty_keys.discard(key)
+        clear_session_analysis_memory_cache(session_id)
     if session_persistence_enabled(session_id):
         memory_dir = settings.sessions_dir / session_id / "analysis_memories"
         if memory_dir.exists():
@@ -578,7 +756,9 @@ def clear_session_analysis_memories(session_id: str) -> None:
 
 
 def clear_session_analysis_memory_cache(session_id: str) -> None:
-    """仅清除会话的 AnalysisMemory 内存缓存。"""
-    keys_to_remove = [k for k in _analysis_memories if k.startswith(f"{session_id}:")]
-    for key in keys_to_remove:
-        _analysis_memories.pop(key, None)
+    """仅清除会话的 AnalysisMemory 内存缓存（未落盘的修改会先写入磁盘）。"""
+    with _registry_lock:
+        flush_analysis_memories(session_id)
+        keys_to_remove = [k for k in _analysis_memories if k.startswith(f"{session_id}:")]
+        for key in keys_to_remove:
+            _analysis_memories.pop(key, None)
@@ -658,25 +658,10 @@ def compress_session_history(
     }
 
 
-async def compress_session_history_with_llm(
-    session: Session,
-    *,
-    ratio: float = 0.5,
-    min_messages: int = 4,
-) -> dict[str, Any]:
-    """压缩会话历史（LLM 摘要模式）。
-
-    优先使用 LLM 生成高质量中文摘要，失败时自动回退到轻量摘要。
-    """
-    total = len(session.messages)
+def plan_compression_split(total: int, *, ratio: float = 0.5, min_messages: int = 4) -> int:
+    """计算单次压缩应归档的最旧消息条数；消息不足时返回 0。"""
     if total < min_messages:
-        return {
-            "success": False,
-            "message": f"消息数量不足，至少需要 {min_messages} 条消息才可压缩",
-            "archived_count": 0,
-            "remaining_count": total,
-        }
-
+        return 0
     ratio = min(max(ratio, 0.1), 0.9)
     # min_messages 表示"最少保留数"，归档其余部分，并受 ratio 限制单次归档比例
     archive_count = total - min_messages
@@ -684,27 +669,34 @@ async def compress_session_history_with_llm(
     archive_count = max(1, archive_count)
     if archive_count >= total:
         archive_count = max(total - 1, 1)
+    return archive_count
 
-    archived = session.messages[:archive_count]
-    remaining = session.messages[archive_count:]
-    if not archived:
-        return {
-            "success": False,
-            "message": "没有可归档的消息",
-            "archived_count": 0,
-            "remaining_count": total,
-        }
 
-    # 尝试 LLM 摘要
-    summary = await _llm_summarize(archived)
-    summary_mode = "llm"
+async def summarize_for_compression(messages: list[dict[str, Any]]) -> tuple[str, str]:
+    """为待归档消息生成摘要，返回 (summary, summary_mode)。
+
+    只读取消息、不修改会话，可在后台提前执行。LLM 失败时回退到轻量摘要。
+    """
+    summary = await _llm_summarize(messages)
     if summary is None:
-        summary = _summarize_messages(archived)
-        summary_mode = "lightweight"
+        return _summarize_messages(messages), "lightweight"
+    return summary, "llm"
+
 
+def apply_compression_summary(
+    session: Session,
+    archived: list[dict[str, Any]],
+    summary: str,
+    summary_mode: str,
+) -> dict[str, Any]:
+    """把已生成的摘要落到会话上：归档最旧消息、截断历史、写入压缩上下文。
+
+    整个过程不含 await，调用方在事件循环中执行即保证原子性。调用前需确认
+    ``session.messages`` 的前缀仍是 ``archived``。
+    """
+    remaining = session.messages[len(archived) :]
     # 过滤上传文件路径，防止污染长期记忆
     summary = _strip_upload_mentions(summary)
-
     # 追加 pending_actions 状态到摘要，确保压缩后 LLM 仍感知待处理动作
     summary = _append_pending_actions_to_summary(summary, session.pending_actions)
 
@@ -713,10 +705,6 @@ async def compress_session_history_with_llm(
     session.messages = remaining
     session._rewrite_conversation_memory()
     session.set_compressed_context(summary)
-
-    # LLM 路径：尝试将最旧两段合并为 depth=1 摘要（段数超限时）
-    await try_merge_oldest_segments(session, settings.compressed_context_max_segments)
-
     return {
         "success": True,
         "message": "会话压缩完成",
@@ -730,6 +718,45 @@ async def compress_session_history_with_llm(
     }
 
 
+async def compress_session_history_with_llm(
+    session: Session,
+    *,
+    ratio: float = 0.5,
+    min_messages: int = 4,
+) -> dict[str, Any]:
+    """压缩会话历史（LLM 摘要模式）。
+
+    优先使用 LLM 生成高质量中文摘要，失败时自动回退到轻量摘要。
+    """
+    total = len(session.messages)
+    if total < min_messages:
+        return {
+            "success": False,
+            "message": f"消息数量不足，至少需要 {min_messages} 条消息才可压缩",
+            "archived_count": 0,
+            "remaining_count": total,
+        }
+
+    archive_count = plan_compression_split(total, ratio=ratio, min_messages=min_messages)
+    archived = session.messages[:archive_count]
+    if not archived:
+        return {
+            "success": False,
+            "message": "没有可归档的消息",
+            "archived_count": 0,
+            "remaining_count": total,
+        }
+
+    summary, summary_mode = await summarize_for_compression(archived)
+    result = apply_compression_summary(session, archived, summary, summary_mode)
+
+    # LLM 路径：尝试将最旧两段合并为 depth=1 摘要（段数超限时）
+    await try_merge_oldest_segments(session, settings.compressed_context_max_segments)
+    result["compressed_rounds"] = session.compressed_rounds
+    result["last_compressed_at"] = session.last_compressed_at
+    return result
+
+
 def rollback_compression(session: Session) -> dict[str, Any]:
     """回滚最近一次压缩，将最新归档消息恢复到当前会话。"""
     archive_dir = settings.sessions_dir / session.id / "archive"
@@ -784,6 +811,7 @@ from nini.memory.analysis_memory import (  # noqa: E402,F401
     StatisticResult,
     clear_session_analysis_memories,
     clear_session_analysis_memory_cache,
+    flush_analysis_memories,
     get_analysis_memory,
     list_session_analysis_memories,
     load_analysis_memory,
@@ -37,11 +37,20 @@ class KnowledgeMemory:
 
     def append(self, section: str, content: str) -> None:
         """追加一个章节。"""
+        self.append_many([(section, content)])
+
+    def append_many(self, sections: list[tuple[str, str]]) -> None:
+        """一次读写追加多个章节，结果与逐个 ``append`` 相同。
+
+        新章节先收集再一次拼接，耗时与追加量成线性，而非逐节重拼整篇文档。
+        """
+        if not sections:
+            return
         existing = self.read()
-        new_content = (
-            f"{existing}\n\n## {section}\n\n{content}" if existing else f"## {section}\n\n{content}"
-        )
-        self.write(new_content.strip() + "\n")
+        # 逐个 append 时每节末尾空白被裁掉并补一个换行，节间再以两个换行分隔
+        head = f"{existing}\n\n".lstrip() if existing else ""
+        body = "\n\n\n".join(f"## {section}\n\n{content}".rstrip() for section, content in sections)
+        self.write(f"{head}{body}\n")
 
     def clear(self) -> None:
         """清空知识记忆。"""
@@ -5,7 +5,10 @@ from __future__ import annotations
 import hashlib
 import json
 import logging
+import math
+import re
 import sqlite3
+import threading
 import time
 import uuid
 from pathlib import Path
@@ -46,7 +49,7 @@ _FTS5_SQL = """
 CREATE VIRTUAL TABLE IF NOT EXISTS facts_fts USING fts5(
     content, summary, tags,
     content=facts, content_rowid=rowid,
-    tokenize='unicode61'
+    tokenize='{tokenizer}'
 );
 CREATE TRIGGER IF NOT EXISTS facts_ai AFTER INSERT ON facts BEGIN
     INSERT INTO facts_fts(rowid, content, summary, tags)
@@ -64,6 +67,22 @@ CREATE TRIGGER IF NOT EXISTS facts_au AFTER UPDATE ON facts BEGIN
 END;
 """
 
+_DROP_FTS5_SQL = """
+DROP TRIGGER IF EXISTS facts_ai;
+DROP TRIGGER IF EXISTS facts_ad;
+DROP TRIGGER IF EXISTS facts_au;
+DROP TABLE IF EXISTS facts_fts;
+"""
+
+# trigram 分词器只能匹配 ≥3 字符的片段，更短的词项走 LIKE 降级
+_TRIGRAM_MIN_CHARS = 3
+# 单个 CJK 词项最多展开的三元组数量，避免超长 query 生成巨大 MATCH 表达式
+_MAX_TRIGRAMS_PER_TERM = 32
+# bm25 列权重：content / summary / tags
+_BM25_WEIGHTS = "1.0, 2.0, 0.5"
+_CJK_RE = re.compile(r"[\u3400-\u9fff\uf900-\ufaff]")
+_TERM_SPLIT_RE = re.compile(r"[\s,，。；;：:、!！?？()（）\[\]【】\"'“”‘’]+")
+
 
 def _check_fts5() -> bool:
     """探测当前 SQLite 是否支持 FTS5。"""
@@ -76,6 +95,66 @@ def _check_fts5() -> bool:
         return False
 
 
+def _check_trigram() -> bool:
+    """探测 FTS5 是否内置 trigram 分词器（SQLite ≥ 3.34）。"""
+    try:
+        probe = sqlite3.connect(":memory:")
+        probe.execute("CREATE VIRTUAL TABLE _p USING fts5(x, tokenize='trigram')")
+        probe.close()
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def _decay_score(
+    importance: float | None, access_count: int | None, created_at: float | None, now: float
+) -> float:
+    """时间衰减得分（注册为 SQL 函数 nini_decay）。
+
+    高频访问记忆衰减更慢（更"经典"）：access_count > 5 时 λ=0.005，否则 λ=0.01。
+    """
+    created = float(created_at if created_at is not None else now)
+    days = max(0.0, (now - created) / 86400)
+    decay_lambda = 0.005 if int(access_count or 0) > 5 else 0.01
+    return float(importance if importance is not None else 0.5) * math.exp(-decay_lambda * days)
+
+
+def build_match_expression(query: str) -> str | None:
+    """把自然语言 query 转为 trigram FTS5 MATCH 表达式。
+
+    - 含 CJK 字符的词项展开为重叠三元组后 OR 连接，由 bm25 按命中片段数排序；
+    - 其余词项作为短语整体匹配（trigram 下即子串匹配）；
+    - 短于 3 字符的词项无法被 trigram 索引命中，直接丢弃。
+
+    所有词项都被丢弃时返回 None，调用方应降级为 LIKE。
+    """
+    clauses: list[str] = []
+    seen: set[str] = set()
+    for term in _TERM_SPLIT_RE.split(query):
+        term = term.strip()
+        if len(term) < _TRIGRAM_MIN_CHARS:
+            continue
+        if _CJK_RE.search(term) and len(term) > _TRIGRAM_MIN_CHARS:
+            grams = [
+                term[idx : idx + _TRIGRAM_MIN_CHARS]
+                for idx in range(len(term) - _TRIGRAM_MIN_CHARS + 1)
+            ][:_MAX_TRIGRAMS_PER_TERM]
+        else:
+            grams = [term]
+        for gram in grams:
+            if gram in seen:
+                continue
+            seen.add(gram)
+            clauses.append('"' + gram.replace('"', '""') + '"')
+    return " OR ".join(clauses) if clauses else None
+
+
+def _escape_like(query: str) -> str:
+    """转义 LIKE 特殊字符并包裹为子串模式。"""
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
 class MemoryStore:
     """SQLite 统一记忆存储层。WAL 模式，支持多会话并发写入。"""
 
@@ -84,18 +163,26 @@ class MemoryStore:
         db_path.parent.mkdir(parents=True, exist_ok=True)
         self._db_path = db_path
         self._fts5 = _check_fts5()
+        # 仅 trigram 分词器能切分中文；unicode61 会把整段 CJK 当作一个 token，
+        # 此时全文检索对中文无效，检索统一走 LIKE 降级路径
+        self._fts_tokenizer = "trigram" if self._fts5 and _check_trigram() else "unicode61"
+        # 同一连接会被事件循环线程与 to_thread 工作线程共享，读写均需串行化
+        self._lock = threading.RLock()
+        # 本进程内写操作计数，配合 PRAGMA data_version 供上层检索缓存判定失效
+        self._generation = 0
         self._conn = sqlite3.connect(str(db_path), check_same_thread=False, timeout=10.0)
         self._conn.row_factory = sqlite3.Row
         self._conn.execute("PRAGMA journal_mode=WAL")
         self._conn.execute("PRAGMA foreign_keys=ON")
         self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.create_function("nini_decay", 4, _decay_score, deterministic=True)
         with self._conn:
             self._conn.executescript(_SCHEMA_SQL)
-            if self._fts5:
-                try:
-                    self._conn.executescript(_FTS5_SQL)
-                except sqlite3.OperationalError:
-                    self._fts5 = False
+        if self._fts5:
+            try:
+                self._ensure_fts_index()
+            except sqlite3.OperationalError:
+                self._fts5 = False
         # json_extract 索引（JSON1 扩展存在时生效，否则静默跳过）
         try:
             with self._conn:
@@ -106,6 +193,27 @@ class MemoryStore:
         except sqlite3.OperationalError:
             pass
 
+    def _ensure_fts_index(self) -> None:
+        """创建 FTS5 索引；旧库分词器不一致时重建索引（外部内容表，rebuild 即可回填）。"""
+        row = self._conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type='table' AND name='facts_fts'"
+        ).fetchone()
+        rebuild = row is not None and f"'{self._fts_tokenizer}'" not in str(row[0])
+        with self._conn:
+            if rebuild:
+                logger.info("facts_fts 分词器变更为 %s，重建全文索引", self._fts_tokenizer)
+                self._conn.executescript(_DROP_FTS5_SQL)
+            self._conn.executescript(_FTS5_SQL.format(tokenizer=self._fts_tokenizer))
+            if rebuild:
+                self._conn.execute("INSERT INTO facts_fts(facts_fts) VALUES ('rebuild')")
+
+    @property
+    def generation(self) -> tuple[int, int]:
+        """数据版本号：任何写入（本连接或其他连接）后都会变化。"""
+        with self._lock:
+            data_version = int(self._conn.execute("PRAGMA data_version").fetchone()[0])
+            return self._generation, data_version
+
     # ---- 写操作 ----
 
     def upsert_fact(
@@ -126,97 +234,170 @@ class MemoryStore:
             f"{memory_type}|{sci.get('dataset_name', '')}|{content}".encode()
         ).hexdigest()
 
-        existing = self._conn.execute(
-            "SELECT id FROM facts WHERE dedup_key = ?", (dedup_key,)
-        ).fetchone()
-        if existing:
+        with self._lock:
+            self._generation += 1
+            existing = self._conn.execute(
+                "SELECT id FROM facts WHERE dedup_key = ?", (dedup_key,)
+            ).fetchone()
+            if existing:
+                now = time.time()
+                with self._conn:
+                    self._conn.execute(
+                        "UPDATE facts SET access_count = access_count + 1, last_accessed_at = ? "
+                        "WHERE id = ?",
+                        (now, existing[0]),
+                    )
+                return str(existing[0])
+
+            fact_id = str(uuid.uuid4())
             now = time.time()
             with self._conn:
                 self._conn.execute(
-                    "UPDATE facts SET access_count = access_count + 1, last_accessed_at = ? "
-                    "WHERE id = ?",
-                    (now, existing[0]),
+                    """INSERT INTO facts
+                       (id, content, memory_type, summary, tags, importance, trust_score,
+                        source_session_id, created_at, updated_at, dedup_key, sci_metadata)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (
+                        fact_id,
+                        content,
+                        memory_type,
+                        summary,
+                        json.dumps(tags or [], ensure_ascii=False),
+                        importance,
+                        trust_score,
+                        source_session_id,
+                        now,
+                        now,
+                        dedup_key,
+                        json.dumps(sci, ensure_ascii=False),
+                    ),
                 )
-            return str(existing[0])
+            return fact_id
 
-        fact_id = str(uuid.uuid4())
-        now = time.time()
-        with self._conn:
-            self._conn.execute(
-                """INSERT INTO facts
-                   (id, content, memory_type, summary, tags, importance, trust_score,
-                    source_session_id, created_at, updated_at, dedup_key, sci_metadata)
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                (
-                    fact_id,
-                    content,
-                    memory_type,
-                    summary,
-                    json.dumps(tags or [], ensure_ascii=False),
-                    importance,
-                    trust_score,
-                    source_session_id,
-                    now,
-                    now,
-                    dedup_key,
-                    json.dumps(sci, ensure_ascii=False),
-                ),
-            )
-        return fact_id
+    def delete_fact(self, fact_id: str) -> bool:
+        """删除 fact，返回是否存在并被删除。"""
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.execute("DELETE FROM facts WHERE id = ?", (fact_id,))
+            if cursor.rowcount:
+                self._generation += 1
+            return bool(cursor.rowcount)
 
     def upsert_profile(self, profile_id: str, data_json: dict[str, Any], narrative_md: str) -> None:
         """更新研究画像（ON CONFLICT 覆盖）。"""
-        with self._conn:
-            self._conn.execute(
-                """INSERT INTO research_profiles (profile_id, data_json, narrative_md, updated_at)
-                   VALUES (?, ?, ?, ?)
-                   ON CONFLICT(profile_id) DO UPDATE SET
-                       data_json    = excluded.data_json,
-                       narrative_md = excluded.narrative_md,
-                       updated_at   = excluded.updated_at""",
-                (
-                    profile_id,
-                    json.dumps(data_json, ensure_ascii=False),
-                    narrative_md,
-                    time.time(),
-                ),
-            )
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    """INSERT INTO research_profiles (profile_id, data_json, narrative_md, updated_at)
+                       VALUES (?, ?, ?, ?)
+                       ON CONFLICT(profile_id) DO UPDATE SET
+                           data_json    = excluded.data_json,
+                           narrative_md = excluded.narrative_md,
+                           updated_at   = excluded.updated_at""",
+                    (
+                        profile_id,
+                        json.dumps(data_json, ensure_ascii=False),
+                        narrative_md,
+                        time.time(),
+                    ),
+                )
 
     def get_profile(self, profile_id: str) -> dict[str, Any] | None:
         """获取研究画像，不存在时返回 None。"""
-        row = self._conn.execute(
-            "SELECT * FROM research_profiles WHERE profile_id = ?", (profile_id,)
-        ).fetchone()
-        if not row:
-            return None
-        return {
-            "profile_id": row["profile_id"],
-            "data_json": json.loads(row["data_json"]),
-            "narrative_md": row["narrative_md"],
-            "updated_at": row["updated_at"],
-        }
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM research_profiles WHERE profile_id = ?", (profile_id,)
+            ).fetchone()
+            if not row:
+                return None
+            return {
+                "profile_id": row["profile_id"],
+                "data_json": json.loads(row["data_json"]),
+                "narrative_md": row["narrative_md"],
+                "updated_at": row["updated_at"],
+            }
 
     # ---- 读操作 ----
 
     def search_fts(self, query: str, top_k: int = 10) -> list[dict[str, Any]]:
-        """全文检索；FTS5 不可用时降级为 LIKE 匹配（特殊字符已转义）。"""
+        """全文检索，按 bm25 相关度排序。
+
+        trigram FTS5 可用时走 MATCH；分词器不可用或词项过短时降级为 LIKE 子串匹配
+        （特殊字符已转义），降级路径按 importance / trust_score 排序。
+        """
         if not query or not query.strip():
-            rows = self._conn.execute(
-                "SELECT * FROM facts ORDER BY importance DESC, trust_score DESC LIMIT ?",
-                (top_k,),
-            ).fetchall()
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT * FROM facts ORDER BY importance DESC, trust_score DESC LIMIT ?",
+                    (top_k,),
+                ).fetchall()
             return [self._row_to_dict(r) for r in rows]
 
-        # LIKE 降级路径：转义 % 和 _ 特殊字符
-        escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
-        like_q = f"%{escaped}%"
-        rows = self._conn.execute(
-            "SELECT * FROM facts WHERE content LIKE ? ESCAPE '\\' "
-            "OR summary LIKE ? ESCAPE '\\' ORDER BY importance DESC, trust_score DESC LIMIT ?",
-            (like_q, like_q, top_k),
-        ).fetchall()
+        match = self._match_expression(query)
+        with self._lock:
+            if match is not None:
+                rows = self._conn.execute(
+                    f"""SELECT f.* FROM facts_fts
+                        JOIN facts f ON f.rowid = facts_fts.rowid
+                        WHERE facts_fts MATCH ?
+                        ORDER BY bm25(facts_fts, {_BM25_WEIGHTS}), f.importance DESC
+                        LIMIT ?""",
+                    (match, top_k),
+                ).fetchall()
+            else:
+                like_q = _escape_like(query)
+                rows = self._conn.execute(
+                    "SELECT * FROM facts WHERE content LIKE ? ESCAPE '\\' "
+                    "OR summary LIKE ? ESCAPE '\\' ORDER BY importance DESC, trust_score DESC "
+                    "LIMIT ?",
+                    (like_q, like_q, top_k),
+                ).fetchall()
+        return [self._row_to_dict(r) for r in rows]
+
+    def search_ranked(
+        self,
+        query: str,
+        *,
+        top_k: int = 5,
+        candidates: int = 15,
+        now: float | None = None,
+    ) -> list[dict[str, Any]]:
+        """召回 + 时间衰减排序一次完成：先取相关度最高的 candidates 条，再按
+        importance·exp(-λ·days) 取前 top_k 条。衰减在 SQL 内计算，结果附带 score 列。
+        """
+        if not query or not query.strip():
+            return []
+        now = time.time() if now is None else now
+        match = self._match_expression(query)
+        if match is not None:
+            recall_sql = f"""SELECT f.* FROM facts_fts
+                JOIN facts f ON f.rowid = facts_fts.rowid
+                WHERE facts_fts MATCH ?
+                ORDER BY bm25(facts_fts, {_BM25_WEIGHTS}), f.importance DESC
+                LIMIT ?"""
+            params: tuple[Any, ...] = (match, candidates)
+        else:
+            like_q = _escape_like(query)
+            recall_sql = """SELECT * FROM facts
+                WHERE content LIKE ? ESCAPE '\\' OR summary LIKE ? ESCAPE '\\'
+                ORDER BY importance DESC, trust_score DESC
+                LIMIT ?"""
+            params = (like_q, like_q, candidates)
+        with self._lock:
+            rows = self._conn.execute(  # noqa: S608
+                f"""WITH hits AS ({recall_sql})
+                    SELECT *, nini_decay(importance, access_count, created_at, ?) AS score
+                    FROM hits ORDER BY score DESC LIMIT ?""",
+                (*params, now, top_k),
+            ).fetchall()
         return [self._row_to_dict(r) for r in rows]
 
+    def _match_expression(self, query: str) -> str | None:
+        """trigram 索引可用时返回 MATCH 表达式，否则返回 None（走 LIKE）。"""
+        if not self._fts5 or self._fts_tokenizer != "trigram":
+            return None
+        return build_match_expression(query)
+
     def filter_by_sci(
         self,
         *,
@@ -226,22 +407,23 @@ class MemoryStore:
         min_effect_size: float | None = None,
     ) -> list[dict[str, Any]]:
         """按 sci_metadata JSON 字段过滤。JSON1 不可用时降级为全表扫描内存过滤。"""
-        # 先尝试 json_extract 路径
-        try:
-            return self._filter_by_sci_sql(
-                dataset_name=dataset_name,
-                analysis_type=analysis_type,
-                max_p_value=max_p_value,
-                min_effect_size=min_effect_size,
-            )
-        except sqlite3.OperationalError:
-            # JSON1 不可用，降级为全表扫描+内存过滤
-            return self._filter_by_sci_memory(
-                dataset_name=dataset_name,
-                analysis_type=analysis_type,
-                max_p_value=max_p_value,
-                min_effect_size=min_effect_size,
-            )
+        with self._lock:
+            # 先尝试 json_extract 路径
+            try:
+                return self._filter_by_sci_sql(
+                    dataset_name=dataset_name,
+                    analysis_type=analysis_type,
+                    max_p_value=max_p_value,
+                    min_effect_size=min_effect_size,
+                )
+            except sqlite3.OperationalError:
+                # JSON1 不可用，降级为全表扫描+内存过滤
+                return self._filter_by_sci_memory(
+                    dataset_name=dataset_name,
+                    analysis_type=analysis_type,
+                    max_p_value=max_p_value,
+                    min_effect_size=min_effect_size,
+                )
 
     def _filter_by_sci_sql(
         self,
@@ -341,69 +523,71 @@ class MemoryStore:
             logger.debug("JSONL 迁移文件不存在，跳过：%s", jsonl_path)
             return 0
         count = 0
-        with open(jsonl_path, encoding="utf-8") as fh:
-            for line in fh:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    d = json.loads(line)
-                    sci: dict[str, Any] = {}
-                    if d.get("source_dataset"):
-                        sci["dataset_name"] = d["source_dataset"]
-                    if d.get("analysis_type"):
-                        sci["analysis_type"] = d["analysis_type"]
-                    meta = d.get("metadata") or {}
-                    for key in ("p_value", "effect_size", "significant", "sample_size"):
-                        if key in meta:
-                            sci[key] = meta[key]
-
-                    dedup_key = hashlib.md5(
-                        f"{d.get('memory_type', '')}|{sci.get('dataset_name', '')}|"
-                        f"{d.get('content', '')}".encode()
-                    ).hexdigest()
-                    existing = self._conn.execute(
-                        "SELECT id FROM facts WHERE dedup_key = ?", (dedup_key,)
-                    ).fetchone()
-                    if existing:
+        with self._lock:
+            with open(jsonl_path, encoding="utf-8") as fh:
+                for line in fh:
+                    line = line.strip()
+                    if not line:
                         continue
-
-                    created_ts = time.time()
-                    created_str = str(d.get("created_at", ""))
-                    if created_str:
-                        try:
-                            from datetime import datetime
-
-                            created_ts = datetime.fromisoformat(created_str).timestamp()
-                        except Exception:
-                            pass
-
-                    fact_id = str(d.get("id") or uuid.uuid4())
-                    with self._conn:
-                        self._conn.execute(
-                            """INSERT OR IGNORE INTO facts
-                               (id, content, memory_type, summary, tags, importance,
-                                source_session_id, created_at, updated_at, dedup_key,
-                                sci_metadata)
-                               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                            (
-                                fact_id,
-                                str(d.get("content", "")),
-                                str(d.get("memory_type", "insight")),
-                                str(d.get("summary", "")),
-                                json.dumps(d.get("tags") or [], ensure_ascii=False),
-                                float(d.get("importance_score", 0.5)),
-                                str(d.get("source_session_id", "")),
-                                created_ts,
-                                created_ts,
-                                dedup_key,
-                                json.dumps(sci, ensure_ascii=False),
-                            ),
-                        )
-                    count += 1
-                except Exception as exc:
-                    logger.warning("迁移 JSONL 条目失败: %s", exc)
-        return count
+                    try:
+                        d = json.loads(line)
+                        sci: dict[str, Any] = {}
+                        if d.get("source_dataset"):
+                            sci["dataset_name"] = d["source_dataset"]
+                        if d.get("analysis_type"):
+                            sci["analysis_type"] = d["analysis_type"]
+                        meta = d.get("metadata") or {}
+                        for key in ("p_value", "effect_size", "significant", "sample_size"):
+                            if key in meta:
+                                sci[key] = meta[key]
+
+                        dedup_key = hashlib.md5(
+                            f"{d.get('memory_type', '')}|{sci.get('dataset_name', '')}|"
+                            f"{d.get('content', '')}".encode()
+                        ).hexdigest()
+                        existing = self._conn.execute(
+                            "SELECT id FROM facts WHERE dedup_key = ?", (dedup_key,)
+                        ).fetchone()
+                        if existing:
+                            continue
+
+                        created_ts = time.time()
+                        created_str = str(d.get("created_at", ""))
+                        if created_str:
+                            try:
+                                from datetime import datetime
+
+                                created_ts = datetime.fromisoformat(created_str).timestamp()
+                            except Exception:
+                                pass
+
+                        fact_id = str(d.get("id") or uuid.uuid4())
+                        self._generation += 1
+                        with self._conn:
+                            self._conn.execute(
+                                """INSERT OR IGNORE INTO facts
+                                   (id, content, memory_type, summary, tags, importance,
+                                    source_session_id, created_at, updated_at, dedup_key,
+                                    sci_metadata)
+                                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                                (
+                                    fact_id,
+                                    str(d.get("content", "")),
+                                    str(d.get("memory_type", "insight")),
+                                    str(d.get("summary", "")),
+                                    json.dumps(d.get("tags") or [], ensure_ascii=False),
+                                    float(d.get("importance_score", 0.5)),
+                                    str(d.get("source_session_id", "")),
+                                    created_ts,
+                                    created_ts,
+                                    dedup_key,
+                                    json.dumps(sci, ensure_ascii=False),
+                                ),
+                            )
+                        count += 1
+                    except Exception as exc:
+                        logger.warning("迁移 JSONL 条目失败: %s", exc)
+            return count
 
     def migrate_profile_json(self, json_path: Path, narrative_path: Path | None = None) -> None:
         """将旧 profiles/*.json + *_profile.md 迁移到 research_profiles 表。
@@ -413,23 +597,24 @@ class MemoryStore:
         json_path = Path(json_path)
         if not json_path.exists():
             return
-        try:
-            data = json.loads(json_path.read_text(encoding="utf-8"))
-            profile_id = str(data.get("user_id", json_path.stem))
-            existing = self._conn.execute(
-                "SELECT profile_id FROM research_profiles WHERE profile_id = ?",
-                (profile_id,),
-            ).fetchone()
-            if existing:
-                return
-            narrative = ""
-            if narrative_path is not None:
-                narrative_path = Path(narrative_path)
-                if narrative_path.exists():
-                    narrative = narrative_path.read_text(encoding="utf-8")
-            self.upsert_profile(profile_id, data, narrative)
-        except Exception as exc:
-            logger.warning("迁移 profile JSON 失败 %s: %s", json_path, exc)
+        with self._lock:
+            try:
+                data = json.loads(json_path.read_text(encoding="utf-8"))
+                profile_id = str(data.get("user_id", json_path.stem))
+                existing = self._conn.execute(
+                    "SELECT profile_id FROM research_profiles WHERE profile_id = ?",
+                    (profile_id,),
+                ).fetchone()
+                if existing:
+                    return
+                narrative = ""
+                if narrative_path is not None:
+                    narrative_path = Path(narrative_path)
+                    if narrative_path.exists():
+                        narrative = narrative_path.read_text(encoding="utf-8")
+                self.upsert_profile(profile_id, data, narrative)
+            except Exception as exc:
+                logger.warning("迁移 profile JSON 失败 %s: %s", json_path, exc)
 
     def close(self) -> None:
         """关闭数据库连接。"""
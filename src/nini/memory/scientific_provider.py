@@ -2,11 +2,12 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
-import math
 import re
-import time
+import threading
+from collections import OrderedDict
 from pathlib import Path
 from typing import Any
 
@@ -26,6 +27,8 @@ _CONCLUSION_PATTERNS = [
     re.compile(r"结论[：:].{5,150}"),
     re.compile(r"发现[：:].{5,150}"),
 ]
+# prefetch 结果缓存条目上限（按规范化 query 索引）
+_PREFETCH_CACHE_MAX_ENTRIES = 64
 
 
 class ScientificMemoryProvider:
@@ -44,6 +47,9 @@ class ScientificMemoryProvider:
         self._profile_id = profile_id
         self._store: MemoryStore | None = None
         self._session_id: str = ""
+        # query → (store.generation, context block)；store 有任何写入即整体失效
+        self._prefetch_cache: OrderedDict[str, tuple[tuple[int, int], str]] = OrderedDict()
+        self._prefetch_lock = threading.Lock()
 
     @property
     def name(self) -> str:
@@ -113,27 +119,33 @@ class ScientificMemoryProvider:
     async def prefetch(self, query: str, *, session_id: str = "") -> str:
         """三段式检索：FTS5 召回 → 时间衰减+情境加权排序 → fencing 包裹。
 
-        返回值包含 <memory-context> 标签，供调用方直接追加到 prompt。
+        SQLite 查询在工作线程中执行，不阻塞事件循环；相同 query 在记忆库无写入期间
+        直接复用上次结果。返回值包含 <memory-context> 标签，供调用方直接追加到 prompt。
         """
         if self._store is None or not query.strip():
             return ""
         try:
-            candidates = self._store.search_fts(query, top_k=15)
-            if not candidates:
-                return ""
-            now = time.time()
-            scored: list[tuple[float, dict[str, Any]]] = []
-            for fact in candidates:
-                importance = float(fact.get("importance", 0.5))
-                access_count = int(fact.get("access_count") or 0)
-                created_at = float(fact.get("created_at") or now)
-                days = max(0.0, (now - created_at) / 86400)
-                # 高频访问记忆衰减更慢（更"经典"）
-                decay_lambda = 0.005 if access_count > 5 else 0.01
-                score = importance * math.exp(-decay_lambda * days)
-                scored.append((score, fact))
-            scored.sort(key=lambda x: x[0], reverse=True)
-            top = [f for _, f in scored[:5]]
+            return await asyncio.to_thread(self._prefetch_sync, query)
+        except Exception as exc:
+            logger.warning("ScientificMemoryProvider.prefetch 失败: %s", exc)
+            return ""
+
+    def _prefetch_sync(self, query: str) -> str:
+        """prefetch 的同步实现（带按 query 的结果缓存）。"""
+        store = self._store
+        if store is None:
+            return ""
+        key = " ".join(query.split())
+        generation = store.generation
+        with self._prefetch_lock:
+            cached = self._prefetch_cache.get(key)
+            if cached is not None and cached[0] == generation:
+                self._prefetch_cache.move_to_end(key)
+                return cached[1]
+
+        top = store.search_ranked(query, top_k=5, candidates=15)
+        block = ""
+        if top:
             lines: list[str] = []
             for fact in top:
                 memory_type = fact.get("memory_type", "")
@@ -144,11 +156,14 @@ class ScientificMemoryProvider:
                 if dataset:
                     line += f"（来源：{dataset}）"
                 lines.append(line)
-            raw = "\n".join(lines)
-            return build_memory_context_block(raw)
-        except Exception as exc:
-            logger.warning("ScientificMemoryProvider.prefetch 失败: %s", exc)
-            return ""
+            block = build_memory_context_block("\n".join(lines))
+
+        with self._prefetch_lock:
+            self._prefetch_cache[key] = (generation, block)
+            self._prefetch_cache.move_to_end(key)
+            while len(self._prefetch_cache) > _PREFETCH_CACHE_MAX_ENTRIES:
+                self._prefetch_cache.popitem(last=False)
+        return block
 
     async def sync_turn(
         self,
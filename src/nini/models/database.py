@@ -1,18 +1,37 @@
 """SQLite 数据库模型和初始化。
 
-使用 sqlite3 + 轻量异步包装（不依赖 SQLAlchemy ORM），保持轻量。
+使用 sqlite3（不依赖 SQLAlchemy ORM），保持轻量。应用数据库的读写统一经
+``DatabaseService``（``get_database()``）调度，不在事件循环线程上执行任何 sqlite3 调用：
+
+- 写：单个专用写线程 + 有界队列，每个写操作是一个在写连接上执行的事务函数，
+  成功提交、异常回滚；队列满时在工作线程里等待空位，超时抛 ``DatabaseBusyError``；
+- 读：少量只读 WAL 连接组成的线程池，读不阻塞写、写也不阻塞读；
+- 连接长期持有，sqlite3 的语句缓存（``cached_statements``）得以跨调用复用预编译语句；
+- 建表与迁移对同一数据库文件只执行一次；
+- 排队与执行耗时记录在延迟直方图中，经 ``stats()`` 暴露。
 """
 
 from __future__ import annotations
 
+import asyncio
+import bisect
 import logging
+import queue
 import sqlite3
-from typing import Any, Iterable, cast
+import threading
+import time
+from collections.abc import Callable, Iterable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, TypeVar, cast
 
 from nini.config import settings
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 # 建表 SQL
 _SCHEMA = """
 CREATE TABLE IF NOT EXISTS sessions (
@@ -109,6 +128,415 @@ ON harness_runs(session_id, created_at DESC);
 """
 
 
+# 延迟直方图桶上界（毫秒）
+_LATENCY_BUCKETS_MS: tuple[float, ...] = (
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    25.0,
+    50.0,
+    100.0,
+    250.0,
+    500.0,
+    1000.0,
+    2500.0,
+    5000.0,
+)
+_CLOSE_TIMEOUT_SECONDS = 5.0
+
+
+class DatabaseBusyError(RuntimeError):
+    """写队列已满，且在 ``settings.db_write_queue_timeout`` 内未腾出空位。"""
+
+
+class LatencyHistogram:
+    """固定桶延迟直方图（毫秒），线程安全。"""
+
+    def __init__(self, bounds: Sequence[float] = _LATENCY_BUCKETS_MS) -> None:
+        self._bounds = tuple(bounds)
+        self._counts = [0] * (len(self._bounds) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, ms: float) -> None:
+        idx = bisect.bisect_left(self._bounds, ms)
+        with self._lock:
+            self._counts[idx] += 1
+            self._count += 1
+            self._sum += ms
+            self._max = max(self._max, ms)
+
+    def _quantile_locked(self, q: float) -> float:
+        """按桶上界估计分位数；落入溢出桶时返回观测到的最大值。"""
+        if self._count == 0:
+            return 0.0
+        target = q * self._count
+        seen = 0
+        for idx, count in enumerate(self._counts):
+            seen += count
+            if seen >= target and count:
+                return self._bounds[idx] if idx < len(self._bounds) else self._max
+        return self._max
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            labels = [f"<={bound:g}" for bound in self._bounds] + ["+Inf"]
+            return {
+                "count": self._count,
+                "mean_ms": round(self._sum / self._count, 3) if self._count else 0.0,
+                "max_ms": round(self._max, 3),
+                "p50_ms": self._quantile_locked(0.5),
+                "p95_ms": self._quantile_locked(0.95),
+                "p99_ms": self._quantile_locked(0.99),
+                "buckets": dict(zip(labels, self._counts)),
+            }
+
+
+@dataclass
+class _WriteJob:
+    fn: Callable[[sqlite3.Connection], Any]
+    loop: asyncio.AbstractEventLoop
+    future: asyncio.Future[Any]
+    enqueued_at: float
+
+
+def _settle(future: asyncio.Future[Any], result: Any, error: BaseException | None) -> None:
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class DatabaseService:
+    """应用数据库服务：一个写线程 + 只读连接池。
+
+    Args:
+        path: 数据库文件路径
+        read_pool_size: 只读连接（线程）数
+        write_queue_size: 写队列容量
+        statement_cache_size: 每个连接缓存的预编译语句数
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        read_pool_size: int = 4,
+        write_queue_size: int = 256,
+        statement_cache_size: int = 256,
+    ) -> None:
+        self.path = Path(path)
+        self._read_pool_size = max(1, int(read_pool_size))
+        self._statement_cache_size = max(0, int(statement_cache_size))
+        self._queue: queue.Queue[_WriteJob | None] = queue.Queue(maxsize=max(1, write_queue_size))
+        self._writer: threading.Thread | None = None
+        self._readers = ThreadPoolExecutor(
+            max_workers=self._read_pool_size, thread_name_prefix="nini-db-read"
+        )
+        self._reader_local = threading.local()
+        self._reader_conns: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._schema_ready = False
+        self._closed = False
+        self._rejected_writes = 0
+        self._latency = {
+            kind: {"queue": LatencyHistogram(), "execute": LatencyHistogram()}
+            for kind in ("write", "read")
+        }
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    # ---- 对外接口 ----
+
+    async def ensure_schema(self) -> None:
+        """建表与迁移；同一服务只执行一次。"""
+        if not self._schema_ready:
+            await self._submit_write(self._init_schema)
+
+    async def write(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        """在写线程上以单个事务执行 ``fn(conn)``：成功提交，异常回滚并向调用方抛出。"""
+        await self.ensure_schema()
+        return cast(T, await self._submit_write(fn))
+
+    async def read(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        """在只读连接池中执行 ``fn(conn)``，可见此前已提交的全部写入。"""
+        await self.ensure_schema()
+        if self._closed:
+            raise RuntimeError("数据库服务已关闭")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._readers, self._run_read, fn, time.perf_counter())
+
+    async def fetchall(self, sql: str, parameters: Iterable[Any] = ()) -> list[sqlite3.Row]:
+        params = tuple(parameters)
+        return await self.read(lambda conn: conn.execute(sql, params).fetchall())
+
+    async def fetchone(self, sql: str, parameters: Iterable[Any] = ()) -> sqlite3.Row | None:
+        params = tuple(parameters)
+        return await self.read(lambda conn: conn.execute(sql, params).fetchone())
+
+    async def execute(self, sql: str, parameters: Iterable[Any] = ()) -> int:
+        """执行单条写语句并提交，返回受影响行数。"""
+        params = tuple(parameters)
+        return await self.write(lambda conn: conn.execute(sql, params).rowcount)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "path": str(self.path),
+            "schema_ready": self._schema_ready,
+            "closed": self._closed,
+            "write_queue_depth": self._queue.qsize(),
+            "write_queue_capacity": self._queue.maxsize,
+            "rejected_writes": self._rejected_writes,
+            "read_pool_size": self._read_pool_size,
+            "read_connections": len(self._reader_conns),
+            "write": {name: hist.snapshot() for name, hist in self._latency["write"].items()},
+            "read": {name: hist.snapshot() for name, hist in self._latency["read"].items()},
+        }
+
+    def close(self, timeout: float = _CLOSE_TIMEOUT_SECONDS) -> None:
+        """停止写线程（先处理完已入队的写）并关闭全部连接。"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            writer = self._writer
+        if writer is not None and writer.is_alive():
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                logger.warning("关闭数据库服务时写队列仍满: %s", self.path)
+            writer.join(timeout)
+        self._readers.shutdown(wait=True)
+        with self._lock:
+            conns, self._reader_conns = self._reader_conns, []
+        for conn in conns:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    # ---- 写线程 ----
+
+    async def _submit_write(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        self._ensure_writer()
+        loop = asyncio.get_running_loop()
+        job = _WriteJob(fn=fn, loop=loop, future=loop.create_future(), enqueued_at=0.0)
+        job.enqueued_at = time.perf_counter()
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            # 背压：在工作线程里等待空位，事件循环不被阻塞
+            try:
+                await asyncio.to_thread(
+                    self._queue.put, job, True, float(settings.db_write_queue_timeout)
+                )
+            except queue.Full:
+                self._rejected_writes += 1
+                raise DatabaseBusyError(f"数据库写队列已满（容量 {self._queue.maxsize}）") from None
+        return await job.future
+
+    def _ensure_writer(self) -> None:
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("数据库服务已关闭")
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(
+                    target=self._writer_main, name="nini-db-writer", daemon=True
+                )
+                self._writer.start()
+
+    def _open_writer(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(
+            str(self.path),
+            timeout=10.0,
+            check_same_thread=False,
+            cached_statements=self._statement_cache_size,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _writer_main(self) -> None:
+        conn: sqlite3.Connection | None = None
+        open_error: BaseException | None = None
+        try:
+            conn = self._open_writer()
+        except Exception as exc:  # 目录不可写等：让每个写请求都拿到该错误
+            logger.error("打开数据库写连接失败: %s (%s)", self.path, exc)
+            open_error = exc
+        queue_hist = self._latency["write"]["queue"]
+        execute_hist = self._latency["write"]["execute"]
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            started = time.perf_counter()
+            queue_hist.observe((started - job.enqueued_at) * 1000)
+            result: Any = None
+            error: BaseException | None = open_error
+            if conn is not None:
+                try:
+                    with conn:
+                        result = job.fn(conn)
+                except BaseException as exc:
+                    error = exc
+            execute_hist.observe((time.perf_counter() - started) * 1000)
+            try:
+                job.loop.call_soon_threadsafe(_settle, job.future, result, error)
+            except RuntimeError:
+                # 提交方的事件循环已关闭，结果无人等待
+                pass
+        if conn is not None:
+            conn.close()
+
+    def _init_schema(self, conn: sqlite3.Connection) -> None:
+        if self._schema_ready:
+            return
+        logger.info("初始化数据库: %s", self.path)
+        conn.executescript(_SCHEMA)
+        _migrate_model_configs(conn)
+        _migrate_harness_runs(conn)
+        self._schema_ready = True
+
+    # ---- 只读连接池 ----
+
+    def _reader_conn(self) -> sqlite3.Connection:
+        conn = getattr(self._reader_local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                f"{self.path.resolve().as_uri()}?mode=ro",
+                uri=True,
+                timeout=10.0,
+                check_same_thread=False,
+                cached_statements=self._statement_cache_size,
+            )
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA query_only=ON")
+            self._reader_local.conn = conn
+            with self._lock:
+                self._reader_conns.append(conn)
+        return cast(sqlite3.Connection, conn)
+
+    def _run_read(self, fn: Callable[[sqlite3.Connection], T], enqueued_at: float) -> T:
+        started = time.perf_counter()
+        self._latency["read"]["queue"].observe((started - enqueued_at) * 1000)
+        try:
+            return fn(self._reader_conn())
+        finally:
+            self._latency["read"]["execute"].observe((time.perf_counter() - started) * 1000)
+
+
+_service: DatabaseService | None = None
+_service_lock = threading.Lock()
+
+
+def get_database() -> DatabaseService:
+    """返回当前 ``settings.db_path`` 对应的数据库服务；路径变化时替换并在后台关闭旧服务。"""
+    global _service
+    path = settings.db_path
+    stale: DatabaseService | None = None
+    with _service_lock:
+        if _service is None or _service.closed or _service.path != path:
+            stale = _service
+            _service = DatabaseService(
+                path,
+                read_pool_size=settings.db_read_pool_size,
+                write_queue_size=settings.db_write_queue_size,
+            )
+        service = _service
+    if stale is not None and not stale.closed:
+        threading.Thread(target=stale.close, name="nini-db-close", daemon=True).start()
+    return service
+
+
+async def shutdown_database() -> None:
+    """关闭数据库服务（应用退出时调用）。"""
+    global _service
+    with _service_lock:
+        service, _service = _service, None
+    if service is not None:
+        await asyncio.to_thread(service.close)
+
+
+async def init_db() -> None:
+    """初始化数据库（建表 + 迁移）；同一数据库文件只执行一次。"""
+    await get_database().ensure_schema()
+
+
+def _migrate_model_configs(conn: sqlite3.Connection) -> None:
+    """为 model_configs 表添加可能缺失的字段和索引（兼容旧数据库）。"""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(model_configs)").fetchall()}
+
+    migrations = [
+        (
+            "encrypted_api_key",
+            "ALTER TABLE model_configs ADD COLUMN encrypted_api_key TEXT",
+        ),
+        (
+            "updated_at",
+            "ALTER TABLE model_configs ADD COLUMN updated_at TEXT DEFAULT (datetime('now'))",
+        ),
+        (
+            "api_mode",
+            "ALTER TABLE model_configs ADD COLUMN api_mode TEXT",
+        ),
+        (
+            "is_default",
+            "ALTER TABLE model_configs ADD COLUMN is_default INTEGER DEFAULT 0",
+        ),
+        (
+            "priority",
+            "ALTER TABLE model_configs ADD COLUMN priority INTEGER DEFAULT 0",
+        ),
+    ]
+    for col_name, sql in migrations:
+        if col_name not in columns:
+            try:
+                conn.execute(sql)
+                logger.info("数据库迁移：已添加 model_configs.%s 字段", col_name)
+            except sqlite3.Error as e:
+                logger.debug("迁移字段 %s 跳过: %s", col_name, e)
+
+    # 确保 provider 列有 UNIQUE 约束（旧表可能缺失）
+    try:
+        conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_model_configs_provider ON model_configs(provider)"
+        )
+    except sqlite3.Error as e:
+        logger.debug("创建 provider 唯一索引跳过: %s", e)
+
+
+def _migrate_harness_runs(conn: sqlite3.Connection) -> None:
+    """为旧版 harness_runs 表补齐后加的字段。"""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(harness_runs)").fetchall()}
+    for col_name, ddl in (
+        ("task_id", "ALTER TABLE harness_runs ADD COLUMN task_id TEXT"),
+        ("recipe_id", "ALTER TABLE harness_runs ADD COLUMN recipe_id TEXT"),
+        ("recovery_count", "ALTER TABLE harness_runs ADD COLUMN recovery_count INTEGER DEFAULT 0"),
+        (
+            "budget_warning_count",
+            "ALTER TABLE harness_runs ADD COLUMN budget_warning_count INTEGER DEFAULT 0",
+        ),
+    ):
+        if col_name not in columns:
+            conn.execute(ddl)
+            logger.info("数据库迁移：已添加 harness_runs.%s 字段", col_name)
+
+
 class AsyncSQLiteCursor:
     """sqlite3.Cursor 的最小异步适配层。"""
 
@@ -177,77 +605,8 @@ class AsyncSQLiteConnection:
         await self.close()
 
 
-async def init_db() -> None:
-    """初始化数据库（建表 + 迁移）。"""
-    db_path = settings.db_path
-    logger.info("初始化数据库: %s", db_path)
-    async with await get_db() as db:
-        await db.executescript(_SCHEMA)
-        # 迁移：为旧数据库添加新字段
-        await _migrate_model_configs(db)
-        await db.commit()
-
-
-async def _migrate_model_configs(db: AsyncSQLiteConnection) -> None:
-    """为 model_configs 表添加可能缺失的字段和索引（兼容旧数据库）。"""
-    cursor = await db.execute("PRAGMA table_info(model_configs)")
-    columns = {row[1] for row in await cursor.fetchall()}
-
-    migrations = [
-        (
-            "encrypted_api_key",
-            "ALTER TABLE model_configs ADD COLUMN encrypted_api_key TEXT",
-        ),
-        (
-            "updated_at",
-            "ALTER TABLE model_configs ADD COLUMN updated_at TEXT DEFAULT (datetime('now'))",
-        ),
-        (
-            "api_mode",
-            "ALTER TABLE model_configs ADD COLUMN api_mode TEXT",
-        ),
-        (
-            "is_default",
-            "ALTER TABLE model_configs ADD COLUMN is_default INTEGER DEFAULT 0",
-        ),
-        (
-            "priority",
-            "ALTER TABLE model_configs ADD COLUMN priority INTEGER DEFAULT 0",
-        ),
-    ]
-    for col_name, sql in migrations:
-        if col_name not in columns:
-            try:
-                await db.execute(sql)
-                logger.info("数据库迁移：已添加 model_configs.%s 字段", col_name)
-            except Exception as e:
-                logger.debug("迁移字段 %s 跳过: %s", col_name, e)
-
-    # 确保 provider 列有 UNIQUE 约束（旧表可能缺失）
-    try:
-        await db.execute(
-            "CREATE UNIQUE INDEX IF NOT EXISTS idx_model_configs_provider ON model_configs(provider)"
-        )
-    except Exception as e:
-        logger.debug("创建 provider 唯一索引跳过: %s", e)
-
-    # 创建 app_settings 表（如果不存在）
-    try:
-        await db.execute(
-            """
-            CREATE TABLE IF NOT EXISTS app_settings (
-                key TEXT PRIMARY KEY,
-                value TEXT NOT NULL,
-                updated_at TEXT NOT NULL DEFAULT (datetime('now'))
-            )
-        """
-        )
-    except Exception as e:
-        logger.debug("创建 app_settings 表跳过: %s", e)
-
-
 async def get_db() -> AsyncSQLiteConnection:
-    """获取数据库连接。"""
+    """获取独立的数据库连接（兼容旧接口；应用代码请使用 ``get_database()``）。"""
     conn = sqlite3.connect(str(settings.db_path), timeout=10.0)
     conn.row_factory = sqlite3.Row
     db = AsyncSQLiteConnection(conn)
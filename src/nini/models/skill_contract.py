@@ -121,3 +121,6 @@ class ContractResult(BaseModel):
     total_ms: int | None = Field(None, description="总耗时（毫秒）")
     error_message: str | None = Field(None, description="整体失败时的错误信息")
     evidence_chain: EvidenceChain | None = Field(default=None, description="证据链快照")
+    trace: dict[str, Any] | None = Field(
+        default=None, description="调度时间线（每步就绪/开始/结束与关键路径）"
+    )
@@ -6,6 +6,7 @@ import base64
 import builtins as py_builtins
 import io
 import logging
+import marshal
 import multiprocessing
 from multiprocessing.connection import Connection
 import os
@@ -24,10 +25,11 @@ from nini.charts.renderers import apply_matplotlib_rc_style
 from nini.config import settings
 from nini.sandbox.capture import capture_stdio
 from nini.sandbox.policy import (
+    SandboxCompileError,
     SandboxPolicyError,
     SandboxReviewRequired,
+    compile_validated_code,
     get_allowed_import_roots,
-    validate_code,
     validate_import,
 )
 from nini.update.runtime_state import register_owned_process, unregister_owned_pid
@@ -765,7 +767,7 @@ def _collect_figures(
 
 def _sandbox_worker(
     conn: Connection,
-    code: str,
+    compiled_code: bytes,
     datasets: dict[str, pd.DataFrame],
     working_dir: str,
     timeout_seconds: int,
@@ -807,9 +809,10 @@ def _sandbox_worker(
             exec_globals["df"] = local_datasets[dataset_name].copy(deep=True)
 
         with capture_stdio() as (stdout_buf, stderr_buf):
-            compiled = compile(code, "<sandbox>", "exec")
+            # 父进程校验时已基于同一棵 AST 编译，这里直接还原代码对象
+            compiled = marshal.loads(compiled_code)
             # 注意：这里使用 Python 内置的 exec() 函数执行沙箱代码，
-            # 不是 child_process.exec，代码已通过 validate_code() 策略校验。
+            # 不是 child_process.exec，代码已通过 compile_validated_code() 策略校验。
             exec(compiled, exec_globals)  # noqa: S102
             stdout_text = stdout_buf.getvalue()
             stderr_text = _strip_benign_stderr(stderr_buf.getvalue())
@@ -1001,7 +1004,21 @@ class SandboxExecutor:
             return payload
 
         normalized_extra_allowed_imports = sorted(get_allowed_import_roots(extra_allowed_imports))
-        validate_code(code, extra_allowed_imports=normalized_extra_allowed_imports)
+        try:
+            compiled_code = compile_validated_code(
+                code, extra_allowed_imports=normalized_extra_allowed_imports
+            )
+        except SandboxCompileError as exc:
+            # 与子进程内编译失败时的返回一致：作为普通执行失败上报
+            return _with_duration(
+                {
+                    "success": False,
+                    "stdout": "",
+                    "stderr": "",
+                    "error": str(exc),
+                    "traceback": exc.detail,
+                }
+            )
 
         working_dir = settings.sessions_dir / session_id / "sandbox_tmp"
         working_dir.mkdir(parents=True, exist_ok=True)
@@ -1013,7 +1030,7 @@ class SandboxExecutor:
             target=_sandbox_worker,
             args=(
                 child_conn,
-                code,
+                compiled_code,
                 datasets,
                 str(working_dir),
                 self.timeout_seconds,
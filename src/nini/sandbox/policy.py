@@ -3,8 +3,15 @@
 from __future__ import annotations
 
 import ast
-from dataclasses import dataclass
-from typing import Any, Iterable
+import hashlib
+import marshal
+import re
+import threading
+import traceback
+from collections import OrderedDict, deque
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Any, Iterable, TypeVar, cast
 
 # 分层白名单：从最安全到受限
 # Tier 1: 纯计算/数据处理（完全安全）
@@ -162,6 +169,14 @@ class SandboxPolicyError(ValueError):
     """策略校验失败。"""
 
 
+class SandboxCompileError(Exception):
+    """代码通过 AST 校验但无法编译（如模块级 ``return``、循环外 ``break``）。"""
+
+    def __init__(self, message: str, *, detail: str = "") -> None:
+        super().__init__(message)
+        self.detail = detail
+
+
 class SandboxReviewRequired(Exception):
     """导入命中低风险扩展包，需要用户审批。"""
 
@@ -233,9 +248,16 @@ def normalize_reviewable_import_roots(raw: Iterable[str] | None) -> set[str]:
     return normalized
 
 
+@lru_cache(maxsize=64)
+def _allowed_roots_for(extra_roots: frozenset[str]) -> frozenset[str]:
+    return frozenset(ALLOWED_IMPORT_ROOTS | extra_roots)
+
+
 def get_allowed_import_roots(extra_allowed_imports: Iterable[str] | None = None) -> set[str]:
     """返回本次执行允许导入的根模块集合。"""
-    return ALLOWED_IMPORT_ROOTS | normalize_reviewable_import_roots(extra_allowed_imports)
+    return set(
+        _allowed_roots_for(frozenset(normalize_reviewable_import_roots(extra_allowed_imports)))
+    )
 
 
 def _reviewable_violation(module_name: str, *, lineno: int | None = None) -> PolicyViolation:
@@ -249,15 +271,13 @@ def _reviewable_violation(module_name: str, *, lineno: int | None = None) -> Pol
     )
 
 
-def validate_import(
+def _check_import(
     root: str,
     module_name: str,
+    allowed_roots: frozenset[str],
     *,
     lineno: int | None = None,
-    extra_allowed_imports: Iterable[str] | None = None,
 ) -> None:
-    """校验单个导入请求，必要时抛出审批或策略异常。"""
-    allowed_roots = get_allowed_import_roots(extra_allowed_imports)
     if root in allowed_roots:
         return
     if root in REVIEWABLE_IMPORT_ROOTS:
@@ -269,133 +289,330 @@ def validate_import(
     raise SandboxPolicyError(f"不允许导入模块: {module_name}")
 
 
-def validate_code(code: str, *, extra_allowed_imports: Iterable[str] | None = None) -> None:
-    """对用户代码做 AST 静态安全检查。"""
-    try:
-        tree = ast.parse(code)
-    except SyntaxError as exc:
-        raise SandboxPolicyError(f"代码语法错误: {exc}") from exc
+def validate_import(
+    root: str,
+    module_name: str,
+    *,
+    lineno: int | None = None,
+    extra_allowed_imports: Iterable[str] | None = None,
+) -> None:
+    """校验单个导入请求，必要时抛出审批或策略异常。"""
+    allowed_roots = _allowed_roots_for(
+        frozenset(normalize_reviewable_import_roots(extra_allowed_imports))
+    )
+    _check_import(root, module_name, allowed_roots, lineno=lineno)
 
-    violations: list[PolicyViolation] = []
-    reviewable_violations: dict[str, PolicyViolation] = {}
 
-    for node in ast.walk(tree):
-        if isinstance(node, ast.Import):
-            for alias in node.names:
-                module_name = alias.name
-                root = _root_module(module_name)
-                try:
-                    validate_import(
-                        root,
-                        module_name,
-                        lineno=getattr(node, "lineno", None),
-                        extra_allowed_imports=extra_allowed_imports,
-                    )
-                except SandboxReviewRequired as exc:
-                    for violation in exc.violations:
-                        reviewable_violations[violation.root or _root_module(module_name)] = (
-                            violation
-                        )
-                except SandboxPolicyError as exc:
-                    violations.append(
-                        PolicyViolation(
-                            message=str(exc),
-                            lineno=getattr(node, "lineno", None),
-                            module=module_name,
-                            root=root,
-                            risk_level="hard_deny" if root in HARD_DENY_IMPORT_ROOTS else "deny",
-                            alternatives=_HARD_DENY_ALTERNATIVES.get(root),
-                        )
-                    )
+# ---- 校验缓存 ----
+# LLM 修正代码后常整段重新提交，只改动少数语句。整段结果按 (代码哈希, 额外允许导入)
+# 缓存裁决与编译产物；未命中时仍需重新解析，但逐个顶层语句的检查结果按语句原文复用，
+# 只有改动过的语句才会重新遍历。
+_VALIDATION_CACHE_SIZE = 256
+_STATEMENT_CACHE_SIZE = 4096
+_LINE_BREAK_RE = re.compile(r"\r\n|\r|\n")
+_ALLOWED_DUNDERS = {"__name__", "__doc__", "__len__"}
+# 排除常见安全的属性方法（如 re.compile、df.eval）
+_ATTR_CALL_SKIP = {"compile", "eval"}
 
-        if isinstance(node, ast.ImportFrom):
-            if node.level and node.level > 0:
-                violations.append(
-                    PolicyViolation(
-                        message="不允许相对导入",
-                        lineno=getattr(node, "lineno", None),
-                    )
+
+@dataclass(frozen=True)
+class _Finding:
+    """单个语句内的检查发现；行号相对语句起始行保存，以便语句平移后复用。"""
+
+    depth: int
+    order: int
+    reviewable: bool
+    violation: PolicyViolation
+
+
+class _ValidationEntry:
+    """整段代码的校验裁决；通过时保留 AST，首次编译后换成字节码（或编译错误）。"""
+
+    __slots__ = ("error", "reviewable", "tree", "bytecode", "compile_error")
+
+    def __init__(
+        self,
+        *,
+        error: str | None = None,
+        reviewable: tuple[PolicyViolation, ...] = (),
+        tree: ast.Module | None = None,
+    ) -> None:
+        self.error = error
+        self.reviewable = reviewable
+        self.tree = tree
+        self.bytecode: bytes | None = None
+        self.compile_error: tuple[str, str] | None = None
+
+    def raise_if_rejected(self) -> None:
+        if self.error is not None:
+            raise SandboxPolicyError(self.error)
+        if self.reviewable:
+            raise SandboxReviewRequired(
+                [item.root or "" for item in self.reviewable],
+                violations=[replace(item) for item in self.reviewable],
+            )
+
+
+_cache_lock = threading.Lock()
+_validation_cache: OrderedDict[tuple[str, frozenset[str]], _ValidationEntry] = OrderedDict()
+_statement_cache: OrderedDict[tuple[Any, ...], tuple[_Finding, ...]] = OrderedDict()
+_cache_stats = {"hits": 0, "misses": 0, "statement_hits": 0, "statement_misses": 0}
+
+
+_K = TypeVar("_K")
+_V = TypeVar("_V")
+
+
+def _cache_get(cache: OrderedDict[_K, _V], key: _K) -> _V | None:
+    with _cache_lock:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+
+def _cache_put(cache: OrderedDict[_K, _V], key: _K, value: _V, limit: int) -> None:
+    with _cache_lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > limit:
+            cache.popitem(last=False)
+
+
+def _count(name: str) -> None:
+    with _cache_lock:
+        _cache_stats[name] += 1
+
+
+def clear_validation_cache() -> None:
+    """清空校验缓存（测试或策略调整后使用）。"""
+    with _cache_lock:
+        _validation_cache.clear()
+        _statement_cache.clear()
+        for key in _cache_stats:
+            _cache_stats[key] = 0
+
+
+def validation_cache_stats() -> dict[str, int]:
+    """返回校验缓存的命中统计。"""
+    with _cache_lock:
+        return {
+            **_cache_stats,
+            "entries": len(_validation_cache),
+            "statement_entries": len(_statement_cache),
+        }
+
+
+def _import_violation(
+    exc: SandboxPolicyError, *, lineno: int | None, module: str, root: str
+) -> PolicyViolation:
+    return PolicyViolation(
+        message=str(exc),
+        lineno=lineno,
+        module=module,
+        root=root,
+        risk_level="hard_deny" if root in HARD_DENY_IMPORT_ROOTS else "deny",
+        alternatives=_HARD_DENY_ALTERNATIVES.get(root),
+    )
+
+
+def _check_node(node: ast.AST, allowed_roots: frozenset[str]) -> list[tuple[bool, PolicyViolation]]:
+    """检查单个 AST 节点，返回 (是否需审批, 违规) 列表。"""
+    found: list[tuple[bool, PolicyViolation]] = []
+    lineno = getattr(node, "lineno", None)
+
+    if isinstance(node, ast.Import):
+        for alias in node.names:
+            module_name = alias.name
+            root = _root_module(module_name)
+            try:
+                _check_import(root, module_name, allowed_roots, lineno=lineno)
+            except SandboxReviewRequired as exc:
+                found.extend((True, violation) for violation in exc.violations)
+            except SandboxPolicyError as exc:
+                found.append(
+                    (False, _import_violation(exc, lineno=lineno, module=module_name, root=root))
                 )
-                continue
 
-            module = node.module or ""
-            root = _root_module(module) if module else ""
-            if not root:
-                violations.append(
+    elif isinstance(node, ast.ImportFrom):
+        if node.level and node.level > 0:
+            found.append((False, PolicyViolation(message="不允许相对导入", lineno=lineno)))
+            return found
+
+        module = node.module or ""
+        root = _root_module(module) if module else ""
+        if not root:
+            found.append(
+                (
+                    False,
                     PolicyViolation(
                         message=f"不允许导入模块: {module or '<empty>'}",
-                        lineno=getattr(node, "lineno", None),
+                        lineno=lineno,
                         module=module or "<empty>",
                         risk_level="deny",
-                    )
-                )
-                continue
-            try:
-                validate_import(
-                    root,
-                    module,
-                    lineno=getattr(node, "lineno", None),
-                    extra_allowed_imports=extra_allowed_imports,
-                )
-            except SandboxReviewRequired as exc:
-                for violation in exc.violations:
-                    reviewable_violations[violation.root or root] = violation
-            except SandboxPolicyError as exc:
-                violations.append(
-                    PolicyViolation(
-                        message=str(exc),
-                        lineno=getattr(node, "lineno", None),
-                        module=module,
-                        root=root,
-                        risk_level="hard_deny" if root in HARD_DENY_IMPORT_ROOTS else "deny",
-                        alternatives=_HARD_DENY_ALTERNATIVES.get(root),
-                    )
+                    ),
                 )
-
-        # 禁止访问危险的双下划线属性（防止沙箱逃逸）
-        if isinstance(node, ast.Attribute):
-            if node.attr.startswith("__") and node.attr.endswith("__"):
-                _ALLOWED_DUNDERS = {"__name__", "__doc__", "__len__"}
-                if node.attr not in _ALLOWED_DUNDERS:
-                    violations.append(
+            )
+            return found
+        try:
+            _check_import(root, module, allowed_roots, lineno=lineno)
+        except SandboxReviewRequired as exc:
+            found.extend((True, violation) for violation in exc.violations)
+        except SandboxPolicyError as exc:
+            found.append((False, _import_violation(exc, lineno=lineno, module=module, root=root)))
+
+    # 禁止访问危险的双下划线属性（防止沙箱逃逸）
+    elif isinstance(node, ast.Attribute):
+        if node.attr.startswith("__") and node.attr.endswith("__"):
+            if node.attr not in _ALLOWED_DUNDERS:
+                found.append(
+                    (
+                        False,
                         PolicyViolation(
                             message=f"不允许访问双下划线属性: {node.attr}",
-                            lineno=getattr(node, "lineno", None),
-                        )
-                    )
-
-        if isinstance(node, ast.Call):
-            # 禁止直接调用危险函数
-            if isinstance(node.func, ast.Name) and node.func.id in BANNED_CALLS:
-                violations.append(
-                    PolicyViolation(
-                        message=f"不允许调用函数: {node.func.id}",
-                        lineno=getattr(node, "lineno", None),
+                            lineno=lineno,
+                        ),
                     )
                 )
-            # 禁止通过属性调用危险函数（如 os.system()）
-            # 排除常见安全的属性方法（如 re.compile、df.eval）
-            _ATTR_CALL_SKIP = {"compile", "eval"}
-            if (
-                isinstance(node.func, ast.Attribute)
-                and node.func.attr in BANNED_CALLS
-                and node.func.attr not in _ATTR_CALL_SKIP
-            ):
-                violations.append(
-                    PolicyViolation(
-                        message=f"不允许调用函数: {node.func.attr}",
-                        lineno=getattr(node, "lineno", None),
-                    )
+
+    elif isinstance(node, ast.Call):
+        # 禁止直接调用危险函数
+        if isinstance(node.func, ast.Name) and node.func.id in BANNED_CALLS:
+            found.append(
+                (False, PolicyViolation(message=f"不允许调用函数: {node.func.id}", lineno=lineno))
+            )
+        # 禁止通过属性调用危险函数（如 os.system()）
+        if (
+            isinstance(node.func, ast.Attribute)
+            and node.func.attr in BANNED_CALLS
+            and node.func.attr not in _ATTR_CALL_SKIP
+        ):
+            found.append(
+                (
+                    False,
+                    PolicyViolation(message=f"不允许调用函数: {node.func.attr}", lineno=lineno),
                 )
+            )
+
+    return found
+
+
+def _scan_statement(stmt: ast.stmt, allowed_roots: frozenset[str]) -> tuple[_Finding, ...]:
+    """按 ast.walk 的广度优先顺序遍历单个顶层语句，记录深度以便跨语句还原全局顺序。"""
+    findings: list[_Finding] = []
+    pending: deque[tuple[ast.AST, int]] = deque([(stmt, 0)])
+    while pending:
+        node, depth = pending.popleft()
+        for reviewable, violation in _check_node(node, allowed_roots):
+            if violation.lineno is not None:
+                violation.lineno -= stmt.lineno
+            findings.append(_Finding(depth, len(findings), reviewable, violation))
+        pending.extend((child, depth + 1) for child in ast.iter_child_nodes(node))
+    return tuple(findings)
+
+
+def _statement_key(
+    stmt: ast.stmt, lines: list[str], allowed_roots: frozenset[str]
+) -> tuple[Any, ...]:
+    """以语句所占源码行原文 + 起止列定位语句；装饰器行一并纳入。"""
+    first = min([stmt.lineno, *(d.lineno for d in getattr(stmt, "decorator_list", ()))])
+    last = stmt.end_lineno or stmt.lineno
+    text = "\n".join(lines[first - 1 : last])
+    return (
+        hashlib.sha1(text.encode("utf-8", "surrogatepass")).digest(),
+        stmt.lineno - first,
+        stmt.col_offset,
+        stmt.end_col_offset,
+        allowed_roots,
+    )
+
+
+def _validate_tree(
+    tree: ast.Module, lines: list[str], allowed_roots: frozenset[str]
+) -> _ValidationEntry:
+    ranked: list[tuple[int, int, int, _Finding, int]] = []
+    for index, stmt in enumerate(tree.body):
+        key = _statement_key(stmt, lines, allowed_roots)
+        findings = _cache_get(_statement_cache, key)
+        if findings is None:
+            _count("statement_misses")
+            findings = _scan_statement(stmt, allowed_roots)
+            _cache_put(_statement_cache, key, findings, _STATEMENT_CACHE_SIZE)
+        else:
+            _count("statement_hits")
+        ranked.extend((item.depth, index, item.order, item, stmt.lineno) for item in findings)
+
+    # 按 (深度, 语句序, 语句内序) 排序即可还原整树 ast.walk 的遍历顺序
+    ranked.sort(key=lambda row: row[:3])
+    violations: list[PolicyViolation] = []
+    reviewable_violations: dict[str, PolicyViolation] = {}
+    for _depth, _index, _order, item, base in ranked:
+        violation = replace(item.violation)
+        if violation.lineno is not None:
+            violation.lineno += base
+        if item.reviewable:
+            reviewable_violations[violation.root or _root_module(violation.module or "")] = (
+                violation
+            )
+        else:
+            violations.append(violation)
 
     if violations:
         first = violations[0]
         where = f" (第 {first.lineno} 行)" if first.lineno else ""
-        raise SandboxPolicyError(f"{first.message}{where}")
-
+        return _ValidationEntry(error=f"{first.message}{where}")
     if reviewable_violations:
         ordered = sorted(reviewable_violations.values(), key=lambda item: item.root or "")
-        raise SandboxReviewRequired(
-            [item.root or "" for item in ordered],
-            violations=ordered,
-        )
+        return _ValidationEntry(reviewable=tuple(ordered))
+    return _ValidationEntry(tree=tree)
+
+
+def _validated_entry(code: str, extra_allowed_imports: Iterable[str] | None) -> _ValidationEntry:
+    allowed_roots = _allowed_roots_for(
+        frozenset(normalize_reviewable_import_roots(extra_allowed_imports))
+    )
+    key = (hashlib.sha256(code.encode("utf-8", "surrogatepass")).hexdigest(), allowed_roots)
+    entry = _cache_get(_validation_cache, key)
+    if entry is not None:
+        _count("hits")
+        return entry
+
+    _count("misses")
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as exc:
+        entry = _ValidationEntry(error=f"代码语法错误: {exc}")
+    else:
+        entry = _validate_tree(tree, _LINE_BREAK_RE.split(code), allowed_roots)
+    _cache_put(_validation_cache, key, entry, _VALIDATION_CACHE_SIZE)
+    return entry
+
+
+def validate_code(code: str, *, extra_allowed_imports: Iterable[str] | None = None) -> None:
+    """对用户代码做 AST 静态安全检查。"""
+    _validated_entry(code, extra_allowed_imports).raise_if_rejected()
+
+
+def compile_validated_code(
+    code: str, *, extra_allowed_imports: Iterable[str] | None = None
+) -> bytes:
+    """校验并编译用户代码，返回 marshal 序列化的代码对象。
+
+    复用校验阶段的 AST 编译，结果随校验裁决一起缓存；子进程直接 ``marshal.loads``，
+    无需再次解析与编译。``ast.parse`` 接受但编译器拒绝的代码抛出
+    ``SandboxCompileError``，该裁决同样缓存。
+    """
+    entry = _validated_entry(code, extra_allowed_imports)
+    entry.raise_if_rejected()
+    with _cache_lock:
+        bytecode, tree, compile_error = entry.bytecode, entry.tree, entry.compile_error
+    if bytecode is None and compile_error is None:
+        try:
+            bytecode = marshal.dumps(compile(cast(ast.Module, tree), "<sandbox>", "exec"))
+        except (SyntaxError, ValueError) as exc:
+            compile_error = (str(exc), "".join(traceback.format_exception_only(exc)))
+        with _cache_lock:
+            entry.bytecode, entry.compile_error, entry.tree = bytecode, compile_error, None
+    if compile_error is not None:
+        raise SandboxCompileError(compile_error[0], detail=compile_error[1])
+    return cast(bytes, bytecode)
@@ -11,18 +11,23 @@
 
 from __future__ import annotations
 
+import asyncio
+import functools
 import json
 import logging
-import os
+import math
+import threading
 import time
 import uuid
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterator
 
 import pandas as pd
 
 from nini.config import settings
 from nini.sandbox.r_policy import RSandboxPolicyError, validate_r_code
+from nini.utils.dataframe_io import dataset_version
 
 logger = logging.getLogger(__name__)
 
@@ -84,59 +89,171 @@ def detect_webr_installation() -> dict[str, Any]:
         }
 
 
-def _sanitize_stem(name: str, index: int) -> str:
-    import re
+# ---- 内存列式数据通道 ----
+# webr 在进程内运行，数据集不再落盘为 CSV 再由 R 读回：按列编码为 JSON，
+# 以 R 原始字符串内联进脚本，由预热时注册的 .nini_put() 解码并按版本存入会话仓库。
 
-    cleaned = re.sub(r"[^0-9A-Za-z_.-]", "_", name).strip("._")
-    if not cleaned:
-        cleaned = f"dataset_{index}"
-    return cleaned
 
+# object 列按推断类型还原为数值/逻辑列，避免 [1, 2.5, None] 或布尔对象被当作字符串传入 R
+_NUMERIC_INFERRED = frozenset({"integer", "floating", "mixed-integer-float", "decimal"})
 
-def _write_datasets_csv(
-    datasets: dict[str, pd.DataFrame], target_dir: Path
-) -> list[dict[str, str]]:
-    target_dir.mkdir(parents=True, exist_ok=True)
-    manifest: list[dict[str, str]] = []
-    for idx, (name, df) in enumerate(datasets.items(), start=1):
-        if not isinstance(df, pd.DataFrame):
-            continue
-        stem = _sanitize_stem(name, idx)
-        csv_path = target_dir / f"{idx:03d}_{stem}.csv"
-        df.to_csv(csv_path, index=False)
-        manifest.append({"name": name, "path": str(csv_path)})
-    return manifest
+
+def _column_values(series: pd.Series) -> list[Any]:
+    if pd.api.types.is_object_dtype(series):
+        inferred = pd.api.types.infer_dtype(series, skipna=True)
+        if inferred == "boolean":
+            series = series.astype("boolean")
+        elif inferred in _NUMERIC_INFERRED:
+            series = pd.to_numeric(series, errors="coerce")
+    present = series.notna().to_numpy()
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+        values = series.astype(object).tolist()
+        out: list[Any] = []
+        for keep, value in zip(present, values):
+            # JSON 无 Inf 表示，非有限值按 NA 传递
+            if not keep or (isinstance(value, float) and not math.isfinite(value)):
+                out.append(None)
+            else:
+                out.append(value)
+        return out
+    if pd.api.types.is_datetime64_any_dtype(series):
+        texts = series.dt.strftime("%Y-%m-%d %H:%M:%S").tolist()
+    else:
+        texts = [str(value) for value in series.tolist()]
+    return [text if keep else None for keep, text in zip(present, texts)]
+
+
+def encode_columnar(df: pd.DataFrame) -> str:
+    """将 DataFrame 编码为列式 JSON：{"names": [...], "nrow": n, "columns": [[...], ...]}。"""
+    payload = {
+        "names": [str(col) for col in df.columns],
+        "nrow": int(len(df)),
+        "columns": [_column_values(df.iloc[:, idx]) for idx in range(df.shape[1])],
+    }
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), allow_nan=False)
+
+
+def _r_raw_string(text: str) -> str:
+    """生成不与内容冲突的 R 原始字符串字面量 r"-(...)-"。"""
+    dashes = "-"
+    while f'){dashes}"' in text:
+        dashes += "-"
+    return f'r"{dashes}({text}){dashes}"'
+
+
+def _r_string_vector(items: list[str]) -> str:
+    if not items:
+        return "character(0)"
+    return "c(" + ", ".join(json.dumps(item, ensure_ascii=False) for item in items) + ")"
+
+
+# 会话预热：注册数据集仓库与存取函数。仓库挂在搜索路径上的独立环境里，
+# 用户代码清空 .GlobalEnv 不会误删。
+_WARMUP_SCRIPT = """
+options(stringsAsFactors = FALSE, warn = 1)
+for (.nini_pkg in {packages}) {{
+  suppressPackageStartupMessages(try(library(.nini_pkg, character.only = TRUE), silent = TRUE))
+}}
+if (!("nini:store" %in% search())) {{
+  local({{
+    store <- attach(NULL, name = "nini:store")
+    assign(".nini_datasets", new.env(parent = emptyenv()), envir = store)
+    assign(".nini_put", function(name, version, payload) {{
+      spec <- jsonlite::fromJSON(payload, simplifyDataFrame = FALSE, simplifyMatrix = FALSE)
+      cols <- lapply(spec$columns, function(v) {{
+        if (!length(v)) return(logical(0))
+        if (is.list(v)) return(unlist(lapply(v, function(x) if (is.null(x)) NA else x)))
+        v
+      }})
+      df <- structure(cols, names = as.character(spec$names), class = "data.frame",
+                      row.names = seq_len(spec$nrow))
+      assign(name, list(version = version, df = df), envir = .nini_datasets)
+      invisible(NULL)
+    }}, envir = store)
+    assign(".nini_fetch", function(names, versions) {{
+      out <- list()
+      for (i in seq_along(names)) {{
+        entry <- get0(names[[i]], envir = .nini_datasets, inherits = FALSE)
+        if (is.null(entry) || !identical(entry$version, versions[[i]])) return(NULL)
+        out[[names[[i]]]] <- entry$df
+      }}
+      out
+    }}, envir = store)
+    assign(".nini_drop", function(names) {{
+      names <- intersect(names, ls(.nini_datasets, all.names = TRUE))
+      if (length(names)) rm(list = names, envir = .nini_datasets)
+      invisible(NULL)
+    }}, envir = store)
+  }})
+}}
+if (!exists(".nini_baseline", envir = as.environment("nini:store"), inherits = FALSE)) {{
+  assign(".nini_baseline", list(options = options(), search = search(), wd = getwd()),
+         envir = as.environment("nini:store"))
+}}
+invisible(NULL)
+""".strip()
+
+# 每次执行后重置工作区：清空全局变量并关闭图形设备，再按预热快照恢复 options()、
+# 搜索路径与工作目录；预热加载的包与数据集仓库保留
+_RESET_SCRIPT = """
+rm(list = ls(envir = globalenv(), all.names = TRUE), envir = globalenv())
+try(grDevices::graphics.off(), silent = TRUE)
+local({
+  baseline <- get0(".nini_baseline", envir = as.environment("nini:store"), inherits = FALSE)
+  if (is.null(baseline)) return(invisible(NULL))
+  for (entry in setdiff(search(), baseline$search)) {
+    try(detach(entry, character.only = TRUE), silent = TRUE)
+  }
+  added <- setdiff(names(options()), names(baseline$options))
+  if (length(added)) options(stats::setNames(vector("list", length(added)), added))
+  try(options(baseline$options), silent = TRUE)
+  try(setwd(baseline$wd), silent = TRUE)
+})
+invisible(gc())
+""".strip()
 
 
 def _build_webr_wrapper(
     *,
     user_code: str,
-    manifest: list[dict[str, str]],
+    loads: dict[str, tuple[str, str]],
+    versions: dict[str, str],
+    drops: list[str],
+    forget_all: bool = False,
     dataset_name: str | None,
     persist_df: bool,
     plots_dir: Path,
 ) -> str:
-    """构建传入 webr 的完整 R 脚本（含数据集注入、结果捕获）。"""
+    """构建传入 webr 的完整 R 脚本（含数据集注入、结果捕获）。
+
+    ``loads`` 为需要（重新）导入的数据集 ``{名称: (版本, 列式 JSON)}``；其余数据集
+    直接从会话仓库按版本取出，版本不符时输出 ``__NINI_STALE__`` 并跳过用户代码。
+    """
     dataset_name_literal = json.dumps(dataset_name or "")
-    manifest_json = json.dumps(manifest, ensure_ascii=False)
     plots_dir_str = json.dumps(str(plots_dir))
+    inject_lines: list[str] = []
+    if forget_all:
+        inject_lines.append(".nini_drop(ls(.nini_datasets, all.names = TRUE))")
+    elif drops:
+        inject_lines.append(f".nini_drop({_r_string_vector(drops)})")
+    for name, (version, payload) in loads.items():
+        inject_lines.append(f"{_fn_call('.nini_put', name, version)}, {_r_raw_string(payload)})")
+    names = list(versions)
+    inject_lines.append(
+        f"datasets <- .nini_fetch({_r_string_vector(names)}, "
+        f"{_r_string_vector([versions[name] for name in names])})"
+    )
+    inject_code = "\n".join(inject_lines)
 
     return f"""
 options(stringsAsFactors = FALSE, warn = 1)
 
 # ---- 数据集注入 ----
-manifest_data <- {manifest_json}
-datasets <- list()
-if (length(manifest_data) > 0) {{
-  for (i in seq_along(manifest_data)) {{
-    item <- manifest_data[[i]]
-    nm <- item$name
-    fp <- item$path
-    if (file.exists(fp)) {{
-      datasets[[nm]] <- utils::read.csv(fp, check.names = FALSE, stringsAsFactors = FALSE)
-    }}
-  }}
-}}
+{inject_code}
+
+if (is.null(datasets)) {{
+  cat("__NINI_STALE__\\n")
+}} else {{
 
 dataset_name <- {dataset_name_literal}
 if (nzchar(dataset_name) && dataset_name %in% names(datasets)) {{
@@ -148,7 +265,6 @@ plots_dir <- {plots_dir_str}
 dir.create(plots_dir, recursive = TRUE, showWarnings = FALSE)
 base_plot_path <- file.path(plots_dir, "base_plots.pdf")
 tryCatch(grDevices::pdf(base_plot_path), error = function(e) NULL)
-on.exit({{ try(grDevices::dev.off(), silent = TRUE) }}, add = TRUE)
 
 # ---- 执行用户代码 ----
 err_msg <- NULL
@@ -157,6 +273,7 @@ tryCatch({{
 }}, error = function(e) {{
   err_msg <<- conditionMessage(e)
 }})
+try(grDevices::dev.off(), silent = TRUE)
 
 # ---- 捕获 ggplot 对象 ----
 if ("ggplot2" %in% loadedNamespaces()) {{
@@ -179,45 +296,232 @@ if (exists("df") && nzchar(dataset_name)) {{
 }}
 
 if (!is.null(err_msg)) {{
-  cat(paste0("__NINI_ERROR__:", err_msg, "\n"))
+  cat(paste0("__NINI_ERROR__:", err_msg, "\\n"))
 }} else {{
-  cat("__NINI_OK__\n")
+  cat("__NINI_OK__\\n")
   if (exists("result")) {{
     tryCatch({{
-      cat(paste0("__NINI_RESULT__:", jsonlite::toJSON(result, auto_unbox = TRUE), "\n"))
+      cat(paste0("__NINI_RESULT__:", jsonlite::toJSON(result, auto_unbox = TRUE), "\\n"))
     }}, error = function(e) NULL)
   }}
 }}
+
+}}
 """.strip()
 
 
-class WebRExecutor:
-    """WebAssembly R 执行器（通过 webr Python 包）。"""
+def _fn_call(fn: str, *args: str) -> str:
+    """生成未闭合的 R 调用前缀，如 ``.nini_put("a", "v1"``。"""
+    return f"{fn}(" + ", ".join(json.dumps(arg, ensure_ascii=False) for arg in args)
 
-    def __init__(self, timeout_seconds: int | None = None):
-        self.timeout_seconds = timeout_seconds or int(settings.r_webr_timeout)
-        self._session: Any = None  # lazy init
 
-    def _get_session(self) -> Any:
-        """获取或初始化 webr 会话（延迟初始化，避免启动时下载）。"""
-        if self._session is not None:
-            return self._session
-        import webr  # type: ignore[import]
+def _create_webr_vm() -> Any:
+    """创建 webr 虚拟机（不同版本的 webr Python API 有差异，做兼容处理）。"""
+    import webr  # type: ignore[import]
+
+    # webr Python 包的典型 API：RVirtualMachine / Shelter
+    r_vm_cls = getattr(webr, "RVirtualMachine", None)
+    if callable(r_vm_cls):
+        return r_vm_cls()
+    shelter_cls = getattr(webr, "Shelter", None)
+    if callable(shelter_cls):
+        return shelter_cls()
+    raise RuntimeError(f"未知的 webr API，请检查已安装版本（{getattr(webr, '__version__', '?')}）")
+
+
+def _run_r_code(r_session: Any, code: str) -> tuple[str, str]:
+    """调用 webr 执行 R 代码，返回 (stdout, stderr)。
 
-        # webr Python 包的典型 API：RVirtualMachine / Shelter
-        # 不同版本的 API 可能有差异，做兼容处理
-        r_vm_cls = getattr(webr, "RVirtualMachine", None)
-        if callable(r_vm_cls):
-            self._session = r_vm_cls()
+    兼容不同版本的 webr Python API。
+    """
+    # 尝试常见 API 变体
+    if hasattr(r_session, "run_r_code"):
+        result = r_session.run_r_code(code)
+        stdout = getattr(result, "output", "") or ""
+        stderr = getattr(result, "message", "") or ""
+    elif hasattr(r_session, "eval_r"):
+        result = r_session.eval_r(code)
+        stdout = str(result) if result is not None else ""
+        stderr = ""
+    elif hasattr(r_session, "console"):
+        console = r_session.console
+        console.write(code + "\n")
+        if hasattr(console, "read"):
+            stdout = console.read() or ""
         else:
-            shelter_cls = getattr(webr, "Shelter", None)
-            if callable(shelter_cls):
-                self._session = shelter_cls()
+            stdout = ""
+        stderr = ""
+    else:
+        raise RuntimeError("无法识别 webr 会话对象的 API，请检查 webr 包版本")
+    return str(stdout), str(stderr)
+
+
+# ---- 预热会话池 ----
+
+
+class WarmWebRSession:
+    """池中的一个 webr 会话及其数据集仓库状态。"""
+
+    __slots__ = ("vm", "owner", "loaded", "runs")
+
+    def __init__(self, vm: Any) -> None:
+        self.vm = vm
+        self.owner: str | None = None
+        # 仓库中已导入的数据集：名称 -> 版本指纹（与 R 端 .nini_datasets 同步）
+        self.loaded: dict[str, str] = {}
+        self.runs = 0
+
+
+class WebRSessionPool:
+    """预热的 webr 会话池。
+
+    会话按需创建（首次使用才触发 WASM 运行时下载），创建后预加载常用 R 包并注册
+    数据集仓库；执行结束清空工作区后放回池中复用。同一 nini 会话优先分配上次使用的
+    webr 会话，以复用已导入的数据集；换主时清空仓库，保证会话间隔离。
+    """
+
+    def __init__(
+        self,
+        size: int | None = None,
+        *,
+        preload_packages: list[str] | None = None,
+        factory: Callable[[], Any] | None = None,
+    ) -> None:
+        self.size = max(1, int(size or settings.r_webr_pool_size))
+        if preload_packages is None:
+            preload_packages = [
+                item.strip() for item in settings.r_webr_preload_packages.split(",") if item.strip()
+            ]
+        if "jsonlite" not in preload_packages:
+            preload_packages = ["jsonlite", *preload_packages]
+        self.preload_packages = preload_packages
+        self._factory = factory or _create_webr_vm
+        self._cond = threading.Condition()
+        self._idle: list[WarmWebRSession] = []
+        self._total = 0
+        self._closed = False
+        self._stats = {"created": 0, "reused": 0, "discarded": 0, "waits": 0}
+
+    def acquire(self, owner: str, *, timeout: float | None = None) -> WarmWebRSession:
+        """取出一个会话；池满时最多等待 ``timeout`` 秒。"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("webr 会话池已关闭")
+                if self._idle:
+                    picked = next(
+                        (item for item in reversed(self._idle) if item.owner == owner), None
+                    ) or next((item for item in self._idle if item.owner is None), None)
+                    if picked is None:
+                        picked = self._idle[0]
+                    self._idle.remove(picked)
+                    self._stats["reused"] += 1
+                    return picked
+                if self._total < self.size:
+                    self._total += 1
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("等待可用 webr 会话超时")
+                self._stats["waits"] += 1
+                self._cond.wait(remaining)
+
+        try:
+            vm = self._factory()
+            _run_r_code(vm, _WARMUP_SCRIPT.format(packages=_r_string_vector(self.preload_packages)))
+        except Exception:
+            with self._cond:
+                self._total -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats["created"] += 1
+        logger.info("webr 会话已预热: packages=%s", ",".join(self.preload_packages))
+        return WarmWebRSession(vm)
+
+    def release(self, session: WarmWebRSession, *, broken: bool = False) -> None:
+        """归还会话；执行异常或重置失败的会话直接丢弃。"""
+        if not broken:
+            try:
+                _run_r_code(session.vm, _RESET_SCRIPT)
+            except Exception:
+                logger.warning("webr 会话重置失败，已丢弃", exc_info=True)
+                broken = True
+        with self._cond:
+            if broken or self._closed:
+                self._total -= 1
+                self._stats["discarded"] += 1
             else:
-                raise RuntimeError(
-                    f"未知的 webr API，请检查已安装版本（{getattr(webr, '__version__', '?')}）"
-                )
-        return self._session
+                session.runs += 1
+                self._idle.append(session)
+            self._cond.notify()
+
+    @contextmanager
+    def session(self, owner: str, *, timeout: float | None = None) -> Iterator[WarmWebRSession]:
+        warm = self.acquire(owner, timeout=timeout)
+        broken = True
+        try:
+            yield warm
+            broken = False
+        finally:
+            self.release(warm, broken=broken)
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            return {
+                **self._stats,
+                "size": self.size,
+                "live": self._total,
+                "idle": len(self._idle),
+            }
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._total -= len(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+
+
+_pool: WebRSessionPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_webr_session_pool() -> WebRSessionPool:
+    """返回进程级 webr 会话池。"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = WebRSessionPool()
+        return _pool
+
+
+def shutdown_webr_session_pool() -> None:
+    """关闭进程级 webr 会话池（应用退出时调用）。"""
+    global _pool
+    with _pool_lock:
+        pool = _pool
+        _pool = None
+    if pool is not None:
+        pool.close()
+
+
+class WebRExecutor:
+    """WebAssembly R 执行器（通过 webr Python 包）。"""
+
+    def __init__(
+        self,
+        timeout_seconds: int | None = None,
+        *,
+        pool: WebRSessionPool | None = None,
+    ):
+        self.timeout_seconds = timeout_seconds or int(settings.r_webr_timeout)
+        self._pool = pool
+
+    @property
+    def pool(self) -> WebRSessionPool:
+        return self._pool or get_webr_session_pool()
 
     async def execute(
         self,
@@ -228,39 +532,75 @@ class WebRExecutor:
         dataset_name: str | None = None,
         persist_df: bool = False,
     ) -> dict[str, Any]:
-        return self._execute_sync(
-            code=code,
-            session_id=session_id,
-            datasets=datasets,
-            dataset_name=dataset_name,
-            persist_df=persist_df,
+        """异步执行入口：webr 在进程内同步运行，放到线程池中避免阻塞事件循环。"""
+        return await asyncio.to_thread(
+            functools.partial(
+                self._execute_sync,
+                code=code,
+                session_id=session_id,
+                datasets=datasets,
+                dataset_name=dataset_name,
+                persist_df=persist_df,
+            )
         )
 
-    def _run_r_code(self, r_session: Any, code: str) -> tuple[str, str]:
-        """调用 webr 执行 R 代码，返回 (stdout, stderr)。
-
-        兼容不同版本的 webr Python API。
-        """
-        # 尝试常见 API 变体
-        if hasattr(r_session, "run_r_code"):
-            result = r_session.run_r_code(code)
-            stdout = getattr(result, "output", "") or ""
-            stderr = getattr(result, "message", "") or ""
-        elif hasattr(r_session, "eval_r"):
-            result = r_session.eval_r(code)
-            stdout = str(result) if result is not None else ""
-            stderr = ""
-        elif hasattr(r_session, "console"):
-            console = r_session.console
-            console.write(code + "\n")
-            if hasattr(console, "read"):
-                stdout = console.read() or ""
+    def _run_in_session(
+        self,
+        warm: WarmWebRSession,
+        *,
+        session_id: str,
+        code: str,
+        frames: dict[str, pd.DataFrame],
+        dataset_name: str | None,
+        persist_df: bool,
+        plots_dir: Path,
+    ) -> tuple[str, str]:
+        """在预热会话中执行；仅导入版本变化的数据集，仓库失步时全量重导一次。"""
+        # 换主时清空上一 nini 会话留下的全部数据集，保证会话间隔离
+        forget_all = warm.owner != session_id
+        if forget_all:
+            warm.loaded = {}
+            warm.owner = session_id
+        drops = sorted(set(warm.loaded) - set(frames))
+        for name in drops:
+            warm.loaded.pop(name, None)
+        versions = {name: dataset_version(df) for name, df in frames.items()}
+
+        for attempt in range(2):
+            loads = {
+                name: (version, encode_columnar(frames[name]))
+                for name, version in versions.items()
+                if warm.loaded.get(name) != version
+            }
+            wrapper_code = _build_webr_wrapper(
+                user_code=code,
+                loads=loads,
+                versions=versions,
+                drops=drops,
+                forget_all=forget_all,
+                dataset_name=dataset_name,
+                persist_df=persist_df,
+                plots_dir=plots_dir,
+            )
+            stdout_raw, stderr_raw = _run_r_code(warm.vm, wrapper_code)
+            markers = {line.split(":", 1)[0] for line in stdout_raw.splitlines()}
+            if "__NINI_STALE__" in markers and attempt == 0:
+                logger.debug("webr 数据集仓库失步，全量重新导入: session=%s", session_id)
+                warm.loaded = {}
+                continue
+            if markers & {"__NINI_OK__", "__NINI_ERROR__"}:
+                warm.loaded = dict(versions)
             else:
-                stdout = ""
-            stderr = ""
-        else:
-            raise RuntimeError("无法识别 webr 会话对象的 API，请检查 webr 包版本")
-        return str(stdout), str(stderr)
+                # 脚本未跑到结束标记（如用户代码语法错误），仓库状态未知，下次全量导入
+                warm.loaded = {}
+            logger.debug(
+                "webr 数据集注入: session=%s imported=%d reused=%d",
+                session_id,
+                len(loads),
+                len(versions) - len(loads),
+            )
+            return stdout_raw, stderr_raw
+        return stdout_raw, stderr_raw
 
     def _execute_sync(
         self,
@@ -298,20 +638,19 @@ class WebRExecutor:
         working_dir = settings.sessions_dir / session_id / "webr_tmp" / run_id
         working_dir.mkdir(parents=True, exist_ok=True)
         plots_dir = working_dir / "plots"
-
-        datasets_manifest = _write_datasets_csv(datasets, working_dir / "datasets")
-
-        wrapper_code = _build_webr_wrapper(
-            user_code=code,
-            manifest=datasets_manifest,
-            dataset_name=dataset_name,
-            persist_df=persist_df,
-            plots_dir=plots_dir,
-        )
+        frames = {name: df for name, df in datasets.items() if isinstance(df, pd.DataFrame)}
 
         try:
-            r_session = self._get_session()
-            stdout_raw, stderr_raw = self._run_r_code(r_session, wrapper_code)
+            with self.pool.session(session_id, timeout=self.timeout_seconds) as warm:
+                stdout_raw, stderr_raw = self._run_in_session(
+                    warm,
+                    session_id=session_id,
+                    code=code,
+                    frames=frames,
+                    dataset_name=dataset_name,
+                    persist_df=persist_df,
+                    plots_dir=plots_dir,
+                )
         except RSandboxPolicyError:
             raise
         except Exception as exc:
@@ -335,7 +674,7 @@ class WebRExecutor:
                 error_msg = line[len("__NINI_ERROR__:") :]
             elif line.startswith("__NINI_RESULT__:"):
                 result_json = line[len("__NINI_RESULT__:") :]
-            elif line != "__NINI_OK__":
+            elif line not in ("__NINI_OK__", "__NINI_STALE__"):
                 user_stdout_lines.append(line)
 
         stdout_text = "\n".join(user_stdout_lines).strip()
@@ -402,6 +741,9 @@ webr_executor = WebRExecutor()
 
 __all__ = [
     "WebRExecutor",
+    "WebRSessionPool",
     "detect_webr_installation",
+    "get_webr_session_pool",
+    "shutdown_webr_session_pool",
     "webr_executor",
 ]
@@ -1,7 +1,7 @@
 """Skill 契约运行时。
 
-按 SkillContract 的 DAG 定义执行步骤，支持分层并行、条件跳过、输入输出绑定、
-review_gate 阻塞以及 retry_policy 失败策略。
+按 SkillContract 的 DAG 定义执行步骤，支持数据流并行（依赖完成即启动，无层间屏障）、
+条件跳过、输入输出绑定、review_gate 阻塞以及 retry_policy 失败策略。
 """
 
 from __future__ import annotations
@@ -12,10 +12,16 @@ import logging
 import time
 from collections.abc import Callable, Coroutine, Mapping
 from dataclasses import dataclass
-from typing import Any, Literal, cast
+from typing import Any, Literal
 
 from nini.models.event_schemas import SkillStepEventData, SkillSummaryEventData
 from nini.models.skill_contract import ContractResult, SkillContract, SkillStep, StepExecutionRecord
+from nini.utils.dataflow import (
+    DataflowGraph,
+    DataflowScheduler,
+    StepDurationHistory,
+    get_step_duration_history,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -104,11 +110,20 @@ class ContractRunner:
         skill_name: str,
         callback: EventCallback,
         review_gate_timeout: float = _REVIEW_GATE_TIMEOUT_SECONDS,
+        *,
+        max_concurrency: int | None = None,
+        history: StepDurationHistory | None = None,
     ) -> None:
         self._contract = contract
         self._skill_name = skill_name
         self._callback = callback
         self._review_gate_timeout = review_gate_timeout
+        if max_concurrency is None:
+            from nini.config import settings
+
+            max_concurrency = int(getattr(settings, "max_sub_agent_concurrency", 4))
+        self._max_concurrency = max_concurrency
+        self._history = history or get_step_duration_history()
         self._last_step_outputs: dict[str, Any] = {}
         self._last_output_aliases: dict[str, Any] = {}
         # step_id -> asyncio.Event，用于 review_gate 确认
@@ -121,69 +136,78 @@ class ContractRunner:
     # ------------------------------------------------------------------
 
     async def run(self, session: Any, inputs: dict[str, Any] | None = None) -> ContractResult:
-        """按 DAG 分层执行契约中所有步骤，返回执行结果汇总。"""
+        """按 DAG 数据流执行契约中所有步骤，返回执行结果汇总。
+
+        每个步骤在其依赖（含 condition / input_from 引用的更早层步骤）结束后立即启动；
+        abort 之后不再启动新步骤，未启动的步骤记为“契约已终止”。
+        步骤记录按拓扑层与声明顺序排列，与分层执行时一致。
+        """
         start_total = time.monotonic()
         inputs = inputs or {}
-        layers = self._topological_sort(self._contract.steps)
-        step_records: list[StepExecutionRecord] = []
+        steps = self._contract.steps
+        id_to_step = {step.id: step for step in steps}
+        layers = self._topological_sort(steps)
+        layer_of = {step.id: index for index, layer in enumerate(layers) for step in layer}
+        graph = DataflowGraph(self._scheduling_dependencies(steps, layer_of))
         step_status: dict[str, StepRecordStatus] = {}
         step_outputs: dict[str, Any] = {}
         output_aliases: dict[str, Any] = {}
         aborted = False
         abort_error: str | None = None
 
-        for layer_index, layer in enumerate(layers):
-            if aborted:
-                for step in layer:
-                    step_records.append(
-                        StepExecutionRecord(
-                            step_id=step.id,
-                            status="skipped",
-                            duration_ms=None,
-                            error_message="契约已终止",
-                        )
-                    )
-                continue
-
-            raw_outcomes = await asyncio.gather(
-                *(
-                    self._execute_step(
-                        step,
-                        session,
-                        inputs,
-                        step_status,
-                        step_outputs,
-                        output_aliases,
-                        layer_index,
-                    )
-                    for step in layer
-                ),
-                return_exceptions=True,
-            )
+        async def _execute(step_id: str) -> _StepOutcome:
+            nonlocal aborted, abort_error
+            step = id_to_step[step_id]
+            try:
+                outcome = await self._execute_step(
+                    step,
+                    session,
+                    inputs,
+                    step_status,
+                    step_outputs,
+                    output_aliases,
+                    layer_of[step_id],
+                )
+            except Exception as exc:
+                logger.error("步骤 '%s' 出现未捕获异常", step.id, exc_info=exc)
+                outcome = await self._build_failure_outcome(
+                    step,
+                    str(exc),
+                    duration_ms=None,
+                    layer=layer_of[step_id],
+                )
+            # 结果立即写入共享上下文，后继步骤无需等待同层其他步骤
+            step_status[step.id] = outcome.record.status
+            if outcome.record.status == "completed":
+                self._store_step_output(step, outcome.step_output, step_outputs, output_aliases)
+            if outcome.should_abort and not aborted:
+                aborted = True
+                abort_error = outcome.record.error_message
+            return outcome
+
+        scheduler: DataflowScheduler[_StepOutcome] = DataflowScheduler(
+            graph,
+            max_concurrency=self._max_concurrency,
+            history=self._history,
+            history_key=lambda sid: f"contract:{self._skill_name}:{sid}",
+        )
+        run = await scheduler.run(_execute, should_halt=lambda _sid, _outcome: aborted)
 
-            for step, raw_outcome in zip(layer, raw_outcomes, strict=True):
-                if isinstance(raw_outcome, BaseException):
-                    logger.error(
-                        "步骤 '%s' 出现未捕获异常",
-                        step.id,
-                        exc_info=(type(raw_outcome), raw_outcome, raw_outcome.__traceback__),
-                    )
-                    outcome = await self._build_failure_outcome(
-                        step,
-                        str(raw_outcome),
+        step_records: list[StepExecutionRecord] = []
+        for layer in layers:
+            for step in layer:
+                outcome = run.results.get(step.id)
+                if outcome is not None:
+                    step_records.append(outcome.record)
+                    continue
+                step_records.append(
+                    StepExecutionRecord(
+                        step_id=step.id,
+                        status="skipped",
                         duration_ms=None,
-                        layer=layer_index,
+                        error_message="契约已终止",
                     )
-                else:
-                    outcome = cast(_StepOutcome, raw_outcome)
-
-                step_records.append(outcome.record)
-                step_status[step.id] = outcome.record.status
-                if outcome.record.status == "completed":
-                    self._store_step_output(step, outcome.step_output, step_outputs, output_aliases)
-                if outcome.should_abort and not aborted:
-                    aborted = True
-                    abort_error = outcome.record.error_message
+                )
 
         total_ms = int((time.monotonic() - start_total) * 1000)
         self._last_step_outputs = dict(step_outputs)
@@ -207,6 +231,7 @@ class ContractRunner:
             total_ms=total_ms,
             error_message=abort_error,
             evidence_chain=self._snapshot_evidence_chain(session),
+            trace=run.trace.to_dict(),
         )
 
     def approve_review(self, step_id: str) -> None:
@@ -270,6 +295,47 @@ class ContractRunner:
 
         return layered_steps
 
+    def _scheduling_dependencies(
+        self, steps: list[SkillStep], layer_of: Mapping[str, int]
+    ) -> dict[str, list[str]]:
+        """调度依赖 = 声明的 depends_on + condition / input_from 引用的更早层步骤。
+
+        分层执行时，步骤可以读取任意更早层步骤的输出；数据流执行保留这一点，
+        把这些隐式的数据引用也作为调度依赖（只取更早层，保证无环）。
+        """
+        producers: dict[str, str] = {step.id: step.id for step in steps}
+        for step in steps:
+            if step.output_key:
+                producers.setdefault(step.output_key, step.id)
+
+        deps: dict[str, list[str]] = {}
+        for step in steps:
+            referenced: list[str] = []
+            for reference in step.input_from.values():
+                root = reference.split(".", 1)[0]
+                if root:
+                    referenced.append(root)
+            if step.condition:
+                try:
+                    parsed = ast.parse(step.condition, mode="eval")
+                except SyntaxError:
+                    parsed = None
+                if parsed is not None:
+                    referenced.extend(
+                        node.id for node in ast.walk(parsed) if isinstance(node, ast.Name)
+                    )
+            step_deps = list(step.depends_on)
+            for name in referenced:
+                producer = producers.get(name)
+                if (
+                    producer is not None
+                    and producer not in step_deps
+                    and layer_of[producer] < layer_of[step.id]
+                ):
+                    step_deps.append(producer)
+            deps[step.id] = step_deps
+        return deps
+
     async def _execute_step(
         self,
         step: SkillStep,
@@ -17,8 +17,10 @@ from nini.todo.index import (
     TodoService,
     clone_event,
     clone_task,
+    get_todo_service,
     make_event_id,
     make_task_id,
+    shutdown_todo_service,
     utc_now,
 )
 
@@ -39,7 +41,9 @@ __all__ = [
     "TodoService",
     "clone_event",
     "clone_task",
+    "get_todo_service",
     "make_event_id",
     "make_task_id",
+    "shutdown_todo_service",
     "utc_now",
 ]
@@ -2,8 +2,11 @@
 
 from __future__ import annotations
 
+import threading
 from pathlib import Path
 
+from nini.config import settings
+
 from nini.todo.dispatcher import TaskDispatcher
 from nini.todo.hooks import LoggingTaskHook, TaskHook, TaskHookRegistry
 from nini.todo.models import (
@@ -128,6 +131,35 @@ class TodoService:
     def list_events(self, session_id: str, *, task_id: str | None = None) -> list[TaskEvent]:
         return self._dispatcher(session_id).store.list_events(task_id=task_id)
 
+    def close(self) -> None:
+        """压缩各会话的事件日志并释放文件句柄。"""
+        for dispatcher in self._dispatchers.values():
+            dispatcher.store.close()
+        self._dispatchers.clear()
+
+
+_todo_service: TodoService | None = None
+_todo_service_lock = threading.Lock()
+
+
+def get_todo_service() -> TodoService:
+    """返回进程内共享的任务服务（按会话目录落盘）。"""
+    global _todo_service
+    with _todo_service_lock:
+        if _todo_service is None:
+            _todo_service = TodoService(base_dir=settings.sessions_dir)
+        return _todo_service
+
+
+def shutdown_todo_service() -> None:
+    """压缩并关闭共享任务服务的事件日志（应用退出时调用）。"""
+    global _todo_service
+    with _todo_service_lock:
+        service = _todo_service
+        _todo_service = None
+    if service is not None:
+        service.close()
+
 
 __all__ = [
     "InvalidTaskTransitionError",
@@ -146,7 +178,9 @@ __all__ = [
     "TodoService",
     "clone_event",
     "clone_task",
+    "get_todo_service",
     "make_event_id",
     "make_task_id",
+    "shutdown_todo_service",
     "utc_now",
 ]
@@ -3,10 +3,13 @@
 from __future__ import annotations
 
 import json
+import logging
+import os
+import time
 from dataclasses import replace
 from pathlib import Path
 from threading import RLock
-from typing import Any, cast
+from typing import IO, Any, cast
 
 from nini.todo.hooks import TaskHookRegistry
 from nini.todo.models import (
@@ -42,8 +45,16 @@ class TaskDependencyError(TaskStoreError):
     """任务依赖不满足。"""
 
 
+logger = logging.getLogger(__name__)
+
 _UNSET = object()
 
+# 事件日志累计多少条后压缩为快照
+_COMPACT_EVERY_RECORDS = 500
+# fsync 批量策略：累计条数或距上次 fsync 的时间任一达到即落盘
+_FSYNC_BATCH_RECORDS = 32
+_FSYNC_INTERVAL_SECONDS = 1.0
+
 _ALLOWED_TRANSITIONS: dict[TaskStatus, set[TaskStatus]] = {
     TaskStatus.PENDING: {TaskStatus.ASSIGNED, TaskStatus.CANCELLED},
     TaskStatus.ASSIGNED: {
@@ -74,8 +85,14 @@ _STATUS_TO_EVENT: dict[TaskStatus, TaskEventType] = {
 class TaskStore:
     """任务快照存储。
 
-    当前实现使用内存字典 + 可选 JSON 文件落盘，作为后续接入
-    `Session` / WebSocket / SQLite 的最小可运行核心。
+    内存字典 + 可选落盘。落盘分两部分：
+
+    - ``storage_path``：压缩后的 JSON 快照（任务 + 事件），记录已包含的日志序号；
+    - ``<storage_path>.events.jsonl``：追加式事件日志，每次变更只追加一行
+      （事件 + 变更后的任务状态），fsync 按条数/时间批量执行。
+
+    日志累计到一定条数后压缩进快照并清空；加载时先读快照再重放日志。
+    可认领队列由依赖计数增量维护，``list_ready_tasks`` 不再全表扫描。
     """
 
     def __init__(
@@ -89,6 +106,15 @@ class TaskStore:
         self._lock = RLock()
         self._tasks: dict[str, Task] = {}
         self._events: list[TaskEvent] = []
+        # 依赖索引：被依赖任务 -> 依赖它的任务；任务 -> 未完成依赖数
+        self._dependents: dict[str, set[str]] = {}
+        self._unsatisfied: dict[str, int] = {}
+        self._ready: set[str] = set()
+        self._log_seq = 0
+        self._snapshot_seq = 0
+        self._log_handle: IO[str] | None = None
+        self._unsynced_records = 0
+        self._last_fsync = time.monotonic()
         self._load()
 
     @property
@@ -96,6 +122,13 @@ class TaskStore:
         """返回 hook 注册器。"""
         return self._hooks
 
+    @property
+    def log_path(self) -> Path | None:
+        """追加式事件日志路径。"""
+        if self._storage_path is None:
+            return None
+        return self._storage_path.with_name(self._storage_path.name + ".events.jsonl")
+
     def create_task(
         self,
         *,
@@ -127,7 +160,7 @@ class TaskStore:
             self._ensure_dependencies_exist(task.dependency_ids)
             if task.task_id in self._tasks:
                 raise TaskConflictError(f"任务已存在: {task.task_id}")
-            self._tasks[task.task_id] = task
+            self._apply_task_locked(task.task_id, task)
             event = self._append_event_locked(
                 task,
                 event_type=TaskEventType.CREATED,
@@ -136,7 +169,7 @@ class TaskStore:
                 to_status=task.status,
                 message="创建任务",
             )
-            self._persist_locked()
+            self._persist_locked(event, task)
             safe_task = clone_task(task)
             safe_event = clone_event(event)
 
@@ -218,7 +251,7 @@ class TaskStore:
             )
             if not updated.title:
                 raise ValueError("任务标题不能为空")
-            self._tasks[task.task_id] = updated
+            self._apply_task_locked(task.task_id, updated)
             event = self._append_event_locked(
                 updated,
                 event_type=TaskEventType.UPDATED,
@@ -227,7 +260,7 @@ class TaskStore:
                 to_status=updated.status,
                 message=message or "更新任务元数据",
             )
-            self._persist_locked()
+            self._persist_locked(event, updated)
             safe_task = clone_task(updated)
             safe_event = clone_event(event)
 
@@ -243,7 +276,8 @@ class TaskStore:
             task = self._require_task_locked(task_id)
             if task.status in {TaskStatus.ASSIGNED, TaskStatus.IN_PROGRESS}:
                 raise TaskConflictError(f"执行中的任务不可删除: {task.task_id}")
-            removed = self._tasks.pop(task.task_id)
+            removed = task
+            self._apply_task_locked(task.task_id, None)
             event = self._append_event_locked(
                 removed,
                 event_type=TaskEventType.DELETED,
@@ -252,7 +286,7 @@ class TaskStore:
                 to_status=None,
                 message="删除任务",
             )
-            self._persist_locked()
+            self._persist_locked(event, None)
             safe_task = clone_task(removed)
             safe_event = clone_event(event)
 
@@ -406,7 +440,7 @@ class TaskStore:
                 finished_at=finished_at,
                 updated_at=now,
             )
-            self._tasks[updated.task_id] = updated
+            self._apply_task_locked(updated.task_id, updated)
             event = self._append_event_locked(
                 updated,
                 event_type=self._event_type_for_transition(current.status, to_status),
@@ -415,7 +449,7 @@ class TaskStore:
                 to_status=to_status,
                 message=message,
             )
-            self._persist_locked()
+            self._persist_locked(event, updated)
             safe_task = clone_task(updated)
             safe_event = clone_event(event)
 
@@ -431,13 +465,9 @@ class TaskStore:
     def list_ready_tasks(self) -> list[Task]:
         """列出当前可认领的任务。"""
         with self._lock:
-            ready = [
-                clone_task(task)
-                for task in self._tasks.values()
-                if task.status == TaskStatus.PENDING and self._dependencies_satisfied_locked(task)
-            ]
+            ready = [self._tasks[task_id] for task_id in self._ready]
             ready.sort(key=self._task_sort_key)
-            return ready
+            return [clone_task(task) for task in ready]
 
     def to_dict(self) -> dict[str, Any]:
         """导出完整快照。"""
@@ -447,32 +477,215 @@ class TaskStore:
                 "events": [event.to_dict() for event in self.list_events()],
             }
 
+    def flush(self) -> None:
+        """将已追加但尚未 fsync 的事件日志落盘。"""
+        with self._lock:
+            self._fsync_log_locked()
+
+    def compact(self) -> None:
+        """将当前状态写成快照并清空事件日志。"""
+        with self._lock:
+            self._compact_locked()
+
+    def close(self) -> None:
+        """压缩日志并关闭文件句柄。"""
+        with self._lock:
+            if self._storage_path is not None and self._log_seq > self._snapshot_seq:
+                self._compact_locked()
+            self._close_log_locked()
+
     def _load(self) -> None:
-        if self._storage_path is None or not self._storage_path.exists():
+        if self._storage_path is None:
             return
-        payload = json.loads(self._storage_path.read_text(encoding="utf-8"))
-        tasks = payload.get("tasks", [])
-        events = payload.get("events", [])
         self._tasks = {}
         self._events = []
-        for raw in tasks:
-            task = Task.from_dict(raw)
-            self._tasks[task.task_id] = task
-        for raw in events:
-            self._events.append(TaskEvent.from_dict(raw))
+        if self._storage_path.exists():
+            payload = json.loads(self._storage_path.read_text(encoding="utf-8"))
+            for raw in payload.get("tasks", []):
+                task = Task.from_dict(raw)
+                self._tasks[task.task_id] = task
+            for raw in payload.get("events", []):
+                self._events.append(TaskEvent.from_dict(raw))
+            self._snapshot_seq = int(payload.get("log_seq", 0) or 0)
+            self._log_seq = self._snapshot_seq
+        self._replay_log_locked()
+        self._rebuild_indexes_locked()
+
+    def _replay_log_locked(self) -> None:
+        log_path = self.log_path
+        if log_path is None or not log_path.exists():
+            return
+        # 以字节偏移记录最后一条完整记录的结尾，用于截掉崩溃留下的残行
+        good_offset = 0
+        torn = False
+        with log_path.open("rb") as handle:
+            for line in handle:
+                if not line.strip():
+                    good_offset += len(line)
+                    continue
+                try:
+                    record = json.loads(line)
+                    seq = int(record["seq"])
+                    event = TaskEvent.from_dict(record["event"])
+                    raw_task = record.get("task")
+                    task = Task.from_dict(raw_task) if raw_task is not None else None
+                except (ValueError, KeyError, TypeError):
+                    # 崩溃时可能留下半行，之后的内容不可信
+                    torn = True
+                    break
+                good_offset += len(line)
+                if not line.endswith(b"\n"):
+                    # 完整记录缺少换行：后续追加不能接在同一行上
+                    torn = True
+                if seq <= self._log_seq:
+                    continue  # 已包含在快照中
+                if task is None:
+                    self._tasks.pop(event.task_id, None)
+                else:
+                    self._tasks[task.task_id] = task
+                self._events.append(event)
+                self._log_seq = seq
+        if torn:
+            self._repair_log_tail(log_path, good_offset)
+
+    @staticmethod
+    def _repair_log_tail(log_path: Path, good_offset: int) -> None:
+        """截断到最后一条完整记录并补齐换行，之后追加的记录才能在下次加载时读到。"""
+        logger.warning("任务事件日志存在损坏记录，已截断后续内容: %s", log_path)
+        with log_path.open("r+b") as handle:
+            handle.truncate(good_offset)
+            if good_offset:
+                handle.seek(good_offset - 1)
+                if handle.read(1) != b"\n":
+                    handle.write(b"\n")
+
+    def _persist_locked(self, event: TaskEvent, task: Task | None) -> None:
+        """追加一条事件日志；累计足够条数后压缩为快照。"""
+        if self._storage_path is None:
+            return
+        self._log_seq += 1
+        record = {
+            "seq": self._log_seq,
+            "event": event.to_dict(),
+            "task": task.to_dict() if task is not None else None,
+        }
+        handle = self._open_log_locked()
+        handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+        handle.flush()
+        self._unsynced_records += 1
+        if (
+            self._unsynced_records >= _FSYNC_BATCH_RECORDS
+            or time.monotonic() - self._last_fsync >= _FSYNC_INTERVAL_SECONDS
+        ):
+            self._fsync_log_locked()
+        if self._log_seq - self._snapshot_seq >= _COMPACT_EVERY_RECORDS:
+            self._compact_locked()
+
+    def _open_log_locked(self) -> IO[str]:
+        if self._log_handle is None:
+            log_path = self.log_path
+            assert log_path is not None
+            log_path.parent.mkdir(parents=True, exist_ok=True)
+            self._log_handle = log_path.open("a", encoding="utf-8")
+        return self._log_handle
+
+    def _fsync_log_locked(self) -> None:
+        if self._log_handle is not None and self._unsynced_records:
+            os.fsync(self._log_handle.fileno())
+        self._unsynced_records = 0
+        self._last_fsync = time.monotonic()
+
+    def _close_log_locked(self) -> None:
+        if self._log_handle is None:
+            return
+        self._fsync_log_locked()
+        self._log_handle.close()
+        self._log_handle = None
 
-    def _persist_locked(self) -> None:
+    def _compact_locked(self) -> None:
         if self._storage_path is None:
             return
         self._storage_path.parent.mkdir(parents=True, exist_ok=True)
         payload = {
             "tasks": [task.to_dict() for task in self._tasks.values()],
             "events": [event.to_dict() for event in self._events],
+            "log_seq": self._log_seq,
         }
-        self._storage_path.write_text(
-            json.dumps(payload, ensure_ascii=False, indent=2),
-            encoding="utf-8",
+        tmp_path = self._storage_path.with_name(self._storage_path.name + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as handle:
+            json.dump(payload, handle, ensure_ascii=False, indent=2)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, self._storage_path)
+        self._snapshot_seq = self._log_seq
+        # 快照已包含全部日志记录（log_seq），即使截断前崩溃，重放时也会按序号跳过
+        self._close_log_locked()
+        log_path = self.log_path
+        if log_path is not None:
+            log_path.write_text("", encoding="utf-8")
+
+    def _rebuild_indexes_locked(self) -> None:
+        self._dependents = {}
+        self._unsatisfied = {}
+        self._ready = set()
+        for task in self._tasks.values():
+            self._link_dependencies_locked(task)
+
+    def _apply_task_locked(self, task_id: str, updated: Task | None) -> None:
+        """写入（或删除）任务，并增量维护依赖计数与可认领队列。"""
+        previous = self._tasks.get(task_id)
+        deps_changed = (
+            previous is None or updated is None or previous.dependency_ids != updated.dependency_ids
         )
+        if previous is not None and deps_changed:
+            self._unlink_dependencies_locked(previous)
+        if updated is None:
+            self._tasks.pop(task_id, None)
+        else:
+            self._tasks[task_id] = updated
+            if deps_changed:
+                self._link_dependencies_locked(updated)
+            self._sync_ready_locked(task_id)
+
+        was_done = previous is not None and previous.status == TaskStatus.DONE
+        is_done = updated is not None and updated.status == TaskStatus.DONE
+        if was_done != is_done:
+            delta = -1 if is_done else 1
+            for dependent_id in self._dependents.get(task_id, ()):
+                self._unsatisfied[dependent_id] = self._unsatisfied.get(dependent_id, 0) + delta
+                self._sync_ready_locked(dependent_id)
+
+    def _link_dependencies_locked(self, task: Task) -> None:
+        unsatisfied = 0
+        for dep_id in task.dependency_ids:
+            self._dependents.setdefault(dep_id, set()).add(task.task_id)
+            dep = self._tasks.get(dep_id)
+            if dep is None or dep.status != TaskStatus.DONE:
+                unsatisfied += 1
+        self._unsatisfied[task.task_id] = unsatisfied
+        self._sync_ready_locked(task.task_id)
+
+    def _unlink_dependencies_locked(self, task: Task) -> None:
+        for dep_id in task.dependency_ids:
+            dependents = self._dependents.get(dep_id)
+            if dependents is None:
+                continue
+            dependents.discard(task.task_id)
+            if not dependents:
+                self._dependents.pop(dep_id, None)
+        self._unsatisfied.pop(task.task_id, None)
+        self._ready.discard(task.task_id)
+
+    def _sync_ready_locked(self, task_id: str) -> None:
+        task = self._tasks.get(task_id)
+        if (
+            task is not None
+            and task.status == TaskStatus.PENDING
+            and self._unsatisfied.get(task_id, 0) == 0
+        ):
+            self._ready.add(task_id)
+        else:
+            self._ready.discard(task_id)
 
     def _require_task_locked(self, task_id: str) -> Task:
         normalized = str(task_id).strip()
@@ -498,11 +711,7 @@ class TaskStore:
             seen.add(dep_id)
 
     def _dependencies_satisfied_locked(self, task: Task) -> bool:
-        for dep_id in task.dependency_ids:
-            dep = self._tasks.get(dep_id)
-            if dep is None or dep.status != TaskStatus.DONE:
-                return False
-        return True
+        return self._unsatisfied.get(task.task_id, 0) == 0
 
     def _validate_transition_locked(
         self,
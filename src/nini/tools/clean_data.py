@@ -9,10 +9,17 @@ from typing import Any
 
 import numpy as np
 import pandas as pd
-from scipy import stats
+from scipy import special, stats
 
 from nini.agent.session import Session
 from nini.tools.base import Tool, ToolResult
+from nini.tools.column_profiler import (
+    MIN_IQR_COUNT,
+    ColumnStats,
+    DatasetProfile,
+    profile_dataframe,
+    profile_series,
+)
 from nini.utils.dataframe_io import dataframe_to_json_safe
 
 
@@ -75,11 +82,8 @@ class CleaningRecommendation:
     priority: str  # high, medium, low
 
 
-def analyze_missing_pattern(df: pd.DataFrame, column: str) -> MissingPattern:
-    """分析缺失值模式。
-
-    通过检查缺失值的分布来判断是随机缺失还是系统性缺失。
-    """
+def _analyze_missing_pattern_pairwise(df: pd.DataFrame, column: str) -> MissingPattern:
+    """逐列对的缺失模式判定（参考实现；列名重复等少见情形的回退路径）。"""
     col_data = df[column]
     missing_mask = col_data.isna()
 
@@ -116,39 +120,172 @@ def analyze_missing_pattern(df: pd.DataFrame, column: str) -> MissingPattern:
     return MissingPattern.RANDOM
 
 
+# 共现计数矩阵按行分块累加：float32 矩阵乘在块内精确（块行数远小于 2**24）
+_COOCCURRENCE_CHUNK_ROWS = 1 << 16
+
+
+def missing_cooccurrence(mask: np.ndarray, targets: np.ndarray | None = None) -> np.ndarray:
+    """缺失共现计数矩阵：``result[i, j]`` 为目标列 i 与列 j 同时缺失的行数。
+
+    Args:
+        mask: ``(行数, 列数)`` 的布尔缺失矩阵
+        targets: 目标列下标；None 表示全部列（得到对称方阵）
+    """
+    n_rows, n_cols = mask.shape
+    target_idx = np.arange(n_cols) if targets is None else np.asarray(targets, dtype=np.intp)
+    counts = np.zeros((len(target_idx), n_cols), dtype=np.int64)
+    for start in range(0, n_rows, _COOCCURRENCE_CHUNK_ROWS):
+        block = mask[start : start + _COOCCURRENCE_CHUNK_ROWS].astype(np.float32)
+        counts += np.rint(block[:, target_idx].T @ block).astype(np.int64)
+    return counts
+
+
+def _yates_chi2_pvalues(
+    both: np.ndarray, target_missing: np.ndarray, other_missing: np.ndarray, n_rows: int
+) -> np.ndarray:
+    """批量计算 2×2 缺失列联表的 Yates 校正卡方 p 值。
+
+    与 ``scipy.stats.chi2_contingency`` 逐表计算的运算顺序一致（单元格顺序
+    ``[[非缺失, 非缺失], ..., [缺失, 缺失]]``），结果逐位相同。
+    """
+    total = float(n_rows)
+    mi = target_missing.astype(np.float64)[:, None]
+    mj = other_missing.astype(np.float64)[None, :]
+    a = both.astype(np.float64)
+    observed = np.stack(np.broadcast_arrays(total - mi - mj + a, mj - a, mi - a, a), axis=-1)
+    rows = np.stack(np.broadcast_arrays(total - mi, total - mi, mi, mi), axis=-1)
+    cols = np.stack(np.broadcast_arrays(total - mj, mj, total - mj, mj), axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        expected = rows * cols / total
+        diff = expected - observed
+        corrected = observed + np.minimum(0.5, np.abs(diff)) * np.sign(diff)
+        statistic = ((corrected - expected) ** 2 / expected).sum(axis=-1)
+    return np.asarray(special.chdtrc(1, statistic), dtype=np.float64)
+
+
+def _block_missing_flags(
+    index: pd.Index, mask: np.ndarray, counts: np.ndarray
+) -> np.ndarray | None:
+    """整块缺失判定：缺失行索引标签的平均间隔 < 2。
+
+    相邻间隔之和可以裂项为“末个缺失标签 - 首个缺失标签”，因此整数索引下只需
+    每列首末缺失位置即可精确得到与逐列 ``np.mean(gaps)`` 相同的结果。
+    非整数索引（或数值过大）返回 None，由调用方逐列计算。
+    """
+    if not pd.api.types.is_signed_integer_dtype(index.dtype) or len(index) == 0:
+        return None
+    labels = index.to_numpy()
+    if np.abs(labels).max() >= 2**52:
+        return None
+    n_rows = mask.shape[0]
+    first = mask.argmax(axis=0)
+    last = n_rows - 1 - mask[::-1].argmax(axis=0)
+    flags = np.zeros(mask.shape[1], dtype=bool)
+    multi = counts > 1
+    span = labels[last[multi]] - labels[first[multi]]
+    flags[multi] = span / (counts[multi] - 1) < 2.0
+    return flags
+
+
+def analyze_missing_patterns(
+    df: pd.DataFrame, columns: list[Any] | None = None
+) -> dict[Any, MissingPattern]:
+    """一次性分析多列缺失值模式（向量化）。
+
+    - 整块缺失：按首末缺失标签与缺失数直接得到平均间隔；
+    - 系统性缺失：一次布尔矩阵乘得到全部列对的缺失共现计数，由计数推出所有 2×2 列联表，
+      批量计算 Yates 校正卡方 p 值，任一 p < 0.05 即判为系统性缺失。
+
+    结果与逐列对 ``crosstab`` + ``chi2_contingency`` 的判定完全一致。
+    """
+    targets = list(df.columns) if columns is None else list(columns)
+    if not df.columns.is_unique:
+        return {column: _analyze_missing_pattern_pairwise(df, column) for column in targets}
+
+    mask = df.isna().to_numpy(dtype=bool)
+    n_rows = mask.shape[0]
+    counts = mask.sum(axis=0)
+    positions = {column: idx for idx, column in enumerate(df.columns)}
+    target_idx = np.array([positions[column] for column in targets], dtype=np.intp)
+
+    target_mask = mask[:, target_idx]
+    target_counts = counts[target_idx]
+    block = _block_missing_flags(df.index, target_mask, target_counts)
+
+    # 只有“部分缺失”的列才能构成 2×2 列联表
+    partial = np.flatnonzero((counts > 0) & (counts < n_rows))
+    systematic = np.zeros(len(targets), dtype=bool)
+    candidates = np.flatnonzero((target_counts > 0) & (target_counts < n_rows))
+    if len(partial) > 1 and len(candidates) > 0:
+        partial_mask = mask[:, partial]
+        local = np.searchsorted(partial, target_idx[candidates])
+        both = missing_cooccurrence(partial_mask, local)
+        p_values = _yates_chi2_pvalues(
+            both, counts[target_idx[candidates]], counts[partial], n_rows
+        )
+        significant = p_values < 0.05
+        # 排除与自身的配对
+        significant[np.arange(len(candidates)), local] = False
+        systematic[candidates] = significant.any(axis=1)
+
+    patterns: dict[Any, MissingPattern] = {}
+    for pos, column in enumerate(targets):
+        if target_counts[pos] == 0:
+            patterns[column] = MissingPattern.NONE
+            continue
+        if block is None:
+            missing_indices = df.index[target_mask[:, pos]]
+            if len(missing_indices) > 1:
+                gaps = missing_indices[1:].values - missing_indices[:-1].values
+                if np.mean(gaps) < 2.0:
+                    patterns[column] = MissingPattern.BLOCK
+                    continue
+        elif block[pos]:
+            patterns[column] = MissingPattern.BLOCK
+            continue
+        patterns[column] = MissingPattern.SYSTEMATIC if systematic[pos] else MissingPattern.RANDOM
+    return patterns
+
+
+def analyze_missing_pattern(df: pd.DataFrame, column: str) -> MissingPattern:
+    """分析缺失值模式。
+
+    通过检查缺失值的分布来判断是随机缺失还是系统性缺失。
+    分析多列时请使用 ``analyze_missing_patterns``，共现矩阵只计算一次。
+    """
+    return analyze_missing_patterns(df, [column])[column]
+
+
 def analyze_outlier_pattern(series: pd.Series) -> tuple[OutlierPattern, int, tuple[float, float]]:
     """分析异常值模式。
 
     返回: (模式, 异常值数量, (下界, 上界))
     """
-    clean_data = series.dropna()
-    if len(clean_data) < 4:
+    return _outlier_pattern_from_stats(profile_series(series, allow_sampling=False))
+
+
+def _outlier_pattern_from_stats(
+    column_stats: ColumnStats,
+) -> tuple[OutlierPattern, int, tuple[float, float]]:
+    """由列画像判定异常值模式（IQR 方法）。"""
+    if column_stats.count < MIN_IQR_COUNT or column_stats.q1 is None or column_stats.q3 is None:
         return OutlierPattern.NONE, 0, (0.0, 0.0)
 
-    # 使用 IQR 方法检测异常值
-    q1 = clean_data.quantile(0.25)
-    q3 = clean_data.quantile(0.75)
+    q1, q3 = column_stats.q1, column_stats.q3
     iqr = q3 - q1
-
     if pd.isna(iqr) or iqr == 0:
         return OutlierPattern.NONE, 0, (q1, q3)
 
     lower_bound = q1 - 1.5 * iqr
     upper_bound = q3 + 1.5 * iqr
-
-    outliers = clean_data[(clean_data < lower_bound) | (clean_data > upper_bound)]
-    outlier_count = len(outliers)
-    outlier_ratio = outlier_count / len(clean_data)
-
-    # 判断分布模式（即使无异常值也计算）
-    skewness = clean_data.skew()
-
+    outlier_count = column_stats.iqr_outlier_count
     if outlier_count == 0:
         return OutlierPattern.NONE, 0, (lower_bound, upper_bound)
 
+    outlier_ratio = outlier_count / column_stats.count
     if outlier_ratio > 0.1:
         pattern = OutlierPattern.EXTREME
-    elif abs(float(skewness)) > 1.5:  # type: ignore[arg-type]
+    elif abs(column_stats.skewness or 0.0) > 1.5:
         pattern = OutlierPattern.SKEWED
     else:
         pattern = OutlierPattern.NORMAL
@@ -156,48 +293,53 @@ def analyze_outlier_pattern(series: pd.Series) -> tuple[OutlierPattern, int, tup
     return pattern, outlier_count, (lower_bound, upper_bound)
 
 
-def analyze_column_profile(df: pd.DataFrame, column: str) -> ColumnProfile:
-    """分析单列数据特征。"""
-    col_data = df[column]
-    total_rows = len(col_data)
-    missing_count = int(col_data.isna().sum())
-    missing_ratio = missing_count / total_rows if total_rows > 0 else 0.0
-    missing_pattern = analyze_missing_pattern(df, column)
-    unique_count = col_data.nunique(dropna=True)
-    is_numeric = pd.api.types.is_numeric_dtype(col_data)
+def analyze_column_profile(
+    df: pd.DataFrame,
+    column: str,
+    *,
+    missing_pattern: MissingPattern | None = None,
+    column_stats: ColumnStats | None = None,
+) -> ColumnProfile:
+    """分析单列数据特征。
+
+    ``missing_pattern`` 可由 ``analyze_missing_patterns`` 批量预先计算后传入；
+    ``column_stats`` 可由 ``profile_dataframe`` 批量预先计算后传入。
+    """
+    if column_stats is None:
+        column_stats = profile_series(df[column])
+    total_rows = len(df)
+    missing_ratio = column_stats.missing_count / total_rows if total_rows > 0 else 0.0
+    if missing_pattern is None:
+        missing_pattern = analyze_missing_pattern(df, column)
 
     profile = ColumnProfile(
         column=column,
-        dtype=str(col_data.dtype),
+        dtype=column_stats.dtype,
         total_rows=total_rows,
-        missing_count=missing_count,
+        missing_count=column_stats.missing_count,
         missing_ratio=missing_ratio,
         missing_pattern=missing_pattern,
-        unique_count=unique_count,
-        is_numeric=is_numeric,
+        unique_count=column_stats.unique_count,
+        is_numeric=column_stats.is_numeric,
     )
 
-    if is_numeric:
-        clean_data = col_data.dropna()
-        if len(clean_data) > 0:
-            profile.mean = float(clean_data.mean())
-            profile.median = float(clean_data.median())
-            std_val = clean_data.std()
-            profile.std = float(std_val) if std_val is not None else 0.0
-            profile.skewness = float(clean_data.skew())  # type: ignore[arg-type]
-            profile.kurtosis = float(clean_data.kurtosis())  # type: ignore[arg-type]
-
-            outlier_pattern, outlier_count, bounds = analyze_outlier_pattern(clean_data)
+    if column_stats.is_numeric:
+        if column_stats.count > 0:
+            profile.mean = column_stats.mean
+            profile.median = column_stats.median
+            profile.std = column_stats.std
+            profile.skewness = column_stats.skewness
+            profile.kurtosis = column_stats.kurtosis
+
+            outlier_pattern, outlier_count, bounds = _outlier_pattern_from_stats(column_stats)
             profile.outlier_count = outlier_count
-            profile.outlier_ratio = outlier_count / len(clean_data)
+            profile.outlier_ratio = outlier_count / column_stats.count
             profile.outlier_pattern = outlier_pattern
             profile.outlier_bounds = bounds
     else:
-        # 分类列：计算众数
-        mode_series = col_data.mode(dropna=True)
-        if len(mode_series) > 0:
-            profile.mode = mode_series.iloc[0]
-            profile.mode_freq = int((col_data == profile.mode).sum())
+        # 分类列：众数
+        profile.mode = column_stats.mode
+        profile.mode_freq = column_stats.mode_freq
 
     return profile
 
@@ -311,18 +453,26 @@ def generate_cleaning_recommendation(profile: ColumnProfile) -> CleaningRecommen
     )
 
 
-def analyze_dataset_features(df: pd.DataFrame) -> dict[str, Any]:
+def analyze_dataset_features(
+    df: pd.DataFrame, *, profile: DatasetProfile | None = None
+) -> dict[str, Any]:
     """分析整个数据集的特征。
 
-    返回包含各列特征分析的字典。
+    返回包含各列特征分析的字典。``profile`` 为 ``profile_dataframe`` 的结果，
+    未提供时在此计算一次。
     """
+    if profile is None:
+        profile = profile_dataframe(df)
+    missing_patterns = analyze_missing_patterns(df)
     profiles = {}
     for column in df.columns:
-        profiles[column] = analyze_column_profile(df, column)
+        profiles[column] = analyze_column_profile(
+            df, column, missing_pattern=missing_patterns[column], column_stats=profile[column]
+        )
 
     # 计算数据集整体统计
     total_cells = df.size
-    missing_cells = df.isna().sum().sum()
+    missing_cells = profile.missing_cells
     numeric_cols = df.select_dtypes(include="number").columns.tolist()
 
     return {
@@ -334,20 +484,23 @@ def analyze_dataset_features(df: pd.DataFrame) -> dict[str, Any]:
         "numeric_columns": len(numeric_cols),
         "categorical_columns": len(df.columns) - len(numeric_cols),
         "column_profiles": profiles,
+        "quantiles_sampled": profile.sampled,
     }
 
 
-def recommend_cleaning_strategy(df: pd.DataFrame) -> dict[str, Any]:
+def recommend_cleaning_strategy(
+    df: pd.DataFrame, *, profile: DatasetProfile | None = None
+) -> dict[str, Any]:
     """为整个数据集推荐清洗策略。
 
     这是对外暴露的主要推荐函数。
     """
-    features = analyze_dataset_features(df)
+    features = analyze_dataset_features(df, profile=profile)
     profiles = features["column_profiles"]
 
     recommendations = {}
-    for column, profile in profiles.items():
-        recommendations[column] = generate_cleaning_recommendation(profile)
+    for column, column_profile in profiles.items():
+        recommendations[column] = generate_cleaning_recommendation(column_profile)
 
     # 生成整体策略建议
     high_priority_cols = [r.column for r in recommendations.values() if r.priority == "high"]
@@ -360,6 +513,7 @@ def recommend_cleaning_strategy(df: pd.DataFrame) -> dict[str, Any]:
             "columns_needing_attention": len(high_priority_cols) + len(medium_priority_cols),
             "total_columns": len(df.columns),
             "dataset_missing_ratio": features["missing_ratio"],
+            "quantiles_sampled": features["quantiles_sampled"],
         },
     }
 
@@ -402,6 +556,14 @@ def recommend_cleaning_strategy(df: pd.DataFrame) -> dict[str, Any]:
     }
 
 
+def _nonzero_iqr_bounds(column_stats: ColumnStats) -> tuple[float, float] | None:
+    """IQR 边界；IQR 为 0 或无法计算时返回 None（不做异常值处理）。"""
+    iqr = column_stats.iqr
+    if iqr is None or pd.isna(iqr) or iqr == 0:
+        return None
+    return column_stats.iqr_bounds
+
+
 def _safe_preview(df: pd.DataFrame, n_rows: int = 20) -> dict[str, Any]:
     """生成 DataFrame 的安全预览。
 
@@ -609,22 +771,15 @@ class CleanDataTool(Tool):
         numeric_cols = df.select_dtypes(include="number").columns.tolist()
         non_numeric_cols = [c for c in df.columns if c not in numeric_cols]
 
-        if strategy == "mean":
+        if strategy in {"mean", "median"}:
+            profile = profile_dataframe(df, allow_sampling=False)
             for col in numeric_cols:
-                df[col] = df[col].fillna(df[col].mean())
+                fill = profile[col].mean if strategy == "mean" else profile[col].median
+                if fill is not None:
+                    df[col] = df[col].fillna(fill)
             for col in non_numeric_cols:
-                mode = df[col].mode(dropna=True)
-                if len(mode) > 0:
-                    df[col] = df[col].fillna(mode.iloc[0])
-            return
-
-        if strategy == "median":
-            for col in numeric_cols:
-                df[col] = df[col].fillna(df[col].median())
-            for col in non_numeric_cols:
-                mode = df[col].mode(dropna=True)
-                if len(mode) > 0:
-                    df[col] = df[col].fillna(mode.iloc[0])
+                if profile[col].mode_freq > 0:
+                    df[col] = df[col].fillna(profile[col].mode)
             return
 
         if strategy == "mode":
@@ -650,24 +805,21 @@ class CleanDataTool(Tool):
 
         before = len(df)
         mask = pd.Series([True] * len(df), index=df.index)
+        profile = profile_dataframe(df, numeric_cols, allow_sampling=False)
 
         if method == "iqr":
             for col in numeric_cols:
-                q1 = df[col].quantile(0.25)
-                q3 = df[col].quantile(0.75)
-                iqr = q3 - q1
-                if pd.isna(iqr) or iqr == 0:
+                bounds = _nonzero_iqr_bounds(profile[col])
+                if bounds is None:
                     continue
-                low = q1 - 1.5 * iqr
-                high = q3 + 1.5 * iqr
-                mask &= df[col].between(low, high) | df[col].isna()
+                mask &= df[col].between(*bounds) | df[col].isna()
 
         if method == "zscore":
             for col in numeric_cols:
-                std = df[col].std()
-                if pd.isna(std) or std == 0:
+                mean, std = profile[col].mean, profile[col].std
+                if mean is None or std is None or pd.isna(std) or std == 0:
                     continue
-                z = (df[col] - df[col].mean()) / std
+                z = (df[col] - mean) / std
                 mask &= z.abs().le(threshold) | df[col].isna()
 
         filtered = df[mask].copy()
@@ -748,40 +900,32 @@ class CleanDataTool(Tool):
         numeric_cols = df.select_dtypes(include="number").columns.tolist()
         before = len(df)
         mask = pd.Series([True] * len(df), index=df.index)
+        targets = [
+            col
+            for col in numeric_cols
+            if col in recs and recs[col].get("outlier_strategy", "none") != "none"
+        ]
+        profile = profile_dataframe(df, targets, allow_sampling=False)
 
-        for col in numeric_cols:
-            if col not in recs or col not in df.columns:
-                continue
-
+        for col in targets:
             strategy = recs[col].get("outlier_strategy", "none")
-            if strategy == "none":
-                continue
-
             if strategy == "iqr":
-                q1 = df[col].quantile(0.25)
-                q3 = df[col].quantile(0.75)
-                iqr = q3 - q1
-                if pd.isna(iqr) or iqr == 0:
+                bounds = _nonzero_iqr_bounds(profile[col])
+                if bounds is None:
                     continue
-                low = q1 - 1.5 * iqr
-                high = q3 + 1.5 * iqr
-                mask &= df[col].between(low, high) | df[col].isna()
+                mask &= df[col].between(*bounds) | df[col].isna()
             elif strategy == "zscore":
-                std = df[col].std()
-                if pd.isna(std) or std == 0:
+                mean, std = profile[col].mean, profile[col].std
+                if mean is None or std is None or pd.isna(std) or std == 0:
                     continue
-                z = (df[col] - df[col].mean()) / std
+                z = (df[col] - mean) / std
                 mask &= z.abs().le(3.0) | df[col].isna()
             elif strategy == "winsorize":
                 # 缩尾处理：将异常值替换为边界值
-                q1 = df[col].quantile(0.25)
-                q3 = df[col].quantile(0.75)
-                iqr = q3 - q1
-                if pd.isna(iqr) or iqr == 0:
+                bounds = _nonzero_iqr_bounds(profile[col])
+                if bounds is None:
                     continue
-                low = q1 - 1.5 * iqr
-                high = q3 + 1.5 * iqr
-                df[col] = df[col].clip(lower=low, upper=high)
+                df[col] = df[col].clip(lower=bounds[0], upper=bounds[1])
 
         if before > 0:
             filtered = df[mask].copy()
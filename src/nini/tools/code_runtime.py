@@ -14,6 +14,7 @@ import pandas as pd
 
 from nini.agent.session import Session
 from nini.charts import build_style_spec
+from nini.charts.render_service import RenderJob, get_chart_render_service
 from nini.config import settings
 from nini.memory.storage import ArtifactStorage
 from nini.models import ResourceType
@@ -271,26 +272,32 @@ def _save_python_figures(
         export_timeout = settings.sandbox_image_export_timeout
         try:
             import json as json_mod
-            import plotly.graph_objects as go
 
-            fig = go.Figure(json_mod.loads(normalized_plotly_json))
-            apply_plotly_cjk_font_fallback(fig)
+            figure_dict = json_mod.loads(normalized_plotly_json)
             export_formats = [
                 fmt for fmt in style_spec.export_formats if fmt in {"pdf", "svg", "png"}
             ] or ["pdf", "svg", "png"]
-            for fmt in export_formats:
+            # 所有格式一次性提交给常驻渲染服务，命中内容哈希缓存的格式不再重复渲染
+            render_jobs = [
+                RenderJob(
+                    figure=figure_dict,
+                    format=fmt,
+                    width=1200,
+                    height=800,
+                    scale=max(1, int(style_spec.dpi / 150)),
+                    style_key=style_spec.style_key,
+                )
+                for fmt in export_formats
+            ]
+            rendered = get_chart_render_service().render_many_sync(
+                render_jobs, timeout=export_timeout
+            )
+            for fmt, image_bytes in zip(export_formats, rendered):
+                if isinstance(image_bytes, BaseException):
+                    raise image_bytes
                 img_name = f"{base_name}.{fmt}"
                 img_path = storage.get_path(img_name)
-                with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
-                    future = pool.submit(
-                        fig.write_image,
-                        str(img_path),
-                        format=fmt,
-                        width=1200,
-                        height=800,
-                        scale=max(1, int(style_spec.dpi / 150)),
-                    )
-                    future.result(timeout=export_timeout)
+                img_path.write_bytes(image_bytes)
                 record = ws.add_artifact_record(
                     name=img_name,
                     artifact_type="chart",
@@ -0,0 +1,305 @@
+"""列式数据画像：按 dtype 块批量计算清洗推荐与质量评分共用的列统计量。
+
+逐列调用 ``mean/median/std/skew/kurtosis/quantile/mode/nunique`` 时，每个统计量都会各自
+``dropna`` 并扫描一遍整列。本模块把数值列按列块转换为 ``(列数, 行数)`` 的 float64 矩阵：
+
+- 一次中心化得到计数、均值、标准差、偏度、峰度（公式与 pandas ``nanops`` 一致）；
+- 一次按行排序得到四分位数（与 numpy ``method="linear"`` 逐位一致）、唯一值个数，
+  再向量化统计 IQR 越界个数；
+- 非数值列各做一次 ``value_counts``，同时得到唯一值个数、众数与众数频次。
+
+行数超过 ``settings.data_profile_exact_max_rows`` 时，四分位数改在固定种子的均匀抽样行上
+估计（``DatasetProfile.sampled`` 为 True）；矩、缺失数、唯一值个数以及按估计边界统计的
+异常值个数仍基于全量数据。会修改数据的清洗操作应传 ``allow_sampling=False``。
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+# 每个数值列块的元素上限（float64，约 128 MB），控制排序副本的峰值内存
+_CHUNK_ELEMENTS = 1 << 24
+_SAMPLE_SEED = 0
+# IQR 判定所需的最少有效值个数
+MIN_IQR_COUNT = 4
+
+
+@dataclass
+class ColumnStats:
+    """单列统计量；数值字段仅对数值列有效，众数字段仅对非数值列有效。"""
+
+    column: str
+    dtype: str
+    is_numeric: bool
+    count: int  # 非缺失值个数
+    missing_count: int
+    unique_count: int
+    mean: float | None = None
+    std: float | None = None  # ddof=1，与 ``Series.std`` 一致
+    skewness: float | None = None
+    kurtosis: float | None = None
+    min: float | None = None
+    max: float | None = None
+    q1: float | None = None
+    median: float | None = None
+    q3: float | None = None
+    # 落在 [q1 - 1.5·IQR, q3 + 1.5·IQR] 之外的个数；IQR 为 0 时同样按该边界统计，
+    # 有效值少于 ``MIN_IQR_COUNT`` 时为 0
+    iqr_outlier_count: int = 0
+    mode: Any | None = None
+    mode_freq: int = 0
+
+    @property
+    def iqr(self) -> float | None:
+        if self.q1 is None or self.q3 is None:
+            return None
+        return self.q3 - self.q1
+
+    @property
+    def iqr_bounds(self) -> tuple[float, float] | None:
+        iqr = self.iqr
+        if iqr is None or self.q1 is None or self.q3 is None:
+            return None
+        return self.q1 - 1.5 * iqr, self.q3 + 1.5 * iqr
+
+
+@dataclass
+class DatasetProfile:
+    """数据集画像：列名 -> ``ColumnStats``。"""
+
+    total_rows: int
+    columns: dict[str, ColumnStats] = field(default_factory=dict)
+    sampled: bool = False
+    sample_rows: int | None = None
+
+    def __getitem__(self, column: str) -> ColumnStats:
+        return self.columns[column]
+
+    def __contains__(self, column: object) -> bool:
+        return column in self.columns
+
+    @property
+    def missing_cells(self) -> int:
+        return sum(stats.missing_count for stats in self.columns.values())
+
+
+def is_profiled_numeric(series: pd.Series) -> bool:
+    """画像按数值列处理的 dtype；与 ``select_dtypes(include="number")`` 一致，不含布尔与复数。"""
+    return (
+        pd.api.types.is_numeric_dtype(series)
+        and not pd.api.types.is_bool_dtype(series)
+        and not pd.api.types.is_complex_dtype(series)
+    )
+
+
+def profile_dataframe(
+    df: pd.DataFrame,
+    columns: Iterable[str] | None = None,
+    *,
+    allow_sampling: bool = True,
+) -> DatasetProfile:
+    """计算 ``df`` 中各列（默认全部）的统计量。"""
+    from nini.config import settings
+
+    selected = list(df.columns) if columns is None else list(dict.fromkeys(columns))
+    total_rows = len(df)
+    profile = DatasetProfile(total_rows=total_rows)
+
+    sample_idx: np.ndarray | None = None
+    exact_max = int(settings.data_profile_exact_max_rows)
+    sample_rows = int(settings.data_profile_sample_rows)
+    if allow_sampling and 0 < exact_max < total_rows and 0 < sample_rows < total_rows:
+        rng = np.random.default_rng(_SAMPLE_SEED)
+        sample_idx = np.sort(rng.choice(total_rows, size=sample_rows, replace=False))
+        profile.sampled = True
+        profile.sample_rows = sample_rows
+
+    numeric = [col for col in selected if is_profiled_numeric(df[col])]
+    numeric_set = set(numeric)
+    per_chunk = max(1, _CHUNK_ELEMENTS // max(total_rows, 1))
+    for start in range(0, len(numeric), per_chunk):
+        chunk = numeric[start : start + per_chunk]
+        for stats in _profile_numeric_block(df, chunk, sample_idx):
+            profile.columns[stats.column] = stats
+
+    for col in selected:
+        if col not in numeric_set:
+            profile.columns[col] = _profile_categorical(col, df[col])
+
+    # 保持调用方给定的列顺序
+    profile.columns = {col: profile.columns[col] for col in selected}
+    return profile
+
+
+def profile_series(series: pd.Series, *, allow_sampling: bool = True) -> ColumnStats:
+    """单列画像（内部仍走批量路径）。"""
+    name = str(series.name) if series.name is not None else "value"
+    frame = series.to_frame(name=name)
+    return profile_dataframe(frame, allow_sampling=allow_sampling)[name]
+
+
+def _profile_numeric_block(
+    df: pd.DataFrame, columns: list[str], sample_idx: np.ndarray | None
+) -> list[ColumnStats]:
+    n_rows = len(df)
+    # 每行一列，行内连续：逐列归约走 numpy 成对求和，与单列 Series 运算一致
+    values = np.ascontiguousarray(
+        df[columns].to_numpy(dtype=np.float64, na_value=np.nan).T.reshape(len(columns), n_rows)
+    )
+    mask = np.isnan(values)
+    count = n_rows - mask.sum(axis=1)
+    filled = np.where(mask, 0.0, values)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = filled.sum(axis=1, dtype=np.float64) / count
+        adjusted = filled - mean[:, None]
+        np.putmask(adjusted, mask, 0.0)
+        adjusted2 = adjusted**2
+        m2 = adjusted2.sum(axis=1, dtype=np.float64)
+        m3 = (adjusted2 * adjusted).sum(axis=1, dtype=np.float64)
+        m4 = (adjusted2**2).sum(axis=1, dtype=np.float64)
+        std = np.sqrt(np.where(count > 1, m2 / (count - 1), np.nan))
+        skewness, kurtosis = _skew_kurt(filled, count, m2, m3, m4)
+        col_min = np.fmin.reduce(values, axis=1, initial=np.inf, where=~mask)
+        col_max = np.fmax.reduce(values, axis=1, initial=-np.inf, where=~mask)
+    del adjusted, adjusted2, filled
+
+    if sample_idx is None:
+        ordered = np.sort(values, axis=1)
+        ordered_count = count
+        unique_count = _sorted_unique_counts(ordered, count)
+    else:
+        ordered = np.sort(values[:, sample_idx], axis=1)
+        ordered_count = ordered.shape[1] - np.isnan(ordered).sum(axis=1)
+        unique_count = df[columns].nunique(dropna=True).to_numpy()
+    q1, median, q3 = (_linear_quantile(ordered, ordered_count, q) for q in (0.25, 0.5, 0.75))
+    del ordered
+
+    iqr = q3 - q1
+    lower = q1 - 1.5 * iqr
+    upper = q3 + 1.5 * iqr
+    with np.errstate(invalid="ignore"):
+        outliers = ((values < lower[:, None]) | (values > upper[:, None])).sum(axis=1)
+    outliers = np.where(count >= MIN_IQR_COUNT, outliers, 0)
+
+    result: list[ColumnStats] = []
+    for j, col in enumerate(columns):
+        n = int(count[j])
+        stats = ColumnStats(
+            column=col,
+            dtype=str(df[col].dtype),
+            is_numeric=True,
+            count=n,
+            missing_count=n_rows - n,
+            unique_count=int(unique_count[j]),
+        )
+        if n > 0:
+            stats.mean = float(mean[j])
+            stats.std = float(std[j])
+            stats.skewness = float(skewness[j])
+            stats.kurtosis = float(kurtosis[j])
+            stats.min = float(col_min[j])
+            stats.max = float(col_max[j])
+        if ordered_count[j] > 0:
+            stats.q1 = float(q1[j])
+            stats.median = float(median[j])
+            stats.q3 = float(q3[j])
+            stats.iqr_outlier_count = int(outliers[j])
+        result.append(stats)
+    return result
+
+
+def _skew_kurt(
+    filled: np.ndarray, count: np.ndarray, m2: np.ndarray, m3: np.ndarray, m4: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """偏度与超额峰度（无偏修正），浮点误差处理同 pandas ``nanskew``/``nankurt``。"""
+    count = count.astype(np.float64)
+    max_abs = np.abs(filled).max(axis=1, initial=0.0)
+    eps = np.finfo(np.float64).eps
+    m2 = np.where(np.abs(m2) < ((eps * max_abs) ** 2) * count, 0.0, m2)
+    m3 = np.where(np.abs(m3) < ((eps * max_abs) ** 3) * count, 0.0, m3)
+    m4 = np.where(np.abs(m4) < ((eps * max_abs) ** 4) * count, 0.0, m4)
+
+    skewness = (count * (count - 1) ** 0.5 / (count - 2)) * (m3 / m2**1.5)
+    skewness = np.where(m2 == 0, 0.0, skewness)
+    skewness[count < 3] = np.nan
+
+    adj = 3 * (count - 1) ** 2 / ((count - 2) * (count - 3))
+    numerator = count * (count + 1) * (count - 1) * m4
+    denominator = (count - 2) * (count - 3) * m2**2
+    kurtosis = numerator / denominator - adj
+    kurtosis = np.where(denominator == 0, 0.0, kurtosis)
+    kurtosis[count < 4] = np.nan
+    return skewness, kurtosis
+
+
+def _linear_quantile(ordered: np.ndarray, count: np.ndarray, q: float) -> np.ndarray:
+    """numpy ``method="linear"`` 分位数；``ordered`` 每行升序且 NaN 位于行尾。"""
+    result = np.full(len(count), np.nan)
+    rows = np.flatnonzero(count > 0)
+    if rows.size == 0:
+        return result
+    n = count[rows]
+    virtual = n * q + (1 - q) - 1
+    previous = np.floor(virtual).astype(np.intp)
+    following = previous + 1
+    at_end = virtual >= n - 1
+    previous[at_end] = n[at_end] - 1
+    following[at_end] = n[at_end] - 1
+    gamma = virtual - np.floor(virtual)
+    a = ordered[rows, previous]
+    b = ordered[rows, following]
+    diff = b - a
+    with np.errstate(invalid="ignore"):
+        values = a + diff * gamma
+        high = gamma >= 0.5
+        values[high] = (b - diff * (1 - gamma))[high]
+    result[rows] = values
+    return result
+
+
+def _sorted_unique_counts(ordered: np.ndarray, count: np.ndarray) -> np.ndarray:
+    if ordered.shape[1] < 2:
+        return (count > 0).astype(np.int64)
+    changes = ordered[:, 1:] != ordered[:, :-1]
+    valid = np.arange(ordered.shape[1] - 1)[None, :] < (count - 1)[:, None]
+    unique: np.ndarray = (changes & valid).sum(axis=1) + (count > 0)
+    return unique
+
+
+def _profile_categorical(column: str, series: pd.Series) -> ColumnStats:
+    missing = int(series.isna().sum())
+    counts = series.value_counts(dropna=True, sort=False)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        counts = counts[counts > 0]
+    stats = ColumnStats(
+        column=column,
+        dtype=str(series.dtype),
+        is_numeric=False,
+        count=len(series) - missing,
+        missing_count=missing,
+        unique_count=len(counts),
+    )
+    if len(counts) == 0:
+        return stats
+    freq = counts.to_numpy()
+    top = int(freq.max())
+    ties = counts.index[freq == top]
+    stats.mode_freq = top
+    if len(ties) == 1:
+        stats.mode = ties[0]
+    elif isinstance(series.dtype, pd.CategoricalDtype):
+        # 分类 dtype 的众数按类别顺序取第一个
+        stats.mode = series.mode(dropna=True).iloc[0]
+    else:
+        # 与 ``Series.mode`` 一致：并列时取排序后的第一个，不可排序时按出现顺序
+        try:
+            stats.mode = min(ties)
+        except TypeError:
+            stats.mode = ties[0]
+    return stats
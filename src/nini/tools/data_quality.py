@@ -16,6 +16,7 @@ from scipy import stats
 
 from nini.agent.session import Session
 from nini.tools.base import Tool, ToolResult
+from nini.tools.column_profiler import MIN_IQR_COUNT, DatasetProfile, profile_dataframe
 
 
 class QualityDimension(Enum):
@@ -77,20 +78,27 @@ class QualityReport:
 # ---- 质量评分算法 ----
 
 
-def calculate_completeness_score(df: pd.DataFrame) -> DimensionScore:
+def calculate_completeness_score(
+    df: pd.DataFrame, profile: DatasetProfile | None = None
+) -> DimensionScore:
     """计算完整性评分。
 
     评估数据集中缺失值的情况。
     """
+    missing_by_column: dict[Any, int]
+    if profile is not None:
+        missing_by_column = {col: profile[col].missing_count for col in df.columns}
+    else:
+        missing_by_column = {col: int(count) for col, count in df.isna().sum().items()}
     total_cells = df.size
-    missing_cells = df.isna().sum().sum()
+    missing_cells = sum(missing_by_column.values())
     completeness_ratio = (total_cells - missing_cells) / total_cells if total_cells > 0 else 1.0
 
     # 按列统计缺失情况
     column_missing = {}
     high_missing_columns = []
     for col in df.columns:
-        col_missing = df[col].isna().sum()
+        col_missing = missing_by_column[col]
         col_ratio = col_missing / len(df) if len(df) > 0 else 0
         column_missing[col] = {
             "missing_count": int(col_missing),
@@ -203,36 +211,35 @@ def calculate_consistency_score(df: pd.DataFrame) -> DimensionScore:
     )
 
 
-def calculate_accuracy_score(df: pd.DataFrame) -> DimensionScore:
+def calculate_accuracy_score(
+    df: pd.DataFrame, profile: DatasetProfile | None = None
+) -> DimensionScore:
     """计算准确性评分。
 
     评估异常值、离群点等情况。
     """
+    numeric_cols = df.select_dtypes(include=[np.number]).columns
+    if profile is None:
+        profile = profile_dataframe(df, numeric_cols)
     issues = []
     suggestions = []
     total_outliers = 0
     outlier_columns = []
 
-    # 检查数值列的异常值
-    for col in df.select_dtypes(include=[np.number]).columns:
-        series = df[col].dropna()
-        if len(series) < 4:
+    # 检查数值列的异常值（IQR 方法，边界与越界计数由画像批量给出）
+    for col in numeric_cols:
+        col_stats = profile[col]
+        if col_stats.count < MIN_IQR_COUNT:
             continue
 
-        Q1 = series.quantile(0.25)
-        Q3 = series.quantile(0.75)
-        IQR = Q3 - Q1
-        lower_bound = Q1 - 1.5 * IQR
-        upper_bound = Q3 + 1.5 * IQR
-
-        outliers = series[(series < lower_bound) | (series > upper_bound)]
-        if len(outliers) > 0:
-            total_outliers += len(outliers)
-            outlier_ratio = len(outliers) / len(series)
+        outlier_count = col_stats.iqr_outlier_count
+        if outlier_count > 0:
+            total_outliers += outlier_count
+            outlier_ratio = outlier_count / col_stats.count
             outlier_columns.append(
                 {
                     "column": col,
-                    "outlier_count": len(outliers),
+                    "outlier_count": outlier_count,
                     "outlier_ratio": round(outlier_ratio, 4),
                 }
             )
@@ -248,9 +255,7 @@ def calculate_accuracy_score(df: pd.DataFrame) -> DimensionScore:
                 )
 
     # 计算评分
-    total_numeric_cells = sum(
-        len(df[col].dropna()) for col in df.select_dtypes(include=[np.number]).columns
-    )
+    total_numeric_cells = sum(profile[col].count for col in numeric_cols)
 
     if total_numeric_cells > 0:
         outlier_ratio = total_outliers / total_numeric_cells
@@ -279,29 +284,35 @@ def calculate_accuracy_score(df: pd.DataFrame) -> DimensionScore:
     )
 
 
-def calculate_validity_score(df: pd.DataFrame) -> DimensionScore:
+def calculate_validity_score(
+    df: pd.DataFrame, profile: DatasetProfile | None = None
+) -> DimensionScore:
     """计算有效性评分。
 
     评估数据是否符合预期的范围和格式。
     """
+    numeric_cols = df.select_dtypes(include=[np.number]).columns
+    if profile is None:
+        profile = profile_dataframe(df, numeric_cols)
     issues = []
     suggestions = []
     invalid_count = 0
 
     # 检查数值列的范围有效性
     range_issues = []
-    for col in df.select_dtypes(include=[np.number]).columns:
-        series = df[col].dropna()
-        if len(series) == 0:
+    for col in numeric_cols:
+        col_stats = profile[col]
+        if col_stats.count == 0 or col_stats.min is None or col_stats.max is None:
             continue
 
         # 检查极端值（可能是数据录入错误）
-        min_val = series.min()
-        max_val = series.max()
+        min_val = col_stats.min
+        max_val = col_stats.max
 
         # 检测可能的无效值（如负数年龄、超过合理范围的值等）
         if col.lower() in ["age", "年龄"] and (min_val < 0 or max_val > 150):
-            invalid_count += len(series[(series < 0) | (series > 150)])
+            series = df[col]
+            invalid_count += int(((series < 0) | (series > 150)).sum())
             range_issues.append(
                 {
                     "column": col,
@@ -368,7 +379,9 @@ def calculate_validity_score(df: pd.DataFrame) -> DimensionScore:
     )
 
 
-def calculate_uniqueness_score(df: pd.DataFrame) -> DimensionScore:
+def calculate_uniqueness_score(
+    df: pd.DataFrame, profile: DatasetProfile | None = None
+) -> DimensionScore:
     """计算唯一性评分。
 
     评估重复数据的情况。
@@ -382,8 +395,12 @@ def calculate_uniqueness_score(df: pd.DataFrame) -> DimensionScore:
     id_column_issues = []
     for col in df.columns:
         if any(keyword in col.lower() for keyword in ["id", "编号", "code", "代码", "key"]):
-            unique_count = df[col].nunique()
-            total_count = len(df[col].dropna())
+            if profile is not None and col in profile:
+                unique_count = profile[col].unique_count
+                total_count = profile[col].count
+            else:
+                unique_count = df[col].nunique()
+                total_count = len(df[col].dropna())
             if unique_count < total_count:
                 id_column_issues.append(
                     {
@@ -482,23 +499,29 @@ def generate_quality_summary(report: QualityReport) -> dict[str, Any]:
     }
 
 
-def evaluate_data_quality(df: pd.DataFrame, dataset_name: str) -> QualityReport:
+def evaluate_data_quality(
+    df: pd.DataFrame, dataset_name: str, *, profile: DatasetProfile | None = None
+) -> QualityReport:
     """评估数据质量并生成完整报告。
 
     Args:
         df: 要评估的数据集
         dataset_name: 数据集名称
+        profile: ``profile_dataframe(df)`` 的结果；未提供时在此计算一次，各维度共用
 
     Returns:
         QualityReport 对象
     """
+    if profile is None:
+        profile = profile_dataframe(df)
+
     # 计算各维度评分
     dimension_scores = [
-        calculate_completeness_score(df),
+        calculate_completeness_score(df, profile),
         calculate_consistency_score(df),
-        calculate_accuracy_score(df),
-        calculate_validity_score(df),
-        calculate_uniqueness_score(df),
+        calculate_accuracy_score(df, profile),
+        calculate_validity_score(df, profile),
+        calculate_uniqueness_score(df, profile),
     ]
 
     # 计算综合评分
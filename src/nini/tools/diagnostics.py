@@ -9,9 +9,10 @@ import logging
 from dataclasses import dataclass, field
 from typing import TYPE_CHECKING, Any
 
-import numpy as np
 import pandas as pd
 
+from nini.tools.column_profiler import MIN_IQR_COUNT, ColumnStats, profile_dataframe
+
 if TYPE_CHECKING:
     from nini.agent.session import Session
 
@@ -106,12 +107,17 @@ class DataDiagnostics:
             )
             return result
 
+        columns_to_analyze = [target_column] if target_column else df.columns.tolist()
+        columns_to_analyze = [col for col in columns_to_analyze if col in df.columns]
+        # 列统计一次算出，质量评分与逐列检查共用
+        profile = profile_dataframe(df if self.include_quality_score else df[columns_to_analyze])
+
         # 集成质量评分
         if self.include_quality_score:
             try:
                 from nini.tools.data_quality import evaluate_data_quality
 
-                quality_report = evaluate_data_quality(df, dataset_name)
+                quality_report = evaluate_data_quality(df, dataset_name, profile=profile)
                 result.quality_score = {
                     "overall_score": round(quality_report.overall_score, 2),
                     "grade": quality_report.summary.get("grade", "未知"),
@@ -134,21 +140,17 @@ class DataDiagnostics:
                 logger.warning("质量评分计算失败: %s", e)
 
         # 分析列
-        columns_to_analyze = [target_column] if target_column else df.columns.tolist()
-
         for col in columns_to_analyze:
-            if col not in df.columns:
-                continue
-
             col_data = df[col]
+            col_stats = profile[col]
 
             # 检查缺失值
-            self._check_missing_values(result, col, col_data)
+            self._check_missing_values(result, col, col_stats)
 
             # 检查数据类型（仅对数值列）
             if pd.api.types.is_numeric_dtype(col_data):
-                self._check_outliers(result, col, col_data)
-                self._check_sample_size(result, col, col_data)
+                self._check_outliers(result, col, col_data, col_stats)
+                self._check_sample_size(result, col, col_stats)
             else:
                 self._check_type_conversion(result, col, col_data)
 
@@ -158,12 +160,12 @@ class DataDiagnostics:
         self,
         result: DiagnosisResult,
         col: str,
-        col_data: pd.Series,
+        col_stats: ColumnStats,
     ) -> None:
         """检查缺失值问题。"""
-        missing_count = col_data.isna().sum()
+        missing_count = col_stats.missing_count
         if missing_count > 0:
-            missing_ratio = missing_count / len(col_data)
+            missing_ratio = missing_count / (col_stats.count + missing_count)
             result.metadata.setdefault("missing_values", {})
             result.metadata["missing_values"][col] = {
                 "count": int(missing_count),
@@ -202,34 +204,31 @@ class DataDiagnostics:
         result: DiagnosisResult,
         col: str,
         col_data: pd.Series,
+        col_stats: ColumnStats,
     ) -> None:
         """检查异常值问题（使用 IQR 方法）。"""
-        clean_data = col_data.dropna()
-        if len(clean_data) < 4:
+        bounds = col_stats.iqr_bounds
+        if col_stats.count < MIN_IQR_COUNT or bounds is None:
             return
 
-        Q1 = clean_data.quantile(0.25)
-        Q3 = clean_data.quantile(0.75)
-        IQR = Q3 - Q1
-        lower_bound = Q1 - 1.5 * IQR
-        upper_bound = Q3 + 1.5 * IQR
-
-        outliers = clean_data[(clean_data < lower_bound) | (clean_data > upper_bound)]
-        if len(outliers) > 0:
+        outlier_count = col_stats.iqr_outlier_count
+        if outlier_count > 0:
+            lower_bound, upper_bound = bounds
+            outliers = col_data[(col_data < lower_bound) | (col_data > upper_bound)]
             result.metadata.setdefault("outliers", {})
             result.metadata["outliers"][col] = {
-                "count": len(outliers),
-                "values": outliers.tolist()[:10],  # 最多返回 10 个
+                "count": outlier_count,
+                "values": outliers.iloc[:10].tolist(),  # 最多返回 10 个
             }
 
-            if len(outliers) > len(clean_data) * 0.05:
+            if outlier_count > col_stats.count * 0.05:
                 result.suggestions.append(
                     DataIssue(
                         type="outliers",
                         severity="medium",
-                        message=f"列 '{col}' 有 {len(outliers)} 个异常值，建议检查数据质量",
+                        message=f"列 '{col}' 有 {outlier_count} 个异常值，建议检查数据质量",
                         column=col,
-                        details={"count": len(outliers), "ratio": len(outliers) / len(clean_data)},
+                        details={"count": outlier_count, "ratio": outlier_count / col_stats.count},
                     )
                 )
 
@@ -237,24 +236,24 @@ class DataDiagnostics:
         self,
         result: DiagnosisResult,
         col: str,
-        col_data: pd.Series,
+        col_stats: ColumnStats,
     ) -> None:
         """检查样本量问题。"""
-        clean_data = col_data.dropna()
-        if len(clean_data) < 30:
+        count = col_stats.count
+        if count < 30:
             result.metadata.setdefault("sample_size", {})
             result.metadata["sample_size"][col] = {
-                "count": len(clean_data),
+                "count": count,
                 "warning": True,
             }
-            if len(clean_data) < 10:
+            if count < 10:
                 result.suggestions.append(
                     DataIssue(
                         type="sample_size",
                         severity="high",
-                        message=f"列 '{col}' 样本量过小（n={len(clean_data)}），统计结果可能不可靠",
+                        message=f"列 '{col}' 样本量过小（n={count}），统计结果可能不可靠",
                         column=col,
-                        details={"count": len(clean_data)},
+                        details={"count": count},
                     )
                 )
 
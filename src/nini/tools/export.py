@@ -10,6 +10,7 @@ from typing import Any
 import plotly.graph_objects as go
 
 from nini.agent.session import Session
+from nini.charts.render_service import RenderJob, get_chart_render_service
 from nini.config import settings
 from nini.memory.storage import ArtifactStorage
 from nini.tools.base import Tool, ToolResult
@@ -134,17 +135,17 @@ class ExportChartTool(Tool):
             # kaleido 图片导出：在线程池中执行并施加超时保护
             export_timeout = settings.sandbox_image_export_timeout
             try:
-                await asyncio.wait_for(
-                    asyncio.to_thread(
-                        fig.write_image,
-                        str(path),
+                image_bytes = await get_chart_render_service().render(
+                    RenderJob(
+                        figure=fig.to_plotly_json(),
+                        format=fmt,
                         width=width,
                         height=height,
                         scale=scale,
-                        format=fmt,
                     ),
                     timeout=export_timeout,
                 )
+                path.write_bytes(image_bytes)
             except asyncio.TimeoutError:
                 logger.warning(
                     "图片导出超时（%ds），格式=%s，尺寸=%dx%d scale=%.1f",
@@ -239,19 +240,20 @@ class ExportChartTool(Tool):
     ) -> bool | None:
         """降级尝试：使用更小的尺寸导出图片。"""
         try:
-            return await asyncio.wait_for(
-                asyncio.to_thread(
-                    fig.write_image,
-                    str(path),
+            image_bytes = await get_chart_render_service().render(
+                RenderJob(
+                    figure=fig.to_plotly_json(),
+                    format=fmt,
                     width=800,
                     height=600,
                     scale=1,
-                    format=fmt,
                 ),
                 timeout=timeout,
             )
         except Exception:
             return None
+        path.write_bytes(image_bytes)
+        return True
 
     def _build_result(
         self,
@@ -4,6 +4,8 @@ from __future__ import annotations
 
 import asyncio
 import base64
+import hashlib
+import importlib.metadata
 import json
 import logging
 import os
@@ -11,16 +13,20 @@ import re
 import subprocess
 import sys
 import tempfile
+import threading
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Awaitable, Callable, TypeVar, cast
 from urllib.parse import unquote, urlsplit
 
 from nini.agent.session import Session
+from nini.charts.render_service import RenderJob, get_chart_render_service
 from nini.config import settings
 from nini.memory.storage import ArtifactStorage
 from nini.tools.base import Tool, ToolResult
-from nini.utils.chart_fonts import CJK_FONT_FAMILY, apply_plotly_cjk_font_fallback
+from nini.utils.chart_fonts import CJK_FONT_FAMILY
 from nini.workspace import WorkspaceManager
 
 logger = logging.getLogger(__name__)
@@ -418,16 +424,15 @@ def _normalize_plotly_figure_payload(chart_data: Any) -> dict[str, Any] | None:
 def _plotly_json_to_png_bytes(json_path: Path) -> tuple[bytes | None, str | None]:
     """将 Plotly JSON 文件转换为 PNG 字节。失败时返回错误原因。"""
     try:
-        import plotly.graph_objects as go
-
         raw_chart_data = json.loads(json_path.read_text(encoding="utf-8"))
         chart_data = _normalize_plotly_figure_payload(raw_chart_data)
         if chart_data is None:
             logger.debug("Plotly JSON 结构无法识别 (%s)", json_path.name)
             return None, "Plotly JSON 结构无法识别"
-        fig = go.Figure(chart_data)
-        apply_plotly_cjk_font_fallback(fig)
-        png_data: bytes = fig.to_image(format="png", width=1400, height=900, scale=2)  # type: ignore[assignment]
+        png_data = get_chart_render_service().render_sync(
+            RenderJob(figure=chart_data, format="png", width=1400, height=900, scale=2),
+            timeout=max(float(settings.plotly_export_timeout), 1.0),
+        )
         return png_data, None
     except Exception as exc:
         logger.debug("Plotly PNG 转换失败 (%s): %s", json_path.name, exc)
@@ -435,6 +440,176 @@ def _plotly_json_to_png_bytes(json_path: Path) -> tuple[bytes | None, str | None
         return None, error_text
 
 
+_IMAGE_MIME_MAP = {
+    "png": "image/png",
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "gif": "image/gif",
+    "svg": "image/svg+xml",
+    "webp": "image/webp",
+}
+# 报告导出内联图片缓存上限（按 data URI 字符数计）
+_PREPARED_ASSET_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Plotly 转 PNG 的渲染参数，参与导出缓存键
+_PLOTLY_EXPORT_RENDER_TAG = "plotly-png:1400x900@2"
+# 每个会话保留的导出产物缓存份数
+_EXPORT_CACHE_MAX_ENTRIES = 16
+
+
+@dataclass(frozen=True)
+class _ImageReference:
+    """HTML 中引用的一张工作区图片。``path`` 为 None 表示路径越界。"""
+
+    name: str
+    path: Path | None
+    is_plotly: bool
+
+
+class _PreparedAssetCache:
+    """按 (路径, mtime, 大小) 缓存图片的内容哈希与 base64 data URI。
+
+    报告反复导出时，未改动的图片无需重新读取与编码；Plotly 图表的 PNG
+    由图表渲染服务按图表内容缓存，这里只记录源文件哈希。
+    """
+
+    def __init__(self, max_bytes: int = _PREPARED_ASSET_CACHE_MAX_BYTES) -> None:
+        self._max_bytes = max_bytes
+        self._entries: OrderedDict[tuple[str, int, int], tuple[str, str | None]] = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stat_key(path: Path) -> tuple[str, int, int]:
+        stat = path.stat()
+        return str(path), stat.st_mtime_ns, stat.st_size
+
+    def _get(self, key: tuple[str, int, int]) -> tuple[str, str | None] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _put(self, key: tuple[str, int, int], content_hash: str, data_uri: str | None) -> None:
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None and previous[1] is not None:
+                self._total_bytes -= len(previous[1])
+            self._entries[key] = (content_hash, data_uri)
+            if data_uri is not None:
+                self._total_bytes += len(data_uri)
+            while self._total_bytes > self._max_bytes and len(self._entries) > 1:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                if evicted is not None:
+                    self._total_bytes -= len(evicted)
+
+    def content_hash(self, path: Path) -> str:
+        key = self._stat_key(path)
+        entry = self._get(key)
+        if entry is not None:
+            return entry[0]
+        content_hash = hashlib.sha256(path.read_bytes()).hexdigest()
+        self._put(key, content_hash, None)
+        return content_hash
+
+    def data_uri(self, path: Path) -> str:
+        key = self._stat_key(path)
+        entry = self._get(key)
+        if entry is not None and entry[1] is not None:
+            return entry[1]
+        raw = path.read_bytes()
+        mime = _IMAGE_MIME_MAP.get(path.suffix.lower().lstrip("."), "application/octet-stream")
+        data_uri = f"data:{mime};base64,{base64.b64encode(raw).decode('ascii')}"
+        self._put(key, hashlib.sha256(raw).hexdigest(), data_uri)
+        return data_uri
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+
+_prepared_assets = _PreparedAssetCache()
+
+
+def _resolve_image_reference(src_url: str, session_id: str) -> _ImageReference | None:
+    """将 /api/artifacts/ 或 /api/workspace/ 图片 URL 映射到工作区文件。"""
+    workspace_dir = settings.sessions_dir / session_id / "workspace"
+    artifacts_dir = workspace_dir / "artifacts"
+    # 从 URL 提取工作区文件路径。
+    url_path = urlsplit(src_url).path
+    parts = url_path.strip("/").split("/")
+    if len(parts) < 4:
+        return None
+    if parts[0] == "api" and parts[1] == "artifacts":
+        encoded_name = "/".join(parts[3:])  # 支持子路径
+        decoded_name = unquote(encoded_name).lstrip("/")
+        base_dir = artifacts_dir
+    elif len(parts) >= 5 and parts[0] == "api" and parts[1] == "workspace" and parts[3] == "files":
+        encoded_name = "/".join(parts[4:])
+        decoded_name = unquote(encoded_name).lstrip("/")
+        base_dir = workspace_dir
+    else:
+        return None
+
+    file_path = (base_dir / decoded_name).resolve()
+    is_plotly_json = decoded_name.lower().endswith(".plotly.json")
+    # 安全兜底：防止构造路径逃逸到工作区外
+    try:
+        file_path.relative_to(base_dir.resolve())
+    except ValueError:
+        return _ImageReference(name=decoded_name, path=None, is_plotly=is_plotly_json)
+    return _ImageReference(name=decoded_name, path=file_path, is_plotly=is_plotly_json)
+
+
+def _collect_image_references(html: str, session_id: str) -> list[_ImageReference]:
+    """按出现顺序列出 HTML 中可识别的工作区图片引用。"""
+    references: list[_ImageReference] = []
+    for match in _IMG_SRC_PATTERN.finditer(html):
+        reference = _resolve_image_reference(match.group(3), session_id)
+        if reference is not None:
+            references.append(reference)
+    return references
+
+
+def _prepare_image_asset(reference: _ImageReference) -> tuple[str | None, str | None]:
+    """将单张图片转换为 data URI，返回 (data_uri, error)。"""
+    assert reference.path is not None
+    if reference.is_plotly:
+        png_data, error_text = _plotly_json_to_png_bytes(reference.path)
+        if png_data is None:
+            return None, error_text or "Plotly 转 PNG 失败"
+        return f"data:image/png;base64,{base64.b64encode(png_data).decode('ascii')}", None
+    return _prepared_assets.data_uri(reference.path), None
+
+
+def _prepare_image_assets(
+    references: list[_ImageReference],
+) -> dict[Path, tuple[str | None, str | None]]:
+    """并行准备全部图片（同一文件只处理一次）。
+
+    并行度与图表渲染服务的线程数一致（``settings.chart_render_workers``），
+    多张 Plotly 图表可同时占满渲染线程池，而不是逐张“读取 → 渲染 → 编码”。
+    """
+    unique: dict[Path, _ImageReference] = {}
+    for reference in references:
+        if reference.path is not None and reference.path not in unique and reference.path.exists():
+            unique[reference.path] = reference
+
+    def _safe_prepare(reference: _ImageReference) -> tuple[str | None, str | None]:
+        try:
+            return _prepare_image_asset(reference)
+        except Exception as exc:
+            logger.debug("图片 base64 转换失败 (%s): %s", reference.name, exc)
+            return None, str(exc).strip() or exc.__class__.__name__
+
+    items = list(unique.values())
+    if len(items) <= 1:
+        return {reference.path: _safe_prepare(reference) for reference in items}  # type: ignore[misc]
+    results = _get_asset_executor().map(_safe_prepare, items)
+    return {reference.path: result for reference, result in zip(items, results)}  # type: ignore[misc]
+
+
 def _resolve_images_to_base64(html: str, session_id: str) -> str:
     """将 HTML 中的 /api/artifacts/ 图片引用替换为 base64 内联数据。"""
     resolved_html, _ = _resolve_images_to_base64_with_stats(html, session_id)
@@ -446,15 +621,12 @@ def _resolve_images_to_base64_with_stats(
     session_id: str,
 ) -> tuple[str, dict[str, Any]]:
     """将 HTML 中的 /api/artifacts/ 图片内联，并返回转换统计。"""
-    artifacts_dir = settings.sessions_dir / session_id / "workspace" / "artifacts"
-    workspace_dir = settings.sessions_dir / session_id / "workspace"
-    artifacts_root = artifacts_dir.resolve()
-    workspace_root = workspace_dir.resolve()
     stats: dict[str, Any] = {
         "plotly_total": 0,
         "plotly_converted": 0,
         "plotly_failed": [],
     }
+    prepared = _prepare_image_assets(_collect_image_references(html, session_id))
 
     def _replace_match(match: re.Match[str]) -> str:
         prefix, quote, src_url, suffix = (
@@ -463,86 +635,119 @@ def _resolve_images_to_base64_with_stats(
             match.group(3),
             match.group(4),
         )
-        # 从 URL 提取工作区文件路径。
-        url_path = urlsplit(src_url).path
-        parts = url_path.strip("/").split("/")
-        if len(parts) < 4:
-            return match.group(0)
-        decoded_name = ""
-        file_path: Path
-        if len(parts) >= 4 and parts[0] == "api" and parts[1] == "artifacts":
-            encoded_name = "/".join(parts[3:])  # 支持子路径
-            decoded_name = unquote(encoded_name).lstrip("/")
-            file_path = (artifacts_dir / decoded_name).resolve()
-        elif (
-            len(parts) >= 5
-            and parts[0] == "api"
-            and parts[1] == "workspace"
-            and parts[3] == "files"
-        ):
-            encoded_name = "/".join(parts[4:])
-            decoded_name = unquote(encoded_name).lstrip("/")
-            file_path = (workspace_dir / decoded_name).resolve()
-        else:
+        reference = _resolve_image_reference(src_url, session_id)
+        if reference is None:
             return match.group(0)
-        is_plotly_json = decoded_name.lower().endswith(".plotly.json")
-        if is_plotly_json:
+        if reference.is_plotly:
             stats["plotly_total"] = int(stats.get("plotly_total", 0)) + 1
 
-        # 安全兜底：防止构造路径逃逸到工作区外
-        try:
-            if url_path.startswith("/api/artifacts/"):
-                file_path.relative_to(artifacts_root)
-            else:
-                file_path.relative_to(workspace_root)
-        except ValueError:
-            if is_plotly_json:
+        if reference.path is None:
+            if reference.is_plotly:
                 stats["plotly_failed"].append(
-                    {"name": decoded_name, "error": "图表路径非法，超出工作区目录"}
+                    {"name": reference.name, "error": "图表路径非法，超出工作区目录"}
                 )
             return match.group(0)
 
-        if not file_path.exists():
-            if is_plotly_json:
-                stats["plotly_failed"].append({"name": decoded_name, "error": "图表文件不存在"})
+        result = prepared.get(reference.path)
+        if result is None:
+            if reference.is_plotly:
+                stats["plotly_failed"].append({"name": reference.name, "error": "图表文件不存在"})
             return match.group(0)
 
-        try:
-            if is_plotly_json:
-                png_data, error_text = _plotly_json_to_png_bytes(file_path)
-                if png_data is None:
-                    stats["plotly_failed"].append(
-                        {
-                            "name": decoded_name,
-                            "error": error_text or "Plotly 转 PNG 失败",
-                        }
-                    )
-                    return match.group(0)
-                b64 = base64.b64encode(png_data).decode("ascii")
-                stats["plotly_converted"] = int(stats.get("plotly_converted", 0)) + 1
-                return f"{prefix}{quote}data:image/png;base64,{b64}{suffix}"
-
-            # 普通图片文件
-            raw = file_path.read_bytes()
-            ext = file_path.suffix.lower().lstrip(".")
-            mime_map = {
-                "png": "image/png",
-                "jpg": "image/jpeg",
-                "jpeg": "image/jpeg",
-                "gif": "image/gif",
-                "svg": "image/svg+xml",
-                "webp": "image/webp",
-            }
-            mime = mime_map.get(ext, "application/octet-stream")
-            b64 = base64.b64encode(raw).decode("ascii")
-            return f"{prefix}{quote}data:{mime};base64,{b64}{suffix}"
-        except Exception as exc:
-            logger.debug("图片 base64 转换失败 (%s): %s", decoded_name, exc)
+        data_uri, error_text = result
+        if data_uri is None:
+            if reference.is_plotly:
+                stats["plotly_failed"].append(
+                    {"name": reference.name, "error": error_text or "Plotly 转 PNG 失败"}
+                )
             return match.group(0)
+        if reference.is_plotly:
+            stats["plotly_converted"] = int(stats.get("plotly_converted", 0)) + 1
+        return f"{prefix}{quote}{data_uri}{suffix}"
 
     return _IMG_SRC_PATTERN.sub(_replace_match, html), stats
 
 
+def _collect_asset_hashes(html: str, session_id: str) -> list[str]:
+    """计算文档引用图片的内容哈希（按出现顺序），作为导出缓存键的一部分。"""
+    hashes: list[str] = []
+    for reference in _collect_image_references(html, session_id):
+        if reference.path is None:
+            hashes.append(f"invalid:{reference.name}")
+            continue
+        try:
+            content_hash = _prepared_assets.content_hash(reference.path)
+        except OSError:
+            hashes.append(f"missing:{reference.name}")
+            continue
+        if reference.is_plotly:
+            content_hash = f"{_PLOTLY_EXPORT_RENDER_TAG}:{content_hash}"
+        hashes.append(content_hash)
+    return hashes
+
+
+def _export_cache_key(
+    *,
+    output_format: str,
+    document_text: str,
+    asset_hashes: list[str],
+    renderer: str,
+) -> str:
+    """导出产物缓存键：(文档内容, 图片内容, 格式, 渲染器)。"""
+    digest = hashlib.sha256()
+    digest.update(f"{output_format}|{renderer}|".encode("utf-8"))
+    digest.update(document_text.encode("utf-8"))
+    for asset_hash in asset_hashes:
+        digest.update(f"|{asset_hash}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _package_version(name: str) -> str:
+    try:
+        return importlib.metadata.version(name)
+    except importlib.metadata.PackageNotFoundError:
+        return "none"
+
+
+def _export_cache_dir(session_id: str) -> Path:
+    return settings.sessions_dir / session_id / "export_cache"
+
+
+def _load_cached_export(session_id: str, cache_key: str, output_format: str) -> bytes | None:
+    path = _export_cache_dir(session_id) / f"{cache_key}.{output_format}"
+    try:
+        data = path.read_bytes()
+    except OSError:
+        return None
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return data or None
+
+
+def _store_cached_export(
+    session_id: str, cache_key: str, output_format: str, output_bytes: bytes
+) -> None:
+    """写入导出缓存，每个会话只保留最近的若干份产物。"""
+    cache_dir = _export_cache_dir(session_id)
+    path = cache_dir / f"{cache_key}.{output_format}"
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(output_bytes)
+        os.replace(tmp, path)
+        cached = sorted(
+            (p for p in cache_dir.iterdir() if p.is_file() and p.suffix != ".tmp"),
+            key=lambda p: p.stat().st_mtime,
+            reverse=True,
+        )
+        for stale in cached[_EXPORT_CACHE_MAX_ENTRIES:]:
+            stale.unlink(missing_ok=True)
+    except OSError:
+        logger.debug("写入导出缓存失败: %s", path, exc_info=True)
+
+
 def _is_chrome_missing_error(error_text: str | None) -> bool:
     if not error_text:
         return False
@@ -563,11 +768,47 @@ def _default_export_directory(source_path: str) -> str:
     return "." if parent in {"", "."} else parent
 
 
+_export_executor: ThreadPoolExecutor | None = None
+_asset_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def _get_export_executor() -> ThreadPoolExecutor:
+    global _export_executor
+    with _executor_lock:
+        if _export_executor is None:
+            _export_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="nini-export")
+        return _export_executor
+
+
+def _get_asset_executor() -> ThreadPoolExecutor:
+    global _asset_executor
+    with _executor_lock:
+        if _asset_executor is None:
+            # 多于渲染线程的准备线程只会在渲染服务里排队
+            _asset_executor = ThreadPoolExecutor(
+                max_workers=max(int(settings.chart_render_workers), 1),
+                thread_name_prefix="nini-export-asset",
+            )
+        return _asset_executor
+
+
+def shutdown_export_workers() -> None:
+    """关闭导出线程池（应用退出时调用）。"""
+    global _export_executor, _asset_executor
+    with _executor_lock:
+        executors = [_export_executor, _asset_executor]
+        _export_executor = None
+        _asset_executor = None
+    for executor in executors:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
 async def _run_blocking_in_isolated_thread(func: Callable[[], _T]) -> _T:
-    """在隔离线程池中执行阻塞任务，避免污染事件循环默认线程池。"""
+    """在常驻的导出线程池中执行阻塞任务，避免污染事件循环默认线程池。"""
     loop = asyncio.get_running_loop()
-    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="nini-export") as executor:
-        return await loop.run_in_executor(executor, func)
+    return await loop.run_in_executor(_get_export_executor(), func)
 
 
 def _workspace_relative_path_for_candidate(
@@ -815,8 +1056,35 @@ async def export_workspace_document(
         metadata={"source_ref": source_ref or "", "prefer_latest_report": prefer_latest_report},
     )
 
+    # 文档与引用图片均未变化时直接复用上次的导出结果，跳过图片内联与渲染。
     if fmt == "pdf":
-        html, image_stats = _resolve_images_to_base64_with_stats(html, session.id)
+        renderer_tag = f"weasyprint:{_package_version('weasyprint')}"
+        document_text = html
+        asset_hashes = await _run_blocking_in_isolated_thread(
+            lambda: _collect_asset_hashes(html, session.id)
+        )
+    else:
+        renderer_tag = f"report_exporter:{_package_version('nini')}"
+        document_text = f"{title}\n{raw_text}"
+        asset_hashes = []
+    export_cache_key = _export_cache_key(
+        output_format=fmt,
+        document_text=document_text,
+        asset_hashes=asset_hashes,
+        renderer=renderer_tag,
+    )
+    output_bytes: bytes | None = _load_cached_export(session.id, export_cache_key, fmt)
+    cache_hit = output_bytes is not None
+    cacheable = True
+    if cache_hit:
+        manager.update_export_job(
+            str(export_job.get("id", "")),
+            metadata={"cache_hit": True, "cache_key": export_cache_key},
+        )
+    elif fmt == "pdf":
+        html, image_stats = await _run_blocking_in_isolated_thread(
+            lambda: _resolve_images_to_base64_with_stats(html, session.id)
+        )
         plotly_failed = image_stats.get("plotly_failed", [])
         if isinstance(plotly_failed, list) and plotly_failed:
             failed_items = [
@@ -888,6 +1156,8 @@ async def export_workspace_document(
         except Exception as exc:
             logger.error("PDF 生成失败: %s", exc, exc_info=True)
             if sys.platform == "win32":
+                # Chromium 回退产物与 WeasyPrint 不同，不写入缓存
+                cacheable = False
                 try:
                     output_bytes = await _run_export_operation_with_retry(
                         operation_name="Chromium PDF 导出",
@@ -946,6 +1216,9 @@ async def export_workspace_document(
             )
             return ToolResult(success=False, message=f"{fmt.upper()} 生成失败: {exc}")
 
+    if output_bytes and not cache_hit and cacheable:
+        _store_cached_export(session.id, export_cache_key, fmt, output_bytes)
+
     output_relative_path = _build_export_relative_path(
         manager,
         source_path=source_path,
@@ -1044,6 +1317,7 @@ async def export_workspace_document(
             "document_type": subtype,
             "export_job_id": export_job.get("id"),
             "project_artifact_id": project_artifact_id,
+            "from_cache": cache_hit,
         },
         artifacts=[artifact],
     )
@@ -16,6 +16,7 @@ from urllib.parse import unquote, urlparse
 from nini.agent.session import Session
 from nini.config import settings
 from nini.tools.base import Tool, ToolResult
+from nini.utils.http_pool import BLOCKED_HOSTS, get_http_pool
 
 logger = logging.getLogger(__name__)
 
@@ -28,13 +29,10 @@ _MAX_URL_LENGTH = 2048
 # 允许的 URL scheme
 _ALLOWED_SCHEMES = {"http", "https", "file"}
 # 禁止访问的域名（安全考虑）
-_BLOCKED_HOSTS = {
-    "localhost",
-    "127.0.0.1",
-    "0.0.0.0",
-    "::1",
-    "metadata.google.internal",
-    "169.254.169.254",
+_BLOCKED_HOSTS = BLOCKED_HOSTS
+_REQUEST_HEADERS = {
+    "User-Agent": "Nini-Scientific-Agent/0.1 (Research Assistant)",
+    "Accept": "text/html,application/json,text/plain,*/*",
 }
 # 本地文件最大大小（字节）
 _MAX_LOCAL_FILE_BYTES = 2 * 1024 * 1024
@@ -222,77 +220,46 @@ class FetchURLTool(Tool):
                 text = text[:_MAX_CHARS] + f"\n\n... (内容已截断，原文共 {len(text)} 字符)"
             return text
 
-        import httpx
-
-        class _SSRFGuardTransport(httpx.AsyncHTTPTransport):
-            """连接时二次验证目标 IP，防止 DNS 重绑定 SSRF。"""
-
-            async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
-                host = request.url.host
-                try:
-                    ipaddress.ip_address(host)
-                    # 直接是 IP 地址，由上层 _validate_url 已验证
-                except ValueError:
-                    # 域名：在建立 TCP 连接前再次解析验证
-                    try:
-                        addr_info = socket.getaddrinfo(host, None, socket.AF_UNSPEC)
-                        for _, _, _, _, sockaddr in addr_info:
-                            resolved_ip = ipaddress.ip_address(sockaddr[0])
-                            if (
-                                resolved_ip.is_private
-                                or resolved_ip.is_loopback
-                                or resolved_ip.is_link_local
-                                or resolved_ip.is_reserved
-                            ):
-                                raise httpx.ConnectError(
-                                    f"DNS 重绑定防护：连接时检测到目标 IP {resolved_ip} 为私有地址"
-                                )
-                    except (socket.gaierror, ValueError):
-                        pass
-                return await super().handle_async_request(request)
-
-        async with httpx.AsyncClient(
-            transport=_SSRFGuardTransport(),
+        # 共享长连接客户端；SSRF 防护在连接池传输层对每个请求（含重定向）执行
+        client = get_http_pool().client(
+            "fetch_url",
+            ssrf_guard=True,
+            headers=_REQUEST_HEADERS,
             timeout=_TIMEOUT,
-            follow_redirects=False,
-            headers={
-                "User-Agent": "Nini-Scientific-Agent/0.1 (Research Assistant)",
-                "Accept": "text/html,application/json,text/plain,*/*",
-            },
-        ) as client:
-            response = await client.get(url)
-            # 处理重定向：验证目标地址安全性
-            if response.is_redirect:
-                location = response.headers.get("location", "")
-                redirect_err = FetchURLTool._validate_url(location)
-                if redirect_err:
-                    raise ValueError(f"重定向目标不安全: {redirect_err}")
-                response = await client.get(location)
-            response.raise_for_status()
-
-            content_type = response.headers.get("content-type", "")
-
-            # JSON 响应直接格式化
-            if "json" in content_type:
-                import json
-
-                try:
-                    data = response.json()
-                    text = json.dumps(data, ensure_ascii=False, indent=2)
-                except Exception:
-                    text = response.text
-            # HTML 响应转 Markdown
-            elif "html" in content_type:
-                text = _html_to_markdown(response.text)
-            # 其他文本类型直接返回
-            else:
+        )
+        response = await client.get(url)
+        # 处理重定向：验证目标地址安全性
+        if response.is_redirect:
+            location = response.headers.get("location", "")
+            redirect_err = FetchURLTool._validate_url(location)
+            if redirect_err:
+                raise ValueError(f"重定向目标不安全: {redirect_err}")
+            response = await client.get(location)
+        response.raise_for_status()
+
+        content_type = response.headers.get("content-type", "")
+
+        # JSON 响应直接格式化
+        if "json" in content_type:
+            import json
+
+            try:
+                data = response.json()
+                text = json.dumps(data, ensure_ascii=False, indent=2)
+            except Exception:
                 text = response.text
+        # HTML 响应转 Markdown
+        elif "html" in content_type:
+            text = _html_to_markdown(response.text)
+        # 其他文本类型直接返回
+        else:
+            text = response.text
 
-            # 截断
-            if len(text) > _MAX_CHARS:
-                text = text[:_MAX_CHARS] + f"\n\n... (内容已截断，原文共 {len(response.text)} 字符)"
+        # 截断
+        if len(text) > _MAX_CHARS:
+            text = text[:_MAX_CHARS] + f"\n\n... (内容已截断，原文共 {len(response.text)} 字符)"
 
-            return text
+        return text
 
 
 def _html_to_markdown(html: str) -> str:
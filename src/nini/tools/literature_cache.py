@@ -0,0 +1,205 @@
+"""文献检索持久化缓存（SQLite）。
+
+两张表：
+
+- ``query_cache``：规范化检索条件 → 结果（来源、降级信息与文献列表），带 TTL；
+- ``paper_cache``：DOI → 单篇文献元数据，跨查询共享。查询结果中带 DOI 的文献只存引用，
+  读取时从 ``paper_cache`` 取最新元数据；任一引用缺失或过期即视为未命中。
+
+缓存位于 ``settings.cache_dir``，可随时删除；读写失败只记录日志，不影响在线检索。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS query_cache (
+    key TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS paper_cache (
+    doi TEXT PRIMARY KEY,
+    paper TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_query_cache_created ON query_cache(created_at);
+"""
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """规范化检索词：NFKC、小写、合并空白。"""
+    text = unicodedata.normalize("NFKC", query).lower()
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def normalize_doi(doi: str) -> str:
+    text = doi.strip().lower()
+    for prefix in ("https://doi.org/", "http://doi.org/", "doi:"):
+        if text.startswith(prefix):
+            text = text[len(prefix) :]
+    return text
+
+
+def make_query_key(
+    query: str,
+    *,
+    max_results: int,
+    year_from: int | None,
+    sort_by: str,
+) -> str:
+    """检索条件的缓存键。"""
+    raw = json.dumps(
+        [normalize_query(query), max_results, year_from, sort_by],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LiteratureCache:
+    """文献检索缓存；单连接 + 锁，可在 ``asyncio.to_thread`` 工作线程中调用。"""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self.stats: dict[str, int] = {"hits": 0, "misses": 0, "writes": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=10.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                conn.executescript(_SCHEMA_SQL)
+            self._conn = conn
+        return self._conn
+
+    def get_query(self, key: str, *, ttl_seconds: float, paper_ttl_seconds: float) -> Any:
+        """读取未过期的查询结果；未命中返回 None。"""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT payload, created_at FROM query_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - float(row[1]) > ttl_seconds:
+                self.stats["misses"] += 1
+                return None
+            payload = json.loads(row[0])
+            papers: list[dict[str, Any]] = []
+            for item in payload.get("papers", []):
+                ref = item.get("doi_ref") if isinstance(item, dict) else None
+                if ref is None:
+                    papers.append(item)
+                    continue
+                paper = self._get_paper_locked(conn, ref, now, paper_ttl_seconds)
+                if paper is None:
+                    self.stats["misses"] += 1
+                    return None
+                papers.append(paper)
+            self.stats["hits"] += 1
+        payload["papers"] = papers
+        payload["cached_at"] = float(row[1])
+        return payload
+
+    def put_query(self, key: str, query: str, payload: dict[str, Any]) -> None:
+        """写入查询结果，并把带 DOI 的文献写入 ``paper_cache``。"""
+        now = time.time()
+        stored = dict(payload)
+        refs: list[dict[str, Any]] = []
+        paper_rows: list[tuple[str, str, float]] = []
+        for paper in payload.get("papers", []):
+            doi = paper.get("doi") if isinstance(paper, dict) else None
+            if doi:
+                normalized = normalize_doi(str(doi))
+                refs.append({"doi_ref": normalized})
+                paper_rows.append((normalized, json.dumps(paper, ensure_ascii=False), now))
+            else:
+                refs.append(paper)
+        stored["papers"] = refs
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO paper_cache (doi, paper, updated_at) VALUES (?, ?, ?)",
+                    paper_rows,
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO query_cache (key, query, payload, created_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, normalize_query(query), json.dumps(stored, ensure_ascii=False), now),
+                )
+            self.stats["writes"] += 1
+
+    def get_paper(self, doi: str, *, ttl_seconds: float) -> dict[str, Any] | None:
+        """按 DOI 读取单篇文献元数据。"""
+        with self._lock:
+            return self._get_paper_locked(
+                self._connect(), normalize_doi(doi), time.time(), ttl_seconds
+            )
+
+    @staticmethod
+    def _get_paper_locked(
+        conn: sqlite3.Connection, doi: str, now: float, ttl_seconds: float
+    ) -> dict[str, Any] | None:
+        row = conn.execute(
+            "SELECT paper, updated_at FROM paper_cache WHERE doi = ?", (doi,)
+        ).fetchone()
+        if row is None or now - float(row[1]) > ttl_seconds:
+            return None
+        paper = json.loads(row[0])
+        return paper if isinstance(paper, dict) else None
+
+    def purge_expired(self, *, ttl_seconds: float, paper_ttl_seconds: float) -> int:
+        """删除过期条目，返回删除行数。"""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                removed = conn.execute(
+                    "DELETE FROM query_cache WHERE created_at < ?", (now - ttl_seconds,)
+                ).rowcount
+                removed += conn.execute(
+                    "DELETE FROM paper_cache WHERE updated_at < ?", (now - paper_ttl_seconds,)
+                ).rowcount
+        return int(removed)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_caches: dict[Path, LiteratureCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_literature_cache() -> LiteratureCache:
+    """返回当前数据目录下的文献检索缓存。"""
+    from nini.config import settings
+
+    path = settings.cache_dir / "literature_search.sqlite3"
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = LiteratureCache(path)
+            _caches[path] = cache
+        return cache
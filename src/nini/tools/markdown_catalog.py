@@ -0,0 +1,264 @@
+"""Markdown 技能目录缓存：持久化扫描结果并增量重扫。
+
+冷启动或每次 ``reload_markdown_tools`` 时，``scan_markdown_tools`` 需要遍历全部技能根目录、
+读取并 YAML 解析每个 ``SKILL.md``。本模块把每个技能文件的原始来源
+（frontmatter、正文首行、openai.yaml）按 ``(path, mtime_ns, size)`` 持久化到缓存目录：
+
+- 增量重扫：只 ``stat`` 已知文件与目录；目录 mtime 未变说明没有新增/删除技能文件，
+  无需 ``rglob``；文件戳未变则直接复用缓存的来源，不再读取与解析。
+- 变更检测：``has_changes`` 复用同一套 stat 检查，可用于轮询式监听。
+- 冷启动快路径：``scan(..., trust=True)`` 在缓存根目录一致时直接由缓存构建技能，
+  完全不触碰技能文件，随后应再做一次校验扫描。
+
+mtime 距扫描时刻过近（``_RACY_WINDOW_NS`` 内）的条目不可信（同一时间片内的再次修改
+不会改变 mtime），这类条目与目录会在下次扫描时重新读取。
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from nini.tools.markdown_scanner import (
+    MarkdownTool,
+    _iter_skill_files,
+    build_markdown_tool,
+    read_skill_source,
+)
+
+logger = logging.getLogger(__name__)
+
+_CATALOG_VERSION = 1
+# 文件系统 mtime 粒度保护窗口（部分文件系统精度只有 1~2 秒）
+_RACY_WINDOW_NS = 2_000_000_000
+
+Stamp = tuple[int, int]
+
+
+def _stamp(path: Path) -> Stamp | None:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _openai_config_path(skill_path: Path) -> Path:
+    return skill_path.parent / "agents" / "openai.yaml"
+
+
+def _walk_dir_stamps(root: Path) -> dict[str, int]:
+    """记录根目录下所有目录的 mtime（不跟随符号链接）。"""
+    stamps: dict[str, int] = {}
+    for dirpath, _dirnames, _filenames in os.walk(root):
+        try:
+            stamps[dirpath] = os.stat(dirpath).st_mtime_ns
+        except OSError:
+            continue
+    return stamps
+
+
+class MarkdownSkillCatalog:
+    """持久化的 Markdown 技能目录缓存。
+
+    线程安全：扫描与落盘在同一把锁内完成，可从后台线程校验。
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._loaded = False
+        # root -> {"dirs": {dir: mtime_ns}, "files": [path, ...]}
+        self._roots: dict[str, dict[str, Any]] = {}
+        # path -> {"stamp": [mtime_ns, size], "openai_stamp": [..] | None, "source": {...}}
+        self._files: dict[str, dict[str, Any]] = {}
+        self._dirty = False
+        self.stats: dict[str, int] = {"parsed": 0, "reused": 0, "rediscovered_roots": 0}
+
+    # ---- 持久化 ----
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.path.exists():
+            return
+        try:
+            payload = json.loads(self.path.read_text(encoding="utf-8"))
+        except Exception as exc:
+            logger.warning("读取技能目录缓存失败，将全量扫描: %s", exc)
+            return
+        if not isinstance(payload, dict) or payload.get("version") != _CATALOG_VERSION:
+            return
+        roots = payload.get("roots")
+        files = payload.get("files")
+        if isinstance(roots, dict) and isinstance(files, dict):
+            self._roots = roots
+            self._files = files
+
+    def save(self) -> None:
+        """原子写入缓存文件；无变更时跳过。"""
+        with self._lock:
+            self._save_locked()
+
+    def _save_locked(self) -> None:
+        if not self._dirty:
+            return
+        files: dict[str, Any] = {}
+        for key, entry in self._files.items():
+            try:
+                # frontmatter 中可能出现日期等非 JSON 类型，这类条目只保留在内存中
+                json.dumps(entry, ensure_ascii=False)
+            except (TypeError, ValueError):
+                continue
+            files[key] = entry
+        payload = {"version": _CATALOG_VERSION, "roots": self._roots, "files": files}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, self.path)
+            self._dirty = False
+        except OSError as exc:
+            logger.warning("写入技能目录缓存失败: %s", exc)
+
+    # ---- 变更检测 ----
+
+    def _root_is_fresh(self, root_key: str, now_ns: int) -> bool:
+        record = self._roots.get(root_key)
+        if not isinstance(record, dict):
+            return False
+        dirs = record.get("dirs")
+        if not isinstance(dirs, dict):
+            return False
+        if not dirs:
+            # 上次扫描时根目录不存在
+            return not Path(root_key).exists()
+        for dirpath, mtime_ns in dirs.items():
+            try:
+                current = os.stat(dirpath).st_mtime_ns
+            except OSError:
+                return False
+            if current != mtime_ns or now_ns - current < _RACY_WINDOW_NS:
+                return False
+        return True
+
+    def _entry_is_fresh(self, entry: Any, skill_path: Path, now_ns: int) -> bool:
+        if not isinstance(entry, dict) or "source" not in entry:
+            return False
+        stamp = _stamp(skill_path)
+        if stamp is None or list(stamp) != entry.get("stamp"):
+            return False
+        if now_ns - stamp[0] < _RACY_WINDOW_NS:
+            return False
+        openai_stamp = _stamp(_openai_config_path(skill_path))
+        recorded = entry.get("openai_stamp")
+        return (list(openai_stamp) if openai_stamp else None) == recorded
+
+    def has_changes(self, roots: list[Path]) -> bool:
+        """仅通过 stat 判断技能目录自上次扫描以来是否发生变化。"""
+        with self._lock:
+            self._load()
+            now_ns = time.time_ns()
+            if set(self._roots) != {str(root) for root in roots}:
+                return True
+            for root in roots:
+                root_key = str(root)
+                if not self._root_is_fresh(root_key, now_ns):
+                    return True
+                for raw in self._roots[root_key].get("files", []):
+                    if not self._entry_is_fresh(self._files.get(raw), Path(raw), now_ns):
+                        return True
+            return False
+
+    # ---- 扫描 ----
+
+    def scan(self, roots: list[Path], *, trust: bool = False) -> list[MarkdownTool]:
+        """增量扫描技能根目录，结果与 ``scan_markdown_tools`` 一致。
+
+        Args:
+            roots: 按优先级排列的已解析根目录。
+            trust: 冷启动快路径；缓存覆盖同一组根目录时不做任何 stat。
+        """
+        with self._lock:
+            self._load()
+            if trust and self._covers(roots):
+                return self._build_from_cache(roots)
+            now_ns = time.time_ns()
+            plan: list[tuple[Path, Path, int]] = []
+            for priority, root in enumerate(roots):
+                root_key = str(root)
+                if self._root_is_fresh(root_key, now_ns):
+                    paths = [Path(raw) for raw in self._roots[root_key].get("files", [])]
+                else:
+                    self.stats["rediscovered_roots"] += 1
+                    dirs = _walk_dir_stamps(root) if root.exists() else {}
+                    paths = [path for _, path, _ in _iter_skill_files([root])]
+                    self._roots[root_key] = {"dirs": dirs, "files": [str(p) for p in paths]}
+                    self._dirty = True
+                plan.extend((root, path, priority) for path in paths)
+
+            stale_roots = set(self._roots) - {str(root) for root in roots}
+            for root_key in stale_roots:
+                self._roots.pop(root_key, None)
+                self._dirty = True
+
+            items: list[MarkdownTool] = []
+            live: set[str] = set()
+            for root, path, priority in plan:
+                key = str(path)
+                live.add(key)
+                entry = self._files.get(key)
+                try:
+                    if entry is not None and self._entry_is_fresh(entry, path, now_ns):
+                        self.stats["reused"] += 1
+                    else:
+                        entry = self._read_entry(path)
+                        self._files[key] = entry
+                        self._dirty = True
+                        self.stats["parsed"] += 1
+                    items.append(build_markdown_tool(root, path, priority, entry["source"]))
+                except Exception as exc:  # pragma: no cover - 防御性保护
+                    self._files.pop(key, None)
+                    logger.warning("解析 Markdown 技能失败: %s (%s)", path, exc)
+
+            for key in set(self._files) - live:
+                self._files.pop(key, None)
+                self._dirty = True
+            self._save_locked()
+            return items
+
+    def _covers(self, roots: list[Path]) -> bool:
+        if not self._roots or set(self._roots) != {str(root) for root in roots}:
+            return False
+        return all(
+            raw in self._files for root in roots for raw in self._roots[str(root)].get("files", [])
+        )
+
+    def _build_from_cache(self, roots: list[Path]) -> list[MarkdownTool]:
+        items: list[MarkdownTool] = []
+        for priority, root in enumerate(roots):
+            for raw in self._roots[str(root)].get("files", []):
+                entry = self._files[raw]
+                try:
+                    items.append(build_markdown_tool(root, Path(raw), priority, entry["source"]))
+                except Exception as exc:  # pragma: no cover - 防御性保护
+                    logger.warning("由缓存构建 Markdown 技能失败: %s (%s)", raw, exc)
+                self.stats["reused"] += 1
+        return items
+
+    @staticmethod
+    def _read_entry(path: Path) -> dict[str, Any]:
+        # 先取文件戳再读取：读取期间发生的修改会在下次扫描时因戳不一致而重读
+        stamp = _stamp(path)
+        openai_stamp = _stamp(_openai_config_path(path))
+        return {
+            "stamp": list(stamp) if stamp else None,
+            "openai_stamp": list(openai_stamp) if openai_stamp else None,
+            "source": read_skill_source(path),
+        }
@@ -5,6 +5,7 @@ from __future__ import annotations
 from dataclasses import dataclass, field
 from collections.abc import Iterable
 import logging
+import os
 from pathlib import Path
 import re
 from typing import TYPE_CHECKING, Any
@@ -127,15 +128,19 @@ def split_frontmatter(text: str) -> tuple[dict[str, Any], str]:
     return meta, body
 
 
-def _extract_description(text: str, fallback_name: str) -> str:
-    """从正文提取描述首行。"""
-    _, body = split_frontmatter(text)
-
+def _first_body_line(body: str) -> str | None:
+    """返回正文中第一条非标题的非空行。"""
     for line in body.splitlines():
         stripped = line.strip()
         if stripped and not stripped.startswith("#"):
             return stripped
-    return f"{fallback_name} 的技能定义"
+    return None
+
+
+def _extract_description(text: str, fallback_name: str) -> str:
+    """从正文提取描述首行。"""
+    _, body = split_frontmatter(text)
+    return _first_body_line(body) or f"{fallback_name} 的技能定义"
 
 
 def _normalize_category(raw_category: Any) -> tuple[str, str | None]:
@@ -254,16 +259,48 @@ def get_markdown_tool_instruction(
     }
 
 
+def _walk_entries(
+    directory: Path, prefix: tuple[str, ...]
+) -> Iterable[tuple[tuple[str, ...], os.DirEntry[str], int | None]]:
+    """单次 scandir 遍历目录树，返回 (相对路径分段, 条目, 子项数量)。
+
+    与 ``rglob("*")`` 一致：不跟随目录符号链接展开，但分类与大小按链接目标计算。
+    子目录的子项数量在遍历时顺带得到，避免再为每个目录单独 ``iterdir``。
+    """
+    try:
+        with os.scandir(directory) as it:
+            entries = list(it)
+    except OSError:
+        return
+    for entry in entries:
+        parts = (*prefix, entry.name)
+        if entry.is_dir():
+            if entry.is_symlink():
+                children: list[tuple[tuple[str, ...], os.DirEntry[str], int | None]] = []
+                try:
+                    with os.scandir(entry.path) as linked:
+                        child_count = sum(1 for _ in linked)
+                except OSError:
+                    child_count = 0
+            else:
+                children = list(_walk_entries(Path(entry.path), parts))
+                child_count = sum(1 for child in children if len(child[0]) == len(parts) + 1)
+            yield parts, entry, child_count
+            yield from children
+        else:
+            yield parts, entry, None
+
+
 def list_markdown_tool_runtime_resources(skill_path: Path) -> list[dict[str, Any]]:
     """列出 Skill 目录中除说明文件外的运行时资源。"""
     skill_dir = skill_path.parent
     resources: list[dict[str, Any]] = []
-    for path in sorted(skill_dir.rglob("*")):
-        if path == skill_path or path.name.startswith("."):
+    walked = sorted(_walk_entries(skill_dir, ()), key=lambda item: item[0])
+    for parts, entry, child_count in walked:
+        if (len(parts) == 1 and parts[0] == skill_path.name) or entry.name.startswith("."):
             continue
-        rel_path = path.relative_to(skill_dir).as_posix()
-        if path.is_dir():
-            child_count = sum(1 for child in path.iterdir())
+        rel_path = "/".join(parts)
+        if child_count is not None:
             resources.append(
                 {
                     "path": rel_path,
@@ -272,13 +309,12 @@ def list_markdown_tool_runtime_resources(skill_path: Path) -> list[dict[str, Any
                 }
             )
             continue
-        top_level = rel_path.split("/", 1)[0]
         resources.append(
             {
                 "path": rel_path,
                 "type": "file",
-                "size": path.stat().st_size,
-                "top_level": top_level,
+                "size": entry.stat().st_size,
+                "top_level": parts[0],
             }
         )
     return resources
@@ -299,6 +335,133 @@ def _iter_skill_files(roots: list[Path]) -> Iterable[tuple[Path, Path, int]]:
                 yield root, resolved, priority
 
 
+def read_skill_source(path: Path) -> dict[str, Any]:
+    """读取技能文件的原始来源（frontmatter、正文首行、openai.yaml）。
+
+    这是扫描中唯一触碰磁盘与 YAML 解析的部分，结果可以 JSON 持久化，
+    供技能目录缓存在文件未变化时直接复用。
+    """
+    text = path.read_text(encoding="utf-8")
+    m = _FRONTMATTER_RE.match(text)
+    body = text[m.end() :] if m else text
+    return {
+        "frontmatter": _parse_frontmatter(text) if m else {},
+        "first_line": _first_body_line(body),
+        "openai_agent_config": _parse_openai_agent_config(path.parent),
+    }
+
+
+def build_markdown_tool(
+    root: Path, path: Path, priority: int, source: dict[str, Any]
+) -> MarkdownTool:
+    """由原始来源构建 MarkdownTool（纯计算，不访问技能文件）。"""
+    meta = dict(source.get("frontmatter") or {})
+
+    # 名称：优先使用 frontmatter，回退到文件夹名
+    name = str(meta.get("name", "")).strip() or path.parent.name
+    if "name" not in meta or not str(meta.get("name", "")).strip():
+        logger.warning(
+            "Markdown 技能 %s 缺少 frontmatter 中的 name 字段，已回退到文件夹名 '%s'",
+            path,
+            name,
+        )
+
+    # 描述：优先使用 frontmatter，回退到正文首行
+    description = str(meta.get("description", "")).strip()
+    if not description:
+        description = source.get("first_line") or f"{name} 的技能定义"
+        logger.warning("Markdown 技能 %s 缺少 frontmatter 中的 description 字段", path)
+
+    # 分类：标准化，兼容别名
+    category, raw_category = _normalize_category(meta.get("category"))
+    if raw_category:
+        logger.warning(
+            "Markdown 技能 %s 的 category '%s' 非标准分类，已归一化为 '%s'",
+            path,
+            raw_category,
+            category,
+        )
+
+    standards = _infer_standards(path)
+    openai_cfg = source.get("openai_agent_config")
+    brief_description = _normalize_brief_description(
+        meta.get("brief-description") or meta.get("brief_description"),
+        description,
+    )
+    research_domain = (
+        str(meta.get("research-domain") or meta.get("research_domain") or "general").strip()
+        or "general"
+    )
+    difficulty_level = _normalize_difficulty(
+        meta.get("difficulty-level") or meta.get("difficulty_level")
+    )
+    typical_use_cases = _to_str_list(meta.get("typical-use-cases") or meta.get("typical_use_cases"))
+    metadata: dict[str, Any] = {
+        "path": str(path),
+        "source_root": str(root),
+        "source_standard": standards,
+        "discovery_priority": priority,
+        "frontmatter": meta,
+        "brief_description": brief_description,
+        "research_domain": research_domain,
+        "difficulty_level": difficulty_level,
+        "typical_use_cases": typical_use_cases,
+    }
+    agents = _to_str_list(meta.get("agents"))
+    if agents:
+        metadata["agents"] = agents
+    tags = _to_str_list(meta.get("tags"))
+    if tags:
+        metadata["tags"] = tags
+    aliases = _to_str_list(meta.get("aliases") or meta.get("alias"))
+    if aliases:
+        metadata["aliases"] = aliases
+    allowed_tools = _to_str_list(meta.get("allowed-tools") or meta.get("allowed_tools"))
+    if allowed_tools:
+        metadata["allowed_tools"] = _expand_allowed_tools(allowed_tools)
+    argument_hint = str(meta.get("argument-hint") or meta.get("argument_hint") or "").strip()
+    if argument_hint:
+        metadata["argument_hint"] = argument_hint
+    if isinstance(meta.get("user-invocable"), bool):
+        metadata["user_invocable"] = meta.get("user-invocable")
+    elif isinstance(meta.get("user_invocable"), bool):
+        metadata["user_invocable"] = meta.get("user_invocable")
+    if isinstance(meta.get("disable-model-invocation"), bool):
+        metadata["disable_model_invocation"] = meta.get("disable-model-invocation")
+    elif isinstance(meta.get("disable_model_invocation"), bool):
+        metadata["disable_model_invocation"] = meta.get("disable_model_invocation")
+    if raw_category:
+        metadata["raw_category"] = raw_category
+    if openai_cfg:
+        metadata["openai_agent_config"] = openai_cfg
+
+    # 解析 contract 段（可选，格式错误时优雅降级）
+    contract_raw = meta.get("contract")
+    if contract_raw is not None:
+        try:
+            from nini.models.skill_contract import SkillContract
+
+            metadata["contract"] = SkillContract.model_validate(contract_raw)
+        except Exception as contract_exc:
+            logger.warning(
+                "Markdown 技能 %s 的 contract 段格式错误，已跳过契约解析: %s",
+                path,
+                contract_exc,
+            )
+
+    return MarkdownTool(
+        name=name,
+        description=description,
+        location=str(path),
+        category=category,
+        brief_description=brief_description,
+        research_domain=research_domain,
+        difficulty_level=difficulty_level,
+        typical_use_cases=typical_use_cases,
+        metadata=metadata,
+    )
+
+
 def scan_markdown_tools(skills_dir: Path | Iterable[Path]) -> list[MarkdownTool]:
     """扫描 Markdown 技能并解析元数据。
 
@@ -317,118 +480,8 @@ def scan_markdown_tools(skills_dir: Path | Iterable[Path]) -> list[MarkdownTool]
     items: list[MarkdownTool] = []
     for root, path, priority in _iter_skill_files(roots):
         try:
-            text = path.read_text(encoding="utf-8")
-            meta = _parse_frontmatter(text)
-
-            # 名称：优先使用 frontmatter，回退到文件夹名
-            name = str(meta.get("name", "")).strip() or path.parent.name
-            if "name" not in meta or not str(meta.get("name", "")).strip():
-                logger.warning(
-                    "Markdown 技能 %s 缺少 frontmatter 中的 name 字段，已回退到文件夹名 '%s'",
-                    path,
-                    name,
-                )
-
-            # 描述：优先使用 frontmatter，回退到正文首行
-            description = str(meta.get("description", "")).strip()
-            if not description:
-                description = _extract_description(text, name)
-                logger.warning("Markdown 技能 %s 缺少 frontmatter 中的 description 字段", path)
-
-            # 分类：标准化，兼容别名
-            category, raw_category = _normalize_category(meta.get("category"))
-            if raw_category:
-                logger.warning(
-                    "Markdown 技能 %s 的 category '%s' 非标准分类，已归一化为 '%s'",
-                    path,
-                    raw_category,
-                    category,
-                )
-
-            standards = _infer_standards(path)
-            openai_cfg = _parse_openai_agent_config(path.parent)
-            brief_description = _normalize_brief_description(
-                meta.get("brief-description") or meta.get("brief_description"),
-                description,
-            )
-            research_domain = (
-                str(meta.get("research-domain") or meta.get("research_domain") or "general").strip()
-                or "general"
-            )
-            difficulty_level = _normalize_difficulty(
-                meta.get("difficulty-level") or meta.get("difficulty_level")
-            )
-            typical_use_cases = _to_str_list(
-                meta.get("typical-use-cases") or meta.get("typical_use_cases")
-            )
-            metadata: dict[str, Any] = {
-                "path": str(path),
-                "source_root": str(root),
-                "source_standard": standards,
-                "discovery_priority": priority,
-                "frontmatter": meta,
-                "brief_description": brief_description,
-                "research_domain": research_domain,
-                "difficulty_level": difficulty_level,
-                "typical_use_cases": typical_use_cases,
-            }
-            agents = _to_str_list(meta.get("agents"))
-            if agents:
-                metadata["agents"] = agents
-            tags = _to_str_list(meta.get("tags"))
-            if tags:
-                metadata["tags"] = tags
-            aliases = _to_str_list(meta.get("aliases") or meta.get("alias"))
-            if aliases:
-                metadata["aliases"] = aliases
-            allowed_tools = _to_str_list(meta.get("allowed-tools") or meta.get("allowed_tools"))
-            if allowed_tools:
-                metadata["allowed_tools"] = _expand_allowed_tools(allowed_tools)
-            argument_hint = str(
-                meta.get("argument-hint") or meta.get("argument_hint") or ""
-            ).strip()
-            if argument_hint:
-                metadata["argument_hint"] = argument_hint
-            if isinstance(meta.get("user-invocable"), bool):
-                metadata["user_invocable"] = meta.get("user-invocable")
-            elif isinstance(meta.get("user_invocable"), bool):
-                metadata["user_invocable"] = meta.get("user_invocable")
-            if isinstance(meta.get("disable-model-invocation"), bool):
-                metadata["disable_model_invocation"] = meta.get("disable-model-invocation")
-            elif isinstance(meta.get("disable_model_invocation"), bool):
-                metadata["disable_model_invocation"] = meta.get("disable_model_invocation")
-            if raw_category:
-                metadata["raw_category"] = raw_category
-            if openai_cfg:
-                metadata["openai_agent_config"] = openai_cfg
-
-            # 解析 contract 段（可选，格式错误时优雅降级）
-            contract_raw = meta.get("contract")
-            if contract_raw is not None:
-                try:
-                    from nini.models.skill_contract import SkillContract
-
-                    metadata["contract"] = SkillContract.model_validate(contract_raw)
-                except Exception as contract_exc:
-                    logger.warning(
-                        "Markdown 技能 %s 的 contract 段格式错误，已跳过契约解析: %s",
-                        path,
-                        contract_exc,
-                    )
-
-            items.append(
-                MarkdownTool(
-                    name=name,
-                    description=description,
-                    location=str(path),
-                    category=category,
-                    brief_description=brief_description,
-                    research_domain=research_domain,
-                    difficulty_level=difficulty_level,
-                    typical_use_cases=typical_use_cases,
-                    metadata=metadata,
-                )
-            )
+            source = read_skill_source(path)
+            items.append(build_markdown_tool(root, path, priority, source))
         except Exception as exc:  # pragma: no cover - 防御性保护
             logger.warning("解析 Markdown 技能失败: %s (%s)", path, exc)
     return items
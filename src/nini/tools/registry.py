@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import logging
 import time
+from dataclasses import dataclass
 from typing import Any
 
 from nini.agent.session import Session
@@ -79,6 +80,30 @@ LLM_EXPOSED_BASE_TOOL_NAMES = {
 }
 
 
+@dataclass(frozen=True)
+class CompiledToolDefinitions:
+    """按工具集版本编译的 LLM 工具定义。
+
+    ``definitions`` 中的字典在版本内保持同一对象，同一版本下序列化结果完全一致，
+    便于 provider 侧 prompt 缓存命中。调用方不得修改定义对象。
+    """
+
+    signature: tuple[int, int, int]
+    definitions: tuple[dict[str, Any], ...]
+
+    @classmethod
+    def compile(
+        cls, definitions: list[dict[str, Any]], *, signature: tuple[int, int, int]
+    ) -> "CompiledToolDefinitions":
+        items = tuple(item for item in definitions if isinstance(item, dict))
+        return cls(signature=signature, definitions=items)
+
+    def by_name(self) -> dict[str, dict[str, Any]]:
+        return {
+            str(item.get("function", {}).get("name", "")).strip(): item for item in self.definitions
+        }
+
+
 class ToolRegistry:
     """管理所有已注册的工具(Tools)。
 
@@ -94,6 +119,9 @@ class ToolRegistry:
         self._fallback_manager: Any = None
         self._diagnostics: Any = None
         self._llm_exposed_function_tools = set(LLM_EXPOSED_BASE_TOOL_NAMES)
+        # 工具集版本号：注册/注销时递增，工具定义编译缓存按版本失效
+        self._version = 0
+        self._compiled_definitions: CompiledToolDefinitions | None = None
 
         # 默认 guardrail 链，包含危险模式拦截规则
         self._guardrails: list[ToolGuardrail] = [DangerousPatternGuardrail()]
@@ -151,8 +179,18 @@ class ToolRegistry:
     def list_markdown_tool_catalog(self) -> list[dict[str, Any]]:
         return self._catalog_ops.list_markdown_tool_catalog()
 
-    def reload_markdown_tools(self) -> list[dict[str, Any]]:
-        return self._markdown_ops.reload_markdown_tools(set(self._tools.keys()))
+    def reload_markdown_tools(
+        self, *, trust_catalog: bool = False, scanned: list[Any] | None = None
+    ) -> list[dict[str, Any]]:
+        return self._markdown_ops.reload_markdown_tools(
+            set(self._tools.keys()), trust_catalog=trust_catalog, scanned=scanned
+        )
+
+    def has_markdown_changes(self) -> bool:
+        return self._markdown_ops.has_markdown_changes()
+
+    def scan_markdown_changes(self) -> list[Any] | None:
+        return self._markdown_ops.scan_markdown_changes()
 
     def set_markdown_tool_enabled(self, name: str, enabled: bool) -> dict[str, Any] | None:
         return self._markdown_ops.set_markdown_tool_enabled(name, enabled)
@@ -163,8 +201,33 @@ class ToolRegistry:
     def write_tools_snapshot(self) -> None:
         self._catalog_ops.write_tools_snapshot()
 
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def invalidate_tool_definitions(self) -> None:
+        """工具集或暴露白名单被直接修改后调用，使编译缓存失效。"""
+        self._version += 1
+        self._compiled_definitions = None
+
     def get_tool_definitions(self) -> list[dict[str, Any]]:
-        return self._function_ops.get_tool_definitions()
+        """返回暴露给 LLM 的工具定义（按版本编译一次，返回新列表、共享定义对象）。"""
+        return list(self.get_compiled_tool_definitions().definitions)
+
+    def get_compiled_tool_definitions(self) -> CompiledToolDefinitions:
+        """获取按当前版本编译好的工具定义。"""
+        signature = (
+            self._version,
+            len(self._tools),
+            len(self._llm_exposed_function_tools or ()),
+        )
+        compiled = self._compiled_definitions
+        if compiled is None or compiled.signature != signature:
+            compiled = CompiledToolDefinitions.compile(
+                self._function_ops.get_tool_definitions(), signature=signature
+            )
+            self._compiled_definitions = compiled
+        return compiled
 
     def _is_markdown_tool(self, tool_name: str) -> bool:
         return self._markdown_ops.is_markdown_tool(tool_name)
@@ -244,6 +307,7 @@ class ToolRegistry:
         # 清空新实例的默认注册工具（空白基础，只放入指定工具）
         subset._tools.clear()
         subset._llm_exposed_function_tools = set()
+        subset.invalidate_tool_definitions()
 
         for name in allowed_tool_names:
             skill = self._tools.get(name)
@@ -283,8 +347,14 @@ class ToolRegistry:
         return FunctionToolRegistryOps._run_tool_coroutine(skill, session, kwargs)
 
 
-def create_default_tool_registry(*, plugin_registry: Any | None = None) -> ToolRegistry:
-    """创建并注册默认工具集(Tools)。"""
+def create_default_tool_registry(
+    *, plugin_registry: Any | None = None, trust_skill_catalog: bool = False
+) -> ToolRegistry:
+    """创建并注册默认工具集(Tools)。
+
+    ``trust_skill_catalog`` 为 True 时 Markdown 技能直接由持久化目录缓存加载（冷启动快路径），
+    调用方应随后调用 ``reload_markdown_tools()`` 做一次校验。
+    """
     registry = ToolRegistry()
     registry.register(TaskWriteTool())
     registry.register(TaskStateTool())
@@ -352,7 +422,7 @@ def create_default_tool_registry(*, plugin_registry: Any | None = None) -> ToolR
         )
     )
 
-    registry.reload_markdown_tools()
+    registry.reload_markdown_tools(trust_catalog=trust_skill_catalog)
     registry.write_tools_snapshot()
     return registry
 
@@ -44,11 +44,18 @@ class FunctionToolRegistryOps:
                     f"新注册来源 {new_loc}。如需覆盖请传入 allow_override=True"
                 )
         self._owner._tools[tool.name] = tool
+        self._bump_version()
         logger.info("注册工具: %s", tool.name)
 
     def unregister(self, name: str) -> None:
         """注销一个工具。"""
-        self._owner._tools.pop(name, None)
+        if self._owner._tools.pop(name, None) is not None:
+            self._bump_version()
+
+    def _bump_version(self) -> None:
+        invalidate = getattr(self._owner, "invalidate_tool_definitions", None)
+        if callable(invalidate):
+            invalidate()
 
     def get(self, name: str) -> Tool | None:
         """获取工具实例。"""
@@ -8,10 +8,11 @@ from pathlib import Path
 from typing import Any
 
 from nini.config import settings
+from nini.tools.markdown_catalog import MarkdownSkillCatalog
 from nini.tools.markdown_scanner import (
+    MarkdownTool,
     get_markdown_tool_instruction,
     list_markdown_tool_runtime_resources,
-    scan_markdown_tools,
 )
 
 logger = logging.getLogger(__name__)
@@ -22,6 +23,30 @@ class MarkdownToolRegistryOps:
 
     def __init__(self, owner: Any) -> None:
         self._owner = owner
+        self._catalog: MarkdownSkillCatalog | None = None
+
+    def get_catalog(self) -> MarkdownSkillCatalog:
+        """返回当前缓存目录对应的技能目录缓存（数据目录切换时重建）。"""
+        path = settings.skills_catalog_path
+        if self._catalog is None or self._catalog.path != path:
+            self._catalog = MarkdownSkillCatalog(path)
+        return self._catalog
+
+    def has_markdown_changes(self) -> bool:
+        """仅通过 stat 检查技能目录自上次扫描后是否变化。"""
+        return self.get_catalog().has_changes(settings.skills_search_dirs)
+
+    def scan_markdown_changes(self) -> list[MarkdownTool] | None:
+        """技能目录有变化时重扫并返回结果，否则返回 None。
+
+        只读写目录缓存（自带锁），不修改注册表，可在工作线程中调用；
+        结果交给 ``reload_markdown_tools(scanned=...)`` 在事件循环中应用。
+        """
+        catalog = self.get_catalog()
+        roots = settings.skills_search_dirs
+        if not catalog.has_changes(roots):
+            return None
+        return catalog.scan(roots)
 
     def load_enabled_overrides(self) -> dict[str, bool]:
         """加载启用状态覆盖。"""
@@ -115,9 +140,23 @@ class MarkdownToolRegistryOps:
             "resources": list_markdown_tool_runtime_resources(skill_path),
         }
 
-    def reload_markdown_tools(self, function_names: set[str]) -> list[dict[str, Any]]:
-        """重新扫描 Markdown Skill 并应用启停覆盖。"""
-        markdown_skills = scan_markdown_tools(settings.skills_search_dirs)
+    def reload_markdown_tools(
+        self,
+        function_names: set[str],
+        *,
+        trust_catalog: bool = False,
+        scanned: list[MarkdownTool] | None = None,
+    ) -> list[dict[str, Any]]:
+        """重新扫描 Markdown Skill 并应用启停覆盖。
+
+        扫描经由持久化目录缓存增量进行；``trust_catalog`` 为冷启动快路径，
+        直接使用缓存而不访问技能文件。``scanned`` 为已在别处完成的扫描结果，此时只应用。
+        """
+        markdown_skills = (
+            scanned
+            if scanned is not None
+            else self.get_catalog().scan(settings.skills_search_dirs, trust=trust_catalog)
+        )
         deduped: list[dict[str, Any]] = []
         seen_markdown_names: set[str] = set()
         duplicate_names: list[str] = []
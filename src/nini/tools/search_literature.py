@@ -2,20 +2,27 @@
 
 通过 Semantic Scholar 与 CrossRef 两级降级链检索学术文献。
 联网不可用或所有 API 均失败时，返回明确的手动替代建议。
+
+成功结果写入 SQLite 持久化缓存（见 ``literature_cache``），相同检索条件在 TTL 内直接命中；
+同时进行中的相同检索只发起一次请求（single-flight）；各数据源使用令牌桶限流，
+额度内的并发请求无需排队。
 """
 
 from __future__ import annotations
 
 import asyncio
+import dataclasses
 import logging
 import re
 import time
+from collections.abc import Awaitable, Callable
 from typing import Any
 
 from nini.agent.session import Session
 from nini.plugins.base import DegradationInfo
 from nini.plugins.network import NetworkPlugin
 from nini.tools.base import Tool, ToolResult
+from nini.tools.literature_cache import get_literature_cache, make_query_key
 
 logger = logging.getLogger(__name__)
 
@@ -32,17 +39,59 @@ _CROSSREF_SEARCH_URL = "https://api.crossref.org/works"
 _SEMANTIC_SCHOLAR_FIELDS = "title,authors,year,abstract,citationCount,externalIds"
 _DEFAULT_MAX_RESULTS = 20
 _MAX_RESULTS_LIMIT = 50
-_MIN_REQUEST_INTERVAL_SECONDS = 1.0
 _JATS_TAG_RE = re.compile(r"<[^>]+>")
 
 
+class _TokenBucket:
+    """预约式令牌桶：令牌不足时预约未来的令牌并休眠，不持锁，额度内的请求可并行发出。"""
+
+    def __init__(
+        self,
+        *,
+        rate: float,
+        capacity: float,
+        clock: Callable[[], float],
+        sleep: Callable[[float], Awaitable[None]],
+    ) -> None:
+        self._rate = max(rate, 1e-6)
+        self._capacity = max(capacity, 1.0)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self._capacity
+        self._updated_at: float | None = None
+
+    async def acquire(self) -> None:
+        now = self._clock()
+        if self._updated_at is not None:
+            self._tokens = min(self._capacity, self._tokens + (now - self._updated_at) * self._rate)
+        self._updated_at = now
+        self._tokens -= 1.0
+        if self._tokens < 0:
+            await self._sleep(-self._tokens / self._rate)
+
+
 class SearchLiteratureTool(Tool):
     """检索学术文献的工具。"""
 
     def __init__(self, plugin_registry: Any | None = None) -> None:
+        from nini.config import settings
+
         self._plugin_registry = plugin_registry
-        self._rate_limit_lock = asyncio.Lock()
-        self._last_semantic_scholar_request_at = 0.0
+        # 时钟与休眠经由实例方法间接调用，便于测试替换
+        self._semantic_scholar_bucket = _TokenBucket(
+            rate=settings.literature_semantic_scholar_rate,
+            capacity=settings.literature_semantic_scholar_burst,
+            clock=lambda: self._monotonic(),
+            sleep=lambda seconds: self._sleep(seconds),
+        )
+        self._crossref_bucket = _TokenBucket(
+            rate=settings.literature_crossref_rate,
+            capacity=settings.literature_crossref_burst,
+            clock=lambda: self._monotonic(),
+            sleep=lambda seconds: self._sleep(seconds),
+        )
+        # 检索键 -> 进行中的检索（single-flight）
+        self._inflight: dict[str, asyncio.Future[ToolResult]] = {}
 
     @property
     def name(self) -> str:
@@ -119,6 +168,55 @@ class SearchLiteratureTool(Tool):
         except ValueError as exc:
             return ToolResult(success=False, message=str(exc))
 
+        key = make_query_key(query, max_results=max_results, year_from=year_from, sort_by=sort_by)
+        cached = await self._read_cache(key)
+        if cached is not None:
+            return self._build_success_result(
+                query=query,
+                source=cached["source"],
+                papers=cached["papers"],
+                fallback_from=cached.get("fallback_from"),
+                warnings=cached.get("warnings"),
+                cache_hit=True,
+            )
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            # 相同检索正在进行：等待其结果，不重复请求
+            shared = await asyncio.shield(inflight)
+            return dataclasses.replace(shared, metadata={**shared.metadata, "coalesced": True})
+
+        future: asyncio.Future[ToolResult] = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._search_online(
+                query=query,
+                max_results=max_results,
+                year_from=year_from,
+                sort_by=sort_by,
+            )
+        except BaseException as exc:
+            future.set_exception(exc)
+            # 没有等待者时避免 "Future exception was never retrieved" 告警
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            self._inflight.pop(key, None)
+
+        if result.success and result.data and result.data.get("papers"):
+            await self._write_cache(key, query, result)
+        return result
+
+    async def _search_online(
+        self,
+        *,
+        query: str,
+        max_results: int,
+        year_from: int | None,
+        sort_by: str,
+    ) -> ToolResult:
         network_plugin = self._resolve_network_plugin()
         is_available = await self._check_network_available(network_plugin)
         if not is_available:
@@ -180,6 +278,38 @@ class SearchLiteratureTool(Tool):
             if owns_client:
                 await client.aclose()
 
+    async def _read_cache(self, key: str) -> dict[str, Any] | None:
+        from nini.config import settings
+
+        if not settings.literature_cache_enabled:
+            return None
+        try:
+            return await asyncio.to_thread(
+                get_literature_cache().get_query,
+                key,
+                ttl_seconds=settings.literature_cache_ttl_seconds,
+                paper_ttl_seconds=settings.literature_paper_cache_ttl_seconds,
+            )
+        except Exception as exc:  # pragma: no cover - 缓存损坏时回退在线检索
+            logger.warning("读取文献检索缓存失败: %s", exc)
+            return None
+
+    async def _write_cache(self, key: str, query: str, result: ToolResult) -> None:
+        from nini.config import settings
+
+        if not settings.literature_cache_enabled:
+            return
+        payload = {
+            "source": result.data["source"],
+            "papers": result.data["papers"],
+            "fallback_from": result.metadata.get("fallback_from"),
+            "warnings": result.metadata.get("warnings") or [],
+        }
+        try:
+            await asyncio.to_thread(get_literature_cache().put_query, key, query, payload)
+        except Exception as exc:  # pragma: no cover - 缓存写入失败不影响结果
+            logger.warning("写入文献检索缓存失败: %s", exc)
+
     def _normalize_max_results(self, raw_value: Any) -> int:
         if raw_value in (None, ""):
             return _DEFAULT_MAX_RESULTS
@@ -234,19 +364,19 @@ class SearchLiteratureTool(Tool):
             raise RuntimeError("httpx 未安装，无法执行在线文献检索")
 
         from nini.config import settings
+        from nini.utils.http_pool import get_http_pool
 
-        proxy = settings.network_proxy
-        client_kwargs: dict[str, Any] = {
-            "timeout": settings.network_timeout,
-            "headers": {
+        # 共享连接池中的长连接客户端：跨调用复用 DNS/TCP/TLS，由应用退出时统一关闭
+        client = get_http_pool().client(
+            "literature",
+            proxy=settings.network_proxy,
+            headers={
                 "User-Agent": "Nini-Scientific-Agent/0.1 (Literature Search)",
                 "Accept": "application/json",
             },
-        }
-        if proxy:
-            client_kwargs["proxy"] = proxy
-        client = httpx.AsyncClient(**client_kwargs)
-        return client, True
+            timeout=settings.network_timeout,
+        )
+        return client, False
 
     async def _search_semantic_scholar(
         self,
@@ -298,6 +428,7 @@ class SearchLiteratureTool(Tool):
         if year_from is not None:
             params["filter"] = f"from-pub-date:{year_from}-01-01"
 
+        await self._crossref_bucket.acquire()
         response = await client.get(_CROSSREF_SEARCH_URL, params=params)
         response.raise_for_status()
         payload = response.json()
@@ -317,13 +448,7 @@ class SearchLiteratureTool(Tool):
         )
 
     async def _enforce_semantic_scholar_rate_limit(self) -> None:
-        async with self._rate_limit_lock:
-            now = self._monotonic()
-            elapsed = now - self._last_semantic_scholar_request_at
-            if elapsed < _MIN_REQUEST_INTERVAL_SECONDS:
-                await self._sleep(_MIN_REQUEST_INTERVAL_SECONDS - elapsed)
-                now = self._monotonic()
-            self._last_semantic_scholar_request_at = now
+        await self._semantic_scholar_bucket.acquire()
 
     def _monotonic(self) -> float:
         return time.monotonic()
@@ -424,21 +549,25 @@ class SearchLiteratureTool(Tool):
         papers: list[dict[str, Any]],
         fallback_from: str | None = None,
         warnings: list[str] | None = None,
+        cache_hit: bool = False,
     ) -> ToolResult:
         metadata: dict[str, Any] = {
             "source": source,
             "offline_mode": False,
             "manual_mode": False,
         }
+        if cache_hit:
+            metadata["cache_hit"] = True
         if fallback_from:
             metadata["fallback_from"] = fallback_from
         if warnings:
             metadata["warnings"] = [warning for warning in warnings if warning]
 
         label = "Semantic Scholar" if source == "semantic_scholar" else "CrossRef"
+        suffix = "（缓存）" if cache_hit else ""
         return ToolResult(
             success=True,
-            message=f"已从 {label} 检索到 {len(papers)} 篇文献",
+            message=f"已从 {label} 检索到 {len(papers)} 篇文献{suffix}",
             data={
                 "query": query,
                 "source": source,
@@ -2,12 +2,24 @@
 
 from __future__ import annotations
 
-from scipy.stats import f_oneway
-from statsmodels.stats.multicomp import pairwise_tukeyhsd
-
 from nini.tools.statistics.anova import ANOVATool
-from nini.tools.statistics.base import _ensure_finite, _get_df, _record_stat_result, _safe_float
+from nini.tools.statistics.base import (
+    _ensure_finite,
+    _get_df,
+    _record_stat_result,
+    _record_stat_results,
+    _safe_float,
+)
 from nini.tools.statistics.correlation import CorrelationTool
+from nini.tools.statistics.engine import (
+    adjust_pvalues,
+    clear_sufficient_stats_cache,
+    correlation_family,
+    group_moments,
+    oneway_anova,
+    sufficient_stats_cache_stats,
+    tukey_hsd,
+)
 from nini.tools.statistics.multiple_comparison import (
     MultipleComparisonCorrectionTool,
     bonferroni_correction,
@@ -26,14 +38,20 @@ __all__ = [
     "_ensure_finite",
     "_get_df",
     "_record_stat_result",
+    "_record_stat_results",
     "bonferroni_correction",
     "holm_correction",
     "fdr_correction",
     "multiple_comparison_correction",
     "recommend_correction_method",
     "get_correction_recommendation_reason",
-    "f_oneway",
-    "pairwise_tukeyhsd",
+    "group_moments",
+    "oneway_anova",
+    "tukey_hsd",
+    "correlation_family",
+    "adjust_pvalues",
+    "clear_sufficient_stats_cache",
+    "sufficient_stats_cache_stats",
     "TTestTool",
     "ANOVATool",
     "CorrelationTool",
@@ -7,8 +7,6 @@ import logging
 from importlib import import_module
 from typing import Any
 
-import numpy as np
-
 from nini.agent.session import Session
 from nini.tools.base import Tool, ToolInputError, ToolResult, ToolSystemError, ToolTimeoutError
 from nini.tools.statistics.base import (
@@ -69,39 +67,29 @@ class ANOVATool(Tool):
                 return ToolResult(success=False, message=f"列 '{col}' 不存在")
 
         try:
-            group_names = df[group_col].dropna().unique()
-            groups = []
-            valid_group_names = []
-            for group_name in group_names:
-                group_data = df[df[group_col] == group_name][value_col].dropna()
-                if len(group_data) > 0:
-                    groups.append(group_data)
-                    valid_group_names.append(group_name)
-
-            if len(groups) < 2:
+            statistics_exports = import_module("nini.tools.statistics")
+            # 一次 groupby 得到各组充分统计量，F 检验与事后检验共用
+            moments = statistics_exports.group_moments(df, value_col, group_col)
+            n_groups = len(moments.labels)
+
+            if n_groups < 2:
                 return ToolResult(
                     success=False,
                     message=(
-                        f"ANOVA 至少需要 2 个分组，当前只有 {len(groups)} 个。"
+                        f"ANOVA 至少需要 2 个分组，当前只有 {n_groups} 个。"
                         "如只有 1 组请使用单样本 t 检验，如只有 2 组请使用 t_test 或 mann_whitney。"
                     ),
                 )
 
-            if len(groups) == 2:
+            if n_groups == 2:
                 logger.info("检测到 2 个分组，建议使用 t_test 或 mann_whitney")
 
-            statistics_exports = import_module("nini.tools.statistics")
-            f_stat, pval = statistics_exports.f_oneway(*groups)
+            anova = statistics_exports.oneway_anova(moments)
+            f_stat, pval = anova["f_statistic"], anova["p_value"]
             is_significant = bool(pval <= 0.05)
-
-            n_total = sum(len(group) for group in groups)
-            n_groups = len(groups)
-            grand_mean = np.concatenate(groups).mean()
-            ss_between = sum(len(group) * (group.mean() - grand_mean) ** 2 for group in groups)
-            ss_within = sum(((group - group.mean()) ** 2).sum() for group in groups)
-            df_between = n_groups - 1
-            df_within = n_total - n_groups
-            eta_sq = ss_between / (ss_between + ss_within) if (ss_between + ss_within) > 0 else 0
+            df_between = anova["df_between"]
+            df_within = anova["df_within"]
+            eta_sq = anova["eta_squared"]
 
             result: dict[str, Any] = {
                 "f_statistic": _ensure_finite(f_stat, "F 统计量"),
@@ -111,12 +99,12 @@ class ANOVATool(Tool):
                 "eta_squared": _safe_float(eta_sq),
                 "n_groups": n_groups,
                 "group_sizes": {
-                    str(group_name): len(group)
-                    for group_name, group in zip(valid_group_names, groups)
+                    str(group_name): int(count)
+                    for group_name, count in zip(moments.labels, moments.counts)
                 },
                 "group_means": {
-                    str(group_name): _safe_float(group.mean())
-                    for group_name, group in zip(valid_group_names, groups)
+                    str(group_name): _safe_float(mean)
+                    for group_name, mean in zip(moments.labels, moments.means)
                 },
                 "significant": is_significant,
             }
@@ -127,29 +115,14 @@ class ANOVATool(Tool):
                 )
 
             if pval <= 0.05 and n_groups >= 3:
-                clean_df = df[[value_col, group_col]].dropna()
-                tukey = statistics_exports.pairwise_tukeyhsd(
-                    endog=clean_df[value_col],
-                    groups=clean_df[group_col],
-                    alpha=0.05,
-                )
-                post_hoc = []
-                idx = 0
-                total_groups = len(tukey.groupsunique)
-                for i in range(total_groups):
-                    for j in range(i + 1, total_groups):
-                        if idx < len(tukey.pvalues):
-                            post_hoc.append(
-                                {
-                                    "group1": str(tukey.groupsunique[i]),
-                                    "group2": str(tukey.groupsunique[j]),
-                                    "mean_diff": _safe_float(tukey.meandiffs[idx]),
-                                    "p_value": _safe_float(tukey.pvalues[idx]),
-                                    "significant": bool(tukey.reject[idx]),
-                                }
-                            )
-                        idx += 1
-                result["post_hoc"] = post_hoc
+                result["post_hoc"] = [
+                    {
+                        **item,
+                        "mean_diff": _safe_float(item["mean_diff"]),
+                        "p_value": _safe_float(item["p_value"]),
+                    }
+                    for item in statistics_exports.tukey_hsd(moments, alpha=0.05)
+                ]
 
             if pval <= 0.05 and n_groups >= 3:
                 n_comparisons = n_groups * (n_groups - 1) // 2
@@ -62,21 +62,58 @@ def _record_stat_result(
     metadata: dict[str, Any] | None = None,
 ) -> None:
     """将统计结果记录到 AnalysisMemory 和 KnowledgeMemory。"""
+    _record_stat_results(
+        session,
+        dataset_name,
+        [
+            {
+                "test_name": test_name,
+                "message": message,
+                "test_statistic": test_statistic,
+                "p_value": p_value,
+                "degrees_of_freedom": degrees_of_freedom,
+                "effect_size": effect_size,
+                "effect_type": effect_type,
+                "significant": significant,
+                "metadata": metadata,
+            }
+        ],
+    )
+
+
+def _record_stat_results(
+    session: Session,
+    dataset_name: str,
+    records: list[dict[str, Any]],
+) -> None:
+    """批量记录统计结果：AnalysisMemory 与 KnowledgeMemory 各提交一次。
+
+    ``records`` 中每项的键与 ``_record_stat_result`` 的关键字参数一致。
+    """
+    if not records:
+        return
     # AnalysisMemory
     mem = get_analysis_memory(resolve_session_resource_id(session), dataset_name)
-    mem.add_statistic(
+    mem.add_statistics(
         StatisticResult(
-            test_name=test_name,
-            test_statistic=test_statistic,
-            p_value=p_value,
-            degrees_of_freedom=degrees_of_freedom,
-            effect_size=effect_size,
-            effect_type=effect_type,
-            significant=significant,
-            metadata=dict(metadata or {}),
+            test_name=record["test_name"],
+            test_statistic=record.get("test_statistic"),
+            p_value=record.get("p_value"),
+            degrees_of_freedom=record.get("degrees_of_freedom"),
+            effect_size=record.get("effect_size"),
+            effect_type=record.get("effect_type", ""),
+            significant=record.get("significant"),
+            metadata=dict(record.get("metadata") or {}),
         )
+        for record in records
     )
     # KnowledgeMemory
     knowledge_memory = getattr(session, "knowledge_memory", None)
     if knowledge_memory is not None:
-        knowledge_memory.append(test_name, message)
+        sections = [(record["test_name"], record["message"]) for record in records]
+        append_many = getattr(knowledge_memory, "append_many", None)
+        if callable(append_many):
+            append_many(sections)
+        else:
+            for section, content in sections:
+                knowledge_memory.append(section, content)
@@ -2,14 +2,15 @@
 
 from __future__ import annotations
 
-from typing import Any, Callable, cast
+import asyncio
+from typing import Any
 
 import pandas as pd
-from scipy.stats import kendalltau, pearsonr, spearmanr
 
 from nini.agent.session import Session
 from nini.tools.base import Tool, ToolResult
-from nini.tools.statistics.base import _ensure_finite, _get_df, _record_stat_result, _safe_float
+from nini.tools.statistics.base import _ensure_finite, _get_df, _record_stat_results, _safe_float
+from nini.tools.statistics.engine import correlation_family
 
 
 class CorrelationTool(Tool):
@@ -73,27 +74,24 @@ class CorrelationTool(Tool):
         if len(data) < 3:
             return ToolResult(success=False, message="至少需要 3 个完整观测值")
 
-        corr_matrix = data.corr(method=method)
+        # 全部变量对的 r 与 p 一次按矩阵算出，按数据内容指纹缓存
+        corr_values, pvalue_values = correlation_family(data, method)
+        corr_matrix = pd.DataFrame(corr_values, index=columns, columns=columns)
         pvalue_matrix: dict[str, dict[str, float]] = {}
-        corr_func = {
-            "pearson": pearsonr,
-            "spearman": spearmanr,
-            "kendall": kendalltau,
-        }.get(method, pearsonr)
-        corr_func_callable = cast(Callable[[Any, Any], tuple[Any, Any]], corr_func)
         pairwise_results: list[dict[str, Any]] = []
 
-        for col1 in columns:
+        for i, col1 in enumerate(columns):
             pvalue_matrix[col1] = {}
-            for col2 in columns:
-                if col1 == col2:
+            for j, col2 in enumerate(columns):
+                if i == j:
                     pvalue_matrix[col1][col2] = 0.0
                     continue
-                _, pval = corr_func_callable(data[col1].values, data[col2].values)
-                pvalue_matrix[col1][col2] = _ensure_finite(pval, f"{col1}-{col2} p 值")
-                if columns.index(col2) <= columns.index(col1):
+                pvalue_matrix[col1][col2] = _ensure_finite(
+                    pvalue_values[i, j], f"{col1}-{col2} p 值"
+                )
+                if j <= i:
                     continue
-                coefficient = _safe_float(corr_matrix.loc[col1, col2])
+                coefficient = _safe_float(corr_values[i, j])
                 pairwise_results.append(
                     {
                         "var_a": col1,
@@ -121,26 +119,31 @@ class CorrelationTool(Tool):
         }
 
         message = f"{method.title()} 相关性分析完成（{len(columns)} 个变量, n={len(data)}）"
+        records: list[dict[str, Any]] = []
         for pair in pairwise_results:
             coefficient = pair["coefficient"]
             p_value = pair["p_value"]
-            _record_stat_result(
-                session,
-                name,
-                test_name=f"{method.title()} 相关性分析（{pair['var_a']} vs {pair['var_b']}）",
-                message=message,
-                p_value=float(p_value) if p_value is not None else None,
-                effect_size=float(coefficient) if coefficient is not None else None,
-                effect_type=f"{method.lower()}_correlation",
-                significant=bool(pair["significant"]),
-                metadata={
-                    "dataset_name": name,
-                    "method": method,
-                    "sample_size": len(data),
-                    "variables": [pair["var_a"], pair["var_b"]],
-                    "var_a": pair["var_a"],
-                    "var_b": pair["var_b"],
-                    "coefficient": coefficient,
-                },
+            records.append(
+                {
+                    "test_name": (
+                        f"{method.title()} 相关性分析（{pair['var_a']} vs {pair['var_b']}）"
+                    ),
+                    "message": message,
+                    "p_value": float(p_value) if p_value is not None else None,
+                    "effect_size": float(coefficient) if coefficient is not None else None,
+                    "effect_type": f"{method.lower()}_correlation",
+                    "significant": bool(pair["significant"]),
+                    "metadata": {
+                        "dataset_name": name,
+                        "method": method,
+                        "sample_size": len(data),
+                        "variables": [pair["var_a"], pair["var_b"]],
+                        "var_a": pair["var_a"],
+                        "var_b": pair["var_b"],
+                        "coefficient": coefficient,
+                    },
+                }
             )
+        # 变量多时逐对记录的章节可达上万条，记忆写入放到工作线程
+        await asyncio.to_thread(_record_stat_results, session, name, records)
         return ToolResult(success=True, data=result, message=message)
@@ -0,0 +1,249 @@
+"""批量统计引擎：充分统计量一次算好，整族检验向量化导出。
+
+- 分组检验（ANOVA / Tukey HSD）：一次 groupby 得到各组样本量、均值与离差平方和；
+- 相关分析（Pearson / Spearman）：一次矩阵乘法得到中心化叉积矩阵，全部变量对的
+  r、t 与 p 值按矩阵整体计算；
+- 多重比较校正：Holm 逐步下降、BH 逐步上升均以排序 + 累积极值向量化完成。
+
+充分统计量按“所用列内容指纹”缓存，同一数据版本上的后续检验直接复用；
+数据被修改后指纹随之变化，不会读到过期结果。
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, TypeVar
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from nini.utils.dataframe_io import dataset_version
+
+T = TypeVar("T")
+
+_CACHE_SIZE = 128
+
+_cache: OrderedDict[tuple[Any, ...], Any] = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_hits = 0
+_cache_misses = 0
+
+
+def _cached(key: tuple[Any, ...], build: Callable[[], T]) -> T:
+    global _cache_hits, _cache_misses
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            _cache_hits += 1
+            return _cache[key]  # type: ignore[no-any-return]
+        _cache_misses += 1
+    value = build()
+    with _cache_lock:
+        _cache[key] = value
+        _cache.move_to_end(key)
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return value
+
+
+def clear_sufficient_stats_cache() -> None:
+    """清空充分统计量缓存（测试与内存回收用）。"""
+    global _cache_hits, _cache_misses
+    with _cache_lock:
+        _cache.clear()
+        _cache_hits = 0
+        _cache_misses = 0
+
+
+def sufficient_stats_cache_stats() -> dict[str, int]:
+    with _cache_lock:
+        return {"entries": len(_cache), "hits": _cache_hits, "misses": _cache_misses}
+
+
+# ---- 分组充分统计量 ----
+
+
+@dataclass(frozen=True)
+class GroupMoments:
+    """各组样本量、均值与组内离差平方和（组按首次出现顺序排列）。"""
+
+    labels: tuple[Any, ...]
+    counts: np.ndarray
+    means: np.ndarray
+    sum_sq: np.ndarray
+
+    @property
+    def n_total(self) -> int:
+        return int(self.counts.sum())
+
+
+def group_moments(df: pd.DataFrame, value_col: str, group_col: str) -> GroupMoments:
+    """剔除缺失值后按组计算充分统计量；结果按两列内容指纹缓存。"""
+    subset = df[[value_col, group_col]]
+    key = ("group_moments", dataset_version(subset), value_col, group_col)
+
+    def build() -> GroupMoments:
+        clean = subset.dropna()
+        grouped = clean.groupby(group_col, sort=False, observed=True)[value_col]
+        agg = grouped.agg(["count", "mean", "var"])
+        counts = agg["count"].to_numpy(dtype=np.int64)
+        variances = np.nan_to_num(agg["var"].to_numpy(dtype=np.float64))
+        return GroupMoments(
+            labels=tuple(agg.index),
+            counts=counts,
+            means=agg["mean"].to_numpy(dtype=np.float64),
+            sum_sq=variances * np.maximum(counts - 1, 0),
+        )
+
+    return _cached(key, build)
+
+
+def oneway_anova(moments: GroupMoments) -> dict[str, Any]:
+    """由分组充分统计量计算单因素方差分析。"""
+    n_total = moments.n_total
+    n_groups = len(moments.labels)
+    grand_mean = float(np.dot(moments.counts, moments.means) / n_total)
+    ss_between = float(np.dot(moments.counts, (moments.means - grand_mean) ** 2))
+    ss_within = float(moments.sum_sq.sum())
+    df_between = n_groups - 1
+    df_within = n_total - n_groups
+    with np.errstate(divide="ignore", invalid="ignore"):
+        f_stat = np.float64(ss_between / df_between) / np.float64(ss_within / df_within)
+    p_value = float(stats.f.sf(f_stat, df_between, df_within)) if np.isfinite(f_stat) else np.nan
+    total = ss_between + ss_within
+    return {
+        "f_statistic": float(f_stat),
+        "p_value": p_value,
+        "df_between": df_between,
+        "df_within": df_within,
+        "ss_between": ss_between,
+        "ss_within": ss_within,
+        "eta_squared": ss_between / total if total > 0 else 0.0,
+    }
+
+
+def tukey_hsd(moments: GroupMoments, alpha: float = 0.05) -> list[dict[str, Any]]:
+    """Tukey HSD 全部组对比较（与 statsmodels ``pairwise_tukeyhsd`` 口径一致）。
+
+    组按标签排序，均值差为后组减前组；全部组对共享一次 MSE 与一次分布计算。
+    """
+    order = pd.Index(moments.labels).argsort()
+    labels = [moments.labels[i] for i in order]
+    counts = moments.counts[order].astype(np.float64)
+    means = moments.means[order]
+    n_groups = len(labels)
+    df_within = moments.n_total - n_groups
+    mse = float(moments.sum_sq.sum()) / df_within
+
+    idx1, idx2 = np.triu_indices(n_groups, 1)
+    mean_diffs = means[idx2] - means[idx1]
+    std_pairs = np.sqrt(mse * (1.0 / counts[idx1] + 1.0 / counts[idx2]) / 2.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        q_stats = np.abs(mean_diffs) / std_pairs
+    p_values = np.atleast_1d(stats.studentized_range.sf(q_stats, n_groups, df_within))
+    return [
+        {
+            "group1": str(labels[i]),
+            "group2": str(labels[j]),
+            "mean_diff": float(diff),
+            "p_value": float(p),
+            "significant": bool(p < alpha),
+        }
+        for i, j, diff, p in zip(idx1, idx2, mean_diffs, p_values)
+    ]
+
+
+# ---- 相关分析 ----
+
+
+@dataclass(frozen=True)
+class CrossProducts:
+    """列均值与中心化叉积矩阵（完整观测行上计算）。"""
+
+    n: int
+    means: np.ndarray
+    cross: np.ndarray
+
+
+def _cross_products(values: np.ndarray) -> CrossProducts:
+    means = values.mean(axis=0)
+    centered = values - means
+    return CrossProducts(n=len(values), means=means, cross=centered.T @ centered)
+
+
+def correlation_family(
+    data: pd.DataFrame, method: str = "pearson"
+) -> tuple[np.ndarray, np.ndarray]:
+    """计算全部列对的相关系数矩阵与双侧 p 值矩阵（对角线 r=1、p=0）。
+
+    ``data`` 须已剔除缺失行。Pearson/Spearman 由叉积矩阵整体导出：
+    t = r·sqrt((n-2)/(1-r²))，p 取自 n-2 自由度的 t 分布；Kendall 无可合并的
+    充分统计量，逐对计算（仅上三角）。
+    """
+    columns = tuple(str(col) for col in data.columns)
+    key = ("correlation", dataset_version(data), columns, method)
+
+    if method == "kendall":
+        return _cached(key, lambda: _kendall_family(data))
+
+    def build() -> CrossProducts:
+        frame = data.rank() if method == "spearman" else data
+        return _cross_products(frame.to_numpy(dtype=np.float64))
+
+    products = _cached(key, build)
+    scale = np.sqrt(np.diag(products.cross))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = np.clip(products.cross / np.outer(scale, scale), -1.0, 1.0)
+    np.fill_diagonal(r, 1.0)
+    # 矩阵对称，p 值只在上三角计算后镜像
+    upper = np.triu_indices(len(columns), 1)
+    r_upper = r[upper]
+    dof = products.n - 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t_stats = r_upper * np.sqrt(dof / (1.0 - r_upper * r_upper))
+    p_upper = 2.0 * stats.t.sf(np.abs(t_stats), dof)
+    p_upper[np.abs(r_upper) == 1.0] = 0.0
+    p = np.zeros_like(r)
+    p[upper] = p_upper
+    p.T[upper] = p_upper
+    return r, p
+
+
+def _kendall_family(data: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    values = data.to_numpy(dtype=np.float64)
+    k = values.shape[1]
+    tau = np.eye(k)
+    p = np.zeros((k, k))
+    for i, j in zip(*np.triu_indices(k, 1)):
+        result = stats.kendalltau(values[:, i], values[:, j])
+        tau[i, j] = tau[j, i] = result.statistic
+        p[i, j] = p[j, i] = result.pvalue
+    return tau, p
+
+
+# ---- 多重比较校正 ----
+
+
+def adjust_pvalues(p_values: Any, method: str) -> np.ndarray:
+    """向量化多重比较校正：bonferroni / holm（逐步下降）/ fdr（BH 逐步上升）。"""
+    p = np.asarray(p_values, dtype=np.float64)
+    m = p.size
+    if m == 0:
+        return p
+    if method == "bonferroni":
+        return np.asarray(np.minimum(p * m, 1.0), dtype=np.float64)
+    order = np.argsort(p, kind="stable")
+    ranked = p[order]
+    if method == "holm":
+        adjusted = np.maximum.accumulate(np.minimum(ranked * (m - np.arange(m)), 1.0))
+    elif method == "fdr":
+        stepped = np.minimum(ranked * m / np.arange(1, m + 1), 1.0)
+        adjusted = np.minimum.accumulate(stepped[::-1])[::-1]
+    else:
+        raise ValueError(f"不支持的校正方法: {method}")
+    out = np.empty(m)
+    out[order] = adjusted
+    return out
@@ -5,8 +5,11 @@ from __future__ import annotations
 import asyncio
 from typing import Any
 
+import numpy as np
+
 from nini.agent.session import Session
 from nini.tools.base import Tool, ToolInputError, ToolResult, ToolSystemError, ToolTimeoutError
+from nini.tools.statistics.engine import adjust_pvalues
 
 
 def bonferroni_correction(p_values: list[float], alpha: float = 0.05) -> dict[str, Any]:
@@ -15,8 +18,9 @@ def bonferroni_correction(p_values: list[float], alpha: float = 0.05) -> dict[st
     if n_comparisons == 0:
         return {"method": "Bonferroni", "corrected_pvalues": [], "significant": []}
 
-    corrected = [min(p_value * n_comparisons, 1.0) for p_value in p_values]
-    significant = [p_value < alpha for p_value in corrected]
+    adjusted = adjust_pvalues(p_values, "bonferroni")
+    corrected = adjusted.tolist()
+    significant = (adjusted < alpha).tolist()
     return {
         "method": "Bonferroni",
         "alpha": alpha,
@@ -34,24 +38,9 @@ def holm_correction(p_values: list[float], alpha: float = 0.05) -> dict[str, Any
     if n_comparisons == 0:
         return {"method": "Holm", "corrected_pvalues": [], "significant": []}
 
-    indexed_pvalues = sorted(enumerate(p_values), key=lambda item: item[1])
-    corrected = [0.0] * n_comparisons
-
-    temp_corrected = []
-    for rank, (orig_index, p_value) in enumerate(indexed_pvalues):
-        multiplier = n_comparisons - rank
-        temp_corrected.append((orig_index, min(p_value * multiplier, 1.0)))
-
-    for i in range(len(temp_corrected) - 2, -1, -1):
-        orig_index, corrected_pvalue = temp_corrected[i]
-        next_corrected = temp_corrected[i + 1][1]
-        if corrected_pvalue < next_corrected:
-            temp_corrected[i] = (orig_index, next_corrected)
-
-    for orig_index, corrected_pvalue in temp_corrected:
-        corrected[orig_index] = corrected_pvalue
-
-    significant = [p_value < alpha for p_value in corrected]
+    adjusted = adjust_pvalues(p_values, "holm")
+    corrected = adjusted.tolist()
+    significant = (adjusted < alpha).tolist()
     return {
         "method": "Holm",
         "alpha": alpha,
@@ -69,20 +58,9 @@ def fdr_correction(p_values: list[float], alpha: float = 0.05) -> dict[str, Any]
     if n_comparisons == 0:
         return {"method": "FDR (Benjamini-Hochberg)", "corrected_pvalues": [], "significant": []}
 
-    indexed_pvalues = sorted(enumerate(p_values), key=lambda item: item[1])
-    corrected = [0.0] * n_comparisons
-
-    temp_corrected = []
-    for rank, (orig_index, p_value) in enumerate(indexed_pvalues, 1):
-        temp_corrected.append((orig_index, min(p_value * n_comparisons / rank, 1.0)))
-
-    min_pvalue = temp_corrected[-1][1] if temp_corrected else 1.0
-    for i in range(len(temp_corrected) - 1, -1, -1):
-        orig_index, corrected_pvalue = temp_corrected[i]
-        min_pvalue = min(min_pvalue, corrected_pvalue)
-        corrected[orig_index] = min_pvalue
-
-    significant = [p_value < alpha for p_value in corrected]
+    adjusted = adjust_pvalues(p_values, "fdr")
+    corrected = adjusted.tolist()
+    significant = (adjusted < alpha).tolist()
     return {
         "method": "FDR (Benjamini-Hochberg)",
         "alpha": alpha,
@@ -198,7 +176,8 @@ class MultipleComparisonCorrectionTool(Tool):
 
         if not p_values:
             return ToolResult(success=False, message="p_values 不能为空")
-        if not all(0 <= p_value <= 1 for p_value in p_values):
+        p_array = np.asarray(p_values, dtype=np.float64)
+        if not np.all((p_array >= 0) & (p_array <= 1)):
             return ToolResult(success=False, message="所有 p 值必须在 [0, 1] 范围内")
 
         try:
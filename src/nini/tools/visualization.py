@@ -18,16 +18,36 @@ from plotly.utils import PlotlyJSONEncoder
 from nini.agent.session import Session
 from nini.charts import build_style_spec, normalize_render_engine
 from nini.charts.code_templates import render_matplotlib_script, render_plotly_script
+from nini.charts.downsample import DownsampleResult, downsample_figure, save_full_resolution
+from nini.config import settings
 from nini.memory.storage import ArtifactStorage
 from nini.tools.base import Tool, ToolResult
 from nini.tools.templates.journal_styles import get_template_names
 from nini.workspace import WorkspaceManager
 
 
-def _to_plotly_json(fig: go.Figure) -> dict[str, Any]:
-    """将 Figure 转换为 JSON 可序列化字典。"""
-    payload = json.loads(json.dumps(fig, cls=PlotlyJSONEncoder))
-    return cast(dict[str, Any], payload) if isinstance(payload, dict) else {}
+def _to_plotly_json(fig: go.Figure) -> tuple[dict[str, Any], DownsampleResult]:
+    """将 Figure 转换为 JSON 可序列化字典。
+
+    超出点数预算的折线/散点轨迹先在 numpy 数组上降采样，再做一次序列化，
+    避免百万级数据点整体经过 JSON 编解码、落盘与 WebSocket 推送。
+    """
+    figure = fig.to_plotly_json()
+    reduction = downsample_figure(
+        figure,
+        line_budget=settings.chart_line_point_budget,
+        scatter_budget=settings.chart_scatter_point_budget,
+    )
+    payload = json.loads(json.dumps(figure, cls=PlotlyJSONEncoder))
+    if not isinstance(payload, dict):
+        return {}, reduction
+    return cast(dict[str, Any], payload), reduction
+
+
+def full_resolution_name(chart_name: str) -> str:
+    """图表 JSON 产物对应的完整分辨率数据文件名。"""
+    stem = chart_name[: -len(".plotly.json")] if chart_name.endswith(".plotly.json") else chart_name
+    return f"{stem}.fullres.npz"
 
 
 def _exec_template(code: str, df: pd.DataFrame) -> Any:
@@ -128,7 +148,7 @@ class CreateChartTool(Tool):
             plotly_code = render_plotly_script(chart_type, kwargs, style_spec, title=title)
             plotly_ns = _exec_template(plotly_code, df)
             plotly_fig = plotly_ns["fig"]
-            chart_data = _to_plotly_json(plotly_fig)
+            chart_data, reduction = _to_plotly_json(plotly_fig)
 
             ws = WorkspaceManager(session)
             storage = ArtifactStorage(session)
@@ -151,6 +171,20 @@ class CreateChartTool(Tool):
             while storage.get_path(output_name).exists():
                 output_name = f"{stem}_{counter}{suffix}"
                 counter += 1
+            if reduction.reduced:
+                # 完整分辨率数据另存为压缩旁路文件，前端缩放时按区间取回
+                fullres_name = full_resolution_name(output_name)
+                save_full_resolution(storage.get_path(fullres_name), reduction)
+                layout = chart_data.setdefault("layout", {})
+                meta = layout.get("meta")
+                if meta is None or isinstance(meta, dict):
+                    layout["meta"] = {
+                        **(meta or {}),
+                        "nini_downsampling": {
+                            "source": fullres_name,
+                            "traces": [item.to_dict() for item in reduction.reductions],
+                        },
+                    }
             path = storage.save_text(
                 json.dumps(chart_data, ensure_ascii=False),
                 output_name,
@@ -225,6 +259,11 @@ class CreateChartTool(Tool):
                     "dataset_name": dataset_name,
                     "render_engine": resolved_engine,
                     "generated_code": generated_code,
+                    **(
+                        {"downsampled": [item.to_dict() for item in reduction.reductions]}
+                        if reduction.reduced
+                        else {}
+                    ),
                 },
                 has_chart=True,
                 chart_data=chart_data,
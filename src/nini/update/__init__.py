@@ -5,6 +5,7 @@ from nini.update.models import (
     UpdateCheckResult,
     UpdateDownloadState,
     UpdateManifest,
+    UpdatePatch,
     UpdateStatus,
 )
 
@@ -13,5 +14,6 @@ __all__ = [
     "UpdateCheckResult",
     "UpdateDownloadState",
     "UpdateManifest",
+    "UpdatePatch",
     "UpdateStatus",
 ]
@@ -0,0 +1,188 @@
+"""二进制差分补丁（nini-delta-v1）的生成与应用。
+
+补丁由一串操作组成，把“上一版本安装包”重组为“新版本安装包”：
+
+- ``C``：从旧安装包 ``offset`` 处复制 ``length`` 字节；
+- ``I``：插入补丁中紧随其后的 ``length`` 字节；
+- ``E``：结束。
+
+文件头为 ``MAGIC`` + 目标大小（大端 uint64）。客户端应用补丁时流式读取，
+边写边计算 SHA256，输出与 manifest 中完整安装包的哈希比对，因此补丁本身不需要额外签名。
+
+生成端（发布工具）采用 rsync 式的弱校验滚动匹配，纯 Python 实现，只用于发版，不在客户端运行。
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import struct
+from pathlib import Path
+from typing import BinaryIO
+
+DELTA_FORMAT = "nini-delta-v1"
+MAGIC = b"NINIDLT1"
+
+_OP_COPY = b"C"
+_OP_INSERT = b"I"
+_OP_END = b"E"
+_U64 = struct.Struct(">Q")
+_COPY = struct.Struct(">QQ")
+
+_IO_CHUNK = 1024 * 1024
+_DEFAULT_BLOCK_SIZE = 16 * 1024
+_MOD = 1 << 16
+
+
+class DeltaError(ValueError):
+    """补丁格式错误或与旧安装包不匹配。"""
+
+
+def _read_exact(file: BinaryIO, size: int) -> bytes:
+    data = file.read(size)
+    if len(data) != size:
+        raise DeltaError("补丁文件被截断")
+    return data
+
+
+def apply_patch(base: Path, patch: Path, output: Path) -> str:
+    """把补丁应用到旧安装包，写出新安装包并返回其 SHA256。
+
+    Raises:
+        DeltaError: 补丁格式错误、复制区间越界或输出大小与声明不一致
+    """
+    digest = hashlib.sha256()
+    base_size = base.stat().st_size
+    written = 0
+    with base.open("rb") as src, patch.open("rb") as ops, output.open("wb") as out:
+        if ops.read(len(MAGIC)) != MAGIC:
+            raise DeltaError(f"不是 {DELTA_FORMAT} 补丁")
+        (target_size,) = _U64.unpack(_read_exact(ops, _U64.size))
+        while True:
+            op = ops.read(1)
+            if op == _OP_END:
+                break
+            if op == _OP_COPY:
+                offset, length = _COPY.unpack(_read_exact(ops, _COPY.size))
+                if offset + length > base_size:
+                    raise DeltaError("补丁复制区间超出旧安装包范围")
+                src.seek(offset)
+                remaining = length
+                while remaining:
+                    chunk = _read_exact(src, min(remaining, _IO_CHUNK))
+                    out.write(chunk)
+                    digest.update(chunk)
+                    remaining -= len(chunk)
+            elif op == _OP_INSERT:
+                (length,) = _U64.unpack(_read_exact(ops, _U64.size))
+                remaining = length
+                while remaining:
+                    chunk = _read_exact(ops, min(remaining, _IO_CHUNK))
+                    out.write(chunk)
+                    digest.update(chunk)
+                    remaining -= len(chunk)
+            else:
+                raise DeltaError("补丁包含未知操作")
+            written += length
+            if written > target_size:
+                raise DeltaError("补丁输出超过声明大小")
+    if written != target_size:
+        raise DeltaError(f"补丁输出大小不一致: 实际={written}, 预期={target_size}")
+    return digest.hexdigest()
+
+
+def _weak_hash(data: bytes) -> tuple[int, int]:
+    a = 0
+    b = 0
+    size = len(data)
+    for idx, value in enumerate(data):
+        a += value
+        b += (size - idx) * value
+    return a % _MOD, b % _MOD
+
+
+def _diff_ops(base: bytes, target: bytes, block_size: int) -> list[tuple[bytes, int, int]]:
+    """计算 (op, a, b) 序列：COPY 为 (offset, length)，INSERT 为 (start, end) 目标区间。"""
+    index: dict[int, list[int]] = {}
+    for offset in range(0, len(base) - block_size + 1, block_size):
+        a, b = _weak_hash(base[offset : offset + block_size])
+        index.setdefault(a | (b << 16), []).append(offset)
+
+    ops: list[tuple[bytes, int, int]] = []
+    literal_start = 0
+    pos = 0
+    end = len(target)
+    if index and end >= block_size:
+        a, b = _weak_hash(target[:block_size])
+        while pos + block_size <= end:
+            match = -1
+            for offset in index.get(a | (b << 16), ()):
+                if base[offset : offset + block_size] == target[pos : pos + block_size]:
+                    match = offset
+                    break
+            if match >= 0:
+                length = block_size
+                while (
+                    match + length < len(base)
+                    and pos + length < end
+                    and base[match + length] == target[pos + length]
+                ):
+                    length += 1
+                if literal_start < pos:
+                    ops.append((_OP_INSERT, literal_start, pos))
+                if ops and ops[-1][0] == _OP_COPY and sum(ops[-1][1:]) == match:
+                    ops[-1] = (_OP_COPY, ops[-1][1], ops[-1][2] + length)
+                else:
+                    ops.append((_OP_COPY, match, length))
+                pos += length
+                literal_start = pos
+                if pos + block_size <= end:
+                    a, b = _weak_hash(target[pos : pos + block_size])
+                continue
+            if pos + block_size >= end:
+                break
+            out_byte = target[pos]
+            in_byte = target[pos + block_size]
+            a = (a - out_byte + in_byte) % _MOD
+            b = (b - block_size * out_byte + a) % _MOD
+            pos += 1
+    if literal_start < end:
+        ops.append((_OP_INSERT, literal_start, end))
+    return ops
+
+
+def create_patch(
+    base: Path, target: Path, output: Path, *, block_size: int = _DEFAULT_BLOCK_SIZE
+) -> int:
+    """生成从 ``base`` 到 ``target`` 的补丁，返回补丁大小（字节）。"""
+    base_bytes = base.read_bytes()
+    target_bytes = target.read_bytes()
+    with output.open("wb") as out:
+        out.write(MAGIC)
+        out.write(_U64.pack(len(target_bytes)))
+        for op, first, second in _diff_ops(base_bytes, target_bytes, block_size):
+            if op == _OP_COPY:
+                out.write(_OP_COPY)
+                out.write(_COPY.pack(first, second))
+            else:
+                out.write(_OP_INSERT)
+                out.write(_U64.pack(second - first))
+                out.write(target_bytes[first:second])
+        out.write(_OP_END)
+    return output.stat().st_size
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=f"生成 {DELTA_FORMAT} 安装包差分补丁")
+    parser.add_argument("--base", required=True, type=Path, help="上一版本安装包")
+    parser.add_argument("--target", required=True, type=Path, help="新版本安装包")
+    parser.add_argument("--output", required=True, type=Path)
+    parser.add_argument("--block-size", type=int, default=_DEFAULT_BLOCK_SIZE)
+    args = parser.parse_args(argv)
+    size = create_patch(args.base, args.target, args.output, block_size=args.block_size)
+    print(f"已生成补丁: {args.output} ({size} bytes)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,15 +1,24 @@
-"""更新包下载与完整性校验。"""
+"""更新包下载与完整性校验。
+
+- 边下载边计算 SHA256，校验阶段不再二次读取整个文件；
+- 大文件按 Range 切分为多个分段并行下载，按偏移顺序汇聚哈希；
+- manifest 提供增量补丁且本地缓存了匹配的旧安装包时，只下载补丁并在暂存目录中重建安装包，
+  任何一步失败都回退完整下载。
+"""
 
 from __future__ import annotations
 
+import asyncio
 import hashlib
 import logging
+import shutil
 from pathlib import Path
 from urllib.parse import urlparse
 
 import httpx
 
-from nini.update.models import UpdateAsset, UpdateDownloadState
+from nini.update.delta import apply_patch
+from nini.update.models import UpdateAsset, UpdateDownloadState, UpdatePatch
 from nini.update.state import UpdateStateStore
 
 logger = logging.getLogger(__name__)
@@ -20,11 +29,100 @@ _CHUNK_SIZE = 1024 * 1024
 # 状态保存间隔（每 5% 保存一次）
 _PROGRESS_SAVE_INTERVAL = 5
 
+# 并行分段下载时单个分段的最小字节数；小文件走单连接
+_MIN_SEGMENT_BYTES = 8 * 1024 * 1024
+
+# 增量补丁下载与重建所用的暂存子目录
+_STAGING_DIRNAME = "staging"
+
 
 class DownloadError(RuntimeError):
     """更新包下载失败。"""
 
 
+class _RangeNotSupported(DownloadError):
+    """服务器忽略了 Range 请求，无法分段下载。"""
+
+
+class _StreamingHash:
+    """流式 SHA256：断点续传时先补算已落盘的前缀。"""
+
+    def __init__(self) -> None:
+        self._digest = hashlib.sha256()
+
+    def reset(self) -> None:
+        self._digest = hashlib.sha256()
+
+    def prime_from_file(self, path: Path, length: int) -> None:
+        self.reset()
+        remaining = length
+        with path.open("rb") as file:
+            while remaining > 0:
+                chunk = file.read(min(remaining, _CHUNK_SIZE))
+                if not chunk:
+                    break
+                self._digest.update(chunk)
+                remaining -= len(chunk)
+
+    def update(self, chunk: bytes) -> None:
+        self._digest.update(chunk)
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+
+class _OrderedSegmentHash:
+    """按偏移顺序汇聚并行分段的 SHA256。
+
+    位于“头部”的分段（之前的分段均已完成）直接对到达的数据块计算哈希；
+    其余分段只落盘，轮到它们成为头部时从文件补读已写入的部分，之后继续实时计算。
+    全部在事件循环线程内调用，无需加锁。
+    """
+
+    def __init__(self, path: Path, bounds: list[tuple[int, int]]) -> None:
+        self._path = path
+        self._bounds = bounds
+        self._digest = hashlib.sha256()
+        self._written = [0] * len(bounds)
+        self._hashed = [0] * len(bounds)
+        self._done = [False] * len(bounds)
+        self._head = 0
+
+    def on_chunk(self, idx: int, chunk: bytes) -> None:
+        if idx == self._head and self._hashed[idx] == self._written[idx]:
+            self._digest.update(chunk)
+            self._hashed[idx] += len(chunk)
+        self._written[idx] += len(chunk)
+
+    def on_done(self, idx: int) -> None:
+        self._done[idx] = True
+        while self._head < len(self._bounds):
+            self._catch_up(self._head)
+            if not self._done[self._head]:
+                break
+            self._head += 1
+
+    def _catch_up(self, idx: int) -> None:
+        missing = self._written[idx] - self._hashed[idx]
+        if missing <= 0:
+            return
+        start = self._bounds[idx][0] + self._hashed[idx]
+        with self._path.open("rb") as file:
+            file.seek(start)
+            while missing > 0:
+                chunk = file.read(min(missing, _CHUNK_SIZE))
+                if not chunk:
+                    raise DownloadError("分段数据读取不完整")
+                self._digest.update(chunk)
+                self._hashed[idx] += len(chunk)
+                missing -= len(chunk)
+
+    def hexdigest(self) -> str:
+        if self._head != len(self._bounds):
+            raise DownloadError("分段下载尚未全部完成")
+        return self._digest.hexdigest()
+
+
 def _safe_filename_from_url(url: str, *, fallback: str) -> str:
     name = Path(urlparse(url).path).name
     if not name or name in {".", ".."}:
@@ -41,16 +139,23 @@ def sha256_file(path: Path) -> str:
     return digest.hexdigest()
 
 
-def verify_downloaded_file(path: Path, asset: UpdateAsset) -> None:
-    """校验文件大小和 SHA256。"""
+def verify_downloaded_file(
+    path: Path, asset: UpdateAsset | UpdatePatch, *, digest: str | None = None
+) -> None:
+    """校验文件大小和 SHA256。
+
+    ``digest`` 为下载过程中流式计算的哈希；提供时不再重新读取文件。
+    """
+    label = "增量补丁" if isinstance(asset, UpdatePatch) else "更新包"
     if not path.exists() or not path.is_file():
-        raise DownloadError("更新包不存在")
+        raise DownloadError(f"{label}不存在")
     size = path.stat().st_size
     if size != asset.size:
-        raise DownloadError(f"更新包大小与 manifest 不一致: 实际={size}, 预期={asset.size}")
-    digest = sha256_file(path)
+        raise DownloadError(f"{label}大小与 manifest 不一致: 实际={size}, 预期={asset.size}")
+    if digest is None:
+        digest = sha256_file(path)
     if digest != asset.sha256:
-        raise DownloadError("更新包 SHA256 校验失败")
+        raise DownloadError(f"{label} SHA256 校验失败")
 
 
 async def _stream_download(
@@ -62,6 +167,7 @@ async def _stream_download(
     timeout: float,
     client: httpx.AsyncClient | None = None,
     resume_from: int = 0,
+    hasher: _StreamingHash | None = None,
 ) -> int:
     """流式下载文件，支持断点续传。
 
@@ -74,6 +180,7 @@ async def _stream_download(
         timeout: 超时时间
         client: httpx 客户端（可选）
         resume_from: 从哪个字节位置继续下载（0 表示从头开始）
+        hasher: 流式哈希（可选）；续传时会先补算已落盘的前缀
 
     Returns:
         实际下载的总字节数
@@ -142,9 +249,17 @@ async def _stream_download(
                 else "wb"
             )
 
+            if hasher is not None:
+                if mode == "ab":
+                    hasher.prime_from_file(target, resume_from)
+                else:
+                    hasher.reset()
+
             with target.open(mode) as f:
                 async for chunk in response.aiter_bytes(chunk_size=_CHUNK_SIZE):
                     f.write(chunk)
+                    if hasher is not None:
+                        hasher.update(chunk)
                     downloaded += len(chunk)
 
                     # 实时校验大小
@@ -173,6 +288,234 @@ async def _stream_download(
         return await _download_with_client(client)
 
 
+def _segment_bounds(size: int, segments: int) -> list[tuple[int, int]]:
+    """把 [0, size) 切分为不超过 ``segments`` 个、每段不小于最小分段的区间。"""
+    count = max(1, min(segments, size // _MIN_SEGMENT_BYTES))
+    step, extra = divmod(size, count)
+    bounds: list[tuple[int, int]] = []
+    start = 0
+    for idx in range(count):
+        end = start + step + (1 if idx < extra else 0)
+        bounds.append((start, end))
+        start = end
+    return bounds
+
+
+async def _segmented_download(
+    url: str,
+    target: Path,
+    expected_size: int,
+    state: UpdateDownloadState,
+    state_store: UpdateStateStore,
+    client: httpx.AsyncClient,
+    bounds: list[tuple[int, int]],
+) -> str:
+    """多个 Range 连接并行下载各分段，返回按顺序汇聚的 SHA256。
+
+    各分段直接写入目标文件的对应偏移（不预分配），因此文件大小等于已写入字节数时，
+    内容必然是连续前缀，可安全地作为单连接续传的起点。
+
+    Raises:
+        _RangeNotSupported: 服务器以 200 响应分段请求
+        DownloadError: 重定向、Content-Range 不匹配或分段不完整
+    """
+    target.write_bytes(b"")
+    hasher = _OrderedSegmentHash(target, bounds)
+    written_total = 0
+    last_saved_progress = 0
+
+    async def _fetch(idx: int) -> None:
+        nonlocal written_total, last_saved_progress
+        start, end = bounds[idx]
+        headers = {"Range": f"bytes={start}-{end - 1}"}
+        async with client.stream("GET", url, headers=headers) as response:
+            if 300 <= response.status_code < 400:
+                raise DownloadError(
+                    f"更新包 URL 返回重定向（status={response.status_code}），出于安全考虑已拒绝跟随"
+                )
+            if response.status_code == 200:
+                raise _RangeNotSupported("服务器不支持 Range 请求")
+            if response.status_code != 206:
+                response.raise_for_status()
+                raise DownloadError(f"分段请求返回异常状态: {response.status_code}")
+            content_range = response.headers.get("Content-Range", "")
+            try:
+                server_start = int(content_range.replace("bytes ", "").split("-")[0])
+            except (ValueError, IndexError) as exc:
+                raise DownloadError(f"Content-Range 格式异常: {content_range}") from exc
+            if server_start != start:
+                raise DownloadError(
+                    f"Content-Range 偏移不匹配: server={server_start}, local={start}"
+                )
+
+            pos = start
+            # 无缓冲写入，头部分段补读时可立即看到其他分段已写入的数据
+            with target.open("r+b", buffering=0) as file:
+                file.seek(start)
+                async for chunk in response.aiter_bytes(chunk_size=_CHUNK_SIZE):
+                    if pos + len(chunk) > end:
+                        raise DownloadError(
+                            f"分段数据超出请求范围: 分段={start}-{end - 1}, 已收到至 {pos + len(chunk)}"
+                        )
+                    file.write(chunk)
+                    pos += len(chunk)
+                    hasher.on_chunk(idx, chunk)
+                    written_total += len(chunk)
+                    state.downloaded_bytes = written_total
+                    state.progress = int(written_total * 100 / expected_size)
+                    if state.progress - last_saved_progress >= _PROGRESS_SAVE_INTERVAL:
+                        state_store.save(state)
+                        last_saved_progress = state.progress
+            if pos != end:
+                raise DownloadError(f"分段下载不完整: 分段={start}-{end - 1}, 已收到至 {pos}")
+        hasher.on_done(idx)
+
+    tasks = [asyncio.create_task(_fetch(idx)) for idx in range(len(bounds))]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    return hasher.hexdigest()
+
+
+async def _download_to(
+    url: str,
+    target: Path,
+    expected_size: int,
+    state: UpdateDownloadState,
+    state_store: UpdateStateStore,
+    timeout: float,
+    client: httpx.AsyncClient | None,
+    *,
+    resume_from: int,
+    segments: int,
+) -> str:
+    """下载到目标文件并返回流式计算的 SHA256；大文件优先并行分段。"""
+    bounds = _segment_bounds(expected_size, segments) if resume_from == 0 else []
+    if len(bounds) > 1:
+        try:
+            if client is None:
+                async with httpx.AsyncClient(
+                    timeout=timeout, follow_redirects=False
+                ) as owned_client:
+                    return await _segmented_download(
+                        url, target, expected_size, state, state_store, owned_client, bounds
+                    )
+            return await _segmented_download(
+                url, target, expected_size, state, state_store, client, bounds
+            )
+        except _RangeNotSupported:
+            logger.warning("服务器不支持 Range 请求，改用单连接下载")
+            state.downloaded_bytes = 0
+            state.progress = 0
+
+    hasher = _StreamingHash()
+    await _stream_download(
+        url,
+        target,
+        expected_size,
+        state,
+        state_store,
+        timeout,
+        client,
+        resume_from,
+        hasher,
+    )
+    return hasher.hexdigest()
+
+
+async def _find_patch_base(
+    asset: UpdateAsset, updates_dir: Path, current_version: str
+) -> tuple[UpdatePatch, Path] | None:
+    """查找适用于当前版本的补丁以及本地缓存的旧安装包（哈希计算在线程中进行）。"""
+    base_dir = updates_dir / current_version
+    for patch in asset.patches:
+        if patch.from_version != current_version or not base_dir.is_dir():
+            continue
+        for candidate in sorted(base_dir.iterdir()):
+            if not candidate.is_file() or candidate.suffix == ".download":
+                continue
+            if candidate.stat().st_size != patch.from_size:
+                continue
+            if await asyncio.to_thread(sha256_file, candidate) == patch.from_sha256:
+                return patch, candidate
+    return None
+
+
+async def _download_via_patch(
+    patch: UpdatePatch,
+    base: Path,
+    asset: UpdateAsset,
+    target: Path,
+    state: UpdateDownloadState,
+    state_store: UpdateStateStore,
+    timeout: float,
+    client: httpx.AsyncClient | None,
+    *,
+    segments: int,
+) -> None:
+    """下载增量补丁并在暂存目录中重建安装包，校验通过后移动到 ``target``。"""
+    staging = target.parent / _STAGING_DIRNAME
+    staging.mkdir(parents=True, exist_ok=True)
+    patch_name = _safe_filename_from_url(patch.url, fallback=f"{target.name}.delta")
+    patch_file = staging / patch_name
+    staged_target = staging / target.name
+    try:
+        logger.info(
+            "下载增量补丁: from=%s, size=%d bytes, url=%s",
+            patch.from_version,
+            patch.size,
+            patch.url,
+        )
+        state.total_bytes = patch.size
+        state_store.save(state)
+        patch_digest = await _download_to(
+            patch.url,
+            patch_file,
+            patch.size,
+            state,
+            state_store,
+            timeout,
+            client,
+            resume_from=0,
+            segments=segments,
+        )
+        verify_downloaded_file(patch_file, patch, digest=patch_digest)
+
+        state.status = "verifying"
+        state.progress = 100
+        state_store.save(state)
+        digest = await asyncio.to_thread(apply_patch, base, patch_file, staged_target)
+        verify_downloaded_file(staged_target, asset, digest=digest)
+        staged_target.replace(target)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def _mark_ready(
+    state: UpdateDownloadState,
+    state_store: UpdateStateStore,
+    asset: UpdateAsset,
+    target: Path,
+) -> UpdateDownloadState:
+    state.status = "ready"
+    state.installer_path = str(target)
+    state.downloaded_bytes = asset.size
+    state.total_bytes = asset.size
+    state.progress = 100
+    state.verified = True
+    state.error = None
+    state.expected_sha256 = asset.sha256
+    state.expected_size = asset.size
+    state_store.save(state)
+
+    logger.info("更新包校验通过: path=%s", target)
+    return state
+
+
 async def download_asset(
     asset: UpdateAsset,
     *,
@@ -181,6 +524,8 @@ async def download_asset(
     state_store: UpdateStateStore,
     timeout: float,
     client: httpx.AsyncClient | None = None,
+    current_version: str | None = None,
+    segments: int = 4,
 ) -> UpdateDownloadState:
     """下载更新安装包；同版本下载请求保持幂等。
 
@@ -189,6 +534,9 @@ async def download_asset(
     - 实时大小校验：下载过程中检测异常
     - 进度上报：定期更新下载进度
     - 断点续传：支持从上次中断位置继续下载
+    - 流式哈希：校验阶段不再二次读取文件
+    - 并行分段：大文件按 ``segments`` 个 Range 连接并行下载
+    - 增量补丁：提供 ``current_version`` 且本地缓存了匹配的旧安装包时优先下载补丁
     """
     existing = state_store.load()
 
@@ -211,6 +559,13 @@ async def download_asset(
     target = version_dir / filename
     temp_target = target.with_suffix(target.suffix + ".download")
 
+    # 只有连续前缀才能续传：分段下载中断后文件带空洞，其大小与已下载字节数不一致
+    if can_resume and (
+        not temp_target.exists() or temp_target.stat().st_size != existing.downloaded_bytes
+    ):
+        logger.warning("部分下载文件与记录不一致，从头重新下载: %s", temp_target)
+        can_resume = False
+
     if can_resume and (existing.expected_sha256 or "").lower() != asset.sha256.lower():
         logger.warning(
             "检测到同版本 manifest 重发布，丢弃旧下载字节: version=%s old_sha=%s new_sha=%s",
@@ -254,6 +609,34 @@ async def download_asset(
         state_store.save(state)
         resume_from = 0
 
+    patch_base = (
+        await _find_patch_base(asset, updates_dir, current_version)
+        if current_version and resume_from == 0 and asset.patches
+        else None
+    )
+    if patch_base is not None:
+        patch, base = patch_base
+        try:
+            await _download_via_patch(
+                patch,
+                base,
+                asset,
+                target,
+                state,
+                state_store,
+                timeout,
+                client,
+                segments=segments,
+            )
+            return _mark_ready(state, state_store, asset, target)
+        except Exception as exc:
+            logger.warning("增量更新失败，回退完整下载: %s", exc)
+            state.status = "downloading"
+            state.downloaded_bytes = 0
+            state.progress = 0
+            state.total_bytes = asset.size
+            state_store.save(state)
+
     logger.info(
         "开始流式下载: version=%s, size=%d bytes, resume_from=%d, url=%s",
         version,
@@ -263,8 +646,8 @@ async def download_asset(
     )
 
     try:
-        # 流式下载（支持断点续传）
-        total_downloaded = await _stream_download(
+        # 流式下载（支持断点续传与并行分段），同时计算 SHA256
+        digest = await _download_to(
             asset.url,
             temp_target,
             asset.size,
@@ -272,7 +655,8 @@ async def download_asset(
             state_store,
             timeout,
             client,
-            resume_from,
+            resume_from=resume_from,
+            segments=segments,
         )
 
         # 下载完成，更新状态
@@ -284,19 +668,9 @@ async def download_asset(
         logger.info("下载完成，开始校验: downloaded=%d bytes", state.downloaded_bytes)
 
         # 校验文件
-        verify_downloaded_file(temp_target, asset)
+        verify_downloaded_file(temp_target, asset, digest=digest)
         temp_target.replace(target)
-
-        state.status = "ready"
-        state.installer_path = str(target)
-        state.verified = True
-        state.error = None
-        state.expected_sha256 = asset.sha256
-        state.expected_size = asset.size
-        state_store.save(state)
-
-        logger.info("更新包校验通过: path=%s", target)
-        return state
+        return _mark_ready(state, state_store, asset, target)
     except Exception as exc:
         logger.error("下载或校验失败: %s", exc)
         # 布尔 flag 决定是否清理临时文件
@@ -93,6 +93,15 @@ def validate_asset_url(
     )
     if source_url.netloc and asset_url.netloc != source_url.netloc:
         raise ManifestError("更新包 URL 必须与更新源同域")
+    for patch in asset.patches:
+        patch_url = urlparse(patch.url)
+        _validate_update_url_security(
+            patch_url,
+            allow_insecure_http=allow_insecure_http,
+            label="增量补丁 URL",
+        )
+        if source_url.netloc and patch_url.netloc != source_url.netloc:
+            raise ManifestError("增量补丁 URL 必须与更新源同域")
 
 
 def select_asset(
@@ -32,6 +32,31 @@ DownloadStatus = Literal[
 ]
 
 
+def _normalize_sha256(value: str) -> str:
+    normalized = value.strip().lower()
+    if len(normalized) != 64 or any(ch not in "0123456789abcdef" for ch in normalized):
+        raise ValueError("sha256 必须是 64 位十六进制字符串")
+    return normalized
+
+
+class UpdatePatch(BaseModel):
+    """从某个旧版本安装包生成新安装包的二进制差分补丁。"""
+
+    from_version: str = Field(min_length=1)
+    # 旧版本安装包的大小与哈希，客户端据此确认本地缓存的安装包可作为补丁基线
+    from_size: int = Field(gt=0)
+    from_sha256: str = Field(min_length=64, max_length=64)
+    format: Literal["nini-delta-v1"] = "nini-delta-v1"
+    url: str = Field(min_length=1)
+    size: int = Field(gt=0)
+    sha256: str = Field(min_length=64, max_length=64)
+
+    @field_validator("sha256", "from_sha256")
+    @classmethod
+    def _validate_sha256(cls, value: str) -> str:
+        return _normalize_sha256(value)
+
+
 class UpdateAsset(BaseModel):
     """单个平台的更新安装包。"""
 
@@ -40,14 +65,13 @@ class UpdateAsset(BaseModel):
     url: str = Field(min_length=1)
     size: int = Field(gt=0)
     sha256: str = Field(min_length=64, max_length=64)
+    # 可选的增量补丁；没有可用基线时回退完整下载
+    patches: list[UpdatePatch] = Field(default_factory=list)
 
     @field_validator("sha256")
     @classmethod
     def _validate_sha256(cls, value: str) -> str:
-        normalized = value.strip().lower()
-        if len(normalized) != 64 or any(ch not in "0123456789abcdef" for ch in normalized):
-            raise ValueError("sha256 必须是 64 位十六进制字符串")
-        return normalized
+        return _normalize_sha256(value)
 
 
 class UpdateManifest(BaseModel):
@@ -154,6 +154,10 @@ class UpdateService:
                 state_store=self.state_store,
                 timeout=float(self.settings.update_download_timeout_seconds),
                 client=client,
+                current_version=(
+                    get_current_version() if self.settings.update_delta_enabled else None
+                ),
+                segments=self.settings.update_download_segments,
             )
             logger.info("下载更新完成: status=%s, verified=%s", result.status, result.verified)
             return result
@@ -0,0 +1,488 @@
+"""全局成本账本（SQLite）。
+
+每个会话的 ``cost.jsonl`` 仍是成本记录的唯一来源；账本只保存由它派生的汇总，
+在 ``SessionTokenTracker`` 追加记录后由后台定时器批量增量更新（不在事件循环上访问
+SQLite），供成本看板按结果规模查询：
+
+- ``ledger_sessions``：会话级汇总，以及该会话 ``cost.jsonl`` 已消费的字节偏移；
+- ``ledger_session_models``：会话 × 模型汇总；
+- ``ledger_models``：全局模型汇总；
+- ``ledger_buckets``：按小时分桶的 会话 × 模型 汇总，支持按时间范围聚合。
+
+增量同步按字节偏移读取 ``cost.jsonl`` 新增的完整行，重复同步不会重复计数；
+文件被截断或重写时该会话从头重建。账本首次使用时回填一次已有会话。
+账本位于 ``settings.cache_dir``，删除后会自动从 ``cost.jsonl`` 重建。
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from nini.utils.token_counter import estimate_cost
+
+logger = logging.getLogger(__name__)
+
+BUCKET_SECONDS = 3600
+GRANULARITY_SECONDS = {"hour": 3600, "day": 86400, "week": 7 * 86400}
+_FALLBACK_SUFFIX = " (fallback)"
+_BACKFILL_KEY = "backfilled"
+
+_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS ledger_sessions (
+    session_id TEXT PRIMARY KEY,
+    input_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0,
+    cost_usd REAL NOT NULL DEFAULT 0,
+    call_count INTEGER NOT NULL DEFAULT 0,
+    first_ts REAL,
+    last_ts REAL,
+    ingested_bytes INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS ledger_session_models (
+    session_id TEXT NOT NULL,
+    model TEXT NOT NULL,
+    input_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0,
+    cost_usd REAL NOT NULL DEFAULT 0,
+    call_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (session_id, model)
+);
+CREATE TABLE IF NOT EXISTS ledger_models (
+    model TEXT PRIMARY KEY,
+    input_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0,
+    cost_usd REAL NOT NULL DEFAULT 0,
+    call_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS ledger_buckets (
+    bucket_start INTEGER NOT NULL,
+    session_id TEXT NOT NULL,
+    model TEXT NOT NULL,
+    input_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0,
+    cost_usd REAL NOT NULL DEFAULT 0,
+    call_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket_start, session_id, model)
+);
+CREATE TABLE IF NOT EXISTS ledger_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ledger_sessions_last_ts ON ledger_sessions(last_ts DESC);
+CREATE INDEX IF NOT EXISTS idx_ledger_buckets_session ON ledger_buckets(session_id, bucket_start);
+"""
+
+# 汇总表的增量更新语句（input, output, cost, calls 依次累加）
+_ADD_SESSION_MODEL = """
+INSERT INTO ledger_session_models (session_id, model, input_tokens, output_tokens, cost_usd, call_count)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(session_id, model) DO UPDATE SET
+    input_tokens = input_tokens + excluded.input_tokens,
+    output_tokens = output_tokens + excluded.output_tokens,
+    cost_usd = cost_usd + excluded.cost_usd,
+    call_count = call_count + excluded.call_count
+"""
+_ADD_MODEL = """
+INSERT INTO ledger_models (model, input_tokens, output_tokens, cost_usd, call_count)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(model) DO UPDATE SET
+    input_tokens = input_tokens + excluded.input_tokens,
+    output_tokens = output_tokens + excluded.output_tokens,
+    cost_usd = cost_usd + excluded.cost_usd,
+    call_count = call_count + excluded.call_count
+"""
+_ADD_BUCKET = """
+INSERT INTO ledger_buckets (bucket_start, session_id, model, input_tokens, output_tokens, cost_usd, call_count)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(bucket_start, session_id, model) DO UPDATE SET
+    input_tokens = input_tokens + excluded.input_tokens,
+    output_tokens = output_tokens + excluded.output_tokens,
+    cost_usd = cost_usd + excluded.cost_usd,
+    call_count = call_count + excluded.call_count
+"""
+
+
+def rollup_model_name(model: str) -> str:
+    """汇总用模型名：去掉兜底价格标记，使同一模型合并统计。"""
+    return model.replace(_FALLBACK_SUFFIX, "")
+
+
+def _parse_cost_line(line: str) -> tuple[float, str, int, int, float] | None:
+    """解析 ``cost.jsonl`` 的一行；缺失成本按当前价格表补算（兼容旧数据）。"""
+    try:
+        data = json.loads(line)
+        timestamp = float(data.get("timestamp", time.time()))
+        model = str(data.get("model", "unknown"))
+        input_tokens = int(data.get("input_tokens", 0) or 0)
+        output_tokens = int(data.get("output_tokens", 0) or 0)
+        cost = data.get("cost_usd")
+    except (json.JSONDecodeError, AttributeError, TypeError, ValueError):
+        return None
+    if cost is None:
+        cost, _ = estimate_cost(model, input_tokens, output_tokens)
+    return timestamp, model, input_tokens, output_tokens, float(cost or 0.0)
+
+
+def _usage_row(row: sqlite3.Row | tuple[Any, ...]) -> dict[str, Any]:
+    input_tokens, output_tokens = int(row[1] or 0), int(row[2] or 0)
+    return {
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "total_tokens": input_tokens + output_tokens,
+        "cost_usd": float(row[3] or 0.0),
+        "call_count": int(row[4] or 0),
+    }
+
+
+class CostLedger:
+    """成本账本；单连接 + 锁，写入与查询均为小事务。"""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=10.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                conn.executescript(_SCHEMA_SQL)
+            self._conn = conn
+        return self._conn
+
+    # ---- 写入 ----
+
+    def sync_session(self, session_id: str, cost_file: Path) -> int:
+        """把 ``cost_file`` 中尚未入账的完整行计入汇总，返回新入账的记录数。"""
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT ingested_bytes FROM ledger_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            offset = int(row[0]) if row else 0
+            try:
+                size = cost_file.stat().st_size
+            except OSError:
+                return 0
+            with conn:
+                if size < offset:
+                    # 文件被截断或重写：丢弃该会话的旧汇总后从头入账
+                    self._forget_locked(conn, session_id)
+                    offset = 0
+                if size == offset:
+                    return 0
+                with open(cost_file, "rb") as f:
+                    f.seek(offset)
+                    chunk = f.read(size - offset)
+                # 只消费到最后一个换行，正在写入的半行留待下次同步
+                end = chunk.rfind(b"\n") + 1
+                if end == 0:
+                    return 0
+                records = [
+                    parsed
+                    for raw in chunk[:end].decode("utf-8", errors="replace").splitlines()
+                    if raw.strip() and (parsed := _parse_cost_line(raw)) is not None
+                ]
+                self._apply_locked(conn, session_id, records, offset + end)
+            return len(records)
+
+    @staticmethod
+    def _apply_locked(
+        conn: sqlite3.Connection,
+        session_id: str,
+        records: list[tuple[float, str, int, int, float]],
+        ingested_bytes: int,
+    ) -> None:
+        session_models: dict[str, list[float]] = {}
+        buckets: dict[tuple[int, str], list[float]] = {}
+        for timestamp, model, input_tokens, output_tokens, cost in records:
+            name = rollup_model_name(model)
+            bucket = int(timestamp // BUCKET_SECONDS) * BUCKET_SECONDS
+            for acc in (
+                session_models.setdefault(name, [0, 0, 0.0, 0]),
+                buckets.setdefault((bucket, name), [0, 0, 0.0, 0]),
+            ):
+                acc[0] += input_tokens
+                acc[1] += output_tokens
+                acc[2] += cost
+                acc[3] += 1
+
+        totals = [sum(acc[i] for acc in session_models.values()) for i in range(4)]
+        timestamps = [item[0] for item in records]
+        conn.execute(
+            """
+            INSERT INTO ledger_sessions (
+                session_id, input_tokens, output_tokens, cost_usd, call_count,
+                first_ts, last_ts, ingested_bytes
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(session_id) DO UPDATE SET
+                input_tokens = input_tokens + excluded.input_tokens,
+                output_tokens = output_tokens + excluded.output_tokens,
+                cost_usd = cost_usd + excluded.cost_usd,
+                call_count = call_count + excluded.call_count,
+                first_ts = COALESCE(MIN(first_ts, excluded.first_ts), first_ts, excluded.first_ts),
+                last_ts = COALESCE(MAX(last_ts, excluded.last_ts), last_ts, excluded.last_ts),
+                ingested_bytes = excluded.ingested_bytes
+            """,
+            (
+                session_id,
+                *totals,
+                min(timestamps) if timestamps else None,
+                max(timestamps) if timestamps else None,
+                ingested_bytes,
+            ),
+        )
+        conn.executemany(
+            _ADD_SESSION_MODEL,
+            [(session_id, model, *acc) for model, acc in session_models.items()],
+        )
+        conn.executemany(_ADD_MODEL, [(model, *acc) for model, acc in session_models.items()])
+        conn.executemany(
+            _ADD_BUCKET,
+            [(bucket, session_id, model, *acc) for (bucket, model), acc in buckets.items()],
+        )
+
+    def forget_session(self, session_id: str) -> None:
+        """从全部汇总中移除会话（会话被删除时调用）。"""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                self._forget_locked(conn, session_id)
+
+    @staticmethod
+    def _forget_locked(conn: sqlite3.Connection, session_id: str) -> None:
+        rows = conn.execute(
+            "SELECT model, input_tokens, output_tokens, cost_usd, call_count "
+            "FROM ledger_session_models WHERE session_id = ?",
+            (session_id,),
+        ).fetchall()
+        conn.executemany(
+            _ADD_MODEL,
+            [(row[0], -row[1], -row[2], -row[3], -row[4]) for row in rows],
+        )
+        conn.execute("DELETE FROM ledger_models WHERE call_count <= 0")
+        for table in ("ledger_session_models", "ledger_buckets", "ledger_sessions"):
+            conn.execute(f"DELETE FROM {table} WHERE session_id = ?", (session_id,))
+
+    def ensure_backfilled(self, sessions_dir: Path) -> None:
+        """首次使用时把已有会话的 ``cost.jsonl`` 全部入账（之后由追踪器增量维护）。"""
+        with self._lock:
+            done = (
+                self._connect()
+                .execute("SELECT 1 FROM ledger_meta WHERE key = ?", (_BACKFILL_KEY,))
+                .fetchone()
+            )
+        if done:
+            return
+        ingested = 0
+        if sessions_dir.exists():
+            for cost_file in sessions_dir.glob("*/cost.jsonl"):
+                ingested += self.sync_session(cost_file.parent.name, cost_file)
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO ledger_meta (key, value) VALUES (?, ?)",
+                    (_BACKFILL_KEY, str(time.time())),
+                )
+        logger.info("成本账本回填完成: %d 条记录", ingested)
+
+    # ---- 查询 ----
+
+    def totals(self) -> dict[str, Any]:
+        """全局汇总与各模型汇总。"""
+        with self._lock:
+            conn = self._connect()
+            model_rows = conn.execute(
+                "SELECT model, input_tokens, output_tokens, cost_usd, call_count FROM ledger_models"
+            ).fetchall()
+            session_count = conn.execute("SELECT COUNT(*) FROM ledger_sessions").fetchone()[0]
+        models = {row[0]: _usage_row(row) for row in model_rows}
+        summary = {
+            key: sum(item[key] for item in models.values())
+            for key in ("input_tokens", "output_tokens", "total_tokens", "cost_usd", "call_count")
+        }
+        summary["session_count"] = int(session_count)
+        summary["models"] = models
+        return summary
+
+    def list_sessions(self, *, limit: int | None = None, offset: int = 0) -> list[dict[str, Any]]:
+        """按最近一次调用倒序列出会话汇总（含模型数）。"""
+        sql = (
+            "SELECT s.session_id, s.input_tokens, s.output_tokens, s.cost_usd, s.call_count, "
+            "s.first_ts, s.last_ts, "
+            "(SELECT COUNT(*) FROM ledger_session_models m WHERE m.session_id = s.session_id) "
+            "FROM ledger_sessions s ORDER BY s.last_ts DESC LIMIT ? OFFSET ?"
+        )
+        with self._lock:
+            rows = (
+                self._connect()
+                .execute(sql, (-1 if limit is None else max(0, limit), max(0, offset)))
+                .fetchall()
+            )
+        return [
+            {
+                "session_id": row[0],
+                **_usage_row(row),
+                "first_ts": row[5],
+                "last_ts": row[6],
+                "model_count": int(row[7]),
+            }
+            for row in rows
+        ]
+
+    def session_models(self, session_id: str) -> dict[str, dict[str, Any]]:
+        """单个会话的各模型汇总。"""
+        with self._lock:
+            rows = (
+                self._connect()
+                .execute(
+                    "SELECT model, input_tokens, output_tokens, cost_usd, call_count "
+                    "FROM ledger_session_models WHERE session_id = ? ORDER BY model",
+                    (session_id,),
+                )
+                .fetchall()
+            )
+        return {row[0]: _usage_row(row) for row in rows}
+
+    def timeline(
+        self,
+        *,
+        granularity: str = "day",
+        since: float | None = None,
+        until: float | None = None,
+        session_id: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """按时间桶聚合（UTC 对齐），每个桶附带模型分解。"""
+        size = GRANULARITY_SECONDS.get(granularity)
+        if size is None:
+            raise ValueError(f"不支持的时间粒度: {granularity}")
+        clauses: list[str] = []
+        params: list[Any] = []
+        if since is not None:
+            clauses.append("bucket_start >= ?")
+            params.append(int(since // BUCKET_SECONDS) * BUCKET_SECONDS)
+        if until is not None:
+            clauses.append("bucket_start < ?")
+            params.append(float(until))
+        if session_id is not None:
+            clauses.append("session_id = ?")
+            params.append(session_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = (
+            f"SELECT bucket_start - (bucket_start % {size}) AS slot, model, "
+            "SUM(input_tokens), SUM(output_tokens), SUM(cost_usd), SUM(call_count) "
+            f"FROM ledger_buckets {where} GROUP BY slot, model ORDER BY slot"
+        )
+        with self._lock:
+            rows = self._connect().execute(sql, params).fetchall()
+
+        buckets: dict[int, dict[str, Any]] = {}
+        for row in rows:
+            slot = int(row[0])
+            usage = _usage_row(row[1:])
+            bucket = buckets.setdefault(
+                slot,
+                {
+                    "bucket_start": slot,
+                    "input_tokens": 0,
+                    "output_tokens": 0,
+                    "total_tokens": 0,
+                    "cost_usd": 0.0,
+                    "call_count": 0,
+                    "models": {},
+                },
+            )
+            for key, value in usage.items():
+                bucket[key] += value
+            bucket["models"][row[1]] = usage
+        return list(buckets.values())
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_ledgers: dict[Path, CostLedger] = {}
+_ledgers_lock = threading.Lock()
+
+
+def get_cost_ledger() -> CostLedger:
+    """返回当前数据目录下的成本账本。"""
+    from nini.config import settings
+
+    path = settings.cache_dir / "cost_ledger.sqlite3"
+    with _ledgers_lock:
+        ledger = _ledgers.get(path)
+        if ledger is None:
+            ledger = CostLedger(path)
+            _ledgers[path] = ledger
+        return ledger
+
+
+# ---- 延迟入账 ----
+
+# 追加记录后的延迟入账时间（秒）：窗口内的多次追加合并为一次同步
+_SYNC_DELAY_SECONDS = 1.0
+
+_pending_syncs: dict[tuple[CostLedger, str], Path] = {}
+_pending_lock = threading.Lock()
+_sync_timer: threading.Timer | None = None
+
+
+def schedule_session_sync(session_id: str, cost_file: Path) -> None:
+    """登记会话待入账，由后台定时器批量同步（调用方线程不访问 SQLite）。"""
+    global _sync_timer
+    ledger = get_cost_ledger()
+    with _pending_lock:
+        _pending_syncs[(ledger, session_id)] = cost_file
+        if _sync_timer is None:
+            _sync_timer = threading.Timer(_SYNC_DELAY_SECONDS, _sync_from_timer)
+            _sync_timer.daemon = True
+            _sync_timer.start()
+
+
+def _sync_from_timer() -> None:
+    global _sync_timer
+    with _pending_lock:
+        _sync_timer = None
+    flush_pending_syncs()
+
+
+def flush_pending_syncs() -> int:
+    """立即同步全部待入账会话，返回新入账的记录数（查询账本前调用）。"""
+    with _pending_lock:
+        pending = list(_pending_syncs.items())
+        _pending_syncs.clear()
+    ingested = 0
+    for (ledger, session_id), cost_file in pending:
+        try:
+            ingested += ledger.sync_session(session_id, cost_file)
+        except Exception as exc:
+            # 偏移未前进：重新登记为待入账，由下一次追加、查询或退出时的同步重试
+            logger.warning("更新成本账本失败: %s (%s)", session_id, exc)
+            with _pending_lock:
+                _pending_syncs.setdefault((ledger, session_id), cost_file)
+    return ingested
+
+
+def shutdown_cost_ledger_sync() -> None:
+    """取消延迟定时器并同步全部待入账会话（应用退出时调用）。"""
+    global _sync_timer
+    with _pending_lock:
+        timer = _sync_timer
+        _sync_timer = None
+    if timer is not None:
+        timer.cancel()
+    flush_pending_syncs()
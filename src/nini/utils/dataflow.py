@@ -0,0 +1,321 @@
+"""数据流调度器：依赖一满足即启动步骤，取代“分层 + 层间屏障”的执行方式。
+
+分层执行时，某一层中一个慢步骤会拖住下一层中所有依赖早已完成的独立步骤；
+本模块按依赖逐个释放步骤，整体耗时趋近于关键路径：
+
+- ``DataflowGraph``：校验依赖（未知依赖、循环）、后继索引、拓扑分层与关键路径优先级；
+- ``DataflowScheduler``：全局并发上限，就绪步骤按“剩余关键路径长度”优先启动，
+  可选 ``should_halt`` 回调在某步骤结果出现后停止启动新步骤；
+- ``StepDurationHistory``：按键记录步骤历史耗时（指数滑动平均），作为关键路径估计；
+- ``DataflowTrace``：每步的就绪/开始/结束时间与实际关键路径，便于定位瓶颈。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+import threading
+import time
+from collections.abc import Awaitable, Callable, Iterable, Mapping
+from dataclasses import dataclass, field
+from typing import Any, Generic, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 未知步骤的默认耗时估计（秒）；全部未知时优先级退化为剩余路径的步数
+_DEFAULT_ESTIMATE_SECONDS = 1.0
+# 历史耗时的指数滑动平均系数
+_HISTORY_ALPHA = 0.3
+_HISTORY_MAX_ENTRIES = 1024
+
+
+class StepDurationHistory:
+    """步骤历史耗时（秒），按调用方给定的键做指数滑动平均。"""
+
+    def __init__(self, *, alpha: float = _HISTORY_ALPHA) -> None:
+        self._alpha = alpha
+        self._values: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def estimate(self, key: str, default: float = _DEFAULT_ESTIMATE_SECONDS) -> float:
+        with self._lock:
+            return self._values.get(key, default)
+
+    def record(self, key: str, seconds: float) -> None:
+        with self._lock:
+            previous = self._values.pop(key, None)
+            value = seconds if previous is None else previous + self._alpha * (seconds - previous)
+            self._values[key] = value
+            while len(self._values) > _HISTORY_MAX_ENTRIES:
+                self._values.pop(next(iter(self._values)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+_step_duration_history = StepDurationHistory()
+
+
+def get_step_duration_history() -> StepDurationHistory:
+    """返回进程级步骤耗时历史。"""
+    return _step_duration_history
+
+
+class DataflowGraph:
+    """步骤依赖图（保持声明顺序）。
+
+    Raises:
+        ValueError: 存在未知依赖或循环依赖时（``strict=True``）
+    """
+
+    def __init__(self, dependencies: Mapping[str, Iterable[str]], *, strict: bool = True) -> None:
+        self.order: list[str] = list(dependencies)
+        self.index = {node: idx for idx, node in enumerate(self.order)}
+        self.dependencies: dict[str, tuple[str, ...]] = {}
+        self.successors: dict[str, list[str]] = {node: [] for node in self.order}
+        for node in self.order:
+            deps: list[str] = []
+            for dep in dependencies[node]:
+                if dep not in self.index:
+                    if strict:
+                        raise ValueError(f"步骤 '{node}' 引用了未知依赖 '{dep}'")
+                    continue
+                if dep not in deps:
+                    deps.append(dep)
+                    self.successors[dep].append(node)
+            self.dependencies[node] = tuple(deps)
+        self.cyclic: list[str] = []
+        self.layers = self._layers()
+        if self.cyclic and strict:
+            raise ValueError(f"工作流存在循环依赖，剩余步骤: {set(self.cyclic)}")
+
+    def _layers(self) -> list[list[str]]:
+        in_degree = {node: len(deps) for node, deps in self.dependencies.items()}
+        current = [node for node in self.order if in_degree[node] == 0]
+        layers: list[list[str]] = []
+        while current:
+            layers.append(current)
+            unlocked: list[str] = []
+            for node in current:
+                for succ in self.successors[node]:
+                    in_degree[succ] -= 1
+                    if in_degree[succ] == 0:
+                        unlocked.append(succ)
+            current = sorted(unlocked, key=self.index.__getitem__)
+        placed = {node for layer in layers for node in layer}
+        self.cyclic = [node for node in self.order if node not in placed]
+        return layers
+
+    def depth(self) -> dict[str, int]:
+        """每个步骤所在的拓扑层序号。"""
+        return {node: idx for idx, layer in enumerate(self.layers) for node in layer}
+
+    def critical_path_priority(self, estimate: Callable[[str], float]) -> dict[str, float]:
+        """每个步骤到汇点的最长估计耗时（含自身），数值越大越应优先启动。"""
+        priority: dict[str, float] = {}
+        for layer in reversed(self.layers):
+            for node in layer:
+                tail = max((priority[succ] for succ in self.successors[node]), default=0.0)
+                priority[node] = max(estimate(node), 0.0) + tail
+        return priority
+
+
+@dataclass
+class StepTiming:
+    """单步调度时间线（相对调度开始的秒数）。"""
+
+    step_id: str
+    ready_at: float
+    started_at: float | None = None
+    finished_at: float | None = None
+
+    @property
+    def queued_ms(self) -> int | None:
+        if self.started_at is None:
+            return None
+        return int((self.started_at - self.ready_at) * 1000)
+
+    @property
+    def duration_ms(self) -> int | None:
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return int((self.finished_at - self.started_at) * 1000)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "step_id": self.step_id,
+            "ready_ms": int(self.ready_at * 1000),
+            "started_ms": None if self.started_at is None else int(self.started_at * 1000),
+            "finished_ms": None if self.finished_at is None else int(self.finished_at * 1000),
+            "queued_ms": self.queued_ms,
+            "duration_ms": self.duration_ms,
+        }
+
+
+@dataclass
+class DataflowTrace:
+    """一次调度的时间线与实际关键路径。"""
+
+    timings: dict[str, StepTiming] = field(default_factory=dict)
+    total_ms: int = 0
+    critical_path: list[str] = field(default_factory=list)
+    max_concurrency: int | None = None
+
+    @property
+    def critical_path_ms(self) -> int:
+        return sum(self.timings[node].duration_ms or 0 for node in self.critical_path)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "total_ms": self.total_ms,
+            "critical_path": list(self.critical_path),
+            "critical_path_ms": self.critical_path_ms,
+            "max_concurrency": self.max_concurrency,
+            "steps": [timing.to_dict() for timing in self.timings.values()],
+        }
+
+
+@dataclass
+class DataflowRun(Generic[T]):
+    """调度结果：已完成步骤的结果（按完成顺序）、未启动步骤与时间线。"""
+
+    results: dict[str, T]
+    not_started: list[str]
+    trace: DataflowTrace
+
+
+class DataflowScheduler(Generic[T]):
+    """按依赖逐个释放步骤的异步调度器。
+
+    Args:
+        graph: 步骤依赖图
+        max_concurrency: 全局并发上限；None 表示不限
+        estimate: 步骤耗时估计（秒），用于关键路径优先级
+        history: 步骤耗时历史；提供 ``history_key`` 时完成后记录实际耗时
+        history_key: 步骤 -> 历史键
+    """
+
+    def __init__(
+        self,
+        graph: DataflowGraph,
+        *,
+        max_concurrency: int | None = None,
+        estimate: Callable[[str], float] | None = None,
+        history: StepDurationHistory | None = None,
+        history_key: Callable[[str], str] | None = None,
+    ) -> None:
+        if graph.cyclic:
+            raise ValueError(f"工作流存在循环依赖，剩余步骤: {set(graph.cyclic)}")
+        self._graph = graph
+        self._max_concurrency = max_concurrency if max_concurrency and max_concurrency > 0 else None
+        self._history = history
+        self._history_key = history_key
+        if estimate is None:
+            if history is not None and history_key is not None:
+                estimate = lambda node: history.estimate(history_key(node))  # noqa: E731
+            else:
+                estimate = lambda node: _DEFAULT_ESTIMATE_SECONDS  # noqa: E731
+        self._priority = graph.critical_path_priority(estimate)
+
+    @property
+    def priority(self) -> dict[str, float]:
+        return dict(self._priority)
+
+    async def run(
+        self,
+        execute: Callable[[str], Awaitable[T]],
+        *,
+        should_halt: Callable[[str, T], bool] | None = None,
+    ) -> DataflowRun[T]:
+        """执行全部步骤。
+
+        步骤抛出的异常会取消其余在途步骤并向上传播；需要“失败也继续”的调用方应在
+        ``execute`` 内部把异常转换为结果。``should_halt`` 返回 True 后不再启动新步骤，
+        在途步骤照常完成。
+        """
+        graph = self._graph
+        started_clock = time.monotonic()
+        trace = DataflowTrace(max_concurrency=self._max_concurrency)
+        remaining = {node: len(deps) for node, deps in graph.dependencies.items()}
+        ready: list[tuple[float, int, str]] = []
+        running: dict[asyncio.Task[T], str] = {}
+        results: dict[str, T] = {}
+        halted = False
+
+        def _now() -> float:
+            return time.monotonic() - started_clock
+
+        def _mark_ready(node: str) -> None:
+            trace.timings[node] = StepTiming(step_id=node, ready_at=_now())
+            heapq.heappush(ready, (-self._priority[node], graph.index[node], node))
+
+        for node in graph.order:
+            if remaining[node] == 0:
+                _mark_ready(node)
+
+        try:
+            while running or (ready and not halted):
+                while (
+                    ready
+                    and not halted
+                    and (self._max_concurrency is None or len(running) < self._max_concurrency)
+                ):
+                    _, _, node = heapq.heappop(ready)
+                    trace.timings[node].started_at = _now()
+                    running[asyncio.ensure_future(execute(node))] = node
+                if not running:
+                    break
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=lambda item: graph.index[running[item]]):
+                    node = running.pop(task)
+                    timing = trace.timings[node]
+                    timing.finished_at = _now()
+                    result = task.result()
+                    results[node] = result
+                    if self._history is not None and self._history_key is not None:
+                        self._history.record(
+                            self._history_key(node), timing.finished_at - (timing.started_at or 0)
+                        )
+                    if should_halt is not None and not halted and should_halt(node, result):
+                        halted = True
+                    for succ in graph.successors[node]:
+                        remaining[succ] -= 1
+                        if remaining[succ] == 0:
+                            _mark_ready(succ)
+        except BaseException:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+            raise
+
+        trace.total_ms = int(_now() * 1000)
+        trace.critical_path = _observed_critical_path(graph, trace.timings)
+        not_started = [node for node in graph.order if node not in results]
+        logger.debug(
+            "数据流调度完成: steps=%d total_ms=%d critical_path=%s (%d ms)",
+            len(results),
+            trace.total_ms,
+            trace.critical_path,
+            trace.critical_path_ms,
+        )
+        return DataflowRun(results=results, not_started=not_started, trace=trace)
+
+
+def _observed_critical_path(graph: DataflowGraph, timings: Mapping[str, StepTiming]) -> list[str]:
+    """按实际结束时间回溯：从最晚结束的步骤沿“最晚结束的依赖”回到起点。"""
+    finished = {node: t for node, t in timings.items() if t.finished_at is not None}
+    if not finished:
+        return []
+    node: str | None = max(finished, key=lambda item: finished[item].finished_at or 0.0)
+    path: list[str] = []
+    while node is not None:
+        path.append(node)
+        deps = [dep for dep in graph.dependencies[node] if dep in finished]
+        node = max(deps, key=lambda item: finished[item].finished_at or 0.0) if deps else None
+    path.reverse()
+    return path
@@ -2,7 +2,9 @@
 
 from __future__ import annotations
 
+import hashlib
 import math
+import uuid
 from pathlib import Path
 from typing import Any, Literal, NoReturn
 
@@ -121,6 +123,25 @@ def read_dataframe(path: Path, ext: str) -> pd.DataFrame:
     raise ValueError(f"不支持的扩展名: {ext_norm}")
 
 
+# ---- DataFrame 版本指纹 ----
+
+
+def dataset_version(df: pd.DataFrame) -> str:
+    """计算数据集版本指纹（列名、类型与逐行内容哈希）。"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(
+        repr(([str(col) for col in df.columns], [str(t) for t in df.dtypes], df.shape)).encode(
+            "utf-8"
+        )
+    )
+    try:
+        digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    except TypeError:
+        # 含不可哈希单元格（如 list）时无法稳定指纹，视为每次都是新版本
+        return uuid.uuid4().hex
+    return digest.hexdigest()
+
+
 # ---- DataFrame JSON 序列化工具 ----
 
 
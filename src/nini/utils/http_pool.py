@@ -0,0 +1,432 @@
+"""出站 HTTP 连接池：工具与模型供应商共享长连接。
+
+此前文献检索每次调用新建 ``httpx.AsyncClient``，网页抓取每次请求新建 SSRF 防护传输层，
+模型供应商的客户端随 ``reload_model_resolver`` 一起丢弃——每次调用都要重新做
+DNS、TCP 与 TLS 握手。本模块按“用途配置”缓存少量长连接客户端：
+
+- keep-alive 连接池，连接数上限交给 ``httpx.Limits``（不按响应体生命周期占用名额，
+  模型供应商的长时间流式响应不会相互阻塞）；
+- 安装 ``h2`` 时启用 HTTP/2（多路复用，同一连接承载并发请求）；
+- SSRF 防护在传输层执行：每个请求（包括重定向后的请求）连接前解析目标地址，
+  私有/回环/链路本地/保留地址一律拒绝；
+- 连接复用指标：按 host 统计请求数、新建连接数、复用连接数与最大并发；
+- 客户端绑定事件循环，循环变化时自动重建并关闭旧连接；应用退出时由 lifespan 统一关闭。
+
+``client()`` 返回共享客户端，调用方不应自行 ``aclose``；需要自建客户端的 SDK
+（OpenAI/Anthropic）可通过 ``transport()`` 借用共享传输层，其 ``aclose`` 不会关闭连接池。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import ipaddress
+import logging
+import socket
+import threading
+import weakref
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# 安装 h2 时 httpx 才能协商 HTTP/2
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# 禁止访问的主机名（与 fetch_url 的 URL 校验保持一致）
+BLOCKED_HOSTS = frozenset(
+    {
+        "localhost",
+        "127.0.0.1",
+        "0.0.0.0",
+        "::1",
+        "metadata.google.internal",
+        "169.254.169.254",
+    }
+)
+
+TransportFactory = Callable[..., httpx.AsyncBaseTransport]
+
+
+class SSRFBlockedError(httpx.ConnectError):
+    """目标地址命中 SSRF 防护策略。"""
+
+
+def is_forbidden_ip(ip: ipaddress.IPv4Address | ipaddress.IPv6Address) -> bool:
+    """私有、回环、链路本地与保留地址均视为内网地址。"""
+    return ip.is_private or ip.is_loopback or ip.is_link_local or ip.is_reserved
+
+
+async def _check_ssrf(request: httpx.Request) -> None:
+    host = (request.url.host or "").lower()
+    if host in BLOCKED_HOSTS:
+        raise SSRFBlockedError(f"SSRF 防护：禁止访问 {host}", request=request)
+    try:
+        ip = ipaddress.ip_address(host)
+    except ValueError:
+        ip = None
+    if ip is not None:
+        if is_forbidden_ip(ip):
+            raise SSRFBlockedError(f"SSRF 防护：禁止访问内网地址 {ip}", request=request)
+        return
+    # 域名：在建立 TCP 连接前解析验证，防止 DNS 重绑定
+    loop = asyncio.get_running_loop()
+    try:
+        addr_info = await loop.getaddrinfo(host, None, family=socket.AF_UNSPEC)
+    except (socket.gaierror, UnicodeError):
+        return  # 解析失败交由连接阶段报错
+    for _, _, _, _, sockaddr in addr_info:
+        try:
+            resolved_ip = ipaddress.ip_address(sockaddr[0])
+        except ValueError:
+            continue
+        if is_forbidden_ip(resolved_ip):
+            raise SSRFBlockedError(
+                f"DNS 重绑定防护：连接时检测到目标 IP {resolved_ip} 为私有地址",
+                request=request,
+            )
+
+
+@dataclass
+class _HostStats:
+    requests: int = 0
+    new_connections: int = 0
+    reused_connections: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+    errors: int = 0
+
+
+@dataclass
+class _PoolMetrics:
+    clients_created: int = 0
+    client_hits: int = 0
+    ssrf_blocked: int = 0
+    hosts: dict[str, _HostStats] = field(default_factory=dict)
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """响应体读取完毕或关闭时回调，用于统计 host 在途请求数。"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]) -> None:
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):  # type: ignore[override]
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+
+class _PooledTransport(httpx.AsyncBaseTransport):
+    """包装底层传输层：SSRF 检查与按 host 的请求、并发、连接复用统计。"""
+
+    def __init__(
+        self,
+        inner: httpx.AsyncBaseTransport,
+        *,
+        metrics: _PoolMetrics,
+        ssrf_guard: bool,
+    ) -> None:
+        self._inner = inner
+        self._metrics = metrics
+        self._ssrf_guard = ssrf_guard
+        # 已见过的底层网络连接（弱引用，连接关闭后自动移除）
+        self._seen_streams: weakref.WeakSet[Any] = weakref.WeakSet()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self._ssrf_guard:
+            try:
+                await _check_ssrf(request)
+            except SSRFBlockedError:
+                self._metrics.ssrf_blocked += 1
+                raise
+
+        key = f"{request.url.host}:{request.url.port or _default_port(request.url.scheme)}"
+        stats = self._metrics.hosts.setdefault(key, _HostStats())
+        released = False
+
+        def _release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                stats.in_flight -= 1
+
+        stats.requests += 1
+        stats.in_flight += 1
+        stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+        try:
+            response = await self._inner.handle_async_request(request)
+        except BaseException:
+            stats.errors += 1
+            _release()
+            raise
+
+        self._record_connection(stats, response)
+        response.stream = _ReleasingStream(response.stream, _release)  # type: ignore[arg-type]
+        return response
+
+    def _record_connection(self, stats: _HostStats, response: httpx.Response) -> None:
+        stream = response.extensions.get("network_stream")
+        if stream is None:
+            return
+        try:
+            if stream in self._seen_streams:
+                stats.reused_connections += 1
+                return
+            self._seen_streams.add(stream)
+        except TypeError:  # pragma: no cover - 不支持弱引用的流实现
+            return
+        stats.new_connections += 1
+
+    async def aclose(self) -> None:
+        """借用方关闭客户端时调用：共享连接池由 ``OutboundHttpPool`` 统一关闭。"""
+
+    async def close_pool(self) -> None:
+        await self._inner.aclose()
+
+
+def _default_port(scheme: str) -> int:
+    return 443 if scheme == "https" else 80
+
+
+@dataclass(frozen=True)
+class _TransportSpec:
+    profile: str
+    ssrf_guard: bool
+    proxy: str | None
+    trust_env: bool
+
+
+@dataclass(frozen=True)
+class _ClientSpec:
+    transport: _TransportSpec
+    follow_redirects: bool
+
+
+class OutboundHttpPool:
+    """按用途配置缓存的共享传输层与 httpx 客户端。
+
+    Args:
+        transport_factory: 底层传输层工厂（测试可注入 ``httpx.ASGITransport`` 等）；
+            默认使用带连接上限与 keep-alive 的 ``httpx.AsyncHTTPTransport``。
+    """
+
+    def __init__(self, *, transport_factory: TransportFactory | None = None) -> None:
+        self._transport_factory = transport_factory
+        self._lock = threading.Lock()
+        self._transports: dict[_TransportSpec, _PooledTransport] = {}
+        self._clients: dict[_ClientSpec, httpx.AsyncClient] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._metrics = _PoolMetrics()
+        # 循环切换后关闭旧连接的任务（保持强引用直至完成）
+        self._closing: set[asyncio.Task[None]] = set()
+
+    def transport(
+        self,
+        profile: str = "default",
+        *,
+        ssrf_guard: bool = False,
+        proxy: str | None = None,
+        trust_env: bool = False,
+    ) -> httpx.AsyncBaseTransport:
+        """获取（或创建）共享传输层，供自建 httpx 客户端的 SDK 复用连接。"""
+        spec = _TransportSpec(
+            profile=profile, ssrf_guard=ssrf_guard, proxy=proxy or None, trust_env=trust_env
+        )
+        with self._lock:
+            return self._transport_locked(spec)
+
+    def client(
+        self,
+        profile: str = "default",
+        *,
+        ssrf_guard: bool = False,
+        proxy: str | None = None,
+        trust_env: bool = False,
+        follow_redirects: bool = False,
+        headers: dict[str, str] | None = None,
+        timeout: float | httpx.Timeout | None = None,
+    ) -> httpx.AsyncClient:
+        """获取（或创建）共享客户端。
+
+        ``headers`` 与 ``timeout`` 只在首次创建时生效；需要按请求变化时请在请求上传入。
+        """
+        transport_spec = _TransportSpec(
+            profile=profile, ssrf_guard=ssrf_guard, proxy=proxy or None, trust_env=trust_env
+        )
+        spec = _ClientSpec(transport=transport_spec, follow_redirects=follow_redirects)
+        with self._lock:
+            transport = self._transport_locked(transport_spec)
+            client = self._clients.get(spec)
+            if client is not None and not client.is_closed:
+                self._metrics.client_hits += 1
+                return client
+            client = httpx.AsyncClient(
+                transport=transport,
+                headers=headers,
+                timeout=timeout if timeout is not None else httpx.Timeout(30.0),
+                follow_redirects=follow_redirects,
+                trust_env=trust_env,
+            )
+            self._clients[spec] = client
+            self._metrics.clients_created += 1
+            return client
+
+    def _transport_locked(self, spec: _TransportSpec) -> _PooledTransport:
+        loop = _running_loop()
+        if loop is not self._loop:
+            # httpx 连接绑定事件循环，循环变化后旧连接不可复用
+            self._retire_locked(self._loop, loop)
+            self._loop = loop
+        transport = self._transports.get(spec)
+        if transport is None:
+            transport = self._create_transport(spec)
+            self._transports[spec] = transport
+        return transport
+
+    def _create_transport(self, spec: _TransportSpec) -> _PooledTransport:
+        from nini.config import settings
+
+        http2 = bool(settings.http_pool_http2 and _HTTP2_AVAILABLE)
+        limits = httpx.Limits(
+            max_connections=settings.http_pool_max_connections,
+            max_keepalive_connections=settings.http_pool_max_keepalive,
+            keepalive_expiry=settings.http_pool_keepalive_expiry,
+        )
+        factory = self._transport_factory or httpx.AsyncHTTPTransport
+        inner = factory(limits=limits, http2=http2, proxy=spec.proxy, trust_env=spec.trust_env)
+        logger.debug(
+            "创建共享 HTTP 传输层: profile=%s ssrf_guard=%s http2=%s proxy=%s",
+            spec.profile,
+            spec.ssrf_guard,
+            http2,
+            spec.proxy or "无",
+        )
+        return _PooledTransport(inner, metrics=self._metrics, ssrf_guard=spec.ssrf_guard)
+
+    def _retire_locked(
+        self,
+        old_loop: asyncio.AbstractEventLoop | None,
+        new_loop: asyncio.AbstractEventLoop | None,
+    ) -> None:
+        """丢弃绑定旧循环的客户端与传输层，并尽量关闭其连接。
+
+        旧循环仍在其他线程运行时回到旧循环关闭；否则在新循环中尽力关闭
+        （旧循环已关闭时部分连接可能无法优雅断开，只记录调试日志）。
+        """
+        clients = list(self._clients.values())
+        transports = list(self._transports.values())
+        self._clients.clear()
+        self._transports.clear()
+        if not clients and not transports:
+            return
+        closing = _close_resources(clients, transports, quiet=True)
+        if old_loop is not None and old_loop.is_running() and not old_loop.is_closed():
+            asyncio.run_coroutine_threadsafe(closing, old_loop)
+        elif new_loop is not None:
+            task = new_loop.create_task(closing)
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+        else:
+            closing.close()
+            logger.debug("无可用事件循环，旧 HTTP 连接交由垃圾回收释放")
+
+    def stats(self) -> dict[str, Any]:
+        """连接复用指标快照。"""
+        hosts = {
+            host: {
+                "requests": item.requests,
+                "new_connections": item.new_connections,
+                "reused_connections": item.reused_connections,
+                "max_in_flight": item.max_in_flight,
+                "errors": item.errors,
+            }
+            for host, item in self._metrics.hosts.items()
+        }
+        new = sum(item["new_connections"] for item in hosts.values())
+        reused = sum(item["reused_connections"] for item in hosts.values())
+        return {
+            "transports": len(self._transports),
+            "clients": len(self._clients),
+            "clients_created": self._metrics.clients_created,
+            "client_hits": self._metrics.client_hits,
+            "requests": sum(item["requests"] for item in hosts.values()),
+            "new_connections": new,
+            "reused_connections": reused,
+            "connection_reuse_ratio": round(reused / (new + reused), 4) if new + reused else 0.0,
+            "ssrf_blocked": self._metrics.ssrf_blocked,
+            "http2": bool(_HTTP2_AVAILABLE),
+            "hosts": hosts,
+        }
+
+    async def aclose(self) -> None:
+        """关闭当前事件循环中的全部共享客户端与连接。"""
+        with self._lock:
+            clients = list(self._clients.values())
+            transports = list(self._transports.values())
+            same_loop = self._loop is _running_loop()
+            self._clients.clear()
+            self._transports.clear()
+            self._loop = None
+        if not same_loop:
+            return
+        await _close_resources(clients, transports)
+
+
+async def _close_resources(
+    clients: list[httpx.AsyncClient],
+    transports: list[_PooledTransport],
+    *,
+    quiet: bool = False,
+) -> None:
+    log = logger.debug if quiet else logger.warning
+    for client in clients:
+        try:
+            await client.aclose()
+        except Exception as exc:  # pragma: no cover - 防御性保护
+            log("关闭共享 HTTP 客户端失败: %s", exc)
+    for transport in transports:
+        try:
+            await transport.close_pool()
+        except Exception as exc:  # pragma: no cover - 防御性保护
+            log("关闭共享 HTTP 连接池失败: %s", exc)
+
+
+def _running_loop() -> asyncio.AbstractEventLoop | None:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+_pool: OutboundHttpPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_http_pool() -> OutboundHttpPool:
+    """获取全局出站 HTTP 连接池。"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = OutboundHttpPool()
+        return _pool
+
+
+async def shutdown_http_pool() -> None:
+    """关闭全局出站 HTTP 连接池（应用退出时调用）。"""
+    global _pool
+    with _pool_lock:
+        pool = _pool
+        _pool = None
+    if pool is not None:
+        logger.info("出站 HTTP 连接池指标: %s", pool.stats())
+        await pool.aclose()
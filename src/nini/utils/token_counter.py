@@ -9,6 +9,7 @@ from __future__ import annotations
 import json
 import logging
 import time
+from collections import OrderedDict
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any
@@ -362,6 +363,15 @@ class SessionTokenTracker:
                 f.write(record_line + "\n")
         except Exception as exc:
             logger.warning(f"Failed to persist cost record for session {self.session_id}: {exc}")
+            return
+
+        # 成本账本按字节偏移增量入账，由后台批量同步；失败不影响记录本身
+        try:
+            from nini.utils.cost_ledger import schedule_session_sync
+
+            schedule_session_sync(self.session_id, cost_file)
+        except Exception as exc:
+            logger.warning(f"Failed to update cost ledger for session {self.session_id}: {exc}")
 
     def record(
         self,
@@ -429,7 +439,19 @@ class SessionTokenTracker:
 
 # ---- 全局会话追踪器注册表 ----
 
-_trackers: dict[str, SessionTokenTracker] = {}
+# 按最近使用排序；值为 (追踪器, 最近访问时间)。跨会话汇总由成本账本维护，
+# 这里只保留活跃会话，空闲或超量的追踪器淘汰后可从 cost.jsonl 重建。
+_trackers: OrderedDict[str, tuple[SessionTokenTracker, float]] = OrderedDict()
+
+
+def _evict_idle_trackers(now: float) -> None:
+    idle_seconds = float(settings.cost_tracker_idle_seconds)
+    max_live = max(1, int(settings.cost_tracker_max_live))
+    while _trackers:
+        last_used = next(iter(_trackers.values()))[1]
+        if len(_trackers) <= max_live and now - last_used <= idle_seconds:
+            break
+        _trackers.popitem(last=False)
 
 
 def get_tracker(
@@ -445,14 +467,19 @@ def get_tracker(
             persist_enabled = session_persistence_enabled(session_id)
         except Exception:
             persist_enabled = True
-    if session_id not in _trackers:
-        _trackers[session_id] = SessionTokenTracker(
+    now = time.monotonic()
+    entry = _trackers.pop(session_id, None)
+    if entry is None:
+        tracker = SessionTokenTracker(
             session_id=session_id,
             _persist_enabled=bool(persist_enabled),
         )
-    elif persist_enabled is not None:
-        _trackers[session_id]._persist_enabled = bool(persist_enabled)
-    return _trackers[session_id]
+    else:
+        tracker = entry[0]
+        tracker._persist_enabled = bool(persist_enabled)
+    _trackers[session_id] = (tracker, now)
+    _evict_idle_trackers(now)
+    return tracker
 
 
 def remove_tracker(session_id: str) -> None:
@@ -13,8 +13,6 @@
 
 from __future__ import annotations
 
-import base64
-import io
 import json
 import logging
 import mimetypes
@@ -22,7 +20,6 @@ import re
 import shutil
 from copy import deepcopy
 import uuid
-import zipfile
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, cast
@@ -42,6 +39,12 @@ from nini.models.session_resources import (
 )
 from nini.models.common import parse_optional_datetime
 from nini.utils.dataframe_io import read_dataframe
+from nini.workspace.preview import (
+    DEFAULT_PREVIEW_LINES,
+    read_line_window,
+    sniff_tabular_header,
+)
+from nini.workspace.zip_stream import ZipManifest, build_zip_bytes
 
 _SAFE_FILENAME_PATTERN = re.compile(r"[^0-9A-Za-z\u4e00-\u9fff._ -]")
 _TEXT_DOCUMENT_EXTENSIONS = {
@@ -662,41 +665,26 @@ class WorkspaceManager:
             "updated_records": updated_records,
         }
 
+    def build_download_manifest_for_paths(self, paths: list[str]) -> ZipManifest:
+        """按相对路径生成 ZIP 清单（目录递归展开，文件名去重）。"""
+        self.ensure_dirs()
+        manifest = ZipManifest()
+        for raw_path in paths:
+            target = self.resolve_workspace_path(raw_path, allow_missing=False)
+            if target.is_dir():
+                for child in sorted(target.rglob("*")):
+                    if not child.is_file():
+                        continue
+                    arcname = child.relative_to(self.workspace_dir).as_posix()
+                    manifest.add_file(child, arcname)
+                continue
+            base_name = self.sanitize_filename(target.name, default_name=target.name)
+            manifest.add_file(target, base_name, dedupe=True)
+        return manifest
+
     def batch_download_paths(self, paths: list[str]) -> bytes:
         """按相对路径将工作空间文件打包为 ZIP。"""
-        self.ensure_dirs()
-        buf = io.BytesIO()
-        added = 0
-        used_names: set[str] = set()
-        with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
-            for raw_path in paths:
-                target = self.resolve_workspace_path(raw_path, allow_missing=False)
-                if target.is_dir():
-                    for child in sorted(target.rglob("*")):
-                        if not child.is_file():
-                            continue
-                        arcname = child.relative_to(self.workspace_dir).as_posix()
-                        zf.write(child, arcname)
-                        added += 1
-                    continue
-                base_name = self.sanitize_filename(target.name, default_name=target.name)
-                arcname = base_name
-                if arcname in used_names:
-                    stem = Path(base_name).stem
-                    suffix = Path(base_name).suffix
-                    index = 2
-                    while True:
-                        candidate = f"{stem} ({index}){suffix}"
-                        if candidate not in used_names:
-                            arcname = candidate
-                            break
-                        index += 1
-                used_names.add(arcname)
-                zf.write(target, arcname)
-                added += 1
-        if added == 0:
-            return b""
-        return buf.getvalue()
+        return build_zip_bytes(self.build_download_manifest_for_paths(paths))
 
     def unique_dataset_name(self, preferred_name: str) -> str:
         entries = self.list_datasets()
@@ -1372,7 +1360,8 @@ class WorkspaceManager:
         self._save_index(index)
         return record.model_dump(mode="json")
 
-    def batch_download_project_artifacts(self, artifact_ids: list[str]) -> bytes:
+    def build_download_manifest_for_project_artifacts(self, artifact_ids: list[str]) -> ZipManifest:
+        """按项目产物 ID 生成 ZIP 清单。"""
         records = self.list_project_artifacts()
         selected_paths: list[str] = []
         for artifact_id in artifact_ids:
@@ -1389,8 +1378,11 @@ class WorkspaceManager:
             selected_paths.append(str(match.get("path", "")).strip())
         cleaned = [path for path in selected_paths if path]
         if not cleaned:
-            return b""
-        return self.batch_download_paths(cleaned)
+            return ZipManifest()
+        return self.build_download_manifest_for_paths(cleaned)
+
+    def batch_download_project_artifacts(self, artifact_ids: list[str]) -> bytes:
+        return build_zip_bytes(self.build_download_manifest_for_project_artifacts(artifact_ids))
 
     def save_text_note(self, content: str, filename: str | None = None) -> dict[str, Any]:
         self.ensure_dirs()
@@ -1805,11 +1797,17 @@ class WorkspaceManager:
 
         return None
 
-    def get_file_preview(self, file_id: str) -> dict[str, Any] | None:
+    def get_file_preview(
+        self,
+        file_id: str,
+        *,
+        start_line: int = 0,
+        max_lines: int = DEFAULT_PREVIEW_LINES,
+    ) -> dict[str, Any] | None:
         """获取文件预览内容。
 
-        - 图片（PNG/JPEG/SVG/GIF）：返回 base64 编码
-        - 文本类（TXT/CSV/TSV/JSON/MD/PY 等）：返回完整文本
+        - 图片（PNG/JPEG/SVG/GIF）：返回文件 URL（支持 ETag/Range）
+        - 文本类（TXT/CSV/TSV/JSON/MD/PY 等）：返回指定行窗口，CSV/TSV 附带表头嗅探
         - HTML：返回完整内容（用于 iframe 渲染）
         - 其他：返回文件基本信息
         """
@@ -1821,14 +1819,25 @@ class WorkspaceManager:
             file_id=file_id,
             kind=kind,
             record=record,
+            start_line=start_line,
+            max_lines=max_lines,
         )
 
+    def _preview_file_url(self, path: Path, record: dict[str, Any]) -> str:
+        """预览用的文件直链，优先使用工作区相对路径。"""
+        rel_path = self._relative_workspace_path(path)
+        if rel_path:
+            return self.build_workspace_file_download_url(rel_path)
+        return str(record.get("download_url", ""))
+
     def _build_preview_payload(
         self,
         *,
         file_id: str,
         kind: str,
         record: dict[str, Any],
+        start_line: int = 0,
+        max_lines: int = DEFAULT_PREVIEW_LINES,
     ) -> dict[str, Any]:
         """根据索引记录构建统一预览载荷。"""
         path_str = record.get("file_path") or record.get("path") or ""
@@ -1853,26 +1862,16 @@ class WorkspaceManager:
         mime_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
         file_size = path.stat().st_size
 
-        # 图片类型
+        # 图片类型：返回可直接请求的 URL（文件端点支持 ETag/Range），不再内联 base64
         if ext in ("png", "jpg", "jpeg", "gif", "svg", "webp"):
-            # 大图片限制（超过 5MB 不做 base64）
-            if file_size > 5 * 1024 * 1024:
-                return {
-                    "id": file_id,
-                    "kind": kind,
-                    "preview_type": "image_too_large",
-                    "name": record.get("name", ""),
-                    "size": file_size,
-                    "mime_type": mime_type,
-                }
-            data = base64.b64encode(path.read_bytes()).decode("ascii")
             return {
                 "id": file_id,
                 "kind": kind,
                 "preview_type": "image",
                 "name": record.get("name", ""),
                 "mime_type": mime_type,
-                "data": f"data:{mime_type};base64,{data}",
+                "size": file_size,
+                "url": self._preview_file_url(path, record),
             }
 
         # HTML 类型（Plotly 图表等）
@@ -1914,7 +1913,7 @@ class WorkspaceManager:
         }
         if ext in text_exts:
             try:
-                content = path.read_text(encoding="utf-8", errors="replace")
+                window = read_line_window(path, start_line=start_line, max_lines=max_lines)
             except Exception:
                 return {
                     "id": file_id,
@@ -1922,17 +1921,20 @@ class WorkspaceManager:
                     "preview_type": "error",
                     "message": "无法读取文件",
                 }
-            total_lines = len(content.splitlines())
-            return {
+            payload: dict[str, Any] = {
                 "id": file_id,
                 "kind": kind,
                 "preview_type": "text",
                 "name": record.get("name", ""),
                 "ext": ext,
-                "content": content,
-                "total_lines": total_lines,
-                "preview_lines": total_lines,
+                "size": file_size,
+                **window,
             }
+            if ext in ("csv", "tsv"):
+                tabular = sniff_tabular_header(path, ext)
+                if tabular is not None:
+                    payload["tabular"] = tabular
+            return payload
 
         # PDF 类型
         if ext == "pdf":
@@ -1962,7 +1964,13 @@ class WorkspaceManager:
             "mime_type": mime_type,
         }
 
-    def get_file_preview_by_path(self, relative_path: str) -> dict[str, Any]:
+    def get_file_preview_by_path(
+        self,
+        relative_path: str,
+        *,
+        start_line: int = 0,
+        max_lines: int = DEFAULT_PREVIEW_LINES,
+    ) -> dict[str, Any]:
         """按路径获取文件预览。"""
         target: Path | None = None
         try:
@@ -1991,7 +1999,13 @@ class WorkspaceManager:
         else:
             kind = self._public_kind_for_record(kind, record)
         file_id = str(record.get("id", relative_path))
-        return self._build_preview_payload(file_id=file_id, kind=kind, record=record)
+        return self._build_preview_payload(
+            file_id=file_id,
+            kind=kind,
+            record=record,
+            start_line=start_line,
+            max_lines=max_lines,
+        )
 
     def search_files(self, query: str) -> list[dict[str, Any]]:
         """根据文件名模糊搜索工作空间文件。"""
@@ -2125,41 +2139,27 @@ class WorkspaceManager:
 
     # ---- 批量下载 ----
 
+    def build_download_manifest_for_file_ids(self, file_ids: list[str]) -> ZipManifest:
+        """按文件 ID 生成 ZIP 清单。"""
+        manifest = ZipManifest()
+        for fid in file_ids:
+            _, record = self._find_record_by_id(fid)
+            if record is None:
+                continue
+            path_str = record.get("file_path") or record.get("path") or ""
+            if not path_str:
+                continue
+            path = Path(path_str)
+            if path.exists() and path.is_file():
+                base_name = self.sanitize_filename(
+                    str(record.get("name", path.name)), default_name=path.name
+                )
+                manifest.add_file(path, base_name, dedupe=True)
+        return manifest
+
     def batch_download(self, file_ids: list[str]) -> bytes:
         """将选中文件打包为 ZIP，返回 ZIP 文件的字节内容。"""
-        buf = io.BytesIO()
-        used_names: set[str] = set()
-        added = 0
-        with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
-            for fid in file_ids:
-                _, record = self._find_record_by_id(fid)
-                if record is None:
-                    continue
-                path_str = record.get("file_path") or record.get("path") or ""
-                if not path_str:
-                    continue
-                path = Path(path_str)
-                if path.exists() and path.is_file():
-                    base_name = self.sanitize_filename(
-                        str(record.get("name", path.name)), default_name=path.name
-                    )
-                    arcname = base_name
-                    if arcname in used_names:
-                        stem = Path(base_name).stem
-                        suffix = Path(base_name).suffix
-                        idx = 2
-                        while True:
-                            candidate = f"{stem} ({idx}){suffix}"
-                            if candidate not in used_names:
-                                arcname = candidate
-                                break
-                            idx += 1
-                    used_names.add(arcname)
-                    zf.write(path, arcname)
-                    added += 1
-        if added == 0:
-            return b""
-        return buf.getvalue()
+        return build_zip_bytes(self.build_download_manifest_for_file_ids(file_ids))
 
     # ---- 文件版本控制 ----
 
@@ -0,0 +1,247 @@
+"""工作区文件的分段预览。
+
+大文本/CSV 文件不再整文件读取：首次预览时按块扫描一次，构建稀疏的行偏移索引
+（每 ``INDEX_STRIDE`` 行记录一个字节偏移），并以 (路径, mtime, size) 为键缓存。
+之后任意行窗口都可以通过 seek 到最近的检查点直接读取。
+
+CSV/TSV 的表头与列类型只从文件首块推断，不加载整表。
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# 每隔多少行记录一个字节偏移检查点
+INDEX_STRIDE = 256
+# 扫描文件时的读块大小
+_SCAN_CHUNK_BYTES = 1024 * 1024
+# 表头/类型嗅探只读取文件首块
+_SNIFF_BLOCK_BYTES = 64 * 1024
+# 嗅探类型时最多使用的样本行数
+_SNIFF_MAX_ROWS = 200
+# 缓存的索引数量上限（LRU 淘汰）
+_MAX_CACHED_INDEXES = 64
+
+# 默认预览窗口
+DEFAULT_PREVIEW_LINES = 1000
+# 单次请求允许的最大行数
+MAX_PREVIEW_LINES = 5000
+# 单个窗口返回的最大字节数（防止超长行撑爆响应）
+MAX_WINDOW_BYTES = 4 * 1024 * 1024
+
+
+@dataclass
+class LineOffsetIndex:
+    """文件的稀疏行偏移索引。
+
+    ``checkpoints[i]`` 是第 ``i * stride`` 行（0 起始）的起始字节偏移。
+    """
+
+    path: str
+    mtime_ns: int
+    size: int
+    total_lines: int
+    stride: int = INDEX_STRIDE
+    checkpoints: list[int] = field(default_factory=list)
+
+    def checkpoint_for(self, line: int) -> tuple[int, int]:
+        """返回不晚于 ``line`` 的最近检查点 (行号, 字节偏移)。"""
+        if not self.checkpoints:
+            return 0, 0
+        slot = min(max(line, 0) // self.stride, len(self.checkpoints) - 1)
+        return slot * self.stride, self.checkpoints[slot]
+
+
+_index_cache: OrderedDict[str, LineOffsetIndex] = OrderedDict()
+_index_lock = threading.Lock()
+
+
+def _cache_key(path: Path) -> tuple[str, int, int]:
+    stat = path.stat()
+    return str(path.resolve()), stat.st_mtime_ns, stat.st_size
+
+
+def build_line_index(path: Path, *, stride: int = INDEX_STRIDE) -> LineOffsetIndex:
+    """按块扫描文件构建行偏移索引（不做解码）。"""
+    resolved, mtime_ns, size = _cache_key(path)
+    checkpoints = [0]
+    line_count = 0
+    offset = 0
+    last_byte = b""
+    with path.open("rb") as fh:
+        while True:
+            chunk = fh.read(_SCAN_CHUNK_BYTES)
+            if not chunk:
+                break
+            start = 0
+            while True:
+                pos = chunk.find(b"\n", start)
+                if pos < 0:
+                    break
+                line_count += 1
+                if line_count % stride == 0:
+                    checkpoints.append(offset + pos + 1)
+                start = pos + 1
+            offset += len(chunk)
+            last_byte = chunk[-1:]
+
+    total_lines = line_count
+    if size > 0 and last_byte != b"\n":
+        # 末行无换行符时同样计为一行（与 str.splitlines 一致）
+        total_lines += 1
+    # 若文件恰好在检查点处结束，末尾检查点指向 EOF，无实际行，去掉
+    if len(checkpoints) > 1 and checkpoints[-1] >= size:
+        checkpoints.pop()
+    return LineOffsetIndex(
+        path=resolved,
+        mtime_ns=mtime_ns,
+        size=size,
+        total_lines=total_lines,
+        stride=stride,
+        checkpoints=checkpoints,
+    )
+
+
+def get_line_index(path: Path) -> LineOffsetIndex:
+    """获取（必要时构建）文件的行偏移索引，文件变更后自动失效。"""
+    resolved, mtime_ns, size = _cache_key(path)
+    with _index_lock:
+        cached = _index_cache.get(resolved)
+        if cached is not None and cached.mtime_ns == mtime_ns and cached.size == size:
+            _index_cache.move_to_end(resolved)
+            return cached
+
+    index = build_line_index(path)
+    with _index_lock:
+        _index_cache[resolved] = index
+        _index_cache.move_to_end(resolved)
+        while len(_index_cache) > _MAX_CACHED_INDEXES:
+            _index_cache.popitem(last=False)
+    logger.debug(
+        "构建预览行索引: path=%s lines=%d checkpoints=%d",
+        resolved,
+        index.total_lines,
+        len(index.checkpoints),
+    )
+    return index
+
+
+def clear_line_index_cache() -> None:
+    """清空行偏移索引缓存（主要用于测试）。"""
+    with _index_lock:
+        _index_cache.clear()
+
+
+def read_line_window(
+    path: Path,
+    start_line: int = 0,
+    max_lines: int = DEFAULT_PREVIEW_LINES,
+) -> dict[str, Any]:
+    """读取 ``[start_line, start_line + max_lines)`` 行窗口。
+
+    Returns:
+        包含 ``content``、``start_line``、``preview_lines``、``total_lines``、
+        ``truncated`` 的字典。``truncated`` 表示窗口因字节上限被截断。
+    """
+    max_lines = max(1, min(int(max_lines), MAX_PREVIEW_LINES))
+    index = get_line_index(path)
+    start_line = max(0, min(int(start_line), max(index.total_lines - 1, 0)))
+
+    anchor_line, anchor_offset = index.checkpoint_for(start_line)
+    lines: list[bytes] = []
+    read_bytes = 0
+    truncated = False
+    with path.open("rb") as fh:
+        fh.seek(anchor_offset)
+        for _ in range(start_line - anchor_line):
+            if not fh.readline():
+                break
+        while len(lines) < max_lines:
+            raw = fh.readline(MAX_WINDOW_BYTES - read_bytes + 1)
+            if not raw:
+                break
+            read_bytes += len(raw)
+            if read_bytes > MAX_WINDOW_BYTES:
+                truncated = True
+                break
+            lines.append(raw)
+
+    content = b"".join(lines).decode("utf-8", errors="replace")
+    return {
+        "content": content,
+        "start_line": start_line,
+        "preview_lines": len(lines),
+        "total_lines": index.total_lines,
+        "truncated": truncated,
+    }
+
+
+def _infer_cell_type(values: list[str]) -> str:
+    """根据样本值粗略推断列类型：integer / number / boolean / string。"""
+    non_empty = [v.strip() for v in values if v and v.strip()]
+    if not non_empty:
+        return "empty"
+    if all(v.lower() in {"true", "false"} for v in non_empty):
+        return "boolean"
+    try:
+        for v in non_empty:
+            int(v)
+        return "integer"
+    except ValueError:
+        pass
+    try:
+        for v in non_empty:
+            float(v)
+        return "number"
+    except ValueError:
+        return "string"
+
+
+def sniff_tabular_header(path: Path, ext: str) -> dict[str, Any] | None:
+    """只读取首块，推断 CSV/TSV 的分隔符、表头和列类型。"""
+    try:
+        with path.open("rb") as fh:
+            block = fh.read(_SNIFF_BLOCK_BYTES)
+    except OSError:
+        return None
+    if not block:
+        return None
+
+    text = block.decode("utf-8-sig", errors="replace")
+    if len(block) == _SNIFF_BLOCK_BYTES:
+        # 丢弃被块边界截断的末行
+        cut = text.rfind("\n")
+        if cut > 0:
+            text = text[:cut]
+
+    delimiter = "\t" if ext == "tsv" else ","
+    try:
+        dialect = csv.Sniffer().sniff(text[:8192], delimiters=",\t;|")
+        delimiter = dialect.delimiter
+    except csv.Error:
+        pass
+
+    rows = list(csv.reader(io.StringIO(text), delimiter=delimiter))
+    rows = [row for row in rows if row]
+    if not rows:
+        return None
+    header = rows[0]
+    samples = rows[1 : _SNIFF_MAX_ROWS + 1]
+    columns = []
+    for pos, name in enumerate(header):
+        column_values = [row[pos] if pos < len(row) else "" for row in samples]
+        columns.append({"name": name, "type": _infer_cell_type(column_values)})
+    return {
+        "delimiter": delimiter,
+        "columns": columns,
+        "sampled_rows": len(samples),
+    }
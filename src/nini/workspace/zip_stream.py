@@ -0,0 +1,186 @@
+"""流式 ZIP 打包。
+
+工作区下载与会话导出不再在内存中构建完整 ZIP：先生成清单（条目、大小），
+再逐条压缩并立即产出字节块，交给 ``StreamingResponse`` 边压缩边发送。
+PNG、PDF、Parquet、XLSX 等已压缩格式直接以 STORED 写入，避免重复 deflate。
+"""
+
+from __future__ import annotations
+
+import time
+import zipfile
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+
+# 读取源文件的块大小
+STREAM_CHUNK_BYTES = 1024 * 1024
+
+# 本身已压缩的格式：重复 deflate 只会消耗 CPU，几乎不减小体积
+ALREADY_COMPRESSED_EXTENSIONS = frozenset(
+    {
+        ".png",
+        ".jpg",
+        ".jpeg",
+        ".gif",
+        ".webp",
+        ".pdf",
+        ".parquet",
+        ".feather",
+        ".xlsx",
+        ".docx",
+        ".pptx",
+        ".zip",
+        ".gz",
+        ".bz2",
+        ".xz",
+        ".7z",
+        ".rar",
+        ".mp4",
+        ".mp3",
+        ".woff",
+        ".woff2",
+    }
+)
+
+
+def compress_type_for(name: str) -> int:
+    """按扩展名选择压缩方式。"""
+    if Path(name).suffix.lower() in ALREADY_COMPRESSED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+@dataclass(frozen=True)
+class ZipEntry:
+    """清单中的单个条目：来源为磁盘文件或内存字节。"""
+
+    arcname: str
+    source: Path | None = None
+    data: bytes | None = None
+    size: int = 0
+
+    @property
+    def compress_type(self) -> int:
+        return compress_type_for(self.arcname)
+
+
+@dataclass
+class ZipManifest:
+    """预先计算的 ZIP 清单，供流式写出与进度展示。"""
+
+    entries: list[ZipEntry] = field(default_factory=list)
+    _used_names: set[str] = field(default_factory=set, repr=False)
+
+    def unique_arcname(self, name: str) -> str:
+        """同名条目追加 `` (2)``、`` (3)`` 后缀。"""
+        if name not in self._used_names:
+            return name
+        stem = Path(name).stem
+        suffix = Path(name).suffix
+        index = 2
+        while True:
+            candidate = f"{stem} ({index}){suffix}"
+            if candidate not in self._used_names:
+                return candidate
+            index += 1
+
+    def add_file(self, path: Path, arcname: str, *, dedupe: bool = False) -> ZipEntry:
+        name = self.unique_arcname(arcname) if dedupe else arcname
+        self._used_names.add(name)
+        entry = ZipEntry(arcname=name, source=path, size=path.stat().st_size)
+        self.entries.append(entry)
+        return entry
+
+    def add_bytes(self, arcname: str, data: bytes) -> ZipEntry:
+        self._used_names.add(arcname)
+        entry = ZipEntry(arcname=arcname, data=data, size=len(data))
+        self.entries.append(entry)
+        return entry
+
+    @property
+    def total_bytes(self) -> int:
+        """全部条目的未压缩字节数。"""
+        return sum(entry.size for entry in self.entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def http_headers(self) -> dict[str, str]:
+        """清单统计信息，供前端展示进度。"""
+        return {
+            "X-Archive-Entries": str(len(self.entries)),
+            "X-Archive-Uncompressed-Size": str(self.total_bytes),
+        }
+
+
+class _ChunkSink:
+    """不可 seek 的写入端：zipfile 检测到后会改用数据描述符（data descriptor）。"""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        if data:
+            self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        return None
+
+    def close(self) -> None:
+        return None
+
+    def drain(self) -> bytes:
+        if not self._chunks:
+            return b""
+        payload = b"".join(self._chunks)
+        self._chunks.clear()
+        return payload
+
+
+def iter_zip_stream(
+    manifest: ZipManifest,
+    *,
+    chunk_size: int = STREAM_CHUNK_BYTES,
+) -> Iterator[bytes]:
+    """按清单逐条压缩，产出 ZIP 字节块。
+
+    同步生成器：``StreamingResponse`` 会在线程池中迭代，文件读取与压缩不占用事件循环。
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", allowZip64=True) as zf:
+        for entry in manifest.entries:
+            if entry.source is not None:
+                info = zipfile.ZipInfo.from_file(entry.source, entry.arcname)
+            else:
+                info = zipfile.ZipInfo(entry.arcname, date_time=time.localtime()[:6])
+                info.external_attr = 0o644 << 16
+            info.compress_type = entry.compress_type
+            force_zip64 = entry.size >= zipfile.ZIP64_LIMIT
+            with zf.open(info, "w", force_zip64=force_zip64) as dest:
+                if entry.source is not None:
+                    with entry.source.open("rb") as src:
+                        while True:
+                            block = src.read(chunk_size)
+                            if not block:
+                                break
+                            dest.write(block)
+                            payload = sink.drain()
+                            if payload:
+                                yield payload
+                elif entry.data:
+                    dest.write(entry.data)
+            payload = sink.drain()
+            if payload:
+                yield payload
+    payload = sink.drain()
+    if payload:
+        yield payload
+
+
+def build_zip_bytes(manifest: ZipManifest) -> bytes:
+    """将清单一次性打包为字节（保留给仍需完整字节的调用方）。"""
+    if not manifest.entries:
+        return b""
+    return b"".join(iter_zip_stream(manifest))
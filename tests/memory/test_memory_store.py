@@ -180,3 +180,65 @@ def test_filter_by_sci_min_effect_size(store: MemoryStore):
     results = store.filter_by_sci(min_effect_size=0.5)
     assert len(results) == 1
     assert "大效应量" in results[0]["content"]
+
+
+# ---- 全文检索排序测试 ----
+
+
+def test_search_fts_matches_cjk_query_by_trigram(store: MemoryStore):
+    """中文自然语言 query 通过三元组召回，命中片段越多排序越靠前。"""
+    if store._fts_tokenizer != "trigram":
+        pytest.skip("SQLite 不支持 trigram 分词器")
+    store.upsert_fact(content="治疗组血压显著下降", memory_type="finding")
+    store.upsert_fact(content="两组血压基线无差异", memory_type="finding")
+    store.upsert_fact(content="样本量不足", memory_type="finding")
+    results = store.search_fts("治疗组血压是否下降")
+    assert [r["content"] for r in results][0] == "治疗组血压显著下降"
+    assert "样本量不足" not in {r["content"] for r in results}
+
+
+def test_search_ranked_orders_by_decay_in_sql(store: MemoryStore):
+    """search_ranked 在召回结果内按 importance·时间衰减排序并返回 score。"""
+    old_id = store.upsert_fact(content="回归分析结果 old", memory_type="statistic", importance=0.9)
+    store.upsert_fact(content="回归分析结果 new", memory_type="statistic", importance=0.6)
+    with store._conn:
+        store._conn.execute(
+            "UPDATE facts SET created_at = created_at - 365 * 86400 WHERE id = ?", (old_id,)
+        )
+    results = store.search_ranked("回归分析结果", top_k=2)
+    assert [r["content"] for r in results] == ["回归分析结果 new", "回归分析结果 old"]
+    assert results[0]["score"] == pytest.approx(0.6, rel=1e-3)
+
+
+def test_generation_changes_on_write_and_delete(store: MemoryStore):
+    """写入与删除都会推进数据版本号。"""
+    before = store.generation
+    fact_id = store.upsert_fact(content="版本号测试", memory_type="insight")
+    after_insert = store.generation
+    assert after_insert != before
+    assert store.delete_fact(fact_id) is True
+    assert store.generation != after_insert
+    assert store.delete_fact(fact_id) is False
+
+
+def test_legacy_unicode61_index_is_rebuilt_as_trigram(tmp_path: Path):
+    """旧库使用 unicode61 分词时，打开后重建为 trigram 索引且保留已有数据。"""
+    db_path = tmp_path / "legacy.db"
+    legacy = MemoryStore(db_path)
+    if legacy._fts_tokenizer != "trigram":
+        legacy.close()
+        pytest.skip("SQLite 不支持 trigram 分词器")
+    legacy.upsert_fact(content="配对样本比较结果显著", memory_type="finding")
+    with legacy._conn:
+        legacy._conn.executescript(
+            "DROP TRIGGER facts_ai; DROP TRIGGER facts_ad; DROP TRIGGER facts_au;"
+            "DROP TABLE facts_fts;"
+            "CREATE VIRTUAL TABLE facts_fts USING fts5(content, summary, tags,"
+            " content=facts, content_rowid=rowid, tokenize='unicode61');"
+        )
+    legacy.close()
+
+    reopened = MemoryStore(db_path)
+    results = reopened.search_fts("配对样本比较")
+    reopened.close()
+    assert [r["content"] for r in results] == ["配对样本比较结果显著"]
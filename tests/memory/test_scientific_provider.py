@@ -97,6 +97,30 @@ async def test_prefetch_applies_fencing(provider: ScientificMemoryProvider):
         assert "</memory-context>" in result
 
 
+async def test_prefetch_caches_until_store_changes(
+    provider: ScientificMemoryProvider, monkeypatch: pytest.MonkeyPatch
+):
+    """相同 query 在记忆库无写入时复用缓存；upsert 后重新检索。"""
+    provider._store.upsert_fact(content="方差分析 F(2,57)=5.3", memory_type="statistic")
+    calls: list[str] = []
+    original = provider._store.search_ranked
+
+    def _counting(query: str, **kwargs):
+        calls.append(query)
+        return original(query, **kwargs)
+
+    monkeypatch.setattr(provider._store, "search_ranked", _counting)
+    first = await provider.prefetch("方差分析")
+    second = await provider.prefetch("方差分析")
+    assert first == second and "方差分析" in first
+    assert len(calls) == 1
+
+    provider._store.upsert_fact(content="方差分析事后检验 Tukey", memory_type="statistic")
+    third = await provider.prefetch("方差分析")
+    assert len(calls) == 2
+    assert "Tukey" in third
+
+
 # ---- sync_turn 测试 ----
 
 
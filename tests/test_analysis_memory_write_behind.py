@@ -0,0 +1,131 @@
+"""AnalysisMemory 签名索引、write-behind 落盘与 LRU 注册表测试。"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+from nini.agent.session import Session
+from nini.config import settings
+from nini.memory import analysis_memory
+from nini.memory.analysis_memory import (
+    StatisticResult,
+    clear_session_analysis_memory_cache,
+    flush_analysis_memories,
+    get_analysis_memory,
+    shutdown_analysis_memories,
+)
+from nini.tools.statistics import _record_stat_results
+
+
+@pytest.fixture(autouse=True)
+def _isolated(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, "data_dir", tmp_path / "data")
+    # 延迟足够长，确保测试中只有显式 flush 才会写盘
+    monkeypatch.setattr(analysis_memory, "_FLUSH_DELAY_SECONDS", 60.0)
+    yield
+    shutdown_analysis_memories()
+    analysis_memory._analysis_memories.clear()
+
+
+def _memory_file(session_id: str, dataset: str) -> Path:
+    return settings.sessions_dir / session_id / "analysis_memories" / f"{dataset}.json"
+
+
+def test_writes_are_deferred_until_flush():
+    memory = get_analysis_memory("sess-wb", "data")
+    for idx in range(50):
+        memory.add_statistic(StatisticResult(test_name=f"t{idx}", p_value=0.01))
+
+    assert not _memory_file("sess-wb", "data").exists()
+    assert flush_analysis_memories("sess-wb") == 1
+    payload = json.loads(_memory_file("sess-wb", "data").read_text(encoding="utf-8"))
+    assert len(payload["statistics"]) == 50
+    # 没有新的修改时不会重复写入
+    assert flush_analysis_memories("sess-wb") == 0
+
+
+def test_failed_flush_keeps_memory_dirty(monkeypatch: pytest.MonkeyPatch):
+    memory = get_analysis_memory("sess-fail", "data")
+    memory.add_statistic(StatisticResult(test_name="t", p_value=0.01))
+
+    real_write = analysis_memory._write_analysis_memory
+    failures = [TypeError("not serializable")]
+
+    def flaky_write(target):
+        if failures:
+            raise failures.pop()
+        real_write(target)
+
+    monkeypatch.setattr(analysis_memory, "_write_analysis_memory", flaky_write)
+    assert flush_analysis_memories("sess-fail") == 0
+    assert flush_analysis_memories("sess-fail") == 1
+    assert _memory_file("sess-fail", "data").exists()
+
+
+def test_signature_index_upserts_and_survives_list_replacement():
+    memory = get_analysis_memory("sess-idx", "data")
+    first = StatisticResult(test_name="t", p_value=0.01, ltm_id="ltm-1")
+    memory.add_statistic(first)
+    memory.add_statistic(StatisticResult(test_name="other", p_value=0.5))
+    memory.add_statistic(StatisticResult(test_name="t", p_value=0.01))
+    assert [item.test_name for item in memory.statistics] == ["t", "other"]
+    assert memory.statistics[0].ltm_id == "ltm-1"
+
+    memory.statistics = [StatisticResult(test_name="other", p_value=0.5)]
+    memory.add_statistic(StatisticResult(test_name="other", p_value=0.5))
+    memory.add_statistic(StatisticResult(test_name="t", p_value=0.01))
+    assert [item.test_name for item in memory.statistics] == ["other", "t"]
+
+
+def test_cache_clear_flushes_pending_changes():
+    memory = get_analysis_memory("sess-clear", "data")
+    memory.add_statistic(StatisticResult(test_name="kept", p_value=0.02))
+
+    clear_session_analysis_memory_cache("sess-clear")
+    reloaded = get_analysis_memory("sess-clear", "data")
+    assert reloaded is not memory
+    assert [item.test_name for item in reloaded.statistics] == ["kept"]
+
+
+def test_lru_eviction_persists_dirty_memories(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(analysis_memory, "_MAX_CACHED_MEMORIES", 2)
+    for idx in range(3):
+        get_analysis_memory("sess-lru", f"d{idx}").add_statistic(
+            StatisticResult(test_name=f"t{idx}", p_value=0.1)
+        )
+
+    assert len(analysis_memory._analysis_memories) == 2
+    assert _memory_file("sess-lru", "d0").exists()
+    assert get_analysis_memory("sess-lru", "d0").statistics[0].test_name == "t0"
+
+
+def test_batch_record_commits_memory_and_knowledge_once():
+    session = Session(id="sess-batch")
+    session.knowledge_memory = MagicMock()
+    records = [
+        {"test_name": f"pair {idx}", "message": "done", "p_value": 0.01, "effect_size": 0.3}
+        for idx in range(100)
+    ]
+    _record_stat_results(session, "data", records)
+
+    memory = get_analysis_memory("sess-batch", "data")
+    assert len(memory.statistics) == 100
+    session.knowledge_memory.append_many.assert_called_once()
+    assert len(session.knowledge_memory.append_many.call_args.args[0]) == 100
+
+
+def test_knowledge_append_many_keeps_append_layout():
+    from nini.memory.knowledge import KnowledgeMemory
+
+    knowledge = KnowledgeMemory("sess-km")
+    knowledge.write("  既有内容\n")
+    knowledge.append_many([("pair 1", "r = 0.3  \n"), ("空", "")])
+    knowledge.append("pair 2", "r = 0.1")
+
+    assert knowledge.read() == (
+        "既有内容\n\n\n## pair 1\n\nr = 0.3\n\n\n## 空\n\n\n## pair 2\n\nr = 0.1\n"
+    )
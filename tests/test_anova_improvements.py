@@ -76,16 +76,43 @@ class TestANOVABoundaries:
             }
         )
 
-        monkeypatch.setattr(statistics_module, "f_oneway", lambda *_args: (3.2, 0.05))
-
-        class _DummyTukey:
-            groupsunique = np.array(["A", "B", "C"])
-            pvalues = np.array([0.049, 0.051, 0.05])
-            meandiffs = np.array([0.2, 0.1, 0.3])
-            reject = np.array([True, False, True])
-
         monkeypatch.setattr(
-            statistics_module, "pairwise_tukeyhsd", lambda *_args, **_kwargs: _DummyTukey()
+            statistics_module,
+            "oneway_anova",
+            lambda _moments: {
+                "f_statistic": 3.2,
+                "p_value": 0.05,
+                "df_between": 2,
+                "df_within": 27,
+                "eta_squared": 0.19,
+            },
+        )
+        monkeypatch.setattr(
+            statistics_module,
+            "tukey_hsd",
+            lambda _moments, alpha=0.05: [
+                {
+                    "group1": "A",
+                    "group2": "B",
+                    "mean_diff": 0.2,
+                    "p_value": 0.049,
+                    "significant": True,
+                },
+                {
+                    "group1": "A",
+                    "group2": "C",
+                    "mean_diff": 0.1,
+                    "p_value": 0.051,
+                    "significant": False,
+                },
+                {
+                    "group1": "B",
+                    "group2": "C",
+                    "mean_diff": 0.3,
+                    "p_value": 0.05,
+                    "significant": True,
+                },
+            ],
         )
 
         result = await ANOVATool().execute(
@@ -0,0 +1,189 @@
+"""后台预压缩测试：软水位启动、轮次边界原子接管、硬阈值回退同步压缩。"""
+
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from nini.agent.components import context_compressor
+from nini.agent.components.context_compressor import (
+    BackgroundCompactor,
+    compress_with_watermarks,
+)
+from nini.agent.events import EventType
+from nini.agent.session import Session
+from nini.config import settings
+
+
+class _GatedSummarizer:
+    def __init__(self) -> None:
+        self.gate = asyncio.Event()
+        self.calls: list[int] = []
+
+    async def __call__(self, messages: list[dict[str, Any]]) -> tuple[str, str]:
+        self.calls.append(len(messages))
+        await self.gate.wait()
+        return f"摘要({len(messages)} 条)", "llm"
+
+
+@pytest.fixture
+def summarizer(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> _GatedSummarizer:
+    monkeypatch.setattr(settings, "data_dir", tmp_path / "data")
+    # 10 条消息时保留最近 6 条，归档 4 条
+    monkeypatch.setattr(settings, "memory_keep_recent_messages", 6)
+    fake = _GatedSummarizer()
+    compactor = BackgroundCompactor(summarize=fake)
+    monkeypatch.setattr(context_compressor, "_background_compactor", compactor)
+    yield fake
+    compactor.shutdown()
+
+
+def _session(n: int) -> Session:
+    session = Session()
+    for i in range(n):
+        session.messages.append({"role": "user" if i % 2 == 0 else "assistant", "content": f"m{i}"})
+    return session
+
+
+async def _inline_should_not_run(tokens: int):
+    raise AssertionError("不应走同步压缩")
+
+
+@pytest.mark.asyncio
+async def test_soft_watermark_starts_job_and_next_boundary_hands_over(summarizer):
+    session = _session(10)
+
+    # 软水位（0.7 × 1000）以上、阈值以下：启动后台任务但不阻塞
+    assert (
+        await compress_with_watermarks(
+            session, current_tokens=800, threshold=1000, inline=_inline_should_not_run
+        )
+        is None
+    )
+    await asyncio.sleep(0)
+    assert summarizer.calls == [4]
+    assert len(session.messages) == 10
+
+    # 摘要未完成时轮次边界不接管
+    session.messages.append({"role": "user", "content": "新问题"})
+    assert (
+        await compress_with_watermarks(
+            session, current_tokens=850, threshold=1000, inline=_inline_should_not_run
+        )
+        is None
+    )
+
+    summarizer.gate.set()
+    await asyncio.sleep(0)
+    event = await compress_with_watermarks(
+        session, current_tokens=850, threshold=1000, inline=_inline_should_not_run
+    )
+    assert event is not None and event.type == EventType.CONTEXT_COMPRESSED
+    assert event.data["trigger"] == "background"
+    assert [m["content"] for m in session.messages] == [
+        "m4",
+        "m5",
+        "m6",
+        "m7",
+        "m8",
+        "m9",
+        "新问题",
+    ]
+    assert "摘要(4 条)" in session.compressed_context
+    assert summarizer.calls == [4]
+
+
+@pytest.mark.asyncio
+async def test_stale_result_is_discarded_when_history_changes(summarizer):
+    session = _session(10)
+    await compress_with_watermarks(
+        session, current_tokens=800, threshold=1000, inline=_inline_should_not_run
+    )
+    # 模拟回滚/其他压缩改写了历史前缀
+    session.messages = [dict(m) for m in session.messages]
+    summarizer.gate.set()
+    await asyncio.sleep(0)
+
+    assert (
+        await compress_with_watermarks(
+            session, current_tokens=800, threshold=1000, inline=_inline_should_not_run
+        )
+        is None
+    )
+    assert len(session.messages) == 10
+    assert session.compressed_context == ""
+
+
+@pytest.mark.asyncio
+async def test_hard_limit_waits_for_inflight_job_before_inline(summarizer):
+    session = _session(10)
+    await compress_with_watermarks(
+        session, current_tokens=800, threshold=1000, inline=_inline_should_not_run
+    )
+    inline_calls: list[int] = []
+
+    async def _inline(tokens: int):
+        inline_calls.append(tokens)
+        return None
+
+    waiter = asyncio.create_task(
+        compress_with_watermarks(session, current_tokens=1200, threshold=1000, inline=_inline)
+    )
+    await asyncio.sleep(0)
+    assert not waiter.done()
+    summarizer.gate.set()
+    await waiter
+    # 先接管后台摘要；归档的消息 token 很少，扣减后仍超限，再走同步压缩
+    assert "摘要(4 条)" in session.compressed_context
+    assert len(inline_calls) == 1 and inline_calls[0] < 1200
+
+
+@pytest.mark.asyncio
+async def test_hard_limit_without_job_compresses_inline(summarizer):
+    session = _session(10)
+    inline_calls: list[int] = []
+
+    async def _inline(tokens: int):
+        inline_calls.append(tokens)
+        return None
+
+    await compress_with_watermarks(session, current_tokens=1500, threshold=1000, inline=_inline)
+    assert inline_calls == [1500]
+    assert summarizer.calls == []
+
+
+@pytest.mark.asyncio
+async def test_jobs_are_released_on_session_removal_and_after_ttl(summarizer, monkeypatch):
+    from nini.agent.session import session_manager
+
+    compactor = context_compressor.get_background_compactor()
+    removed = session_manager.create_session()
+    removed.messages.extend(_session(10).messages)
+    assert compactor.maybe_start(removed, current_tokens=800)
+
+    session_manager.remove_session(removed.id)
+    assert not compactor.has_job(removed.id)
+
+    idle = _session(10)
+    assert compactor.maybe_start(idle, current_tokens=800)
+    summarizer.gate.set()
+    await asyncio.sleep(0)
+    # 已完成但一直无人接管的结果，超过保留时长后在下次启动时清理
+    monkeypatch.setattr(context_compressor, "_SPECULATIVE_JOB_TTL_SECONDS", 0.0)
+    assert compactor.maybe_start(_session(10), current_tokens=800)
+    assert not compactor.has_job(idle.id)
+
+
+@pytest.mark.asyncio
+async def test_background_job_keeps_configured_recent_messages(summarizer, monkeypatch):
+    monkeypatch.setattr(settings, "memory_keep_recent_messages", 8)
+    compactor = context_compressor.get_background_compactor()
+
+    assert compactor.maybe_start(_session(12), current_tokens=800, ratio=0.9)
+    await asyncio.sleep(0)
+
+    # 与同步压缩一致：最少保留 memory_keep_recent_messages 条近期消息
+    assert summarizer.calls == [4]
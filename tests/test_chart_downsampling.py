@@ -0,0 +1,184 @@
+"""图表降采样测试：LTTB/密度分箱保形、typed array 编码、完整分辨率旁路文件与区间取回。"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from nini.agent.session import session_manager
+from nini.app import create_app
+from nini.charts.downsample import (
+    decode_array,
+    density_indices,
+    encode_array,
+    load_trace_window,
+    lttb_indices,
+)
+from nini.config import settings
+from nini.tools.visualization import CreateChartTool, full_resolution_name
+from tests.client_utils import LocalASGIClient
+
+
+@pytest.fixture(autouse=True)
+def _isolated(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, "data_dir", tmp_path / "data")
+    monkeypatch.setattr(settings, "chart_line_point_budget", 300)
+    monkeypatch.setattr(settings, "chart_scatter_point_budget", 400)
+    settings.ensure_dirs()
+    session_manager._sessions.clear()
+    yield
+    session_manager._sessions.clear()
+
+
+def test_lttb_keeps_endpoints_and_spikes() -> None:
+    rng = np.random.default_rng(0)
+    x = np.arange(50_000, dtype=float)
+    y = np.sin(x / 2_000) + rng.normal(0, 0.01, len(x))
+    y[[1_234, 40_000]] = [25.0, -25.0]
+
+    keep = lttb_indices(x, y, 500)
+
+    assert len(keep) == 500 and keep[0] == 0 and keep[-1] == len(x) - 1
+    assert np.all(np.diff(keep) > 0)
+    assert {1_234, 40_000} <= set(keep.tolist())
+    assert y[keep].max() == y.max() and y[keep].min() == y.min()
+
+
+def test_density_binning_respects_budget_and_keeps_outliers() -> None:
+    rng = np.random.default_rng(1)
+    x = np.concatenate([rng.normal(0, 1, 100_000), [40.0]])
+    y = np.concatenate([rng.normal(0, 1, 100_000), [-40.0]])
+    y[5] = np.nan
+
+    keep = density_indices(x, y, 2_000)
+
+    assert 500 < len(keep) <= 2_000
+    assert len(x) - 1 in keep and 5 not in keep
+
+
+def test_typed_array_round_trip() -> None:
+    values = np.array([1.5, -2.0, np.nan])
+    encoded = encode_array(values)
+    assert encoded["dtype"] == "f8"
+    np.testing.assert_array_equal(decode_array(encoded), values)
+
+    small_ints = encode_array(np.array([1, 2, 3], dtype=np.int64))
+    assert small_ints["dtype"] == "i4"
+    matrix = encode_array(np.arange(6, dtype=np.float32).reshape(3, 2))
+    assert matrix["shape"] == "3,2"
+    assert decode_array(matrix).shape == (3, 2)
+    dates = np.array(["2024-01-01T00:00", "2024-01-02T00:00"], dtype="datetime64[m]")
+    assert encode_array(dates) == ["2024-01-01T00:00", "2024-01-02T00:00"]
+
+
+async def _create_chart(session, **kwargs):
+    return await CreateChartTool().execute(session=session, dataset_name="big", **kwargs)
+
+
+async def test_large_line_chart_is_downsampled_with_full_resolution_sidecar() -> None:
+    session = session_manager.create_session()
+    n = 5_000
+    session.datasets["big"] = pd.DataFrame(
+        {"t": np.arange(n), "v": np.sin(np.arange(n) / 100.0), "g": ["a", "b"] * (n // 2)}
+    )
+
+    result = await _create_chart(
+        session, chart_type="line", x_column="t", y_column="v", color_column="g"
+    )
+
+    assert result.success, result.message
+    traces = result.chart_data["data"]
+    assert len(traces) == 2
+    for trace in traces:
+        assert len(decode_array(trace["x"])) == 300
+        assert len(decode_array(trace["y"])) == 300
+    meta = result.chart_data["layout"]["meta"]["nini_downsampling"]
+    assert [item["method"] for item in meta["traces"]] == ["lttb", "lttb"]
+    assert meta["traces"][0]["original_points"] == n // 2
+    assert result.data["downsampled"] == meta["traces"]
+
+    chart_name = result.artifacts[0]["name"]
+    sidecar = Path(result.artifacts[0]["path"]).with_name(full_resolution_name(chart_name))
+    assert meta["source"] == sidecar.name and sidecar.exists()
+    saved = json.loads(Path(result.artifacts[0]["path"]).read_text(encoding="utf-8"))
+    assert saved["layout"]["meta"] == result.chart_data["layout"]["meta"]
+
+    window = load_trace_window(sidecar, 0, x_min="100", x_max=199.5, max_points=10_000)
+    xs = decode_array(window["data"]["x"])
+    assert window["window_points"] == window["points"] == 50
+    assert xs.min() >= 100 and xs.max() <= 199.5
+    with pytest.raises(KeyError):
+        load_trace_window(sidecar, 7, max_points=100)
+
+
+async def test_small_and_scatter_charts() -> None:
+    session = session_manager.create_session()
+    rng = np.random.default_rng(2)
+    session.datasets["big"] = pd.DataFrame(
+        {"a": rng.normal(size=3_000), "b": rng.normal(size=3_000)}
+    )
+
+    scatter = await _create_chart(session, chart_type="scatter", x_column="a", y_column="b")
+    assert scatter.success, scatter.message
+    trace = scatter.chart_data["data"][0]
+    assert 200 < len(decode_array(trace["x"])) <= 400
+    assert scatter.data["downsampled"][0]["method"] == "density"
+
+    session.datasets["big"] = session.datasets["big"].head(50)
+    small = await _create_chart(session, chart_type="scatter", x_column="a", y_column="b")
+    assert "meta" not in small.chart_data["layout"] or "nini_downsampling" not in (
+        small.chart_data["layout"]["meta"] or {}
+    )
+    assert "downsampled" not in small.data
+
+
+async def test_scatter_with_categorical_y_is_downsampled() -> None:
+    session = session_manager.create_session()
+    rng = np.random.default_rng(3)
+    n = 30_000
+    session.datasets["big"] = pd.DataFrame(
+        {"x": rng.normal(size=n), "g": rng.choice(["low", "mid", "high"], size=n)}
+    )
+
+    result = await _create_chart(session, chart_type="scatter", x_column="x", y_column="g")
+
+    assert result.success, result.message
+    trace = result.chart_data["data"][0]
+    assert len(trace["y"]) <= 400 and set(trace["y"]) == {"low", "mid", "high"}
+    assert result.data["downsampled"][0]["method"] == "density"
+    chart_name = result.artifacts[0]["name"]
+    sidecar = Path(result.artifacts[0]["path"]).with_name(full_resolution_name(chart_name))
+    window = load_trace_window(sidecar, 0, x_min=-1, x_max=1, max_points=100)
+    assert 0 < window["points"] <= 100
+
+
+def test_window_endpoint_serves_zoomed_points() -> None:
+    client = LocalASGIClient(create_app())
+    session_id = client.post("/api/sessions").json()["data"]["session_id"]
+    session = session_manager.get_session(session_id)
+    n = 4_000
+    session.datasets["big"] = pd.DataFrame(
+        {
+            "t": pd.date_range("2024-01-01", periods=n, freq="h"),
+            "v": np.cos(np.arange(n) / 50.0),
+        }
+    )
+    result = asyncio.run(_create_chart(session, chart_type="line", x_column="t", y_column="v"))
+    chart_name = result.artifacts[0]["name"]
+
+    resp = client.get(
+        f"/api/charts/{session_id}/artifacts/{chart_name}/window",
+        params={"x_min": "2024-01-02", "x_max": "2024-01-03", "max_points": 20},
+    )
+    assert resp.status_code == 200, resp.text
+    window = resp.json()["data"]
+    assert window["window_points"] == 25 and window["points"] == 20
+    assert window["data"]["x"][0].startswith("2024-01-02T00:00:00")
+
+    missing = client.get(f"/api/charts/{session_id}/artifacts/nope.plotly.json/window")
+    assert missing.status_code == 404
@@ -0,0 +1,157 @@
+"""常驻图表渲染服务测试：内容哈希缓存、在途合并、批量渲染。"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from nini.charts.render_service import ChartRenderService, RenderJob
+
+_FIGURE = {"data": [{"type": "scatter", "x": [1, 2, 3], "y": [3, 1, 2]}], "layout": {}}
+
+
+class _CountingRasterizer:
+    def __init__(self, *, gate: threading.Event | None = None) -> None:
+        self.calls: list[tuple[str, int, int, float]] = []
+        self._gate = gate
+
+    def __call__(
+        self, figure: dict[str, Any], fmt: str, width: int, height: int, scale: float
+    ) -> bytes:
+        if self._gate is not None:
+            self._gate.wait(timeout=5)
+        self.calls.append((fmt, width, height, scale))
+        return f"{fmt}:{width}x{height}@{scale}:{len(figure['data'])}".encode()
+
+
+@pytest.fixture
+def service_factory(tmp_path: Path):
+    created: list[ChartRenderService] = []
+
+    def _make(rasterizer: Any, **kwargs: Any) -> ChartRenderService:
+        service = ChartRenderService(
+            cache_dir=tmp_path / "renders", rasterizer=rasterizer, **kwargs
+        )
+        created.append(service)
+        return service
+
+    yield _make
+    for service in created:
+        service.shutdown()
+
+
+def test_cache_key_depends_on_figure_and_render_options():
+    base = RenderJob(figure=_FIGURE, format="png", width=800, height=600, scale=2)
+    reordered = RenderJob(
+        figure={"layout": {}, "data": _FIGURE["data"]}, format="png", width=800, height=600, scale=2
+    )
+    assert base.cache_key() == reordered.cache_key()
+    assert (
+        base.cache_key()
+        != RenderJob(figure=_FIGURE, format="svg", width=800, height=600, scale=2).cache_key()
+    )
+    assert (
+        base.cache_key()
+        != RenderJob(figure=_FIGURE, format="png", width=800, height=600, scale=1).cache_key()
+    )
+    assert (
+        base.cache_key()
+        != RenderJob(
+            figure=_FIGURE, format="png", width=800, height=600, scale=2, style_key="nature"
+        ).cache_key()
+    )
+
+
+def test_repeated_render_is_served_from_disk_cache(service_factory):
+    rasterizer = _CountingRasterizer()
+    service = service_factory(rasterizer)
+    job = RenderJob(figure=_FIGURE, format="png", width=800, height=600, scale=2)
+
+    first = service.render_sync(job, timeout=5)
+    second = service.render_sync(job, timeout=5)
+    assert first == second
+    assert len(rasterizer.calls) == 1
+    assert service.stats["hits"] == 1
+
+    # 新实例共享同一缓存目录，仍然命中
+    other = service_factory(_CountingRasterizer())
+    assert other.render_sync(job, timeout=5) == first
+
+
+def test_identical_inflight_jobs_are_coalesced(service_factory):
+    gate = threading.Event()
+    rasterizer = _CountingRasterizer(gate=gate)
+    service = service_factory(rasterizer)
+    job = RenderJob(figure=_FIGURE, format="svg")
+
+    first = service.submit(job)
+    second = service.submit(job)
+    assert first is second
+    gate.set()
+    assert first.result(timeout=5).startswith(b"svg:")
+    assert len(rasterizer.calls) == 1
+    assert service.stats["coalesced"] == 1
+
+
+@pytest.mark.asyncio
+async def test_render_many_keeps_order_and_reports_failures(service_factory):
+    def rasterizer(figure, fmt, width, height, scale):
+        if fmt == "pdf":
+            raise RuntimeError("pdf backend unavailable")
+        return fmt.encode()
+
+    service = service_factory(rasterizer)
+    jobs = [RenderJob(figure=_FIGURE, format=fmt) for fmt in ("png", "pdf", "svg")]
+    results = await service.render_many(jobs, timeout=5)
+
+    assert results[0] == b"png"
+    assert isinstance(results[1], RuntimeError)
+    assert results[2] == b"svg"
+
+
+@pytest.mark.asyncio
+async def test_render_timeout_does_not_cancel_inflight_job(service_factory):
+    gate = threading.Event()
+    rasterizer = _CountingRasterizer(gate=gate)
+    service = service_factory(rasterizer)
+    job = RenderJob(figure=_FIGURE, format="png")
+
+    with pytest.raises(asyncio.TimeoutError):
+        await service.render(job, timeout=0.05)
+    gate.set()
+    # 超时后任务继续完成并写入缓存，下一次请求直接命中
+    assert (await service.render(job, timeout=5)).startswith(b"png:")
+    assert len(rasterizer.calls) == 1
+
+
+def test_prune_cache_respects_size_limit(service_factory):
+    service = service_factory(lambda figure, fmt, w, h, s: b"x" * 100, max_cache_bytes=250)
+    for idx in range(5):
+        service.render_sync(RenderJob(figure=_FIGURE, format="png", width=100 + idx), timeout=5)
+    service.prune_cache()
+    cached = [p for p in service.cache_dir.rglob("*") if p.is_file()]
+    assert sum(p.stat().st_size for p in cached) <= 250
+
+
+def test_stuck_render_is_abandoned_and_pool_recreated(service_factory):
+    gate = threading.Event()
+
+    def rasterizer(figure, fmt, width, height, scale):
+        if figure["layout"].get("title") == "hang":
+            gate.wait(timeout=5)
+        return fmt.encode()
+
+    service = service_factory(rasterizer, max_workers=1)
+    stuck = RenderJob(figure={**_FIGURE, "layout": {"title": "hang"}}, format="png")
+
+    with pytest.raises(TimeoutError):
+        service.render_sync(stuck, timeout=0.05)
+    assert service.stats["recycles"] == 1
+    # 唯一的渲染线程仍被卡住，新任务由重建的线程池处理
+    assert service.render_sync(RenderJob(figure=_FIGURE, format="svg"), timeout=2) == b"svg"
+    gate.set()
+    assert service.render_sync(stuck, timeout=5) == b"png"
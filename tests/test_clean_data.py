@@ -7,6 +7,7 @@ import pandas as pd
 import pytest
 
 from nini.agent.session import Session
+from nini.tools import clean_data
 from nini.tools.clean_data import (
     CleanDataTool,
     MissingPattern,
@@ -15,7 +16,9 @@ from nini.tools.clean_data import (
     analyze_column_profile,
     analyze_dataset_features,
     analyze_missing_pattern,
+    analyze_missing_patterns,
     analyze_outlier_pattern,
+    missing_cooccurrence,
     generate_cleaning_recommendation,
     recommend_cleaning_strategy,
     recommend_missing_strategy,
@@ -54,6 +57,36 @@ class TestMissingPatternAnalysis:
         pattern = analyze_missing_pattern(df, "a")
         assert pattern == MissingPattern.SYSTEMATIC
 
+    def test_cooccurrence_matrix_counts_joint_missing(self):
+        mask = np.array(
+            [[True, True, False], [True, False, False], [False, True, True], [True, True, True]]
+        )
+        counts = missing_cooccurrence(mask)
+        expected = mask.T.astype(int) @ mask.astype(int)
+        np.testing.assert_array_equal(counts, expected)
+
+    @pytest.mark.parametrize("index_kind", ["range", "shuffled", "float", "strided"])
+    def test_vectorized_patterns_match_pairwise(self, index_kind: str):
+        rng = np.random.default_rng(42)
+        for _ in range(40):
+            n_rows = int(rng.integers(2, 60))
+            df = pd.DataFrame(rng.normal(size=(n_rows, 6)), columns=list("abcdef"))
+            df.loc[rng.random(n_rows) < 0.3, "a"] = np.nan
+            start = int(rng.integers(0, n_rows))
+            df.iloc[start : start + int(rng.integers(1, n_rows)), 1] = np.nan
+            df.loc[df["a"].isna() | (rng.random(n_rows) < 0.1), "c"] = np.nan
+            df["d"] = np.nan
+            df.loc[rng.random(n_rows) < 0.5, "e"] = np.nan
+            if index_kind == "shuffled":
+                df.index = rng.permutation(n_rows) * 3 - 7
+            elif index_kind == "float":
+                df.index = np.linspace(0.0, 3.0, n_rows)
+            elif index_kind == "strided":
+                df.index = np.arange(n_rows) * 2
+            fast = analyze_missing_patterns(df)
+            for column in df.columns:
+                assert fast[column] == clean_data._analyze_missing_pattern_pairwise(df, column)
+
 
 class TestOutlierPatternAnalysis:
     """测试异常值模式分析。"""
@@ -0,0 +1,145 @@
+"""列式数据画像测试：与逐列 pandas 统计一致、抽样估计，以及清洗推荐/质量评分/诊断共用画像。"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from nini.agent.session import Session
+from nini.config import settings
+from nini.tools.clean_data import CleanDataTool, analyze_column_profile, recommend_cleaning_strategy
+from nini.tools.column_profiler import profile_dataframe
+from nini.tools.data_quality import evaluate_data_quality
+from nini.tools.diagnostics import DataDiagnostics
+
+
+def _random_frame(rng: np.random.Generator, n_rows: int) -> pd.DataFrame:
+    frame = pd.DataFrame(
+        {
+            "normal": rng.normal(50, 10, n_rows),
+            "skewed": np.round(rng.exponential(2.0, n_rows), 1),
+            "ints": rng.integers(0, 20, n_rows),
+            "nullable": pd.array(rng.integers(-5, 5, n_rows), dtype="Int64"),
+            "group": rng.choice(["a", "b", "c"], n_rows),
+            "flag": rng.random(n_rows) > 0.5,
+        }
+    )
+    for col in ("normal", "skewed", "nullable", "group"):
+        frame.loc[rng.random(n_rows) < 0.15, col] = None
+    return frame
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_profile_matches_per_column_pandas(seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    df = _random_frame(rng, int(rng.integers(0, 80)))
+
+    profile = profile_dataframe(df)
+
+    assert not profile.sampled
+    assert profile.missing_cells == int(df.isna().sum().sum())
+    for col in df.columns:
+        stats = profile[col]
+        clean = df[col].dropna()
+        assert stats.count == len(clean)
+        assert stats.missing_count == int(df[col].isna().sum())
+        assert stats.unique_count == df[col].nunique()
+        if not stats.is_numeric:
+            if len(clean):
+                assert stats.mode == df[col].mode().iloc[0]
+                assert stats.mode_freq == int((df[col] == stats.mode).sum())
+            continue
+        if len(clean) == 0:
+            assert stats.mean is None and stats.q1 is None
+            continue
+        clean = clean.astype(float)
+        for name, expected in (
+            ("mean", clean.mean()),
+            ("std", clean.std()),
+            ("skewness", clean.skew()),
+            ("kurtosis", clean.kurtosis()),
+        ):
+            assert getattr(stats, name) == pytest.approx(expected, rel=1e-9, abs=1e-9, nan_ok=True)
+        # 分位数与 numpy linear 插值逐位一致，越界计数因此也精确一致
+        q1, median, q3 = clean.quantile(0.25), clean.quantile(0.5), clean.quantile(0.75)
+        assert (stats.q1, stats.median, stats.q3) == (q1, median, q3)
+        assert (stats.min, stats.max) == (clean.min(), clean.max())
+        if len(clean) >= 4:
+            low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+            assert stats.iqr_outlier_count == int(((clean < low) | (clean > high)).sum())
+
+
+def test_large_frames_estimate_quartiles_on_sample(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "data_profile_exact_max_rows", 2_000)
+    monkeypatch.setattr(settings, "data_profile_sample_rows", 5_000)
+    rng = np.random.default_rng(7)
+    values = rng.normal(0, 1, 20_000)
+    values[rng.random(20_000) < 0.1] = np.nan
+    df = pd.DataFrame({"x": values, "y": rng.integers(0, 500, 20_000)})
+
+    profile = profile_dataframe(df)
+    exact = profile_dataframe(df, allow_sampling=False)
+
+    assert profile.sampled and profile.sample_rows == 5_000
+    assert not exact.sampled
+    x, x_exact = profile["x"], exact["x"]
+    # 矩、计数与唯一值个数仍为全量精确值
+    assert x.count == x_exact.count and x.missing_count == x_exact.missing_count
+    assert x.mean == x_exact.mean and x.std == x_exact.std
+    assert profile["y"].unique_count == df["y"].nunique()
+    assert x.q1 == pytest.approx(x_exact.q1, abs=0.1)
+    assert x.q3 == pytest.approx(x_exact.q3, abs=0.1)
+    assert x.iqr_outlier_count == pytest.approx(x_exact.iqr_outlier_count, rel=0.5)
+
+    recommendation = recommend_cleaning_strategy(df)
+    assert recommendation["overall_strategy"]["summary"]["quantiles_sampled"] is True
+
+
+def test_quality_and_diagnostics_share_profile() -> None:
+    rng = np.random.default_rng(3)
+    df = _random_frame(rng, 60)
+    df["age"] = rng.integers(-3, 200, 60)
+
+    profile = profile_dataframe(df)
+    shared = evaluate_data_quality(df, "ds", profile=profile).to_dict()
+    standalone = evaluate_data_quality(df, "ds").to_dict()
+    assert shared == standalone
+
+    # 布尔列按分类列处理，不再因对布尔值求分位数而报错
+    assert analyze_column_profile(df, "flag").is_numeric is False
+
+
+async def test_diagnostics_use_profile_for_checks() -> None:
+    session = Session()
+    values = [1.0, 2.0, 2.5, 3.0, 2.2, 100.0, None, 2.8]
+    session.datasets["ds"] = pd.DataFrame({"v": values, "flag": [True, False] * 4})
+
+    result = await DataDiagnostics().diagnose(session, "ds")
+
+    assert result.metadata["outliers"]["v"] == {"count": 1, "values": [100.0]}
+    assert result.metadata["missing_values"]["v"]["count"] == 1
+    assert result.metadata["sample_size"]["v"]["count"] == 7
+    assert result.quality_score is not None
+
+
+async def test_clean_data_iqr_removes_same_rows_as_per_column_bounds() -> None:
+    rng = np.random.default_rng(11)
+    df = pd.DataFrame({"a": rng.normal(0, 1, 200), "b": rng.exponential(1.0, 200)})
+    df.loc[[3, 50], "a"] = [25.0, -30.0]
+    expected = pd.Series(True, index=df.index)
+    for col in df.columns:
+        q1, q3 = df[col].quantile(0.25), df[col].quantile(0.75)
+        expected &= df[col].between(q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1))
+
+    session = Session()
+    session.datasets["ds"] = df
+    result = await CleanDataTool().execute(
+        session, dataset_name="ds", missing_strategy="none", outlier_method="iqr"
+    )
+
+    assert result.success, result.message
+    assert result.data["rows_removed_by_outlier"] == int((~expected).sum())
+    pd.testing.assert_frame_equal(
+        session.datasets["ds_cleaned"], df[expected].reset_index(drop=True)
+    )
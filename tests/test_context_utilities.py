@@ -9,6 +9,7 @@ import pytest
 
 from nini.agent.components.context_agents_md import scan_agents_md
 from nini.agent.components.context_utils import (
+    PreparedMessageCache,
     compact_tool_content_for_preparation,
     filter_valid_messages,
     get_last_user_message,
@@ -538,3 +539,72 @@ def test_replace_arguments_handles_positional_and_full_arguments() -> None:
     replaced = replace_arguments(text, "demo.csv score group")
 
     assert replaced == "分析 demo.csv score group；主列=demo.csv；分组=score；第三项=group"
+
+
+def _tool_history(n: int) -> list[dict]:
+    history: list[dict] = [{"role": "user", "content": "分析数据"}]
+    for idx in range(n):
+        call_id = f"call-{idx}"
+        history.append(
+            {
+                "role": "assistant",
+                "content": "",
+                "tool_calls": [
+                    {
+                        "id": call_id,
+                        "type": "function",
+                        "function": {"name": "stat", "arguments": "{}"},
+                    }
+                ],
+            }
+        )
+        history.append(
+            {
+                "role": "tool",
+                "tool_call_id": call_id,
+                "tool_name": "stat",
+                "content": json.dumps({"success": True, "message": "x" * 5000}),
+            }
+        )
+    return history
+
+
+def test_prepared_message_cache_matches_uncached_and_reuses_entries() -> None:
+    """缓存结果与逐条预处理一致；追加消息后只处理新增部分。"""
+    history = _tool_history(5)
+    cache = PreparedMessageCache()
+    cached = prepare_messages_for_llm(history, cache=cache)
+    assert cached == prepare_messages_for_llm(history)
+    assert cache.misses == len(history)
+
+    history.append({"role": "user", "content": "继续"})
+    prepare_messages_for_llm(history, cache=cache)
+    assert cache.misses == len(history)
+    assert cache.hits == len(history) - 1
+
+    # 不同预算档位分开缓存，结果仍与非缓存路径一致
+    tight = prepare_messages_for_llm(history, context_ratio=0.9, cache=cache)
+    assert tight == prepare_messages_for_llm(history, context_ratio=0.9)
+
+
+def test_prepared_message_cache_detects_replaced_content_and_copies_output() -> None:
+    """消息内容被替换时重新计算；返回的字典被修改不会污染缓存。"""
+    history = [{"role": "user", "content": "原始问题"}]
+    cache = PreparedMessageCache()
+    first, tokens = cache.prepare(history, adaptive_max_chars=2000)
+    first[0]["content"] = "被下游改写"
+    history[0]["content"] = "修改后的问题"
+    second, _ = cache.prepare(history, adaptive_max_chars=2000)
+    assert second[0]["content"] == "修改后的问题"
+    assert tokens[0] > 0
+
+
+def test_session_rewrite_clears_prepared_message_cache() -> None:
+    """压缩/回滚重写历史时清空会话级缓存。"""
+    session = Session()
+    session.messages = [{"role": "user", "content": "问题"}, {"role": "assistant", "content": "答"}]
+    session.prepared_message_cache = PreparedMessageCache()
+    session.prepared_message_cache.prepare(session.messages, adaptive_max_chars=2000)
+    assert len(session.prepared_message_cache) == 2
+    session.rollback_last_turn()
+    assert len(session.prepared_message_cache) == 0
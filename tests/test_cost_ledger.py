@@ -0,0 +1,190 @@
+"""成本账本测试：增量入账、回填旧会话、时间分桶聚合、会话删除与追踪器淘汰。"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from nini.api import cost_routes
+from nini.config import settings
+from nini.utils import token_counter
+from nini.utils.cost_ledger import flush_pending_syncs, get_cost_ledger
+from nini.utils.token_counter import get_tracker, remove_tracker
+
+
+@pytest.fixture(autouse=True)
+def _isolated_data_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "data_dir", tmp_path / "data")
+    monkeypatch.setattr(token_counter, "_trackers", token_counter.OrderedDict())
+
+
+def _write_cost_file(session_id: str, rows: list[dict]) -> Path:
+    path = settings.sessions_dir / session_id / "cost.jsonl"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows), encoding="utf-8")
+    return path
+
+
+def test_tracker_records_update_rollups_incrementally() -> None:
+    tracker = get_tracker("s1", persist_enabled=True)
+    tracker.record(model="gpt-4o", input_tokens=1000, output_tokens=500)
+    tracker.record(model="gpt-4o", input_tokens=10, output_tokens=5)
+    tracker.record(model="deepseek-chat", input_tokens=200, output_tokens=100)
+
+    # 追加记录只登记待入账，账本由后台批量同步
+    ledger = get_cost_ledger()
+    assert ledger.session_models("s1") == {}
+    assert flush_pending_syncs() == 3
+    models = ledger.session_models("s1")
+    assert models["gpt-4o"]["call_count"] == 2
+    assert models["gpt-4o"]["input_tokens"] == 1010
+    assert models["deepseek-chat"]["output_tokens"] == 100
+    assert ledger.totals()["cost_usd"] == pytest.approx(tracker.total_cost_usd)
+
+    # 重复同步不会重复计数；未写完的半行留待下次同步
+    cost_file = settings.sessions_dir / "s1" / "cost.jsonl"
+    assert ledger.sync_session("s1", cost_file) == 0
+    with open(cost_file, "a", encoding="utf-8") as f:
+        f.write('{"timestamp": 1, "model": "gpt-4o"')
+    assert ledger.sync_session("s1", cost_file) == 0
+    assert ledger.totals()["call_count"] == 3
+
+
+def test_failed_sync_is_requeued_for_the_next_flush(monkeypatch: pytest.MonkeyPatch) -> None:
+    get_tracker("s2", persist_enabled=True).record(
+        model="gpt-4o", input_tokens=100, output_tokens=50
+    )
+    ledger = get_cost_ledger()
+    real_sync = ledger.sync_session
+
+    def broken_sync(session_id: str, cost_file: Path) -> int:
+        raise OSError("数据库被锁定")
+
+    monkeypatch.setattr(ledger, "sync_session", broken_sync)
+    assert flush_pending_syncs() == 0
+
+    # 没有新的追加，下一次查询前的同步仍会重试
+    monkeypatch.setattr(ledger, "sync_session", real_sync)
+    assert flush_pending_syncs() == 1
+    assert ledger.session_models("s2")["gpt-4o"]["call_count"] == 1
+
+
+async def test_dashboard_backfills_legacy_sessions_once() -> None:
+    _write_cost_file(
+        "old",
+        [
+            {"timestamp": 100.0, "model": "gpt-4o", "input_tokens": 1000, "output_tokens": 0},
+            {
+                "timestamp": 200.0,
+                "model": "glm-5 (fallback)",
+                "input_tokens": 10,
+                "output_tokens": 10,
+                "cost_usd": 0.5,
+            },
+        ],
+    )
+    meta = settings.sessions_dir / "old" / "meta.json"
+    meta.write_text(json.dumps({"title": "旧会话"}), encoding="utf-8")
+    get_tracker("new", persist_enabled=True).record(
+        model="gpt-4o", input_tokens=100, output_tokens=100
+    )
+
+    result = await cost_routes.get_all_sessions_cost(limit=None, offset=0)
+
+    assert [item["session_id"] for item in result["sessions"]] == ["new", "old"]
+    old = result["sessions"][1]
+    assert old["title"] == "旧会话" and old["model_count"] == 2
+    aggregate = result["aggregate"]
+    assert aggregate["total_sessions"] == 2
+    assert aggregate["total_tokens"] == 1220
+    # 缺失成本按价格表补算：gpt-4o 输入 $0.0025/1K
+    assert aggregate["total_cost_usd"] == pytest.approx(0.0025 + 0.5 + 0.00125, abs=1e-6)
+    assert aggregate["most_used_model"] == "gpt-4o"
+
+    page = await cost_routes.get_all_sessions_cost(limit=1, offset=1)
+    assert [item["session_id"] for item in page["sessions"]] == ["old"]
+    assert page["aggregate"]["total_sessions"] == 2
+
+    detail = await cost_routes.get_session_cost("old")
+    assert set(detail["model_breakdown"]) == {"gpt-4o", "glm-5"}
+    assert detail["estimated_cost_usd"] == pytest.approx(0.5025)
+
+
+def test_timeline_aggregates_buckets_by_granularity() -> None:
+    day = 86400 * 10
+    _write_cost_file(
+        "a",
+        [
+            {
+                "timestamp": day + 60,
+                "model": "m1",
+                "input_tokens": 1,
+                "output_tokens": 1,
+                "cost_usd": 1.0,
+            },
+            {
+                "timestamp": day + 7200,
+                "model": "m2",
+                "input_tokens": 2,
+                "output_tokens": 2,
+                "cost_usd": 2.0,
+            },
+            {
+                "timestamp": day + 86400,
+                "model": "m1",
+                "input_tokens": 4,
+                "output_tokens": 4,
+                "cost_usd": 4.0,
+            },
+        ],
+    )
+    ledger = get_cost_ledger()
+    ledger.ensure_backfilled(settings.sessions_dir)
+
+    daily = ledger.timeline(granularity="day")
+    assert [(b["bucket_start"], b["call_count"], b["cost_usd"]) for b in daily] == [
+        (day, 2, 3.0),
+        (day + 86400, 1, 4.0),
+    ]
+    assert set(daily[0]["models"]) == {"m1", "m2"}
+
+    hourly = ledger.timeline(granularity="hour", since=day + 3600, until=day + 86400)
+    assert [b["bucket_start"] for b in hourly] == [day + 7200]
+    assert ledger.timeline(granularity="day", session_id="other") == []
+    with pytest.raises(ValueError):
+        ledger.timeline(granularity="month")
+
+
+def test_deleted_sessions_leave_the_rollups() -> None:
+    from nini.agent.session import session_manager
+
+    get_tracker("keep", persist_enabled=True).record(model="m", input_tokens=1, output_tokens=1)
+    get_tracker("drop", persist_enabled=True).record(model="m", input_tokens=5, output_tokens=5)
+
+    session_manager.remove_session("drop", delete_persistent=True)
+    flush_pending_syncs()
+
+    ledger = get_cost_ledger()
+    assert [item["session_id"] for item in ledger.list_sessions()] == ["keep"]
+    assert ledger.totals()["models"]["m"]["total_tokens"] == 2
+    assert ledger.timeline(granularity="day", session_id="drop") == []
+
+
+def test_idle_and_excess_trackers_are_evicted(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "cost_tracker_max_live", 2)
+
+    first = get_tracker("t1", persist_enabled=False)
+    get_tracker("t2", persist_enabled=False)
+    assert get_tracker("t1", persist_enabled=False) is first
+    get_tracker("t3", persist_enabled=False)
+    assert list(token_counter._trackers) == ["t1", "t3"]
+
+    # 把现有追踪器的最近访问时间拨回到空闲阈值之前
+    stale = token_counter.time.monotonic() - settings.cost_tracker_idle_seconds - 1
+    for session_id, (tracker, _last_used) in list(token_counter._trackers.items()):
+        token_counter._trackers[session_id] = (tracker, stale)
+    get_tracker("t4", persist_enabled=False)
+    assert list(token_counter._trackers) == ["t4"]
+    remove_tracker("t4")
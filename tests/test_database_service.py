@@ -0,0 +1,166 @@
+"""应用数据库服务测试：单写线程串行事务、只读连接池、一次性建表、写队列背压与延迟指标。"""
+
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from nini.config import settings
+from nini.models import database
+from nini.models.database import DatabaseBusyError, DatabaseService, LatencyHistogram
+
+
+@pytest.fixture
+async def service(tmp_path: Path):
+    svc = DatabaseService(tmp_path / "app.db", read_pool_size=2, write_queue_size=8)
+    yield svc
+    await asyncio.to_thread(svc.close)
+
+
+async def test_writes_run_serially_on_writer_thread(service: DatabaseService) -> None:
+    threads: set[str] = set()
+
+    def _insert(conn: sqlite3.Connection, idx: int) -> int:
+        threads.add(threading.current_thread().name)
+        conn.execute("INSERT INTO app_settings (key, value) VALUES (?, ?)", (f"k{idx}", str(idx)))
+        return idx
+
+    results = await asyncio.gather(
+        *(service.write(lambda conn, i=i: _insert(conn, i)) for i in range(20))
+    )
+
+    assert results == list(range(20))
+    assert threads == {"nini-db-writer"}
+    rows = await service.fetchall("SELECT key FROM app_settings ORDER BY CAST(value AS INT)")
+    assert [row["key"] for row in rows] == [f"k{i}" for i in range(20)]
+
+
+async def test_failed_write_rolls_back_whole_transaction(service: DatabaseService) -> None:
+    def _partial(conn: sqlite3.Connection) -> None:
+        conn.execute("INSERT INTO app_settings (key, value) VALUES ('a', '1')")
+        raise ValueError("中途失败")
+
+    with pytest.raises(ValueError, match="中途失败"):
+        await service.write(_partial)
+
+    assert await service.fetchone("SELECT value FROM app_settings WHERE key = 'a'") is None
+    assert await service.execute("INSERT INTO app_settings (key, value) VALUES ('a', '2')") == 1
+
+
+async def test_readers_are_read_only_and_see_commits(service: DatabaseService) -> None:
+    await service.execute("INSERT INTO app_settings (key, value) VALUES ('x', '1')")
+
+    row = await service.fetchone("SELECT value FROM app_settings WHERE key = ?", ("x",))
+    assert row is not None and row["value"] == "1"
+    with pytest.raises(sqlite3.OperationalError):
+        await service.read(lambda conn: conn.execute("DELETE FROM app_settings"))
+
+    names = await service.read(lambda _conn: threading.current_thread().name)
+    assert names.startswith("nini-db-read")
+
+
+async def test_schema_initialised_once_and_migrates_old_tables(tmp_path: Path) -> None:
+    path = tmp_path / "legacy.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE harness_runs (run_id TEXT PRIMARY KEY, session_id TEXT NOT NULL, "
+            "turn_id TEXT NOT NULL, status TEXT NOT NULL, trace_path TEXT NOT NULL, "
+            "created_at TEXT, updated_at TEXT)"
+        )
+    conn.close()
+    svc = DatabaseService(path)
+    calls = 0
+    original = svc._init_schema
+
+    def _counting(conn: sqlite3.Connection) -> None:
+        nonlocal calls
+        calls += 1
+        original(conn)
+
+    svc._init_schema = _counting  # type: ignore[method-assign]
+    try:
+        await asyncio.gather(*(svc.ensure_schema() for _ in range(5)))
+        await svc.ensure_schema()
+        columns = {row[1] for row in await svc.fetchall("PRAGMA table_info(harness_runs)")}
+    finally:
+        await asyncio.to_thread(svc.close)
+
+    # 并发首次调用可能各入队一次，但真正建表只发生在第一次
+    assert 1 <= calls <= 5
+    assert svc.stats()["schema_ready"] is True
+    assert {"task_id", "recipe_id", "recovery_count", "budget_warning_count"} <= columns
+
+
+async def test_full_write_queue_applies_backpressure(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "db_write_queue_timeout", 0.05)
+    svc = DatabaseService(tmp_path / "busy.db", write_queue_size=1)
+    await svc.ensure_schema()
+    release = threading.Event()
+    try:
+        blocker = asyncio.ensure_future(svc.write(lambda _conn: release.wait(5)))
+        await asyncio.sleep(0.05)
+        queued = asyncio.ensure_future(svc.write(lambda _conn: "queued"))
+        await asyncio.sleep(0.05)
+
+        # 事件循环在写线程被占用、队列已满时仍可调度
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        assert time.perf_counter() - started < 0.5
+
+        with pytest.raises(DatabaseBusyError):
+            await svc.write(lambda _conn: None)
+        release.set()
+        assert await blocker is True
+        assert await queued == "queued"
+    finally:
+        release.set()
+        await asyncio.to_thread(svc.close)
+
+    assert svc.stats()["rejected_writes"] == 1
+
+
+async def test_stats_report_latency_histograms(service: DatabaseService) -> None:
+    await service.execute("INSERT INTO app_settings (key, value) VALUES ('k', 'v')")
+    await service.fetchall("SELECT * FROM app_settings")
+
+    stats = service.stats()
+    # 建表 + 一次写入
+    assert stats["write"]["execute"]["count"] == 2
+    assert stats["read"]["queue"]["count"] == 1
+    assert stats["write_queue_capacity"] == 8
+    assert sum(stats["read"]["execute"]["buckets"].values()) == 1
+
+
+def test_latency_histogram_quantiles() -> None:
+    hist = LatencyHistogram(bounds=(1.0, 10.0))
+    for value in (0.5, 0.5, 5.0, 50.0):
+        hist.observe(value)
+
+    snapshot = hist.snapshot()
+    assert snapshot["count"] == 4
+    assert snapshot["buckets"] == {"<=1": 2, "<=10": 1, "+Inf": 1}
+    assert snapshot["p50_ms"] == 1.0
+    assert snapshot["p99_ms"] == 50.0
+
+
+async def test_get_database_follows_db_path(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "data_dir", tmp_path / "one")
+    first = database.get_database()
+    assert database.get_database() is first
+    await database.init_db()
+
+    monkeypatch.setattr(settings, "data_dir", tmp_path / "two")
+    second = database.get_database()
+    assert second is not first and second.path == settings.db_path
+
+    await database.shutdown_database()
+    assert second.closed
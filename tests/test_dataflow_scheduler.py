@@ -0,0 +1,208 @@
+"""数据流调度测试：依赖即释放、并发上限、关键路径优先与时间线。"""
+
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from nini.agent.workflow import WorkflowDef, WorkflowExecutor
+from nini.models.skill_contract import SkillContract, SkillStep
+from nini.skills.contract_runner import ContractRunner
+from nini.utils.dataflow import DataflowGraph, DataflowScheduler, StepDurationHistory
+
+
+def test_graph_rejects_unknown_dependency_and_cycle() -> None:
+    with pytest.raises(ValueError, match="未知依赖"):
+        DataflowGraph({"a": ["missing"]})
+    with pytest.raises(ValueError, match="循环依赖"):
+        DataflowGraph({"a": ["b"], "b": ["a"]})
+    graph = DataflowGraph({"a": [], "b": ["a"], "c": []})
+    assert graph.layers == [["a", "c"], ["b"]]
+
+
+async def test_slow_step_does_not_block_independent_chain() -> None:
+    # slow 直到 b 启动后才结束：分层执行会在 slow 所在层等待而超时，数据流执行则不会
+    graph = DataflowGraph({"slow": [], "a": [], "b": ["a"]})
+    b_started = asyncio.Event()
+    events: list[str] = []
+
+    async def _execute(node: str) -> str:
+        events.append(f"start:{node}")
+        if node == "slow":
+            await asyncio.wait_for(b_started.wait(), timeout=5)
+            await asyncio.sleep(0.05)
+        elif node == "b":
+            b_started.set()
+        events.append(f"end:{node}")
+        return node
+
+    run = await DataflowScheduler(graph).run(_execute)
+
+    assert set(run.results) == {"slow", "a", "b"}
+    assert events.index("start:b") < events.index("end:slow")
+    timings = run.trace.timings
+    assert timings["b"].started_at < timings["slow"].finished_at
+    assert run.trace.critical_path == ["slow"]
+
+
+async def test_concurrency_cap_and_critical_path_priority() -> None:
+    history = StepDurationHistory()
+    history.record("long", 5.0)
+    history.record("tail", 2.0)
+    graph = DataflowGraph({"short1": [], "short2": [], "long": [], "tail": ["long"]})
+    order: list[str] = []
+    in_flight = 0
+    peak = 0
+
+    async def _execute(node: str) -> None:
+        nonlocal in_flight, peak
+        order.append(node)
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+
+    scheduler: DataflowScheduler[None] = DataflowScheduler(
+        graph, max_concurrency=1, history=history, history_key=lambda node: node
+    )
+    await scheduler.run(_execute)
+
+    assert peak == 1
+    # 关键路径 long -> tail 最长，优先启动
+    assert order[0] == "long"
+    assert order.index("tail") < order.index("short1")
+    # 完成后历史耗时被滑动平均更新
+    assert history.estimate("short1", default=-1.0) > 0
+
+
+async def test_should_halt_stops_new_steps() -> None:
+    graph = DataflowGraph({"a": [], "b": ["a"], "c": []})
+
+    async def _execute(node: str) -> bool:
+        return node != "a"
+
+    run = await DataflowScheduler(graph, max_concurrency=1).run(
+        _execute, should_halt=lambda _node, ok: not ok
+    )
+    assert "a" in run.results
+    assert "b" in run.not_started
+
+
+class _FakeSpawner:
+    def __init__(
+        self,
+        delays: dict[str, float],
+        failing: set[str] | None = None,
+        *,
+        wait_for: dict[str, str] | None = None,
+    ) -> None:
+        self.delays = delays
+        self.failing = failing or set()
+        # agent -> 需等待其启动后才继续的 agent
+        self.wait_for = wait_for or {}
+        self.started: dict[str, asyncio.Event] = {}
+        self.tasks: dict[str, str] = {}
+
+    def _started(self, agent_id: str) -> asyncio.Event:
+        return self.started.setdefault(agent_id, asyncio.Event())
+
+    async def spawn_with_retry(self, agent_id: str, task: str, session: Any, **_: Any):
+        self.tasks[agent_id] = task
+        self._started(agent_id).set()
+        if agent_id in self.wait_for:
+            await asyncio.wait_for(self._started(self.wait_for[agent_id]).wait(), timeout=5)
+        await asyncio.sleep(self.delays.get(agent_id, 0.0))
+        ok = agent_id not in self.failing
+        return SimpleNamespace(
+            success=ok,
+            summary=f"{agent_id} 完成" if ok else "",
+            error="" if ok else "boom",
+            stop_reason="",
+        )
+
+
+def _workflow(*steps: dict[str, Any]) -> WorkflowDef:
+    return WorkflowDef.from_dict({"name": "wf", "steps": list(steps)})
+
+
+async def test_workflow_runs_as_dataflow_with_trace() -> None:
+    spawner = _FakeSpawner({"slow": 0.05}, wait_for={"slow": "b"})
+    workflow = _workflow(
+        {"id": "slow", "agent": "slow", "task": "慢"},
+        {"id": "a", "agent": "a", "task": "A"},
+        {"id": "b", "agent": "b", "task": "B", "depends_on": ["a"]},
+    )
+    executor = WorkflowExecutor(spawner, max_concurrency=4, history=StepDurationHistory())
+
+    result = await executor.execute(workflow, session=None)
+
+    assert result.success
+    assert [r.step_id for r in result.step_results] == ["slow", "a", "b"]
+    assert "[a]: a 完成" in spawner.tasks["b"]
+    assert result.trace is not None
+    timings = result.trace.timings
+    assert timings["b"].started_at < timings["slow"].finished_at
+    assert {item["step_id"] for item in result.trace.to_dict()["steps"]} == {"slow", "a", "b"}
+
+
+async def test_workflow_failure_stops_downstream() -> None:
+    spawner = _FakeSpawner({}, failing={"a"})
+    workflow = _workflow(
+        {"id": "a", "agent": "a", "task": "A"},
+        {"id": "b", "agent": "b", "task": "B", "depends_on": ["a"]},
+    )
+    result = await WorkflowExecutor(spawner, history=StepDurationHistory()).execute(
+        workflow, session=None
+    )
+    assert not result.success
+    assert result.error == "步骤 ['a'] 执行失败"
+    assert [r.step_id for r in result.step_results] == ["a"]
+
+
+class _SleepyRunner(ContractRunner):
+    delays: dict[str, float] = {}
+
+    async def _run_step_logic(self, step: SkillStep, session: Any, step_inputs: Any) -> Any:
+        await asyncio.sleep(self.delays.get(step.id, 0.0))
+        return {"step": step.id}
+
+
+async def test_contract_independent_chain_overlaps_slow_step() -> None:
+    contract = SkillContract(
+        steps=[
+            SkillStep(id="slow", name="slow", description="slow"),
+            SkillStep(id="a", name="a", description="a"),
+            SkillStep(id="b", name="b", description="b", depends_on=["a"]),
+        ]
+    )
+
+    async def _callback(_event: str, _data: Any) -> None:
+        return None
+
+    runner = _SleepyRunner(
+        contract, skill_name="dataflow", callback=_callback, history=StepDurationHistory()
+    )
+    runner.delays = {"slow": 0.25, "a": 0.05, "b": 0.1}
+
+    result = await runner.run(session=None)
+
+    assert result.status == "completed"
+    assert [record.step_id for record in result.step_records] == ["slow", "a", "b"]
+    assert result.trace is not None
+    timings = {item["step_id"]: item for item in result.trace["steps"]}
+    assert timings["b"]["started_ms"] < timings["slow"]["finished_ms"]
+
+
+def test_contract_runner_defaults_to_sub_agent_concurrency(monkeypatch) -> None:
+    from nini.config import settings
+
+    monkeypatch.setattr(settings, "max_sub_agent_concurrency", 3)
+
+    async def _callback(_event: str, _data: Any) -> None:
+        return None
+
+    runner = ContractRunner(SkillContract(steps=[]), skill_name="cap", callback=_callback)
+    assert runner._max_concurrency == 3
@@ -0,0 +1,151 @@
+"""报告导出缓存测试：图片准备缓存、并行图表栅格化、导出产物复用。"""
+
+from __future__ import annotations
+
+import base64
+import threading
+from pathlib import Path
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from nini.tools import export_report
+from nini.tools.export_report import (
+    _collect_asset_hashes,
+    _resolve_images_to_base64_with_stats,
+    export_workspace_document,
+)
+
+_PNG_BYTES = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR4"
+    "nGNgYPgPAAEDAQAIicLsAAAABJRU5ErkJggg=="
+)
+
+
+@pytest.fixture()
+def sessions_dir(tmp_path: Path):
+    root = tmp_path / "sessions"
+    (root / "sess-1" / "workspace" / "artifacts").mkdir(parents=True)
+    with (
+        patch("nini.tools.export_report.settings") as mock_settings,
+        patch("nini.workspace.manager.settings") as manager_settings,
+    ):
+        mock_settings.sessions_dir = root
+        manager_settings.sessions_dir = root
+        yield root
+    export_report._prepared_assets.clear()
+
+
+def _artifacts(sessions_dir: Path) -> Path:
+    return sessions_dir / "sess-1" / "workspace" / "artifacts"
+
+
+def test_plotly_figures_are_rasterized_concurrently_and_deduplicated(sessions_dir: Path):
+    for idx in range(3):
+        (_artifacts(sessions_dir) / f"c{idx}.plotly.json").write_text(
+            f'{{"data": [{{"y": [{idx}]}}]}}', encoding="utf-8"
+        )
+    html = "".join(f'<img src="/api/artifacts/sess-1/c{idx}.plotly.json">' for idx in (0, 1, 2, 0))
+
+    # 准备线程数跟随渲染线程数，三张图可同时进入渲染
+    export_report.settings.chart_render_workers = 3
+    export_report.shutdown_export_workers()
+    barrier = threading.Barrier(3, timeout=5)
+    calls: list[str] = []
+
+    def fake_rasterize(path: Path) -> tuple[bytes, None]:
+        calls.append(path.name)
+        barrier.wait()  # 三张图同时处于转换中才会放行
+        return path.name.encode(), None
+
+    with patch("nini.tools.export_report._plotly_json_to_png_bytes", side_effect=fake_rasterize):
+        resolved, stats = _resolve_images_to_base64_with_stats(html, "sess-1")
+
+    assert sorted(calls) == ["c0.plotly.json", "c1.plotly.json", "c2.plotly.json"]
+    assert stats["plotly_total"] == 4
+    assert stats["plotly_converted"] == 4
+    assert resolved.count("data:image/png;base64,") == 4
+
+
+def test_image_data_uri_is_reused_until_file_changes(sessions_dir: Path):
+    image = _artifacts(sessions_dir) / "chart.png"
+    image.write_bytes(_PNG_BYTES)
+    html = '<img src="/api/artifacts/sess-1/chart.png">'
+
+    first_hashes = _collect_asset_hashes(html, "sess-1")
+    with patch.object(Path, "read_bytes", side_effect=AssertionError("不应重新读取")):
+        _resolve_images_to_base64_with_stats(html, "sess-1")
+        assert _collect_asset_hashes(html, "sess-1") == first_hashes
+
+    image.write_bytes(_PNG_BYTES + b"\x00")
+    assert _collect_asset_hashes(html, "sess-1") != first_hashes
+
+
+def _session(report: Path) -> MagicMock:
+    session = MagicMock()
+    session.id = "sess-1"
+    session.artifacts = {
+        "latest_report": {"name": report.name, "type": "report", "path": str(report)}
+    }
+    session.documents = {}
+    session.deep_task_state = {}
+    return session
+
+
+def _fake_weasyprint(payload: bytes) -> MagicMock:
+    module = MagicMock()
+    module.HTML.return_value.write_pdf.return_value = payload
+    return module
+
+
+@pytest.mark.asyncio
+async def test_export_output_is_memoized_by_document_and_assets(sessions_dir: Path):
+    artifacts = _artifacts(sessions_dir)
+    (artifacts / "chart.png").write_bytes(_PNG_BYTES)
+    report = artifacts / "report.md"
+    report.write_text("# 报告\n\n![图](/api/artifacts/sess-1/chart.png)\n", encoding="utf-8")
+    session = _session(report)
+    weasyprint = _fake_weasyprint(b"%PDF-1")
+
+    async def _export() -> Any:
+        with patch.dict("sys.modules", {"weasyprint": weasyprint}):
+            return await export_workspace_document(
+                session, source_ref=None, output_format="pdf", prefer_latest_report=True
+            )
+
+    first = await _export()
+    second = await _export()
+    assert first.success and second.success
+    assert first.data["from_cache"] is False
+    assert second.data["from_cache"] is True
+    assert weasyprint.HTML.call_count == 1
+    output = sessions_dir / "sess-1" / "workspace" / second.data["output_path"]
+    assert output.read_bytes() == b"%PDF-1"
+
+    # 引用的图片变化后缓存失效
+    (artifacts / "chart.png").write_bytes(_PNG_BYTES + b"\x00")
+    third = await _export()
+    assert third.data["from_cache"] is False
+    assert weasyprint.HTML.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_export_cache_is_separate_per_format(sessions_dir: Path):
+    report = _artifacts(sessions_dir) / "report.md"
+    report.write_text("# 报告\n\n正文\n", encoding="utf-8")
+    session = _session(report)
+    rendered: list[str] = []
+
+    def fake_export(markdown: str, fmt: str, title: str) -> bytes:
+        rendered.append(fmt)
+        return fmt.encode()
+
+    with patch("nini.tools.report_exporter.export_report", side_effect=fake_export):
+        for fmt in ("docx", "pptx", "docx"):
+            result = await export_workspace_document(
+                session, source_ref=None, output_format=fmt, prefer_latest_report=True
+            )
+            assert result.success
+
+    assert rendered == ["docx", "pptx"]
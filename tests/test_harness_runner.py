@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import gzip
 import json
 from pathlib import Path
 
@@ -727,10 +728,9 @@ async def test_harness_trace_store_persists_and_replays(
     assert summaries[0].run_id == "run_demo"
     assert replay["status"] == "blocked"
     assert aggregate["failure_distribution"]["tool_loop"] == 1
-    trace_path = (
-        tmp_path / "data" / "sessions" / "session_demo" / "harness" / "traces" / "run_demo.json"
-    )
-    assert json.loads(trace_path.read_text(encoding="utf-8"))["run_id"] == "run_demo"
+    trace_path = Path(summaries[0].trace_path)
+    assert trace_path.is_relative_to(tmp_path / "data" / "sessions" / "session_demo" / "harness")
+    assert json.loads(gzip.decompress(trace_path.read_bytes()))["run_id"] == "run_demo"
 
 
 @pytest.mark.asyncio
@@ -0,0 +1,156 @@
+"""harness trace 后台写入测试：内容寻址压缩存储、批量摘要入库与落盘前可读。"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+from pathlib import Path
+
+import pytest
+
+from nini.config import settings
+from nini.harness.models import HarnessRunContext, HarnessTraceRecord
+from nini.harness.store import HarnessTraceSink, HarnessTraceStore
+from nini.models.database import init_db
+
+
+@pytest.fixture(autouse=True)
+def _data_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "data_dir", tmp_path / "data")
+    settings.ensure_dirs()
+
+
+def _record(run_id: str, *, session_id: str = "s1", **kwargs) -> HarnessTraceRecord:
+    turn_id = kwargs.pop("turn_id", f"turn_{run_id}")
+    return HarnessTraceRecord(
+        run_id=run_id,
+        session_id=session_id,
+        turn_id=turn_id,
+        user_message="请分析",
+        run_context=HarnessRunContext(turn_id=turn_id),
+        status=kwargs.pop("status", "completed"),
+        finished_at="2026-03-14T00:00:01+00:00",
+        **kwargs,
+    )
+
+
+async def test_save_returns_before_write_and_reads_see_pending_run() -> None:
+    await init_db()
+    store = HarnessTraceStore(sink=HarnessTraceSink())
+    snapshot = {"session_id": "s1", "turn_id": "turn_r1", "run_id": "r1", "stop_reason": "done"}
+
+    summary = await store.save_run(_record("r1", summary={"runtime_snapshot": snapshot}))
+
+    object_path = Path(summary.trace_path)
+    assert not object_path.exists() and store.sink.stats()["pending"] == 1
+    assert store.replay_run("r1", session_id="s1")["status"] == "completed"
+    assert store.load_latest_snapshot("s1").trace_ref == str(object_path)
+
+    await store.flush()
+
+    assert object_path.name.endswith(".json.gz")
+    assert json.loads(gzip.decompress(object_path.read_bytes()))["run_id"] == "r1"
+    harness_dir = settings.sessions_dir / "s1" / "harness"
+    index_lines = (harness_dir / "traces" / "index.jsonl").read_text(encoding="utf-8")
+    assert json.loads(index_lines)["digest"] == object_path.name.split(".")[0]
+    assert not (harness_dir / "traces" / "runs.jsonl").exists()
+    assert store.load_snapshot("s1", "turn_r1").trace_ref == str(object_path)
+    assert store.load_run("r1").run_id == "r1"
+    assert store.load_trace_payload(str(object_path))["turn_id"] == "turn_r1"
+
+
+async def test_summaries_are_inserted_in_batches() -> None:
+    await init_db()
+    sink = HarnessTraceSink()
+    store = HarnessTraceStore(sink=sink)
+
+    for idx in range(5):
+        await store.save_run(_record(f"r{idx}", failure_tags=["tool_loop"], status="blocked"))
+
+    runs = await store.list_runs(session_id="s1", limit=10)
+    assert sorted(item.run_id for item in runs) == [f"r{idx}" for idx in range(5)]
+    assert sink.stats() == {"pending": 0, "written": 5, "batches": 1, "failed": 0}
+    aggregate = await store.aggregate_failures(session_id="s1")
+    assert aggregate["failure_distribution"] == {"tool_loop": 5}
+
+
+def test_runs_survive_loop_shutdown_and_sync_benchmark_evaluation() -> None:
+    store = HarnessTraceStore(sink=HarnessTraceSink())
+
+    async def save() -> None:
+        await init_db()
+        await store.save_run(_record("r_lit", recipe_id="literature_review"))
+
+    # asyncio.run 退出时会取消尚未完成的写入任务，条目应保留到下一次 flush
+    asyncio.run(save())
+    result = store.evaluate_core_recipe_benchmarks(session_id="s1")
+
+    samples = result["core_recipe_benchmarks"]["sample_results"]
+    matched = [item for item in samples if item["recipe_id"] == "literature_review"]
+    assert matched and matched[0]["run_id"] == "r_lit"
+    assert store.sink.stats()["pending"] == 0
+
+
+def test_legacy_uncompressed_traces_remain_readable() -> None:
+    store = HarnessTraceStore(sink=HarnessTraceSink())
+    legacy = settings.sessions_dir / "old" / "harness" / "traces" / "r_old.json"
+    legacy.parent.mkdir(parents=True)
+    legacy.write_text(_record("r_old", session_id="old").model_dump_json(indent=2))
+
+    assert store.load_run("r_old").session_id == "old"
+    assert store.replay_run("r_old", session_id="old")["run_id"] == "r_old"
+    assert store.load_trace_payload(str(legacy))["run_id"] == "r_old"
+    with pytest.raises(FileNotFoundError):
+        store.load_run("missing")
+
+
+async def test_failed_batches_are_retried_then_dropped() -> None:
+    await init_db()
+    sink = HarnessTraceSink(retry_delay=0, max_attempts=3)
+    store = HarnessTraceStore(sink=sink)
+    real_write = HarnessTraceSink._write_files
+    calls: list[int] = []
+
+    def flaky_write(batch) -> None:
+        calls.append(len(batch))
+        if len(calls) == 1:
+            raise OSError("磁盘暂不可用")
+        real_write(batch)
+
+    sink._write_files = flaky_write  # type: ignore[method-assign]
+    summary = await store.save_run(_record("r_retry"))
+    await store.flush()
+
+    assert Path(summary.trace_path).exists() and len(calls) == 2
+    assert sink.stats() == {"pending": 0, "written": 1, "batches": 2, "failed": 0}
+
+    def broken_write(batch) -> None:
+        raise OSError("磁盘已满")
+
+    sink._write_files = broken_write  # type: ignore[method-assign]
+    await store.save_run(_record("r_lost"))
+    await store.flush()
+
+    assert sink.stats()["failed"] == 1 and sink.stats()["pending"] == 0
+
+
+def test_flush_takes_over_when_writer_loop_is_not_running() -> None:
+    store = HarnessTraceStore(sink=HarnessTraceSink())
+
+    async def save():
+        await init_db()
+        return await store.save_run(_record("r_idle"))
+
+    other = asyncio.new_event_loop()
+    try:
+        # 登记所在的循环停止运行但未关闭，其上的写入任务永远不会推进
+        summary = other.run_until_complete(save())
+
+        asyncio.run(asyncio.wait_for(store.flush(), timeout=5))
+
+        assert Path(summary.trace_path).exists()
+        assert store.sink.stats()["pending"] == 0
+    finally:
+        other.run_until_complete(asyncio.sleep(0))
+        other.close()
@@ -0,0 +1,198 @@
+"""出站 HTTP 连接池测试：客户端复用、长流不占名额、循环切换关闭旧连接、传输层 SSRF 防护与复用指标。"""
+
+from __future__ import annotations
+
+import asyncio
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, RedirectResponse
+
+from nini.agent.session import Session
+from nini.tools.fetch_url import FetchURLTool
+from nini.tools.search_literature import SearchLiteratureTool
+from nini.utils import http_pool
+from nini.utils.http_pool import OutboundHttpPool, SSRFBlockedError
+
+# 公网 IP 字面量：ASGI 替身不关心 host，SSRF 检查也无需 DNS
+_PUBLIC = "http://93.184.216.34"
+
+
+def _make_app() -> tuple[FastAPI, dict[str, int]]:
+    app = FastAPI()
+    state = {"hits": 0}
+
+    @app.get("/doc")
+    async def doc() -> JSONResponse:
+        state["hits"] += 1
+        return JSONResponse({"title": "文档"})
+
+    @app.get("/redirect-internal")
+    async def redirect_internal() -> RedirectResponse:
+        return RedirectResponse("http://169.254.169.254/latest/meta-data")
+
+    return app, state
+
+
+@pytest.fixture
+def asgi_pool(monkeypatch: pytest.MonkeyPatch) -> tuple[OutboundHttpPool, dict[str, int]]:
+    app, state = _make_app()
+    pool = OutboundHttpPool(transport_factory=lambda **_: httpx.ASGITransport(app=app))
+    monkeypatch.setattr(http_pool, "_pool", pool)
+    return pool, state
+
+
+async def test_clients_are_shared_per_profile(asgi_pool) -> None:
+    pool, _state = asgi_pool
+    first = pool.client("literature")
+    assert pool.client("literature") is first
+    assert pool.client("fetch_url", ssrf_guard=True) is not first
+
+    response = await first.get(f"{_PUBLIC}/doc")
+    assert response.json() == {"title": "文档"}
+
+    stats = pool.stats()
+    assert stats["clients_created"] == 2
+    assert stats["client_hits"] == 1
+    assert stats["hosts"]["93.184.216.34:80"]["requests"] == 1
+
+
+async def test_open_streams_do_not_block_other_requests(asgi_pool) -> None:
+    pool, _state = asgi_pool
+    client = pool.client("llm")
+
+    # 模拟多个会话同时持有未读完的流式响应
+    streams = [
+        await client.send(client.build_request("GET", f"{_PUBLIC}/doc"), stream=True)
+        for _ in range(12)
+    ]
+    try:
+        response = await asyncio.wait_for(client.get(f"{_PUBLIC}/doc"), timeout=5)
+        assert response.status_code == 200
+    finally:
+        for stream in streams:
+            await stream.aclose()
+    assert pool.stats()["hosts"]["93.184.216.34:80"]["max_in_flight"] == 13
+
+
+def test_loop_change_closes_stale_transports() -> None:
+    closed: list[str] = []
+
+    class _Recording(httpx.AsyncBaseTransport):
+        async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200)
+
+        async def aclose(self) -> None:
+            closed.append("transport")
+
+    pool = OutboundHttpPool(transport_factory=lambda **_: _Recording())
+
+    async def borrow() -> None:
+        pool.transport("llm")
+        await asyncio.sleep(0)
+
+    asyncio.run(borrow())
+    assert closed == []
+    asyncio.run(borrow())
+    assert closed == ["transport"]
+    assert pool.stats()["transports"] == 1
+
+
+async def test_ssrf_guard_applies_to_every_request(
+    asgi_pool, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    pool, _state = asgi_pool
+    client = pool.client("guarded", ssrf_guard=True, follow_redirects=True)
+
+    with pytest.raises(SSRFBlockedError):
+        await client.get("http://10.0.0.8/doc")
+    # 重定向到云元数据地址：第二跳同样在传输层被拦截
+    with pytest.raises(SSRFBlockedError):
+        await client.get(f"{_PUBLIC}/redirect-internal")
+
+    # DNS 重绑定：域名在连接时解析到内网地址
+    real_getaddrinfo = socket.getaddrinfo
+
+    def _fake_getaddrinfo(host: str, *args: Any, **kwargs: Any):
+        if host == "rebind.test":
+            return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("10.1.2.3", 0))]
+        return real_getaddrinfo(host, *args, **kwargs)
+
+    monkeypatch.setattr(socket, "getaddrinfo", _fake_getaddrinfo)
+    with pytest.raises(SSRFBlockedError, match="DNS 重绑定防护"):
+        await client.get("http://rebind.test/doc")
+
+    assert pool.stats()["ssrf_blocked"] == 3
+    # 未启用防护的配置不受影响
+    unguarded = pool.client("plain")
+    assert (await unguarded.get(f"{_PUBLIC}/doc")).status_code == 200
+
+
+async def test_tools_reuse_pooled_clients(asgi_pool) -> None:
+    pool, state = asgi_pool
+    tool = FetchURLTool()
+
+    for _ in range(2):
+        result = await tool.execute(Session(), url=f"{_PUBLIC}/doc")
+        assert result.success, result.message
+        assert "文档" in result.data["content"]
+
+    literature = SearchLiteratureTool()
+    client, owns_client = literature._get_http_client(None)
+    again, _ = literature._get_http_client(None)
+    assert owns_client is False and again is client
+
+    stats = pool.stats()
+    assert state["hits"] == 2
+    assert stats["clients_created"] == 2  # fetch_url + literature
+
+
+async def test_borrowed_transport_survives_client_close(asgi_pool) -> None:
+    pool, _state = asgi_pool
+    async with httpx.AsyncClient(transport=pool.transport("llm")) as borrowed:
+        assert (await borrowed.get(f"{_PUBLIC}/doc")).status_code == 200
+    async with httpx.AsyncClient(transport=pool.transport("llm")) as again:
+        assert (await again.get(f"{_PUBLIC}/doc")).status_code == 200
+    assert pool.stats()["transports"] == 1
+
+    await pool.aclose()
+    assert pool.stats()["transports"] == 0
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:  # noqa: N802
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_args: Any) -> None:
+        return
+
+
+async def test_keepalive_connection_reuse_metrics() -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    pool = OutboundHttpPool()
+    try:
+        client = pool.client("local")
+        for _ in range(3):
+            response = await client.get(f"http://127.0.0.1:{server.server_port}/")
+            assert response.text == "ok"
+        host_stats = pool.stats()["hosts"][f"127.0.0.1:{server.server_port}"]
+        assert host_stats["new_connections"] == 1
+        assert host_stats["reused_connections"] == 2
+        assert pool.stats()["connection_reuse_ratio"] == pytest.approx(2 / 3, abs=1e-3)
+    finally:
+        await pool.aclose()
+        server.shutdown()
+        server.server_close()
@@ -5,6 +5,7 @@ from __future__ import annotations
 from contextlib import suppress
 import json
 import logging
+import threading
 from logging.handlers import TimedRotatingFileHandler
 from pathlib import Path
 
@@ -14,7 +15,12 @@ import pytest
 from nini.agent.session import session_manager
 from nini.app import create_app
 from nini.config import settings
-from nini.logging_config import setup_logging
+from nini.logging_config import (
+    AsyncLogHandler,
+    bind_log_context,
+    reset_log_context,
+    setup_logging,
+)
 from tests.client_utils import live_websocket_connect
 
 
@@ -37,8 +43,16 @@ def _flush_managed_handlers() -> None:
             handler.flush()
 
 
-def _get_file_handler() -> TimedRotatingFileHandler:
+def _output_handlers() -> list[logging.Handler]:
+    """根 logger 上的输出 handler（展开异步队列 handler 的写出目标）。"""
+    handlers: list[logging.Handler] = []
     for handler in logging.getLogger().handlers:
+        handlers.extend(getattr(handler, "targets", [handler]))
+    return handlers
+
+
+def _get_file_handler() -> TimedRotatingFileHandler:
+    for handler in _output_handlers():
         if isinstance(handler, TimedRotatingFileHandler):
             return handler
     raise AssertionError("未找到 TimedRotatingFileHandler")
@@ -81,7 +95,7 @@ def test_setup_logging_is_idempotent_and_compatible_with_stdlib_logger(
 
     managed_handlers = [
         handler
-        for handler in logging.getLogger().handlers
+        for handler in _output_handlers()
         if isinstance(handler, (logging.StreamHandler, TimedRotatingFileHandler))
     ]
     assert len(managed_handlers) >= 2
@@ -169,3 +183,109 @@ def test_websocket_logs_bind_connection_id_and_session_id(
         getattr(record, "connection_id", "-") == getattr(connected_log, "connection_id", "-")
         for record in stop_logs
     )
+
+
+class _RecordingHandler(logging.Handler):
+    """记录写出线程与消息；可通过 gate 阻塞写线程以制造队列拥塞。"""
+
+    def __init__(self, gate: threading.Event | None = None) -> None:
+        super().__init__()
+        self.gate = gate
+        self.items: list[tuple[str, str, str]] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.items.append(
+            (
+                threading.current_thread().name,
+                record.getMessage(),
+                getattr(record, "session_id", "-"),
+            )
+        )
+
+
+def test_async_handler_writes_on_writer_thread_with_bound_context() -> None:
+    target = _RecordingHandler()
+    handler = AsyncLogHandler([target], capacity=100)
+    logger = logging.getLogger("nini.tests.async_handler")
+    logger.addHandler(handler)
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    token = bind_log_context(session_id="sess-queue")
+    payload = {"step": 1}
+    try:
+        logger.info("参数 %s", payload)
+        # 入队时已合并参数，之后修改对象不影响输出
+        payload["step"] = 2
+        handler.flush()
+    finally:
+        reset_log_context(token)
+        logger.removeHandler(handler)
+        logger.propagate = True
+        handler.close()
+
+    assert target.items == [("nini-log-writer", "参数 {'step': 1}", "sess-queue")]
+
+
+def test_async_handler_sheds_debug_floods_but_keeps_warnings() -> None:
+    gate = threading.Event()
+    target = _RecordingHandler(gate)
+    handler = AsyncLogHandler([target], capacity=10, batch_size=1, debug_sample_rate=4)
+    logger = logging.getLogger("nini.tests.async_overflow")
+    logger.addHandler(handler)
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    try:
+        for idx in range(200):
+            logger.debug("debug %d", idx)
+        for idx in range(20):
+            logger.info("info %d", idx)
+        gate.set()
+        logger.warning("队列满时的告警")
+        handler.flush()
+        stats = handler.stats()
+    finally:
+        gate.set()
+        logger.removeHandler(handler)
+        logger.propagate = True
+        handler.close()
+
+    messages = [message for _thread, message, _ctx in target.items]
+    assert "队列满时的告警" in messages
+    assert stats["sampled_out"] > 0
+    assert stats["dropped"] > 0
+    assert stats["enqueued"] <= 10 + 1
+    assert len([m for m in messages if m.startswith("debug")]) < 200
+
+
+def test_setup_logging_writes_json_lines(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    _prepare_runtime(tmp_path, monkeypatch)
+
+    setup_logging(log_level="info", log_format="json")
+    token = bind_log_context(session_id="sess-json")
+    try:
+        logging.getLogger("nini.tests.json").info("结构化日志 %d", 42)
+        try:
+            raise ValueError("坏值")
+        except ValueError:
+            logging.getLogger("nini.tests.json").exception("出错了")
+    finally:
+        reset_log_context(token)
+    _flush_managed_handlers()
+
+    lines = [
+        json.loads(line)
+        for line in settings.log_file_path.read_text(encoding="utf-8").splitlines()
+        if line.strip()
+    ]
+    info = next(item for item in lines if item["msg"] == "结构化日志 42")
+    assert info["level"] == "INFO" and info["logger"] == "nini.tests.json"
+    assert info["session_id"] == "sess-json"
+    assert "request_id" not in info
+    error = next(item for item in lines if item["msg"] == "出错了")
+    assert "ValueError: 坏值" in error["exc"]
+    setup_logging(log_level="info")
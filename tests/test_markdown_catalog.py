@@ -0,0 +1,184 @@
+"""Markdown 技能目录缓存测试：持久化复用、增量重扫、变更检测与冷启动快路径。"""
+
+from __future__ import annotations
+
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from nini.config import settings
+from nini.tools import markdown_scanner
+from nini.tools.markdown_catalog import MarkdownSkillCatalog
+from nini.tools.markdown_scanner import (
+    list_markdown_tool_runtime_resources,
+    scan_markdown_tools,
+)
+from nini.tools.registry import ToolRegistry
+
+_OLD_NS = time.time_ns() - 3600 * 1_000_000_000
+
+
+def _write_skill(root: Path, name: str, description: str = "示例技能") -> Path:
+    path = root / name / "SKILL.md"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        f"---\nname: {name}\ndescription: {description}\ncategory: stats\n---\n\n正文\n",
+        encoding="utf-8",
+    )
+    return path
+
+
+def _age_tree(root: Path) -> None:
+    """把目录树 mtime 调到过去，避开 mtime 粒度保护窗口。"""
+    for dirpath, _dirnames, filenames in os.walk(root):
+        for filename in filenames:
+            os.utime(Path(dirpath) / filename, ns=(_OLD_NS, _OLD_NS))
+        os.utime(dirpath, ns=(_OLD_NS, _OLD_NS))
+
+
+@pytest.fixture
+def skills_root(tmp_path: Path) -> Path:
+    root = (tmp_path / "skills").resolve()
+    _write_skill(root, "alpha")
+    _write_skill(root, "beta")
+    _age_tree(root)
+    return root
+
+
+def _count_reads(monkeypatch: pytest.MonkeyPatch) -> list[Path]:
+    reads: list[Path] = []
+    original = markdown_scanner.read_skill_source
+
+    def _spy(path: Path):
+        reads.append(path)
+        return original(path)
+
+    monkeypatch.setattr("nini.tools.markdown_catalog.read_skill_source", _spy)
+    return reads
+
+
+def test_catalog_matches_full_scan_and_persists(
+    tmp_path: Path, skills_root: Path, monkeypatch: pytest.MonkeyPatch
+):
+    expected = [tool.to_dict() for tool in scan_markdown_tools(skills_root)]
+    catalog_path = tmp_path / "cache" / "catalog.json"
+
+    first = MarkdownSkillCatalog(catalog_path)
+    assert [tool.to_dict() for tool in first.scan([skills_root])] == expected
+    assert catalog_path.exists()
+
+    reads = _count_reads(monkeypatch)
+    second = MarkdownSkillCatalog(catalog_path)
+    assert [tool.to_dict() for tool in second.scan([skills_root])] == expected
+    assert reads == []
+    assert second.stats["rediscovered_roots"] == 0
+    assert not second.has_changes([skills_root])
+
+
+def test_incremental_rescan_only_reads_changed_files(
+    tmp_path: Path, skills_root: Path, monkeypatch: pytest.MonkeyPatch
+):
+    catalog = MarkdownSkillCatalog(tmp_path / "catalog.json")
+    catalog.scan([skills_root])
+    reads = _count_reads(monkeypatch)
+
+    changed = _write_skill(skills_root, "beta", description="已修改")
+    assert catalog.has_changes([skills_root])
+    tools = {tool.name: tool for tool in catalog.scan([skills_root])}
+    assert reads == [changed]
+    assert tools["beta"].description == "已修改"
+
+    added = _write_skill(skills_root, "gamma")
+    reads.clear()
+    tools = {tool.name: tool for tool in catalog.scan([skills_root])}
+    assert set(tools) == {"alpha", "beta", "gamma"}
+    assert added in reads and skills_root / "alpha" / "SKILL.md" not in reads
+
+    (skills_root / "alpha" / "SKILL.md").unlink()
+    assert {tool.name for tool in catalog.scan([skills_root])} == {"beta", "gamma"}
+
+
+def test_trusted_cold_start_skips_skill_files(
+    tmp_path: Path, skills_root: Path, monkeypatch: pytest.MonkeyPatch
+):
+    catalog_path = tmp_path / "catalog.json"
+    MarkdownSkillCatalog(catalog_path).scan([skills_root])
+    # 缓存生成后修改文件：冷启动仍返回缓存结果，校验扫描才感知变化
+    _write_skill(skills_root, "alpha", description="离线期间修改")
+    reads = _count_reads(monkeypatch)
+
+    catalog = MarkdownSkillCatalog(catalog_path)
+    cold = {tool.name: tool.description for tool in catalog.scan([skills_root], trust=True)}
+    assert cold == {"alpha": "示例技能", "beta": "示例技能"}
+    assert reads == []
+
+    assert catalog.has_changes([skills_root])
+    verified = {tool.name: tool.description for tool in catalog.scan([skills_root])}
+    assert verified["alpha"] == "离线期间修改"
+
+
+def test_registry_reload_uses_catalog(
+    tmp_path: Path, skills_root: Path, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(settings, "data_dir", tmp_path / "data")
+    monkeypatch.setattr(settings, "skills_dir_path", skills_root)
+    monkeypatch.setattr(settings, "skills_auto_discover_compat_dirs", False)
+    monkeypatch.setattr(settings, "skills_extra_dirs", "")
+    settings.ensure_dirs()
+
+    registry = ToolRegistry()
+    names = {item["name"] for item in registry.reload_markdown_tools()}
+    assert {"alpha", "beta"} <= names
+    assert settings.skills_catalog_path.exists()
+    assert not registry.has_markdown_changes()
+
+
+async def test_startup_verification_applies_rescan_on_event_loop(
+    tmp_path: Path, skills_root: Path, monkeypatch: pytest.MonkeyPatch
+):
+    import threading
+
+    from nini.app import _verify_skill_catalog
+
+    monkeypatch.setattr(settings, "data_dir", tmp_path / "data")
+    monkeypatch.setattr(settings, "skills_dir_path", skills_root)
+    monkeypatch.setattr(settings, "skills_auto_discover_compat_dirs", False)
+    monkeypatch.setattr(settings, "skills_extra_dirs", "")
+    settings.ensure_dirs()
+    registry = ToolRegistry()
+    registry.reload_markdown_tools()
+    _write_skill(skills_root, "gamma")
+
+    applied_on: list[threading.Thread] = []
+    original_reload = registry.reload_markdown_tools
+
+    def tracking_reload(**kwargs):
+        applied_on.append(threading.current_thread())
+        return original_reload(**kwargs)
+
+    monkeypatch.setattr(registry, "reload_markdown_tools", tracking_reload)
+    await _verify_skill_catalog(registry)
+
+    assert applied_on == [threading.current_thread()]
+    assert "gamma" in {item["name"] for item in registry.list_markdown_tools()}
+
+
+def test_runtime_resources_listing(tmp_path: Path):
+    skill_path = _write_skill(tmp_path, "res")
+    skill_dir = skill_path.parent
+    (skill_dir / "scripts" / "nested").mkdir(parents=True)
+    (skill_dir / "scripts" / "run.py").write_text("print(1)\n", encoding="utf-8")
+    (skill_dir / "scripts" / "nested" / "a.txt").write_text("abc", encoding="utf-8")
+    (skill_dir / ".hidden").mkdir()
+    (skill_dir / ".hidden" / "b.txt").write_text("b", encoding="utf-8")
+
+    resources = list_markdown_tool_runtime_resources(skill_path)
+    assert resources == [
+        {"path": ".hidden/b.txt", "type": "file", "size": 1, "top_level": ".hidden"},
+        {"path": "scripts", "type": "dir", "child_count": 2},
+        {"path": "scripts/nested", "type": "dir", "child_count": 1},
+        {"path": "scripts/nested/a.txt", "type": "file", "size": 3, "top_level": "scripts"},
+        {"path": "scripts/run.py", "type": "file", "size": 9, "top_level": "scripts"},
+    ]
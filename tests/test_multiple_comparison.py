@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import pytest
+from statsmodels.stats.multitest import multipletests
 
 from nini.agent.session import Session
 from nini.tools.statistics import (
@@ -79,6 +80,16 @@ class TestHolmCorrection:
         assert all(p >= 0 for p in result["corrected_pvalues"])
         assert all(p <= 1 for p in result["corrected_pvalues"])
 
+    def test_matches_statsmodels_step_down(self):
+        # 回归：旧实现的单调化方向有误，[0.01, 0.04, 0.03] 曾得到 [0.06, 0.04, 0.06]
+        p_values = [0.01, 0.04, 0.03]
+        result = holm_correction(p_values, alpha=0.05)
+
+        expected = multipletests(p_values, method="holm")[1]
+        assert result["corrected_pvalues"] == pytest.approx(expected.tolist())
+        assert result["corrected_pvalues"] == pytest.approx([0.03, 0.06, 0.06])
+        assert result["significant"] == [True, False, False]
+
     def test_more_powerful_than_bonferroni(self):
         # Holm 应该比 Bonferroni 发现更多显著结果（或相等）
         p_values = [0.01, 0.02, 0.03, 0.04, 0.05]
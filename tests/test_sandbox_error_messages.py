@@ -107,3 +107,22 @@ async def test_result_as_matplotlib_figure_returns_hint() -> None:
     assert "result = fig" in result_repr  # 提示语包含正确写法
     # 图表仍然通过 figures 通道导出
     assert outcome.get("figures"), "matplotlib Figure 应被自动收集到 figures 通道"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("code", "expected"),
+    [
+        ("x = 1\nbreak\n", "'break' outside loop (<sandbox>, line 2)"),
+        ("return 1\n", "'return' outside function (<sandbox>, line 1)"),
+        ("nonlocal x\n", "nonlocal declaration not allowed at module level (<sandbox>, line 1)"),
+    ],
+)
+async def test_code_rejected_by_compiler_reports_normal_failure(code: str, expected: str) -> None:
+    """ast.parse 接受但编译器拒绝的代码应作为普通执行失败返回，而不是抛出异常。"""
+    session = Session()
+
+    result = await execute_python_code(session, code=code, dataset_name=None)
+
+    assert result.success is False
+    assert expected in result.message
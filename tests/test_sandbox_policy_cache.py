@@ -0,0 +1,108 @@
+"""沙箱策略校验缓存测试：整段裁决复用、逐语句增量复检、行号平移与编译产物复用。"""
+
+from __future__ import annotations
+
+import marshal
+
+import pytest
+
+from nini.sandbox.policy import (
+    SandboxCompileError,
+    SandboxPolicyError,
+    SandboxReviewRequired,
+    clear_validation_cache,
+    compile_validated_code,
+    validate_code,
+    validation_cache_stats,
+)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache() -> None:
+    clear_validation_cache()
+
+
+def _script(n_blocks: int, changed: int | None = None) -> str:
+    blocks = []
+    for idx in range(n_blocks):
+        value = idx * 10 if idx != changed else -1
+        blocks.append(f"def step_{idx}(df):\n    total = {value}\n    return df.sum() + total\n")
+    return "\n".join(blocks) + "\nresult = step_0\n"
+
+
+def test_identical_code_reuses_verdict() -> None:
+    code = _script(5)
+    validate_code(code)
+    validate_code(code)
+
+    stats = validation_cache_stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+    for _ in range(2):
+        with pytest.raises(SandboxPolicyError, match="不允许调用函数: eval"):
+            validate_code("x = eval('1')")
+    assert validation_cache_stats()["hits"] == 2
+
+
+def test_edit_revalidates_only_changed_statements() -> None:
+    validate_code(_script(30))
+    before = validation_cache_stats()
+
+    validate_code(_script(30, changed=7))
+
+    after = validation_cache_stats()
+    assert after["misses"] == before["misses"] + 1
+    assert after["statement_misses"] == before["statement_misses"] + 1
+    assert after["statement_hits"] == before["statement_hits"] + 30
+
+
+def test_reused_statements_report_shifted_line_numbers() -> None:
+    with pytest.raises(SandboxPolicyError, match=r"第 2 行"):
+        validate_code("x = 1\nimport os\n")
+
+    with pytest.raises(SandboxPolicyError, match=r"第 5 行"):
+        validate_code("y = 2\n\n\nx = 1\nimport os\n")
+    assert validation_cache_stats()["statement_hits"] == 2
+
+
+def test_first_violation_follows_whole_tree_walk_order() -> None:
+    # ast.walk 先访问顶层语句，再深入子节点：顶层 import 早于嵌套的 eval 调用
+    with pytest.raises(SandboxPolicyError, match="不允许导入模块: os"):
+        validate_code("x = eval('1')\nimport os\n")
+
+
+def test_extra_allowed_imports_are_part_of_the_key() -> None:
+    with pytest.raises(SandboxReviewRequired) as exc_info:
+        validate_code("import sympy\nresult = 1")
+    assert exc_info.value.packages == ["sympy"]
+    assert exc_info.value.violations[0].lineno == 1
+
+    validate_code("import sympy\nresult = 1", extra_allowed_imports=["sympy"])
+    assert validation_cache_stats()["entries"] == 2
+
+
+def test_compiled_code_is_cached_and_runnable() -> None:
+    code = "values = [1, 2, 3]\nresult = sum(values)\n"
+
+    first = compile_validated_code(code)
+    second = compile_validated_code(code)
+
+    assert first == second
+    namespace: dict[str, object] = {}
+    exec(marshal.loads(first), namespace)  # noqa: S102
+    assert namespace["result"] == 6
+
+    with pytest.raises(SandboxPolicyError, match="代码语法错误"):
+        compile_validated_code("def broken(:\n")
+
+
+def test_compile_errors_are_cached_as_verdicts() -> None:
+    code = "total = 0\nbreak\n"
+
+    for _ in range(2):
+        with pytest.raises(SandboxCompileError, match="'break' outside loop") as info:
+            compile_validated_code(code)
+        assert "SyntaxError" in info.value.detail
+
+    stats = validation_cache_stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
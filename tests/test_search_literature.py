@@ -2,15 +2,26 @@
 
 from __future__ import annotations
 
+import asyncio
+from pathlib import Path
 from unittest.mock import AsyncMock, MagicMock
 
+import httpx
 import pytest
 
 from nini.agent.session import Session
+from nini.config import settings
 from nini.plugins.base import DegradationInfo
+from nini.tools.literature_cache import get_literature_cache
 from nini.tools.search_literature import SearchLiteratureTool
 
 
+@pytest.fixture(autouse=True)
+def _isolated_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """文献检索缓存写入临时数据目录，避免跨测试命中。"""
+    monkeypatch.setattr(settings, "data_dir", tmp_path / "data")
+
+
 class _StubPluginRegistry:
     def __init__(self, plugin: object) -> None:
         self._plugin = plugin
@@ -166,3 +177,105 @@ async def test_search_literature_returns_offline_degradation_without_http_call()
     assert "离线模式" in result.message
     assert result.data["manual_mode"] is True
     client.get.assert_not_awaited()
+
+
+def _semantic_payload(title: str, doi: str | None = None, citations: int = 1) -> dict:
+    item: dict = {"title": title, "authors": [{"name": "Tester"}], "year": 2023}
+    item["citationCount"] = citations
+    if doi:
+        item["externalIds"] = {"DOI": doi}
+    return {"data": [item]}
+
+
+def _mock_tool(handler) -> tuple[SearchLiteratureTool, httpx.AsyncClient]:
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    tool = SearchLiteratureTool(
+        plugin_registry=_StubPluginRegistry(_StubNetworkPlugin(available=True, client=client)),
+    )
+    tool._sleep = AsyncMock()  # type: ignore[method-assign]
+    return tool, client
+
+
+@pytest.mark.asyncio
+async def test_search_literature_serves_repeated_query_from_persistent_cache() -> None:
+    calls: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.params["query"])
+        return httpx.Response(200, json=_semantic_payload("Cached paper", doi="10.1/ABC"))
+
+    tool, client = _mock_tool(handler)
+    first = await tool.execute(Session(), query="Single  Cell RNA")
+    # 规范化后相同（大小写、空白），新实例也能命中持久化缓存
+    other_tool, other_client = _mock_tool(handler)
+    second = await other_tool.execute(Session(), query="single cell rna")
+
+    assert calls == ["Single  Cell RNA"]
+    assert first.metadata.get("cache_hit") is None
+    assert second.metadata["cache_hit"] is True
+    assert second.data["papers"] == first.data["papers"]
+
+    paper = get_literature_cache().get_paper("https://doi.org/10.1/abc", ttl_seconds=3600)
+    assert paper is not None and paper["title"] == "Cached paper"
+    await client.aclose()
+    await other_client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_search_literature_cache_expires_after_ttl(monkeypatch: pytest.MonkeyPatch) -> None:
+    calls = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        return httpx.Response(200, json=_semantic_payload(f"Paper v{calls}", doi="10.1/ttl"))
+
+    tool, client = _mock_tool(handler)
+    await tool.execute(Session(), query="ttl query")
+    monkeypatch.setattr(settings, "literature_cache_ttl_seconds", -1)
+    result = await tool.execute(Session(), query="ttl query")
+
+    assert calls == 2
+    assert result.data["papers"][0]["title"] == "Paper v2"
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_search_literature_coalesces_identical_inflight_queries() -> None:
+    calls = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json=_semantic_payload("Shared paper"))
+
+    tool, client = _mock_tool(handler)
+    results = await asyncio.gather(
+        *(tool.execute(Session(), query="shared topic") for _ in range(3))
+    )
+
+    assert calls == 1
+    assert all(result.success for result in results)
+    assert sum(1 for result in results if result.metadata.get("coalesced")) == 2
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_search_literature_token_bucket_allows_parallel_burst(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(settings, "literature_semantic_scholar_burst", 3)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json=_semantic_payload(request.url.params["query"]))
+
+    tool, client = _mock_tool(handler)
+    tool._monotonic = lambda: 100.0  # type: ignore[method-assign]
+
+    await asyncio.gather(*(tool.execute(Session(), query=f"topic {i}") for i in range(3)))
+    tool._sleep.assert_not_awaited()
+
+    await tool.execute(Session(), query="topic 4")
+    tool._sleep.assert_awaited_once_with(1.0)
+    await client.aclose()
@@ -0,0 +1,126 @@
+"""批量统计引擎测试：与 scipy/statsmodels 逐项结果一致，充分统计量按数据版本缓存。"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import f_oneway, kendalltau, pearsonr, spearmanr
+from statsmodels.stats.multicomp import pairwise_tukeyhsd
+from statsmodels.stats.multitest import multipletests
+
+from nini.agent.session import Session
+from nini.tools.statistics import ANOVATool, CorrelationTool
+from nini.tools.statistics.engine import (
+    adjust_pvalues,
+    clear_sufficient_stats_cache,
+    correlation_family,
+    group_moments,
+    oneway_anova,
+    sufficient_stats_cache_stats,
+    tukey_hsd,
+)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache() -> None:
+    clear_sufficient_stats_cache()
+
+
+def _grouped_frame() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {"group": rng.choice(["d", "c", "a", "b"], 400), "value": rng.normal(size=400)}
+    )
+    df.loc[df["group"] == "a", "value"] += 0.6
+    df.loc[[3, 7], "value"] = np.nan
+    df.loc[11, "group"] = None
+    return df
+
+
+def test_anova_and_tukey_match_reference_implementations() -> None:
+    df = _grouped_frame()
+    clean = df.dropna()
+
+    moments = group_moments(df, "value", "group")
+    anova = oneway_anova(moments)
+    reference = f_oneway(*(clean.loc[clean["group"] == g, "value"] for g in moments.labels))
+    assert anova["f_statistic"] == pytest.approx(reference.statistic)
+    assert anova["p_value"] == pytest.approx(reference.pvalue)
+    assert (anova["df_between"], anova["df_within"]) == (3, len(clean) - 4)
+
+    tukey = pairwise_tukeyhsd(clean["value"], clean["group"])
+    pairs = tukey_hsd(moments)
+    assert [(p["group1"], p["group2"]) for p in pairs][:3] == [("a", "b"), ("a", "c"), ("a", "d")]
+    np.testing.assert_allclose([p["mean_diff"] for p in pairs], tukey.meandiffs)
+    np.testing.assert_allclose([p["p_value"] for p in pairs], tukey.pvalues, rtol=1e-6)
+    assert [p["significant"] for p in pairs] == list(tukey.reject)
+
+
+@pytest.mark.parametrize(
+    ("method", "reference"),
+    [("pearson", pearsonr), ("spearman", spearmanr), ("kendall", kendalltau)],
+)
+def test_correlation_family_matches_pairwise_scipy(method: str, reference) -> None:
+    rng = np.random.default_rng(1)
+    data = pd.DataFrame(rng.normal(size=(120, 4)), columns=["a", "b", "c", "d"])
+    data["b"] += data["a"]
+
+    r, p = correlation_family(data, method)
+
+    for i, j in [(0, 1), (1, 3), (2, 0)]:
+        expected = reference(data.iloc[:, i], data.iloc[:, j])
+        assert r[i, j] == pytest.approx(expected[0])
+        assert p[i, j] == pytest.approx(expected[1], rel=1e-6, abs=1e-300)
+    np.testing.assert_allclose(r, data.corr(method=method))
+    assert np.all(np.diag(p) == 0.0) and np.allclose(p, p.T)
+
+
+def test_sufficient_statistics_are_reused_until_data_changes() -> None:
+    df = _grouped_frame()
+    group_moments(df, "value", "group")
+    group_moments(df.copy(), "value", "group")
+    assert sufficient_stats_cache_stats()["hits"] == 1
+
+    df.loc[0, "value"] = 99.0
+    changed = group_moments(df, "value", "group")
+    stats = sufficient_stats_cache_stats()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+    assert changed.means.max() > 0.5
+
+
+@pytest.mark.parametrize(
+    ("method", "reference"), [("bonferroni", "bonferroni"), ("holm", "holm"), ("fdr", "fdr_bh")]
+)
+def test_adjust_pvalues_matches_statsmodels(method: str, reference: str) -> None:
+    p_values = [0.01, 0.04, 0.03, 0.04, 0.2, 0.001, 0.03]
+    np.testing.assert_allclose(
+        adjust_pvalues(p_values, method), multipletests(p_values, method=reference)[1]
+    )
+    with pytest.raises(ValueError, match="不支持的校正方法"):
+        adjust_pvalues(p_values, "sidak")
+
+
+async def test_tools_use_batched_engine() -> None:
+    rng = np.random.default_rng(2)
+    session = Session()
+    wide = pd.DataFrame(rng.normal(size=(60, 30)), columns=[f"g{i}" for i in range(30)])
+    session.datasets["wide"] = wide
+    session.datasets["grouped"] = _grouped_frame()
+
+    corr = await CorrelationTool().execute(
+        session, dataset_name="wide", columns=list(wide.columns), method="spearman"
+    )
+    anova = await ANOVATool().execute(
+        session, dataset_name="grouped", value_column="value", group_column="group"
+    )
+
+    assert corr.success and len(corr.data["stat_summary"]["pairwise"]) == 30 * 29 // 2
+    expected = spearmanr(wide["g3"], wide["g17"])
+    assert corr.data["pvalue_matrix"]["g17"]["g3"] == pytest.approx(expected.pvalue)
+    assert anova.success and anova.data["significant"] is True
+    assert len(anova.data["post_hoc"]) == 6
+    assert anova.data["group_sizes"] == {
+        str(k): int(v)
+        for k, v in _grouped_frame().dropna().groupby("group", sort=False).size().items()
+    }
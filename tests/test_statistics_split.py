@@ -18,7 +18,7 @@ def test_statistics_top_level_exports_use_split_modules() -> None:
     )
 
 
-def test_statistics_top_level_keeps_anova_monkeypatch_seams() -> None:
-    """顶层 statistics 仍应暴露 ANOVA 测试所需的兼容钩子。"""
-    assert callable(statistics.f_oneway)
-    assert callable(statistics.pairwise_tukeyhsd)
+def test_statistics_top_level_exposes_anova_engine_seams() -> None:
+    """顶层 statistics 应暴露 ANOVA 测试所需的批量引擎钩子。"""
+    assert callable(statistics.oneway_anova)
+    assert callable(statistics.tukey_hsd)
@@ -93,3 +93,23 @@ def test_invalid_transition_and_delete_conflict(tmp_path) -> None:
 
     with pytest.raises(TaskConflictError):
         service.delete_task("sess_d", task.task_id)
+
+
+def test_shared_service_is_compacted_on_shutdown(tmp_path, monkeypatch) -> None:
+    """应用退出时关闭共享服务：事件日志压缩进快照，下次取用得到新实例。"""
+    from nini.config import settings
+    from nini.todo import get_todo_service, shutdown_todo_service
+
+    monkeypatch.setattr(settings, "data_dir", tmp_path)
+    shutdown_todo_service()
+    service = get_todo_service()
+    assert get_todo_service() is service
+    task = service.create_task("sess_z", title="汇总结果")
+
+    shutdown_todo_service()
+
+    snapshot = settings.sessions_dir / "sess_z" / "todo_state.json"
+    assert snapshot.exists()
+    assert get_todo_service() is not service
+    assert get_todo_service().get_task("sess_z", task.task_id).title == "汇总结果"
+    shutdown_todo_service()
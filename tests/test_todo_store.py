@@ -33,6 +33,7 @@ def test_task_store_crud_and_json_persistence(tmp_path) -> None:
 
     deleted = reloaded.delete_task(created.task_id, actor_id="admin")
     assert deleted.task_id == created.task_id
+    reloaded.close()
 
     snapshot = json.loads(store_path.read_text(encoding="utf-8"))
     assert snapshot["tasks"] == []
@@ -93,3 +94,88 @@ def test_invalid_transition_and_missing_dependency_raise() -> None:
 
     with pytest.raises(TaskDependencyError):
         store.create_task(title="二级任务", dependency_ids=["missing-task"])
+
+
+def test_mutations_append_to_event_log_and_replay_on_load(tmp_path) -> None:
+    """变更只追加事件日志，不重写快照；重新加载时重放日志。"""
+    store_path = tmp_path / "todo.json"
+    store = TaskStore(storage_path=store_path)
+    first = store.create_task(title="清洗数据")
+    second = store.create_task(title="建模", dependency_ids=[first.task_id])
+    store.claim_task(first.task_id, agent_id="agent-a")
+    store.start_task(first.task_id, agent_id="agent-a")
+    store.complete_task(first.task_id, agent_id="agent-a")
+    store.flush()
+
+    assert not store_path.exists()
+    log_lines = store.log_path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["seq"] for line in log_lines] == [1, 2, 3, 4, 5]
+
+    reloaded = TaskStore(storage_path=store_path)
+    assert reloaded.get_task(first.task_id).status == TaskStatus.DONE
+    assert [task.task_id for task in reloaded.list_ready_tasks()] == [second.task_id]
+    assert len(reloaded.list_events()) == 5
+
+
+def test_compaction_writes_snapshot_and_truncates_log(tmp_path, monkeypatch) -> None:
+    """日志达到阈值后压缩为快照；截断前崩溃也不会重复重放。"""
+    monkeypatch.setattr("nini.todo.store._COMPACT_EVERY_RECORDS", 4)
+    store_path = tmp_path / "todo.json"
+    store = TaskStore(storage_path=store_path)
+    tasks = [store.create_task(title=f"任务 {idx}") for idx in range(5)]
+
+    snapshot = json.loads(store_path.read_text(encoding="utf-8"))
+    assert snapshot["log_seq"] == 4
+    assert len(snapshot["tasks"]) == 4
+    assert len(store.log_path.read_text(encoding="utf-8").splitlines()) == 1
+
+    # 模拟旧日志未被截断：已包含在快照中的记录按序号跳过
+    stale = {"seq": 2, "event": store.list_events()[1].to_dict(), "task": None}
+    with store.log_path.open("a", encoding="utf-8") as handle:
+        handle.write(json.dumps(stale) + "\n")
+        handle.write('{"seq": 9, "event":')  # 崩溃留下的半行
+
+    reloaded = TaskStore(storage_path=store_path)
+    assert {task.task_id for task in reloaded.list_tasks()} == {t.task_id for t in tasks}
+    assert len(reloaded.list_events()) == 5
+
+
+def test_records_appended_after_torn_tail_survive_reload(tmp_path) -> None:
+    """加载时截掉残行，崩溃后追加的记录在下次加载时仍可读到。"""
+    store_path = tmp_path / "todo.json"
+    store = TaskStore(storage_path=store_path)
+    first = store.create_task(title="清洗数据")
+    store.close()
+    with store.log_path.open("a", encoding="utf-8") as handle:
+        handle.write('{"seq": 2, "event":')  # 崩溃留下的半行
+
+    recovered = TaskStore(storage_path=store_path)
+    second = recovered.create_task(title="建模")
+    recovered.flush()
+
+    reloaded = TaskStore(storage_path=store_path)
+    assert {task.task_id for task in reloaded.list_tasks()} == {first.task_id, second.task_id}
+    assert all(json.loads(line) for line in store.log_path.read_text("utf-8").splitlines())
+
+
+def test_ready_queue_tracks_dependency_changes_incrementally() -> None:
+    """依赖修改、删除已完成依赖时，ready queue 应同步更新。"""
+    store = TaskStore()
+    base = store.create_task(title="读取数据")
+    extra = store.create_task(title="补充数据")
+    child = store.create_task(title="汇总", dependency_ids=[base.task_id])
+    for task_id in (base.task_id,):
+        store.claim_task(task_id, agent_id="agent-a")
+        store.start_task(task_id, agent_id="agent-a")
+        store.complete_task(task_id, agent_id="agent-a")
+
+    assert {task.task_id for task in store.list_ready_tasks()} == {extra.task_id, child.task_id}
+    assert store.dependencies_satisfied(child.task_id)
+
+    store.update_task(child.task_id, dependency_ids=[base.task_id, extra.task_id])
+    assert [task.task_id for task in store.list_ready_tasks()] == [extra.task_id]
+
+    store.update_task(child.task_id, dependency_ids=[base.task_id])
+    store.delete_task(base.task_id)
+    assert not store.dependencies_satisfied(child.task_id)
+    assert [task.task_id for task in store.list_ready_tasks()] == [extra.task_id]
@@ -0,0 +1,66 @@
+"""工具定义编译缓存与回合形态缓存测试。"""
+
+from __future__ import annotations
+
+import json
+
+from nini.agent.runner import AgentRunner
+from nini.agent.session import Session
+from nini.tools.base import Tool, ToolResult
+from nini.tools.registry import create_default_tool_registry
+
+
+class _ExtraTool(Tool):
+    @property
+    def name(self) -> str:
+        return "stat_test_extra"
+
+    @property
+    def description(self) -> str:
+        return "测试用附加工具"
+
+    @property
+    def parameters(self) -> dict:
+        return {"type": "object", "properties": {}}
+
+    async def execute(self, session: Session, **kwargs) -> ToolResult:
+        return ToolResult(success=True, message="ok")
+
+
+def test_compiled_definitions_are_reused_until_registry_changes():
+    registry = create_default_tool_registry()
+    first = registry.get_compiled_tool_definitions()
+    second = registry.get_compiled_tool_definitions()
+    assert first is second
+    assert all(a is b for a, b in zip(registry.get_tool_definitions(), first.definitions))
+
+    version = registry.version
+    registry.register(_ExtraTool())
+    registry._llm_exposed_function_tools.add("stat_test_extra")
+    assert registry.version > version
+    third = registry.get_compiled_tool_definitions()
+    assert third is not first
+    assert "stat_test_extra" in third.by_name()
+    assert third.signature != first.signature
+
+
+def test_runner_tool_block_is_identical_for_same_turn_shape():
+    registry = create_default_tool_registry()
+    runner = AgentRunner(tool_registry=registry)
+    session = Session()
+
+    first = runner._get_tool_definitions(session=session, user_message="分析数据")
+    second = runner._get_tool_definitions(session=session, user_message="分析数据")
+    assert first is not second
+    assert all(a is b for a, b in zip(first, second))
+    assert json.dumps(first, ensure_ascii=False) == json.dumps(second, ensure_ascii=False)
+
+    preferred = runner._get_tool_definitions(
+        preferred_tools={"dataset_catalog"}, session=session, user_message="分析数据"
+    )
+    assert preferred[0]["function"]["name"] == "dataset_catalog"
+    assert "首选工具" in preferred[0]["function"]["description"]
+
+    registry.unregister("dataset_catalog")
+    after = runner._get_tool_definitions(session=session, user_message="分析数据")
+    assert "dataset_catalog" not in {item["function"]["name"] for item in after}
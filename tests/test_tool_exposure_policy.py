@@ -288,3 +288,36 @@ def test_stage_transition_hint_informs_llm_about_hidden_tools() -> None:
     assert "export_chart" in hint
     # 提示应引导 LLM 调用 task_state
     assert "task_state" in hint
+
+
+def test_compute_tool_exposure_policy_memoizes_by_turn_shape(monkeypatch) -> None:
+    from nini.agent import tool_exposure_policy
+
+    monkeypatch.setattr(
+        tool_exposure_policy, "_POLICY_CACHE", type(tool_exposure_policy._POLICY_CACHE)()
+    )
+    calls: list[str] = []
+    original = tool_exposure_policy._build_exposure_policy
+
+    def _counting(shape, all_tools):
+        calls.append(shape.stage)
+        return original(shape, all_tools)
+
+    monkeypatch.setattr(tool_exposure_policy, "_build_exposure_policy", _counting)
+    registry = _FakeRegistry(["load_dataset", "stat_test", "export_report", "task_state"])
+    session = Session()
+
+    first = compute_tool_exposure_policy(
+        session=session, tool_registry=registry, user_message="导出报告"
+    )
+    first["visible_tools"].append("polluted")
+    second = compute_tool_exposure_policy(
+        session=session, tool_registry=registry, user_message="导出报告"
+    )
+    assert calls == ["export"]
+    assert "polluted" not in second["visible_tools"]
+
+    # 授权状态属于回合形态的一部分，变化后重新计算
+    session.grant_tool_approval("export_report")
+    compute_tool_exposure_policy(session=session, tool_registry=registry, user_message="导出报告")
+    assert calls == ["export", "export"]
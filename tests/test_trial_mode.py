@@ -8,13 +8,9 @@ import pytest
 
 
 def _build_db_mock(key_value_pairs: list[tuple[str, str]]) -> AsyncMock:
-    """构造模拟 DB：SELECT 返回指定的 key-value 行列表。"""
+    """构造模拟数据库服务：fetchall 返回指定的 key-value 行列表。"""
     db = AsyncMock()
-    cursor = AsyncMock()
-    cursor.fetchall = AsyncMock(return_value=key_value_pairs)
-    db.execute = AsyncMock(return_value=cursor)
-    db.commit = AsyncMock()
-    db.close = AsyncMock()
+    db.fetchall = AsyncMock(return_value=key_value_pairs)
     return db
 
 
@@ -28,11 +24,8 @@ async def _call_get_trial_status(
     """辅助：以指定行数据和用量限额调用 get_trial_status()。"""
     db = _build_db_mock(rows)
 
-    async def fake_get_db():
-        return db
-
     with (
-        patch("nini._config_trial.get_db", fake_get_db),
+        patch("nini._config_trial.get_database", return_value=db),
         patch("nini._config_trial.settings") as mock_settings,
         patch(
             "nini._config_trial.get_builtin_usage",
@@ -1,18 +1,23 @@
 """更新包下载与续传相关测试。
 
-§3.2 redirect 拒绝；后续 §7 续传 sha256 比对将在此文件追加。
+§3.2 redirect 拒绝；§7 续传 sha256 比对；本地 HTTP 服务器上的并行分段下载与增量补丁。
 """
 
 from __future__ import annotations
 
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 import hashlib
+import os
+import threading
 
 import httpx
 import pytest
 
+from nini.update import download as download_mod
+from nini.update.delta import DeltaError, apply_patch, create_patch
 from nini.update.download import download_asset
-from nini.update.models import UpdateAsset, UpdateDownloadState
+from nini.update.models import UpdateAsset, UpdateDownloadState, UpdatePatch
 from nini.update.state import UpdateStateStore
 
 
@@ -101,3 +106,253 @@ async def test_download_asset_discards_resume_when_sha256_changes(tmp_path: Path
     assert result.downloaded_bytes == len(payload)
     assert requests[0].headers.get("Range") is None
     assert (version_dir / "Nini-0.1.2-Setup.exe").read_bytes() == payload
+
+
+# ---- 本地 HTTP 服务器：并行分段下载与增量补丁 ----
+
+
+class _RangeServer:
+    """测试用静态文件服务器，可选支持 Range，并记录请求。"""
+
+    def __init__(self) -> None:
+        self.files: dict[str, bytes] = {}
+        self.support_ranges = True
+        self.requests: list[tuple[str, str | None]] = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args) -> None:  # noqa: D401 - 静默日志
+                pass
+
+            def do_GET(self) -> None:
+                range_header = self.headers.get("Range")
+                server.requests.append((self.path, range_header))
+                body = server.files.get(self.path)
+                if body is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                if range_header and server.support_ranges:
+                    start_raw, end_raw = range_header.removeprefix("bytes=").split("-")
+                    start = int(start_raw)
+                    end = int(end_raw) if end_raw else len(body) - 1
+                    chunk = body[start : end + 1]
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{len(body)}")
+                else:
+                    chunk = body
+                    self.send_response(200)
+                self.send_header("Content-Length", str(len(chunk)))
+                self.end_headers()
+                self.wfile.write(chunk)
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def paths_requested(self) -> list[str]:
+        return [path for path, _ in self.requests]
+
+
+@pytest.fixture
+def range_server():
+    server = _RangeServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def small_segments(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(download_mod, "_MIN_SEGMENT_BYTES", 64 * 1024)
+
+
+def _asset_for(url: str, payload: bytes, patches: list[UpdatePatch] | None = None) -> UpdateAsset:
+    return UpdateAsset(
+        platform="windows-x64",
+        url=url,
+        size=len(payload),
+        sha256=hashlib.sha256(payload).hexdigest(),
+        patches=patches or [],
+    )
+
+
+async def _download(asset: UpdateAsset, tmp_path: Path, **kwargs) -> UpdateDownloadState:
+    async with httpx.AsyncClient(trust_env=False, timeout=10) as client:
+        return await download_asset(
+            asset,
+            version="0.2.0",
+            updates_dir=tmp_path / "updates",
+            state_store=UpdateStateStore(tmp_path / "state.json"),
+            timeout=10.0,
+            client=client,
+            **kwargs,
+        )
+
+
+@pytest.mark.asyncio
+async def test_parallel_segments_hash_while_streaming(
+    tmp_path: Path, range_server, small_segments, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    payload = os.urandom(300 * 1024)
+    range_server.files["/stable/Nini-0.2.0-Setup.exe"] = payload
+    asset = _asset_for(f"{range_server.base_url}/stable/Nini-0.2.0-Setup.exe", payload)
+
+    def _no_second_pass(path: Path) -> str:
+        raise AssertionError("校验阶段不应再次读取整个安装包")
+
+    monkeypatch.setattr(download_mod, "sha256_file", _no_second_pass)
+    result = await _download(asset, tmp_path, segments=4)
+
+    assert result.status == "ready" and result.verified
+    ranges = sorted(r for _, r in range_server.requests)
+    assert len(ranges) == 4 and all(r and r.startswith("bytes=") for r in ranges)
+    assert Path(result.installer_path).read_bytes() == payload
+
+
+@pytest.mark.asyncio
+async def test_segmented_download_falls_back_without_range_support(
+    tmp_path: Path, range_server, small_segments
+) -> None:
+    payload = os.urandom(200 * 1024)
+    range_server.support_ranges = False
+    range_server.files["/stable/Nini-0.2.0-Setup.exe"] = payload
+    asset = _asset_for(f"{range_server.base_url}/stable/Nini-0.2.0-Setup.exe", payload)
+
+    result = await _download(asset, tmp_path, segments=3)
+
+    assert result.status == "ready"
+    # 回退的单连接请求不带 Range
+    assert range_server.requests[-1][1] is None
+    assert Path(result.installer_path).read_bytes() == payload
+
+
+def _publish_patch(tmp_path: Path, server: _RangeServer, old: bytes, new: bytes) -> UpdatePatch:
+    old_file = tmp_path / "old.exe"
+    new_file = tmp_path / "new.exe"
+    patch_file = tmp_path / "0.1.0-to-0.2.0.delta"
+    old_file.write_bytes(old)
+    new_file.write_bytes(new)
+    create_patch(old_file, new_file, patch_file, block_size=1024)
+    patch_bytes = patch_file.read_bytes()
+    server.files["/stable/0.1.0-to-0.2.0.delta"] = patch_bytes
+    return UpdatePatch(
+        from_version="0.1.0",
+        from_size=len(old),
+        from_sha256=hashlib.sha256(old).hexdigest(),
+        url=f"{server.base_url}/stable/0.1.0-to-0.2.0.delta",
+        size=len(patch_bytes),
+        sha256=hashlib.sha256(patch_bytes).hexdigest(),
+    )
+
+
+def _cache_installed_version(tmp_path: Path, payload: bytes) -> None:
+    base_dir = tmp_path / "updates" / "0.1.0"
+    base_dir.mkdir(parents=True)
+    (base_dir / "Nini-0.1.0-Setup.exe").write_bytes(payload)
+
+
+@pytest.mark.asyncio
+async def test_delta_patch_rebuilds_installer_without_full_download(
+    tmp_path: Path, range_server
+) -> None:
+    old = os.urandom(64 * 1024)
+    new = old[:20_000] + b"changed module" * 50 + old[20_000:]
+    patch = _publish_patch(tmp_path, range_server, old, new)
+    range_server.files["/stable/Nini-0.2.0-Setup.exe"] = new
+    asset = _asset_for(f"{range_server.base_url}/stable/Nini-0.2.0-Setup.exe", new, [patch])
+    _cache_installed_version(tmp_path, old)
+
+    result = await _download(asset, tmp_path, current_version="0.1.0")
+
+    assert result.status == "ready" and result.verified
+    assert range_server.paths_requested() == ["/stable/0.1.0-to-0.2.0.delta"]
+    assert patch.size < len(new) // 4
+    assert Path(result.installer_path).read_bytes() == new
+    assert not (tmp_path / "updates" / "0.2.0" / "staging").exists()
+
+
+@pytest.mark.asyncio
+async def test_corrupt_delta_patch_falls_back_to_full_download(
+    tmp_path: Path, range_server
+) -> None:
+    old = os.urandom(32 * 1024)
+    new = b"prefix" + old
+    patch = _publish_patch(tmp_path, range_server, old, new)
+    # 服务器上的补丁被篡改：补丁哈希校验失败后回退完整安装包
+    range_server.files["/stable/0.1.0-to-0.2.0.delta"] = b"X" * patch.size
+    range_server.files["/stable/Nini-0.2.0-Setup.exe"] = new
+    asset = _asset_for(f"{range_server.base_url}/stable/Nini-0.2.0-Setup.exe", new, [patch])
+    _cache_installed_version(tmp_path, old)
+
+    result = await _download(asset, tmp_path, current_version="0.1.0")
+
+    assert result.status == "ready"
+    assert range_server.paths_requested() == [
+        "/stable/0.1.0-to-0.2.0.delta",
+        "/stable/Nini-0.2.0-Setup.exe",
+    ]
+    assert Path(result.installer_path).read_bytes() == new
+
+
+@pytest.mark.asyncio
+async def test_delta_skipped_without_matching_base(tmp_path: Path, range_server) -> None:
+    old = os.urandom(16 * 1024)
+    new = old + b"suffix"
+    patch = _publish_patch(tmp_path, range_server, old, new)
+    range_server.files["/stable/Nini-0.2.0-Setup.exe"] = new
+    asset = _asset_for(f"{range_server.base_url}/stable/Nini-0.2.0-Setup.exe", new, [patch])
+    _cache_installed_version(tmp_path, b"other installer")
+
+    result = await _download(asset, tmp_path, current_version="0.1.0")
+
+    assert result.status == "ready"
+    assert range_server.paths_requested() == ["/stable/Nini-0.2.0-Setup.exe"]
+
+
+@pytest.mark.asyncio
+async def test_resume_requires_contiguous_partial_file(tmp_path: Path, range_server) -> None:
+    payload = os.urandom(4096)
+    range_server.files["/stable/Nini-0.2.0-Setup.exe"] = payload
+    asset = _asset_for(f"{range_server.base_url}/stable/Nini-0.2.0-Setup.exe", payload)
+    version_dir = tmp_path / "updates" / "0.2.0"
+    version_dir.mkdir(parents=True)
+    # 分段下载中断留下的带空洞文件：大小与记录的已下载字节数不一致
+    (version_dir / "Nini-0.2.0-Setup.exe.download").write_bytes(b"\0" * 3000)
+    UpdateStateStore(tmp_path / "state.json").save(
+        UpdateDownloadState(
+            status="downloading",
+            version="0.2.0",
+            downloaded_bytes=1000,
+            installer_path=str(version_dir / "Nini-0.2.0-Setup.exe"),
+            expected_sha256=asset.sha256,
+            expected_size=asset.size,
+        )
+    )
+
+    result = await _download(asset, tmp_path)
+
+    assert result.status == "ready"
+    assert range_server.requests == [("/stable/Nini-0.2.0-Setup.exe", None)]
+
+
+def test_apply_patch_rejects_mismatched_base(tmp_path: Path) -> None:
+    old = tmp_path / "old.exe"
+    new = tmp_path / "new.exe"
+    patch = tmp_path / "p.delta"
+    old.write_bytes(os.urandom(8192))
+    new.write_bytes(old.read_bytes()[:4096] + b"tail")
+    create_patch(old, new, patch, block_size=1024)
+
+    assert (
+        apply_patch(old, patch, tmp_path / "out.exe")
+        == hashlib.sha256(new.read_bytes()).hexdigest()
+    )
+    (tmp_path / "short.exe").write_bytes(b"too short")
+    with pytest.raises(DeltaError):
+        apply_patch(tmp_path / "short.exe", patch, tmp_path / "out2.exe")
@@ -213,6 +213,28 @@ def test_select_asset_rejects_cross_domain_asset_url() -> None:
         )
 
 
+def test_select_asset_rejects_cross_domain_patch_url() -> None:
+    payload = _manifest_payload()
+    payload["assets"][0]["patches"] = [
+        {
+            "from_version": "0.1.1",
+            "from_size": 900,
+            "from_sha256": "B" * 64,
+            "url": "https://evil.example.net/0.1.1-to-0.1.2.delta",
+            "size": 120,
+            "sha256": _SHA,
+        }
+    ]
+    manifest = UpdateManifest.model_validate(payload)
+    assert manifest.assets[0].patches[0].from_sha256 == "b" * 64
+    with pytest.raises(ManifestError, match="增量补丁 URL 必须与更新源同域"):
+        select_asset(
+            manifest,
+            channel="stable",
+            base_url="https://updates.example.com/releases",
+        )
+
+
 @pytest.mark.asyncio
 async def test_fetch_manifest_parses_payload() -> None:
     def handler(request: httpx.Request) -> httpx.Response:
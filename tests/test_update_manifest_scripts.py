@@ -34,6 +34,31 @@ def test_build_manifest_contains_installer_metadata(tmp_path) -> None:
     assert len(asset["sha256"]) == 64
 
 
+def test_build_manifest_includes_delta_patches(tmp_path) -> None:
+    old = tmp_path / "Nini-0.1.0-Setup.exe"
+    old.write_bytes(b"old-installer")
+    installer = tmp_path / "Nini-0.1.1-Setup.exe"
+    installer.write_bytes(b"nini-installer")
+    patch = tmp_path / "0.1.0-to-0.1.1.delta"
+    patch.write_bytes(b"delta")
+
+    manifest = build_manifest(
+        installer=installer,
+        version="0.1.1",
+        channel="stable",
+        base_url="https://updates.example.com/nini/",
+        notes="",
+        important=False,
+        patches=[("0.1.0", old, patch)],
+    )
+
+    entry = manifest["assets"][0]["patches"][0]
+    assert entry["from_version"] == "0.1.0"
+    assert entry["from_size"] == len(b"old-installer")
+    assert entry["url"] == "https://updates.example.com/nini/stable/0.1.0-to-0.1.1.delta"
+    assert entry["size"] == len(b"delta")
+
+
 def test_build_manifest_rejects_insecure_base_url(tmp_path) -> None:
     installer = tmp_path / "Nini-0.1.1-Setup.exe"
     installer.write_bytes(b"nini-installer")
@@ -0,0 +1,189 @@
+"""webr 预热会话池测试（使用假 webr 虚拟机，不依赖 webr 实际安装）。"""
+
+from __future__ import annotations
+
+import json
+import re
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from nini.config import settings
+from nini.sandbox import webr_executor
+from nini.sandbox.webr_executor import (
+    WebRExecutor,
+    WebRSessionPool,
+    dataset_version,
+    encode_columnar,
+)
+
+
+class _FakeVM:
+    """记录收到的脚本；用户脚本按配置返回结束标记。"""
+
+    def __init__(self, replies: list[str] | None = None) -> None:
+        self.scripts: list[str] = []
+        self.threads: list[str] = []
+        self.replies = list(replies or [])
+
+    def run_r_code(self, code: str) -> SimpleNamespace:
+        self.scripts.append(code)
+        self.threads.append(threading.current_thread().name)
+        if "# ---- 执行用户代码 ----" not in code:
+            return SimpleNamespace(output="", message="")
+        output = self.replies.pop(0) if self.replies else "__NINI_OK__\n__NINI_RESULT__:42"
+        return SimpleNamespace(output=output, message="")
+
+    @property
+    def user_scripts(self) -> list[str]:
+        return [code for code in self.scripts if "# ---- 执行用户代码 ----" in code]
+
+
+@pytest.fixture(autouse=True)
+def _webr_available(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "data_dir", tmp_path / "data")
+    monkeypatch.setattr(webr_executor, "_check_webr", lambda: True)
+
+
+def _executor(vms: list[_FakeVM], size: int = 1) -> WebRExecutor:
+    pending = list(vms)
+    pool = WebRSessionPool(size, preload_packages=["stats"], factory=lambda: pending.pop(0))
+    return WebRExecutor(timeout_seconds=1, pool=pool)
+
+
+def _run(executor: WebRExecutor, session_id: str, datasets: dict[str, pd.DataFrame]) -> dict:
+    return executor._execute_sync(
+        code="result <- nrow(df)",
+        session_id=session_id,
+        datasets=datasets,
+        dataset_name="d",
+        persist_df=False,
+    )
+
+
+async def test_runs_reuse_warm_session_and_skip_unchanged_datasets() -> None:
+    vm = _FakeVM()
+    executor = _executor([vm])
+    df = pd.DataFrame({"x": [1, 2, 3]})
+
+    first = await executor.execute(code="result <- 1", session_id="s1", datasets={"d": df})
+    second = await executor.execute(code="result <- 1", session_id="s1", datasets={"d": df})
+
+    assert first["success"] and second["result"] == 42
+    assert executor.pool.stats()["created"] == 1
+    # 预热脚本加载 jsonlite 与配置包，仅执行一次
+    assert sum('attach(NULL, name = "nini:store")' in code for code in vm.scripts) == 1
+    assert 'c("jsonlite", "stats")' in vm.scripts[0]
+    first_script, second_script = vm.user_scripts
+    assert '.nini_put("d"' in first_script
+    assert ".nini_put(" not in second_script
+    assert f'.nini_fetch(c("d"), c("{dataset_version(df)}"))' in second_script
+    # 执行在工作线程而非事件循环线程
+    assert all(name != threading.main_thread().name for name in vm.threads)
+    # 每次执行后都重置工作区，并按预热快照恢复 options/搜索路径/工作目录
+    assert ".nini_baseline" in vm.scripts[0]
+    resets = [code for code in vm.scripts if code.startswith("rm(list = ls(envir = globalenv()")]
+    assert len(resets) == 2
+    assert all("options(baseline$options)" in code for code in resets)
+    assert all("setwd(baseline$wd)" in code and "detach(" in code for code in resets)
+
+
+def test_changed_dataset_and_new_owner_reimport() -> None:
+    vm = _FakeVM()
+    executor = _executor([vm])
+    df = pd.DataFrame({"x": [1, 2, 3]})
+
+    _run(executor, "s1", {"d": df, "extra": df})
+    _run(executor, "s1", {"d": df.assign(x=[1, 2, 4])})
+    _run(executor, "s2", {"d": df})
+
+    _first, changed, other_owner = vm.user_scripts
+    assert changed.count(".nini_put(") == 1 and '.nini_drop(c("extra"))' in changed
+    assert ".nini_drop(ls(.nini_datasets" in other_owner
+    assert '.nini_put("d"' in other_owner
+
+
+def test_stale_store_triggers_one_full_reimport() -> None:
+    vm = _FakeVM(replies=["__NINI_OK__", "__NINI_STALE__", "__NINI_OK__\n__NINI_RESULT__:7"])
+    executor = _executor([vm])
+    df = pd.DataFrame({"x": [1.5]})
+
+    _run(executor, "s1", {"d": df})
+    result = _run(executor, "s1", {"d": df})
+
+    assert result["success"] and result["result"] == 7 and result["stdout"] == ""
+    _first, stale, retried = vm.user_scripts
+    assert ".nini_put(" not in stale and '.nini_put("d"' in retried
+
+
+def test_failed_session_is_discarded_and_replaced() -> None:
+    class _BrokenVM(_FakeVM):
+        def run_r_code(self, code: str) -> SimpleNamespace:
+            if "# ---- 执行用户代码 ----" in code:
+                raise RuntimeError("wasm 崩溃")
+            return super().run_r_code(code)
+
+    healthy = _FakeVM()
+    executor = _executor([_BrokenVM(), healthy])
+
+    failed = _run(executor, "s1", {})
+    recovered = _run(executor, "s1", {})
+
+    assert not failed["success"] and "wasm 崩溃" in failed["error"]
+    assert recovered["success"]
+    stats = executor.pool.stats()
+    assert (stats["created"], stats["discarded"], stats["live"]) == (2, 1, 1)
+
+
+def test_pool_waits_for_free_session_then_times_out() -> None:
+    pool = WebRSessionPool(1, preload_packages=[], factory=_FakeVM)
+    held = pool.acquire("s1")
+    with pytest.raises(TimeoutError):
+        pool.acquire("s2", timeout=0.05)
+
+    pool.release(held)
+    assert pool.acquire("s2", timeout=0.05) is held
+
+
+def test_columnar_encoding_preserves_missing_values_and_types() -> None:
+    df = pd.DataFrame(
+        {
+            "num": [1.0, float("nan"), float("inf")],
+            "int": pd.array([1, None, 3], dtype="Int64"),
+            "txt": ["a", None, "c)-"],
+            "when": pd.to_datetime(["2024-01-02 03:04:05", None, "2024-02-01 00:00:00"]),
+            "flag": [True, False, True],
+        }
+    )
+
+    payload = json.loads(encode_columnar(df))
+
+    assert payload["names"] == ["num", "int", "txt", "when", "flag"]
+    assert payload["nrow"] == 3
+    assert payload["columns"] == [
+        [1.0, None, None],
+        [1, None, 3],
+        ["a", None, "c)-"],
+        ["2024-01-02 03:04:05", None, "2024-02-01 00:00:00"],
+        [True, False, True],
+    ]
+    # 内容以 )- 结尾时 JSON 中出现 )-"，原始字符串定界符自动加长
+    script = webr_executor._r_raw_string(encode_columnar(df))
+    assert re.match(r'^r"--\(', script) and script.endswith(')--"')
+
+
+def test_object_columns_are_encoded_by_inferred_type() -> None:
+    df = pd.DataFrame(
+        {
+            "mixed": pd.Series([1, 2.5, None], dtype=object),
+            "flag": pd.Series([True, None, False], dtype=object),
+            "txt": pd.Series(["a", 1, None], dtype=object),
+        }
+    )
+
+    payload = json.loads(encode_columnar(df))
+
+    assert payload["columns"] == [[1.0, 2.5, None], [True, None, False], ["a", "1", None]]
@@ -0,0 +1,147 @@
+"""工作区分段预览测试：行偏移索引、CSV 表头嗅探、图片 ETag/Range。"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import httpx
+import pytest
+
+from nini.agent.session import session_manager
+from nini.app import create_app
+from nini.config import settings
+from nini.workspace import WorkspaceManager
+from nini.workspace.preview import (
+    INDEX_STRIDE,
+    build_line_index,
+    clear_line_index_cache,
+    get_line_index,
+    read_line_window,
+    sniff_tabular_header,
+)
+
+
+@pytest.fixture(autouse=True)
+def _reset_index_cache():
+    clear_line_index_cache()
+    yield
+    clear_line_index_cache()
+
+
+def _write_lines(path: Path, count: int, *, trailing_newline: bool = True) -> None:
+    body = "\n".join(f"line-{i}" for i in range(count))
+    path.write_text(body + ("\n" if trailing_newline else ""), encoding="utf-8")
+
+
+def test_line_index_counts_lines_like_splitlines(tmp_path: Path):
+    path = tmp_path / "a.txt"
+    _write_lines(path, 1000, trailing_newline=False)
+    index = build_line_index(path)
+    assert index.total_lines == len(path.read_text(encoding="utf-8").splitlines())
+    assert len(index.checkpoints) == 1000 // INDEX_STRIDE + 1
+
+
+def test_read_line_window_seeks_to_arbitrary_offset(tmp_path: Path):
+    path = tmp_path / "big.txt"
+    _write_lines(path, 5000)
+
+    window = read_line_window(path, start_line=1234, max_lines=3)
+    assert window["content"] == "line-1234\nline-1235\nline-1236\n"
+    assert window["start_line"] == 1234
+    assert window["preview_lines"] == 3
+    assert window["total_lines"] == 5000
+
+    tail = read_line_window(path, start_line=4998, max_lines=10)
+    assert tail["content"] == "line-4998\nline-4999\n"
+
+
+def test_line_index_invalidated_when_file_changes(tmp_path: Path):
+    path = tmp_path / "grow.txt"
+    _write_lines(path, 10)
+    first = get_line_index(path)
+    assert get_line_index(path) is first
+
+    _write_lines(path, 20)
+    second = get_line_index(path)
+    assert second is not first
+    assert second.total_lines == 20
+
+
+def test_sniff_tabular_header_reads_first_block_only(tmp_path: Path):
+    path = tmp_path / "data.csv"
+    rows = ["id,score,label,flag"] + [f"{i},{i * 0.5},g{i % 3},true" for i in range(50000)]
+    path.write_text("\n".join(rows) + "\n", encoding="utf-8")
+
+    info = sniff_tabular_header(path, "csv")
+    assert info is not None
+    assert info["delimiter"] == ","
+    assert [col["name"] for col in info["columns"]] == ["id", "score", "label", "flag"]
+    assert [col["type"] for col in info["columns"]] == ["integer", "number", "string", "boolean"]
+    assert info["sampled_rows"] <= 200
+
+
+@pytest.fixture
+def client(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, "data_dir", tmp_path / "data")
+    monkeypatch.setattr(settings, "api_key", "")
+    settings.ensure_dirs()
+    session_manager._sessions.clear()
+    app = create_app()
+    transport = httpx.ASGITransport(app=app)
+    yield httpx.AsyncClient(transport=transport, base_url="http://testserver")
+    session_manager._sessions.clear()
+
+
+async def _create_session(client: httpx.AsyncClient) -> str:
+    resp = await client.post("/api/sessions")
+    return resp.json()["data"]["session_id"]
+
+
+@pytest.mark.asyncio
+async def test_preview_api_returns_requested_window(client: httpx.AsyncClient):
+    session_id = await _create_session(client)
+    manager = WorkspaceManager(session_id)
+    manager.ensure_dirs()
+    _write_lines(manager.notes_dir / "log.txt", 3000)
+
+    resp = await client.get(
+        f"/api/workspace/{session_id}/files/notes/log.txt/preview",
+        params={"start_line": 2000, "max_lines": 2},
+    )
+    assert resp.status_code == 200
+    data = resp.json()["data"]
+    assert data["preview_type"] == "text"
+    assert data["content"] == "line-2000\nline-2001\n"
+    assert data["total_lines"] == 3000
+
+
+@pytest.mark.asyncio
+async def test_image_preview_uses_url_with_etag_and_range(client: httpx.AsyncClient):
+    session_id = await _create_session(client)
+    manager = WorkspaceManager(session_id)
+    manager.ensure_dirs()
+    image_bytes = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 4
+    (manager.artifacts_dir / "plot.png").write_bytes(image_bytes)
+
+    preview = (
+        await client.get(f"/api/workspace/{session_id}/files/artifacts/plot.png/preview")
+    ).json()["data"]
+    assert preview["preview_type"] == "image"
+    assert "data" not in preview
+    assert preview["url"] == f"/api/workspace/{session_id}/files/artifacts/plot.png"
+
+    full = await client.get(preview["url"])
+    assert full.status_code == 200
+    assert full.content == image_bytes
+    etag = full.headers["etag"]
+
+    cached = await client.get(preview["url"], headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+
+    partial = await client.get(preview["url"], headers={"Range": "bytes=8-15"})
+    assert partial.status_code == 206
+    assert partial.content == image_bytes[8:16]
+    assert partial.headers["content-range"] == f"bytes 8-15/{len(image_bytes)}"
+
+    unsatisfiable = await client.get(preview["url"], headers={"Range": "bytes=99999-"})
+    assert unsatisfiable.status_code == 416
@@ -0,0 +1,102 @@
+"""流式 ZIP 打包测试。"""
+
+from __future__ import annotations
+
+import io
+import zipfile
+from pathlib import Path
+
+import httpx
+import pytest
+
+from nini.agent.session import session_manager
+from nini.app import create_app
+from nini.config import settings
+from nini.workspace import WorkspaceManager
+from nini.workspace.zip_stream import ZipManifest, iter_zip_stream
+
+
+def test_iter_zip_stream_yields_incrementally_and_roundtrips(tmp_path: Path):
+    text_path = tmp_path / "data.csv"
+    text_path.write_text("a,b\n" + "1,2\n" * 200000, encoding="utf-8")
+    png_path = tmp_path / "chart.png"
+    png_path.write_bytes(b"\x89PNG\r\n\x1a\n" + b"\x00" * 4096)
+
+    manifest = ZipManifest()
+    manifest.add_file(text_path, "data.csv")
+    manifest.add_file(png_path, "chart.png")
+    manifest.add_bytes("metadata.json", b'{"ok": true}')
+    assert len(manifest) == 3
+    assert manifest.total_bytes == text_path.stat().st_size + png_path.stat().st_size + 12
+
+    chunks = list(iter_zip_stream(manifest, chunk_size=64 * 1024))
+    assert len(chunks) > 2
+
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as zf:
+        assert zf.namelist() == ["data.csv", "chart.png", "metadata.json"]
+        assert zf.read("data.csv") == text_path.read_bytes()
+        assert zf.read("metadata.json") == b'{"ok": true}'
+        assert zf.getinfo("data.csv").compress_type == zipfile.ZIP_DEFLATED
+        # 已压缩格式直接存储，不再重复 deflate
+        assert zf.getinfo("chart.png").compress_type == zipfile.ZIP_STORED
+        assert zf.testzip() is None
+
+
+def test_manifest_dedupes_arcnames(tmp_path: Path):
+    first = tmp_path / "a" / "report.md"
+    second = tmp_path / "b" / "report.md"
+    for path in (first, second):
+        path.parent.mkdir(parents=True)
+        path.write_text(path.parent.name, encoding="utf-8")
+
+    manifest = ZipManifest()
+    manifest.add_file(first, "report.md", dedupe=True)
+    manifest.add_file(second, "report.md", dedupe=True)
+    assert [entry.arcname for entry in manifest.entries] == ["report.md", "report (2).md"]
+
+
+@pytest.fixture
+def client(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, "data_dir", tmp_path / "data")
+    monkeypatch.setattr(settings, "api_key", "")
+    settings.ensure_dirs()
+    session_manager._sessions.clear()
+    app = create_app()
+    transport = httpx.ASGITransport(app=app)
+    yield httpx.AsyncClient(transport=transport, base_url="http://testserver")
+    session_manager._sessions.clear()
+
+
+@pytest.mark.asyncio
+async def test_download_zip_route_streams_with_manifest_headers(client: httpx.AsyncClient):
+    session_id = (await client.post("/api/sessions")).json()["data"]["session_id"]
+    manager = WorkspaceManager(session_id)
+    manager.save_text_note("第一篇", "one.md")
+    manager.save_text_note("第二篇", "two.md")
+
+    resp = await client.post(
+        f"/api/workspace/{session_id}/download-zip",
+        json=["notes/one.md", "notes/two.md"],
+    )
+    assert resp.status_code == 200
+    assert resp.headers["x-archive-entries"] == "2"
+    expected_bytes = len("第一篇".encode()) + len("第二篇".encode())
+    assert resp.headers["x-archive-uncompressed-size"] == str(expected_bytes)
+    with zipfile.ZipFile(io.BytesIO(resp.content)) as zf:
+        assert sorted(zf.namelist()) == ["one.md", "two.md"]
+
+
+@pytest.mark.asyncio
+async def test_export_all_streams_session_files(client: httpx.AsyncClient):
+    session_id = (await client.post("/api/sessions")).json()["data"]["session_id"]
+    manager = WorkspaceManager(session_id)
+    manager.ensure_dirs()
+    (manager.artifacts_dir / "fig.png").write_bytes(b"\x89PNG\r\n\x1a\n")
+    manager.save_text_note("note", "n.md")
+
+    resp = await client.get(f"/api/sessions/{session_id}/export-all")
+    assert resp.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(resp.content)) as zf:
+        names = set(zf.namelist())
+        assert {"artifacts/fig.png", "notes/n.md"} <= names
+        assert zf.getinfo("artifacts/fig.png").compress_type == zipfile.ZIP_STORED
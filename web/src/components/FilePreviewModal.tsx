@@ -16,7 +16,8 @@ interface PreviewData {
  preview_type: string
  name?: string
  mime_type?: string
- data?: string // base64 图片
+ data?: string // base64 图片（旧版载荷）
+ url?: string // 图片直链
  content?: string // 文本/HTML
  ext?: string
  total_lines?: number
@@ -138,7 +139,7 @@ function PreviewContent({ preview }: { preview: PreviewData }) {
  return (
  <div className="flex items-center justify-center">
  <img
- src={preview.data}
+ src={preview.url ?? preview.data}
  alt={preview.name}
  className="max-w-full max-h-[70vh] object-contain rounded"
  />
@@ -17,6 +17,7 @@ interface PreviewData {
  name?: string
  mime_type?: string
  data?: string
+ url?: string
  content?: string
  ext?: string
  total_lines?: number
@@ -184,7 +185,7 @@ function PreviewContent({ preview }: { preview: PreviewData }) {
  return (
  <div className="flex items-center justify-center">
  <img
- src={preview.data}
+ src={preview.url ?? preview.data}
  alt={preview.name}
  className="max-w-full max-h-[72vh] object-contain rounded"
  />